@@ -0,0 +1,74 @@
+import sys
+import os
+# libディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import random
+import tempfile
+import time
+from lib.hako_area_accessor_impl import HakoAreaAccessorImpl
+from lib.hako_aabb_object_space import HakoAABBObjectSpace
+
+# 使い方: python bench/bench_area.py [エリア数 ...]
+AREA_COUNTS = [10, 1000, 100000]
+QUERY_COUNT = 2000
+DRONE_SIZE = (0.4, 0.4, 0.1)
+
+
+def generate_area_json(path, count, rng):
+    """エリアを格子状に敷き詰めたエリア定義を生成する（一部は重なる）"""
+    cols = max(1, int(count ** 0.5))
+    areas = []
+    for i in range(count):
+        x = (i % cols) * 10.0 + rng.uniform(-2, 2)
+        y = (i // cols) * 10.0 + rng.uniform(-2, 2)
+        areas.append({
+            "area_id": f"area_{i}",
+            "bounds": {
+                "min": {"x": x, "y": y, "z": 0},
+                "max": {"x": x + rng.uniform(8, 14), "y": y + rng.uniform(8, 14), "z": 50}
+            }
+        })
+    with open(path, 'w') as f:
+        json.dump({"space_areas": areas}, f)
+    return cols * 10.0
+
+
+def linear_get_area_id(accessor, object_space):
+    return accessor._find_first_overlap(None, object_space.get_bounds()['min'], object_space.get_bounds()['max'])
+
+
+def bench(count):
+    rng = random.Random(count)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'area.json')
+        extent = generate_area_json(path, count, rng)
+        t0 = time.perf_counter()
+        accessor = HakoAreaAccessorImpl(path)
+        load_sec = time.perf_counter() - t0
+
+    queries = [HakoAABBObjectSpace((rng.uniform(0, extent), rng.uniform(0, extent), rng.uniform(0, 50)), DRONE_SIZE)
+               for _ in range(QUERY_COUNT)]
+
+    t0 = time.perf_counter()
+    indexed = [accessor.get_area_id(q) for q in queries]
+    indexed_us = (time.perf_counter() - t0) / len(queries) * 1e6
+
+    # 線形探索は時間がかかるため問い合わせ数を減らす
+    linear_queries = queries[:max(20, QUERY_COUNT * 1000 // max(count, 1000))]
+    t0 = time.perf_counter()
+    linear = [linear_get_area_id(accessor, q) for q in linear_queries]
+    linear_us = (time.perf_counter() - t0) / len(linear_queries) * 1e6
+
+    assert indexed[:len(linear)] == linear, "indexed result differs from linear scan"
+    print(f"areas={count:>7}  load={load_sec * 1000:8.1f}ms  "
+          f"indexed={indexed_us:8.2f}us/query  linear={linear_us:10.2f}us/query  "
+          f"speedup={linear_us / indexed_us:8.1f}x  grid={'yes' if accessor._grid is not None else 'no'}")
+
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or AREA_COUNTS
+    for count in counts:
+        bench(count)
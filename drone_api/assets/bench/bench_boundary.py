@@ -0,0 +1,54 @@
+import sys
+import os
+# libディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import random
+import tempfile
+import time
+import numpy as np
+from lib.hako_boundary import HakoBoundary
+from tests.test_boundary import generate_walls, building_extent
+
+# 使い方: python bench/bench_boundary.py [壁の数 ...]
+WALL_COUNTS = [100, 1000, 10000, 50000]
+QUERY_COUNT = 200
+RADIUS = 5.0
+
+
+def time_queries(func, queries):
+    t0 = time.perf_counter()
+    for q in queries:
+        func(q)
+    return (time.perf_counter() - t0) / len(queries) * 1e6
+
+
+def bench(count):
+    rng = random.Random(count)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'boundary.json')
+        with open(path, 'w') as f:
+            json.dump(generate_walls(count, rng), f)
+        t0 = time.perf_counter()
+        boundary = HakoBoundary(path)
+        load_sec = time.perf_counter() - t0
+        linear = HakoBoundary(path)
+        linear.bvh = None
+
+    extent = building_extent(count)
+    queries = [np.array([rng.uniform(0, extent[i]) for i in range(3)])
+               for _ in range(QUERY_COUNT)]
+    nearest_us = time_queries(boundary.find_nearest_wall_with_hitbox, queries)
+    linear_us = time_queries(linear.find_nearest_wall_with_hitbox, queries)
+    radius_us = time_queries(lambda q: boundary.find_walls_within_radius(q, RADIUS), queries)
+    print(f"walls={count:>6}  load={load_sec * 1000:8.1f}ms  "
+          f"nearest={nearest_us:8.1f}us  linear={linear_us:8.1f}us  radius({RADIUS}m)={radius_us:8.1f}us  "
+          f"bvh={'yes' if boundary.bvh is not None else 'no'}")
+
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or WALL_COUNTS
+    for count in counts:
+        bench(count)
@@ -0,0 +1,49 @@
+import sys
+import os
+# libディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import random
+import tempfile
+import time
+from lib.hako_env_compiler import compile_env_bundle, load_env_bundle, load_env_json, validate_env_bundle
+from tests.test_boundary import generate_walls
+from bench.bench_area import generate_area_json
+
+# 使い方: python bench/bench_env_bundle.py [エリア数 壁の数]
+AREA_COUNT = 100000
+WALL_COUNT = 50000
+
+
+def generate_env(area_config_dir, area_count, wall_count, rng):
+    generate_area_json(os.path.join(area_config_dir, 'area.json'), area_count, rng)
+    properties = [{"area_id": f"area_{i}",
+                   "properties": {"wind_velocity": [rng.uniform(-5, 5), rng.uniform(-5, 5), 0.0],
+                                  "temperature": rng.uniform(-10, 30)}}
+                  for i in range(area_count)]
+    with open(os.path.join(area_config_dir, 'area_property.json'), 'w') as f:
+        json.dump({"area_properties": properties}, f)
+    with open(os.path.join(area_config_dir, 'boundary.json'), 'w') as f:
+        json.dump(generate_walls(wall_count, rng), f)
+
+
+def timed(func):
+    t0 = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - t0) * 1000
+
+
+if __name__ == '__main__':
+    area_count = int(sys.argv[1]) if len(sys.argv) > 1 else AREA_COUNT
+    wall_count = int(sys.argv[2]) if len(sys.argv) > 2 else WALL_COUNT
+    with tempfile.TemporaryDirectory() as tmpdir:
+        generate_env(tmpdir, area_count, wall_count, random.Random(0))
+        bundle_path, compile_ms = timed(lambda: compile_env_bundle(tmpdir))
+        _, json_ms = timed(lambda: load_env_json(tmpdir))
+        _, bundle_ms = timed(lambda: load_env_bundle(bundle_path))
+        errors, validate_ms = timed(lambda: validate_env_bundle(tmpdir, bundle_path))
+        print(f"areas={area_count} walls={wall_count}  bundle={os.path.getsize(bundle_path) / 1e6:.1f}MB  "
+              f"compile={compile_ms:.0f}ms  load: json={json_ms:.0f}ms bundle={bundle_ms:.1f}ms  "
+              f"speedup={json_ms / bundle_ms:.0f}x  validate={'ok' if not errors else f'{len(errors)} mismatches'}")
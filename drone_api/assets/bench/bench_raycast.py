@@ -0,0 +1,70 @@
+import sys
+import os
+# libディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import random
+import tempfile
+import time
+import numpy as np
+from lib.hako_boundary import HakoBoundary
+from tests.test_boundary import generate_walls, building_extent
+
+# 使い方: python bench/bench_raycast.py [壁の数 ...]
+WALL_COUNTS = [100, 1000, 10000, 50000]
+RAY_COUNT = 1000
+MAX_DIST = 30.0
+
+
+def per_ray_loop(boundary, origins, directions):
+    """Python のループで1本ずつ全ての壁を判定し、最も近い交点を求める（比較用）"""
+    hits = 0
+    for origin, direction in zip(origins, directions):
+        direction = direction / np.linalg.norm(direction)
+        nearest = MAX_DIST
+        found = False
+        for wall, center, normal, tangent, bitangent, half_size in zip(
+                boundary.wall_list, boundary.centers, boundary.wall_normals(), boundary.tangents,
+                boundary.bitangents, boundary.half_sizes):
+            denom = np.dot(direction, normal)
+            if denom == 0:
+                continue
+            t = np.dot(center - origin, normal) / denom
+            if t < 0 or t > nearest:
+                continue
+            d = origin + t * direction - center
+            if abs(np.dot(d, tangent)) <= half_size[0] and abs(np.dot(d, bitangent)) <= half_size[1]:
+                nearest, found = t, True
+        hits += found
+    return hits
+
+
+def bench(count):
+    rng = random.Random(count)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'boundary.json')
+        with open(path, 'w') as f:
+            json.dump(generate_walls(count, rng), f)
+        boundary = HakoBoundary(path)
+
+    nprng = np.random.default_rng(count)
+    origins = nprng.uniform(0, building_extent(count), size=(RAY_COUNT, 3))
+    directions = nprng.normal(size=(RAY_COUNT, 3))
+    t0 = time.perf_counter()
+    indices, _, _, _ = boundary.raycast_walls(origins, directions, MAX_DIST)
+    batch_us = (time.perf_counter() - t0) / RAY_COUNT * 1e6
+    # 比較用のループは遅いため、一部の光線だけで1本あたりの時間を求める
+    sample = 20
+    t0 = time.perf_counter()
+    per_ray_loop(boundary, origins[:sample], directions[:sample])
+    loop_us = (time.perf_counter() - t0) / sample * 1e6
+    print(f"walls={count:>6}  rays={RAY_COUNT}  raycast={batch_us:8.1f}us/ray  python_loop={loop_us:10.1f}us/ray  "
+          f"hit={np.mean(indices >= 0):.2f}  bvh={'yes' if boundary.bvh is not None else 'no'}")
+
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or WALL_COUNTS
+    for count in counts:
+        bench(count)
@@ -0,0 +1,54 @@
+import sys
+import os
+# libディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import tempfile
+import time
+import numpy as np
+from lib.hako_wind_field import HakoWindField
+
+# 使い方: python bench/bench_wind.py [機体数 ...]
+DRONE_COUNTS = [1, 10, 100, 1000]
+GRID_SHAPE = (200, 200, 50)
+GRID_SPACING = (1.0, 1.0, 1.0)
+TICKS = 500
+DELTA_TIME_SEC = 0.02
+
+
+def bench(wind_field, count):
+    rng = np.random.default_rng(count)
+    extent = np.array(GRID_SHAPE) * np.array(GRID_SPACING)
+    positions = rng.uniform(0, extent, size=(count, 3))
+    drone_indices = np.arange(count)
+    t0 = time.perf_counter()
+    for tick in range(TICKS):
+        wind_field.evaluate(positions, tick * DELTA_TIME_SEC, DELTA_TIME_SEC, drone_indices)
+    tick_us = (time.perf_counter() - t0) / TICKS * 1e6
+    print(f"drones={count:>5}  evaluate={tick_us:8.1f}us/tick  "
+          f"budget={tick_us / (DELTA_TIME_SEC * 1e6) * 100:6.2f}% of {DELTA_TIME_SEC * 1000:.0f}ms")
+
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or DRONE_COUNTS
+    with tempfile.TemporaryDirectory() as tmpdir:
+        grid = np.lib.format.open_memmap(os.path.join(tmpdir, 'wind_grid.npy'), mode='w+',
+                                         dtype=np.float32, shape=GRID_SHAPE + (3,))
+        grid[:] = np.random.default_rng(0).normal(0, 2, size=grid.shape)
+        grid.flush()
+        del grid
+        json_file_path = os.path.join(tmpdir, 'wind_field.json')
+        with open(json_file_path, 'w') as f:
+            json.dump({
+                "grid": {"file": "wind_grid.npy", "origin": [0, 0, 0], "spacing": list(GRID_SPACING)},
+                "gusts": [{"start_sec": 1.0, "duration_sec": 2.0, "amplitude": [3.0, 0.0, 0.0]}],
+                "turbulence": {"model": "dryden", "intensity": [1.0, 1.0, 0.5], "length_scale": [200, 200, 50]}
+            }, f)
+        t0 = time.perf_counter()
+        wind_field = HakoWindField(json_file_path)
+        print(f"grid={GRID_SHAPE}  load={(time.perf_counter() - t0) * 1000:.1f}ms (memory mapped)")
+        for count in counts:
+            bench(wind_field, count)
+        del wind_field
@@ -0,0 +1,38 @@
+import sys
+import os
+import time
+# libディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lib'))
+
+from lib.hako_env_compiler import compile_env_bundle, load_env_bundle, load_env_json, validate_env_bundle
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print(f"Usage: {sys.argv[0]} <area_config_dir> [bundle_path]")
+        return 1
+    area_config_dir = sys.argv[1]
+    bundle_path = sys.argv[2] if len(sys.argv) == 3 else None
+
+    t0 = time.perf_counter()
+    bundle_path = compile_env_bundle(area_config_dir, bundle_path)
+    print(f"INFO: compiled {bundle_path} ({os.path.getsize(bundle_path)} bytes) in {(time.perf_counter() - t0) * 1000:.1f}ms")
+
+    t0 = time.perf_counter()
+    load_env_json(area_config_dir)
+    json_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    load_env_bundle(bundle_path)
+    bundle_ms = (time.perf_counter() - t0) * 1000
+    print(f"INFO: load time: json={json_ms:.1f}ms, bundle={bundle_ms:.1f}ms")
+
+    errors = validate_env_bundle(area_config_dir, bundle_path)
+    if errors:
+        for error in errors[:20]:
+            print(f"ERROR: {error}")
+        print(f"ERROR: bundle differs from the JSON files ({len(errors)} mismatches)")
+        return 1
+    print("INFO: bundle matches the JSON files")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
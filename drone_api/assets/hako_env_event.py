@@ -1,8 +1,6 @@
 import hakopy
 import sys
-import time
-import os
-import asyncio
+import numpy as np
 
 from hakoniwa_pdu.pdu_manager import PduManager
 from hakoniwa_pdu.impl.shm_communication_service import ShmCommunicationService
@@ -10,16 +8,25 @@ from hakoniwa_pdu.pdu_msgs.geometry_msgs.pdu_pytype_Twist import Twist
 from hakoniwa_pdu.pdu_msgs.geometry_msgs.pdu_conv_Twist import pdu_to_py_Twist 
 from hakoniwa_pdu.pdu_msgs.hako_msgs.pdu_pytype_Disturbance import Disturbance
 from hakoniwa_pdu.pdu_msgs.hako_msgs.pdu_conv_Disturbance import py_to_pdu_Disturbance
+from hakoniwa_pdu.pdu_msgs.sensor_msgs.pdu_pytype_PointCloud2 import PointCloud2
+from hakoniwa_pdu.pdu_msgs.sensor_msgs.pdu_pytype_PointField import PointField
+from hakoniwa_pdu.pdu_msgs.sensor_msgs.pdu_conv_PointCloud2 import pdu_to_py_PointCloud2, py_to_pdu_PointCloud2
 
-from lib.hako_area_accessor_impl import HakoAreaAccessorImpl
-from lib.hako_area_pro_accessor_impl import HakoAreaPropAccessorImpl
-from lib.hako_aabb_object_space import HakoAABBObjectSpace
-from lib.hako_boundary import HakoBoundary
+from lib.hako_env_compiler import load_env
+from lib.hako_pdu_robots import find_robots_with_pdus
+from lib.hako_env_reloader import HakoEnvReloader, HakoEnvMaps, load_wind_field
+from lib.hako_env_cache import HakoEnvCache
+from lib.hako_tick_timer import HakoTickTimer
+from lib.hako_ray_query import (RAY_REQUEST_PDU, RAY_RESPONSE_PDU, RAY_RESULT_DTYPE, point_fields,
+                                decode_ray_request, query_rays)
 
 # Declare the global variable for delta_time_usec
 delta_time_usec = 0
 config_path = ''
 area_config_dir=''
+# 実時間に合わせて待つかどうか（--realtime で指定する）
+realtime = False
+tick_timer = None
 def my_on_initialize(context):
     print("INFO: INITIALIZE EVENT OCCURRED")
     return 0
@@ -30,96 +37,237 @@ def my_on_reset(context):
 
 def my_sleep():
     global delta_time_usec
+    # シミュレーション時間で待つ（実時間に合わせる場合だけ、残りの実時間を待つ）
     ret = hakopy.usleep(delta_time_usec)
     if ret == False:
         return False
-    time.sleep(delta_time_usec / 1_000_000.0)
+    tick_timer.pace()
+    return True
+
+def create_disturbance(property_info, wall_result, wind=None):
+    disturbance: Disturbance = Disturbance()
+    disturbance.d_wind.value.x = 0.0
+    disturbance.d_wind.value.y = 0.0
+    disturbance.d_wind.value.z = 0.0
+
+    # 風の場で求めた風速がない場合は、エリアの風速を使う
+    if wind is None and property_info is not None:
+        wind = property_info.get_wind_velocity()
+    if wind is not None:
+        disturbance.d_wind.value.x = wind[0]
+        disturbance.d_wind.value.y = wind[1]
+        disturbance.d_wind.value.z = wind[2]
+    if property_info is not None:
+        temperature = property_info.get_temperature()
+        if temperature is not None:
+            disturbance.d_temp.value = temperature
+        sea_level_atm = property_info.get_sea_level_atm()
+        if sea_level_atm is not None:
+            disturbance.d_atm.sea_level_atm = sea_level_atm
+
+    wall, normal, point, dist = wall_result
+    if wall is not None:
+        #print(f"{hakopy.simulation_time()} nearest wall: {wall['name']}, dist: {dist}, normal: {normal}, point: {point}")
+        disturbance.d_boundary.boundary_point.x = point[0]
+        disturbance.d_boundary.boundary_point.y = point[1]
+        disturbance.d_boundary.boundary_point.z = point[2]
+        disturbance.d_boundary.boundary_normal.x = normal[0]
+        disturbance.d_boundary.boundary_normal.y = normal[1]
+        disturbance.d_boundary.boundary_normal.z = normal[2]
+    else:
+        disturbance.d_boundary.boundary_point.x = 0.0
+        disturbance.d_boundary.boundary_point.y = 0.0
+        disturbance.d_boundary.boundary_point.z = 0.0
+        disturbance.d_boundary.boundary_normal.x = 0.0
+        disturbance.d_boundary.boundary_normal.y = 0.0
+        disturbance.d_boundary.boundary_normal.z = 0.0
+    return disturbance
+
+def disturbance_key(property_info, wall_result, wind=None):
+    """create_disturbance() で書き込む内容を比較するための値"""
+    if wind is None and property_info is not None:
+        wind = property_info.get_wind_velocity()
+    temperature = sea_level_atm = None
+    if property_info is not None:
+        temperature = property_info.get_temperature()
+        sea_level_atm = property_info.get_sea_level_atm()
+    wall, normal, point, dist = wall_result
+    boundary = None
+    if wall is not None:
+        boundary = (tuple(float(v) for v in point), tuple(float(v) for v in normal))
+    return (None if wind is None else tuple(float(v) for v in wind), temperature, sea_level_atm, boundary)
+
+def area_wind(property_info):
+    if property_info is None or property_info.get_wind_velocity() is None:
+        return (0.0, 0.0, 0.0)
+    return property_info.get_wind_velocity()
+
+def read_drone_position(pdu_manager, robot_name):
+    pose_raw_data = pdu_manager.read_pdu_raw_data(robot_name, 'pos')
+    if pose_raw_data is None or len(pose_raw_data) == 0:
+        return None
+    try:
+        pose: Twist = pdu_to_py_Twist(pose_raw_data)
+    except Exception as e:
+        print(f"WARNING: hako_env_event is failed to read pose data of {robot_name}. writer will be soon available...")
+        return None
+    return (pose.linear.x, pose.linear.y, pose.linear.z)
+
+def read_ray_request(pdu_manager, robot_name):
+    raw_data = pdu_manager.read_pdu_raw_data(robot_name, RAY_REQUEST_PDU)
+    if raw_data is None or len(raw_data) == 0:
+        return None
+    try:
+        return pdu_to_py_PointCloud2(raw_data)
+    except Exception as e:
+        print(f"WARNING: hako_env_event is failed to read ray query request of {robot_name}: {e}")
+        return None
+
+def create_ray_response(request, results):
+    # 要求と同じ header を返し、問い合わせ側がどの要求への応答かを判別できるようにする
+    response: PointCloud2 = PointCloud2()
+    response.header = request.header
+    response.height = 1
+    response.width = len(results)
+    fields = []
+    for name, offset, datatype, count in point_fields(RAY_RESULT_DTYPE):
+        field: PointField = PointField()
+        field.name = name
+        field.offset = offset
+        field.datatype = datatype
+        field.count = count
+        fields.append(field)
+    response.fields = fields
+    response.is_bigendian = False
+    response.point_step = RAY_RESULT_DTYPE.itemsize
+    response.row_step = response.point_step * response.width
+    response.data = bytearray(results.tobytes())
+    response.is_dense = True
+    return response
+
+def serve_ray_queries(pdu_manager, robot_names, request_ids, boundary_accessor, area_accessor):
+    """新しい光線の問い合わせ（header.stamp が前回と異なる要求）に応答する"""
+    for robot_name in robot_names:
+        request = read_ray_request(pdu_manager, robot_name)
+        if request is None or request.width * request.height == 0:
+            continue
+        request_id = (request.header.stamp.sec, request.header.stamp.nanosec)
+        if request_ids.get(robot_name) == request_id:
+            continue
+        try:
+            origins, directions, max_dists = decode_ray_request(request.data, request.width * request.height,
+                                                                request.point_step)
+        except ValueError as e:
+            print(f"WARNING: invalid ray query request of {robot_name}: {e}")
+            request_ids[robot_name] = request_id
+            continue
+        results = query_rays(boundary_accessor, area_accessor, origins, directions, max_dists)
+        response_raw_data = py_to_pdu_PointCloud2(create_ray_response(request, results))
+        if pdu_manager.flush_pdu_raw_data_nowait(robot_name, RAY_RESPONSE_PDU, response_raw_data):
+            request_ids[robot_name] = request_id
+        else:
+            print(f"ERROR: Failed to write ray query response of {robot_name}")
 
 def on_manual_timing_control(context):
     global delta_time_usec
+    global tick_timer
     print("INFO: START Wind control")
-    area_accessor = HakoAreaAccessorImpl(os.path.join(area_config_dir, 'area.json'))
-    prop_accessor = HakoAreaPropAccessorImpl(os.path.join(area_config_dir, 'area_property.json'))
-    boundary_accessor = HakoBoundary(os.path.join(area_config_dir, 'boundary.json'))
+    # エリア・プロパティ・境界の索引は全機体で共有する
+    # compile_env.py で作成したバンドルが最新であれば、JSONを解析せずにバンドルから読み込む
+    area_accessor, prop_accessor, boundary_accessor, from_bundle = load_env(area_config_dir)
+    print(f"INFO: environment map loaded from {'bundle' if from_bundle else 'json'}")
     drone_size = (0.4, 0.4, 0.1)
+    # 風の場の定義がある場合は、エリアの一定の風速の代わりに位置と時刻に応じた風速を使う
+    wind_field = load_wind_field(area_config_dir)
+    if wind_field is not None:
+        print(f"INFO: wind field loaded: grid={wind_field.has_grid()}, gusts={len(wind_field.gusts)}, turbulence={wind_field.turbulence is not None}")
+    # 定義ファイルが更新された場合は別スレッドで読み込み直し、tick の合間に切り替える
+    reloader = HakoEnvReloader(area_config_dir, HakoEnvMaps(area_accessor, prop_accessor, boundary_accessor, wind_field))
+    reloader.start()
+
+    robot_names = find_robots_with_pdus(config_path, ['pos', 'disturb'])
+    # 光線の問い合わせの要求と応答のPDUを持つロボット
+    ray_robot_names = find_robots_with_pdus(config_path, [RAY_REQUEST_PDU, RAY_RESPONSE_PDU])
+    if len(robot_names) == 0 and len(ray_robot_names) == 0:
+        print("ERROR: No robot with 'pos' and 'disturb' PDUs found in the PDU config")
+        return 0
+    print(f"INFO: target drones: {robot_names}")
+    if len(ray_robot_names) > 0:
+        print(f"INFO: ray query clients: {ray_robot_names}")
+    ray_request_ids = {}
+    # 動いていない機体の問い合わせと、内容が変わらない書き込みを省略する
+    env_cache = HakoEnvCache(len(robot_names))
 
     # Initialize the PDU manager
     pdu_manager = PduManager()
     pdu_manager.initialize(config_path=config_path, comm_service=ShmCommunicationService())
     pdu_manager.start_service_nowait()
 
+    tick_timer = HakoTickTimer(delta_time_usec, realtime=realtime)
     while True:
+        tick_timer.end_tick()
         ret = my_sleep()
         if ret == False:
             break
+        tick_timer.start_tick()
+
+        maps = reloader.take()
+        if maps is not None:
+            area_accessor, prop_accessor = maps.area_accessor, maps.prop_accessor
+            boundary_accessor, wind_field = maps.boundary, maps.wind_field
+            # 保持しているエリアと壁の結果は古い定義によるものなので、次の tick で問い合わせ直す
+            env_cache.reset_queries()
 
         pdu_manager.run_nowait()
 
-        pose_raw_data = pdu_manager.read_pdu_raw_data('Drone', 'pos')
-        if pose_raw_data is None or len(pose_raw_data) == 0:
-            #print("ERROR: Failed to read pose data")
-            continue
-        try:
-            pose: Twist = pdu_to_py_Twist(pose_raw_data)
-        except Exception as e:
-            print("WARNING: hako_env_event is failed to read pose data. writer will be soon available...")
+        serve_ray_queries(pdu_manager, ray_robot_names, ray_request_ids, boundary_accessor, area_accessor)
+
+        # 位置を受信できた機体をまとめて処理する
+        names = []
+        drone_indices = []
+        positions = []
+        for index, robot_name in enumerate(robot_names):
+            drone_position = read_drone_position(pdu_manager, robot_name)
+            if drone_position is not None:
+                names.append(robot_name)
+                drone_indices.append(index)
+                positions.append(drone_position)
+        if len(names) == 0:
             continue
-        #print(f"Drone pose: {pose}")
-
-        drone_position = (pose.linear.x, pose.linear.y, pose.linear.z)
-        object_space = HakoAABBObjectSpace(drone_position, drone_size)
-        area_id = area_accessor.get_area_id(object_space)
-
-        disturbance: Disturbance = Disturbance()
-        disturbance.d_wind.value.x = 0.0
-        disturbance.d_wind.value.y = 0.0
-        disturbance.d_wind.value.z = 0.0
-
-        if area_id is not None:
-            #print area_id
-            #print(f"{hakopy.simulation_time()} area_id: {area_id}")
-            property_info = prop_accessor.get_property(area_id)
-            wind = property_info.get_wind_velocity()
-            if wind is not None:
-                #print(f"{hakopy.simulation_time()} wind ==> {property_info.get_wind_velocity()}")
-                disturbance.d_wind.value.x = wind[0]
-                disturbance.d_wind.value.y = wind[1]
-                disturbance.d_wind.value.z = wind[2]
-            temperature = property_info.get_temperature()
-            if temperature is not None:
-                #print(f"{hakopy.simulation_time()} temperature ==> {property_info.get_temperature()}")
-                disturbance.d_temp.value = temperature
-            sea_level_atm = property_info.get_sea_level_atm()
-            if sea_level_atm is not None:
-                #print(f"{hakopy.simulation_time()} sea_level_atm ==> {property_info.get_sea_level_atm()}")
-                disturbance.d_atm.sea_level_atm = sea_level_atm
-        else:
-            pass
-            #print(f"{hakopy.simulation_time()}: No wind")
-
-        wall, normal, point, dist = boundary_accessor.find_nearest_wall_with_hitbox(drone_position, local_normal_axis=[0, 0, 1])
-        if wall is not None:
-            #print(f"{hakopy.simulation_time()} nearest wall: {wall['name']}, dist: {dist}, normal: {normal}, point: {point}")
-            disturbance.d_boundary.boundary_point.x = point[0]
-            disturbance.d_boundary.boundary_point.y = point[1]
-            disturbance.d_boundary.boundary_point.z = point[2]
-            disturbance.d_boundary.boundary_normal.x = normal[0]
-            disturbance.d_boundary.boundary_normal.y = normal[1]
-            disturbance.d_boundary.boundary_normal.z = normal[2]
-        else:
-            #print(f"{hakopy.simulation_time()}: No boundary")
-            disturbance.d_boundary.boundary_point.x = 0.0
-            disturbance.d_boundary.boundary_point.y = 0.0
-            disturbance.d_boundary.boundary_point.z = 0.0
-            disturbance.d_boundary.boundary_normal.x = 0.0
-            disturbance.d_boundary.boundary_normal.y = 0.0
-            disturbance.d_boundary.boundary_normal.z = 0.0
+
+        positions = np.array(positions)
+        moved = env_cache.moved(drone_indices, positions)
+        area_ids, wall_results = [], []
+        if moved.any():
+            area_ids = area_accessor.get_area_ids(positions[moved], drone_size)
+            wall_results = boundary_accessor.find_nearest_walls_with_hitbox(positions[moved], local_normal_axis=[0, 0, 1])
+        area_ids, wall_results = env_cache.update_queries(drone_indices, positions, moved, area_ids, wall_results)
+        # 同じエリアにいる機体ではプロパティを1回だけ引く
+        properties = {area_id: prop_accessor.get_property(area_id) for area_id in set(area_ids) if area_id is not None}
+        winds = [None] * len(names)
+        if wind_field is not None:
+            mean_wind = None
+            if not wind_field.has_grid():
+                mean_wind = [area_wind(properties.get(area_id)) for area_id in area_ids]
+            winds = wind_field.evaluate(positions, hakopy.simulation_time() * 1e-06, delta_time_usec * 1e-06,
+                                        drone_indices, mean_wind)
+
         # write pdu data
-        disturbance_raw_data = py_to_pdu_Disturbance(disturbance)
-        ret = pdu_manager.flush_pdu_raw_data_nowait('Drone', 'disturb', disturbance_raw_data)
-        if not ret:
-            print("ERROR: Failed to write disturbance data")
+        for robot_name, index, area_id, wall_result, wind in zip(names, drone_indices, area_ids, wall_results, winds):
+            #print(f"{hakopy.simulation_time()} {robot_name} area_id: {area_id}")
+            property_info = properties.get(area_id)
+            if not env_cache.should_write(index, disturbance_key(property_info, wall_result, wind)):
+                continue
+            disturbance = create_disturbance(property_info, wall_result, wind)
+            disturbance_raw_data = py_to_pdu_Disturbance(disturbance)
+            ret = pdu_manager.flush_pdu_raw_data_nowait(robot_name, 'disturb', disturbance_raw_data)
+            if not ret:
+                env_cache.invalidate(index)
+                print(f"ERROR: Failed to write disturbance data of {robot_name}")
 
+    reloader.stop()
+    print(f"INFO: env cache counters: {env_cache.get_counters()}")
+    print(f"INFO: tick stats: {tick_timer.get_stats()}")
     return 0
 
 my_callback = {
@@ -133,16 +281,19 @@ def main():
     global delta_time_usec
     global config_path
     global area_config_dir
+    global realtime
     global pdu_manager
     
-    if len(sys.argv) != 4:
-        print(f"Usage: {sys.argv[0]} <config_path> <delta_time_msec> <area_config_dir>")
+    args = [arg for arg in sys.argv[1:] if arg != '--realtime']
+    if len(args) != 3:
+        print(f"Usage: {sys.argv[0]} <config_path> <delta_time_msec> <area_config_dir> [--realtime]")
         return 1
 
     asset_name = 'HakoEnv'
-    config_path = sys.argv[1]
-    delta_time_usec = int(sys.argv[2]) * 1000
-    area_config_dir = sys.argv[3]
+    config_path = args[0]
+    delta_time_usec = int(args[1]) * 1000
+    area_config_dir = args[2]
+    realtime = '--realtime' in sys.argv[1:]
 
     ret = hakopy.asset_register(asset_name, config_path, my_callback, delta_time_usec, hakopy.HAKO_ASSET_MODEL_PLANT)
     if ret == False:
@@ -1,9 +1,29 @@
 import json
+import math
 import os
 
+import numpy as np
+
 from ihako_area_accessor import IHakoAreaAccessor
 from ihako_object_space import IHakoObjectSpace
 from hako_aabb_object_space import HakoAABBObjectSpace
+from hako_env_bundle import encode_names, HakoBundleNameIndex, HakoBundleAreaTable
+from hako_wall_bvh import HakoWallBVH, ray_box_intervals, normalize_rays
+
+# エリア数がこれ未満の場合は索引を作らず線形探索する
+GRID_INDEX_MIN_AREAS = 32
+# 1つのエリアを登録するセル数の上限（超える巨大なエリアは常に判定対象とする）
+GRID_MAX_CELLS_PER_AREA = 64
+
+# 候補のエリア数がこれ以下の場合は1件ずつ判定する
+SMALL_CANDIDATES = 16
+
+# エリア数がこれ以上の場合は、光線の判定に使うBVHを（最初の問い合わせ時に）構築する
+RAY_BVH_MIN_AREAS = 1024
+# BVHを使わない光線の判定で、一度に計算する (光線数 x エリア数) の上限（メモリ使用量を抑える）
+RAY_CHUNK_ELEMENTS = 1 << 18
+
+_NO_AREAS = np.zeros(0, dtype=np.int64)
 
 class HakoAreaAccessorImpl(IHakoAreaAccessor):
     def __init__(self, json_file_path):
@@ -25,6 +45,123 @@ class HakoAreaAccessorImpl(IHakoAreaAccessor):
             self.space_areas = self.load_space_areas(json_file_path)
         except json.JSONDecodeError as e:
             raise ValueError(f"JSONファイルのフォーマットが不正です: {e}")
+        self.build_index()
+
+    def build_index(self):
+        """
+        エリアの一様グリッド索引を構築する。
+        各セルには重なるエリアの番号を定義順に保持し、問い合わせ時は番号の小さい順に判定するため
+        線形探索と同じく定義順で最初に重なったエリアが返る。
+        索引は配列（セル番号の昇順の CSR 形式）で保持し、バイナリバンドルからそのまま復元できるようにする。
+        """
+        self._area_ids = list(self.space_areas.keys())
+        # 判定に使う (A,3) の配列
+        self._area_mins = np.array([bounds['min'] for bounds in self.space_areas.values()], dtype=float).reshape(-1, 3)
+        self._area_maxs = np.array([bounds['max'] for bounds in self.space_areas.values()], dtype=float).reshape(-1, 3)
+        self._grid = None
+        self._ray_bvh = None
+        if len(self._area_ids) < GRID_INDEX_MIN_AREAS:
+            return
+
+        # セルの大きさは各軸のエリアの大きさの中央値とする（1つのエリアが数セルに収まる）
+        extents = np.sort(self._area_maxs - self._area_mins, axis=0)
+        median = extents[len(extents) // 2]
+        self._cell_size = tuple(float(m if m > 0 else (e if e > 0 else 1.0)) for m, e in zip(median, extents[-1]))
+
+        lo = np.floor(self._area_mins / self._cell_size).astype(np.int64)
+        hi = np.floor(self._area_maxs / self._cell_size).astype(np.int64)
+        dims = hi - lo + 1
+        counts = dims.prod(axis=1)
+        large = counts > GRID_MAX_CELLS_PER_AREA
+        self._large_areas = np.nonzero(large)[0]
+        small = np.nonzero(~large)[0]
+        # 各エリアが重なるセルを列挙する（エリア番号, セル座標）
+        indices = np.repeat(small, counts[small])
+        offsets = np.arange(len(indices)) - np.repeat(np.cumsum(counts[small]) - counts[small], counts[small])
+        dz = dims[indices, 2]
+        dyz = dims[indices, 1] * dz
+        cells = lo[indices] + np.column_stack([offsets // dyz, (offsets // dz) % dims[indices, 1], offsets % dz])
+        # セル座標を1つの整数に変換し、(セル番号, エリア番号) の順に並べる
+        self._grid_origin = lo[~large].min(axis=0) if len(small) > 0 else np.zeros(3, dtype=np.int64)
+        self._grid_shape = (hi[~large].max(axis=0) - self._grid_origin + 1) if len(small) > 0 else np.ones(3, dtype=np.int64)
+        keys = self._cell_keys(cells)
+        order = np.lexsort((indices, keys))
+        cell_keys, starts = np.unique(keys[order], return_index=True)
+        self._grid = (cell_keys, np.append(starts, len(order)), indices[order])
+        self._grid_params = tuple(int(v) for v in self._grid_origin) + tuple(int(v) for v in self._grid_shape)
+
+    def bundle_arrays(self):
+        """バイナリバンドルに書き出す配列（索引を含む）"""
+        names = encode_names(self._area_ids)
+        arrays = {
+            "area.ids": names,
+            "area.id_order": np.argsort(names, kind='stable'),
+            "area.mins": self._area_mins,
+            "area.maxs": self._area_maxs,
+        }
+        if self._grid is not None:
+            arrays.update({
+                "area.cell_size": np.array(self._cell_size, dtype=float),
+                "area.grid_params": np.array(self._grid_params, dtype=np.int64),
+                "area.cell_keys": self._grid[0],
+                "area.cell_starts": self._grid[1],
+                "area.cell_items": self._grid[2],
+                "area.large_areas": np.asarray(self._large_areas, dtype=np.int64),
+            })
+        return arrays
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        """
+        バイナリバンドルから復元する。配列はメモリマップをそのまま参照し、JSONの解析や索引の構築は行わない。
+
+        Args:
+            bundle (HakoEnvBundle): bundle_arrays() の配列を含むバンドル
+        """
+        self = cls.__new__(cls)
+        self._area_ids = bundle.array("area.ids")
+        self._area_mins = bundle.array("area.mins")
+        self._area_maxs = bundle.array("area.maxs")
+        self.space_areas = HakoBundleAreaTable(HakoBundleNameIndex(self._area_ids, bundle.array("area.id_order")),
+                                               self._area_mins, self._area_maxs)
+        self._grid = None
+        self._ray_bvh = None
+        if "area.cell_keys" in bundle:
+            self._cell_size = tuple(bundle.array("area.cell_size").tolist())
+            self._grid_params = tuple(bundle.array("area.grid_params").tolist())
+            self._grid_origin = np.array(self._grid_params[:3], dtype=np.int64)
+            self._grid_shape = np.array(self._grid_params[3:], dtype=np.int64)
+            self._grid = (bundle.array("area.cell_keys"), bundle.array("area.cell_starts"),
+                          bundle.array("area.cell_items"))
+            self._large_areas = bundle.array("area.large_areas")
+        return self
+
+    def _cell_of(self, point):
+        return (math.floor(point[0] / self._cell_size[0]),
+                math.floor(point[1] / self._cell_size[1]),
+                math.floor(point[2] / self._cell_size[2]))
+
+    def _cell_keys(self, cells):
+        """セル座標 (N,3) をセル番号 (N,) に変換する"""
+        local = cells - self._grid_origin
+        return (local[:, 0] * self._grid_shape[1] + local[:, 1]) * self._grid_shape[2] + local[:, 2]
+
+    def _cell_items(self, cell):
+        """セルに登録されたエリア番号（昇順）"""
+        ox, oy, oz, sx, sy, sz = self._grid_params
+        x, y, z = cell[0] - ox, cell[1] - oy, cell[2] - oz
+        if not (0 <= x < sx and 0 <= y < sy and 0 <= z < sz):
+            return _NO_AREAS
+        key = (x * sy + y) * sz + z
+        cell_keys, starts, items = self._grid
+        i = int(cell_keys.searchsorted(key))
+        if i == len(cell_keys) or int(cell_keys[i]) != key:
+            return _NO_AREAS
+        return items[int(starts[i]):int(starts[i + 1])]
+
+    @staticmethod
+    def _cell_count(lo, hi):
+        return (hi[0] - lo[0] + 1) * (hi[1] - lo[1] + 1) * (hi[2] - lo[2] + 1)
 
     def load_space_areas(self, json_file_path):
         """
@@ -73,18 +210,153 @@ class HakoAreaAccessorImpl(IHakoAreaAccessor):
         """
          
         obj_bounds = object_space.get_bounds()
-        
-        for area_id, bounds in self.space_areas.items():
-            area_min = bounds['min']
-            area_max = bounds['max']
-            obj_min = obj_bounds['min']
-            obj_max = obj_bounds['max']
-
-            # オブジェクトのAABBがエリアのAABBと重なっているかを判定
-            if (area_min[0] <= obj_max[0] and obj_min[0] <= area_max[0] and
-                area_min[1] <= obj_max[1] and obj_min[1] <= area_max[1] and
-                area_min[2] <= obj_max[2] and obj_min[2] <= area_max[2]):
-                return area_id
-
-        #print(f"警告: オブジェクトがどのエリアにも属していません。AABB: {obj_bounds}")
-        return None
+        return self._get_area_id_by_bounds(obj_bounds['min'], obj_bounds['max'])
+
+    def get_area_ids(self, positions, size):
+        """
+        同じ大きさの複数オブジェクト（複数機体）が属するエリアのIDをまとめて返す。
+        判定は get_area_id と同じく、定義順で最初に重なったエリアを返す。
+
+        Args:
+            positions (array_like): オブジェクトの中心位置 (N,3)
+            size (tuple): オブジェクトの大きさ (width, height, depth)
+
+        Returns:
+            list: 各オブジェクトのエリアID（該当するエリアがない場合は None）のリスト。
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        half_size = np.asarray(size, dtype=float) / 2
+        obj_mins = positions - half_size
+        obj_maxs = positions + half_size
+        if self._grid is not None:
+            # 索引を使う場合は1件あたりの判定が定数時間のため、機体ごとに問い合わせる
+            return [self._get_area_id_by_bounds(tuple(lo), tuple(hi))
+                    for lo, hi in zip(obj_mins.tolist(), obj_maxs.tolist())]
+        if len(self._area_ids) == 0:
+            return [None] * len(positions)
+        # (N,A) の重なり判定をまとめて行い、各行で最初に重なったエリアを選ぶ
+        overlap = ((self._area_mins[None, :, :] <= obj_maxs[:, None, :]) &
+                   (obj_mins[:, None, :] <= self._area_maxs[None, :, :])).all(axis=2)
+        first = overlap.argmax(axis=1)
+        hit = overlap[np.arange(len(positions)), first]
+        return [self._area_id(index) if found else None for index, found in zip(first.tolist(), hit.tolist())]
+
+    def raycast_areas(self, origins, directions, max_dists=None):
+        """
+        複数の光線が最初に入るエリアをまとめて求める（始点を含むエリアは距離 0 で入ったものとする）
+
+        Args:
+            origins (array_like): 光線の始点 (R,3)
+            directions (array_like): 光線の方向 (R,3)。正規化して使い、長さ 0 の場合は始点を含むエリアだけを返す
+            max_dists (array_like): 調べる最大距離（スカラーまたは (R,)）。None の場合は無制限
+
+        Returns:
+            tuple: (エリアIDのリスト（当たらない場合は None）, 距離 (R,)（当たらない場合は inf）)
+        """
+        indices, dists = self.raycast_area_indices(origins, directions, max_dists)
+        return [self._area_id(index) if index >= 0 else None for index in indices.tolist()], dists
+
+    def raycast_area_indices(self, origins, directions, max_dists=None):
+        """
+        raycast_areas() と同じ判定で、エリアIDの代わりにエリア番号（定義順、当たらない場合は -1）を返す
+        距離が等しい場合は定義順で先のエリアを返す
+
+        Returns:
+            tuple: (エリア番号 (R,), 距離 (R,))
+        """
+        origins = np.asarray(origins, dtype=float).reshape(-1, 3)
+        directions, max_dists = normalize_rays(directions, max_dists, len(origins))
+        indices = np.full(len(origins), -1, dtype=np.int64)
+        dists = np.full(len(origins), np.inf)
+        area_count = len(self._area_ids)
+        if area_count == 0:
+            return indices, dists
+        if area_count < RAY_BVH_MIN_AREAS:
+            step = max(1, RAY_CHUNK_ELEMENTS // area_count)
+            for start in range(0, len(origins), step):
+                rays = slice(start, start + step)
+                t = self._ray_entry_distances(origins[rays], directions[rays], max_dists[rays],
+                                              self._area_mins, self._area_maxs)
+                nearest = t.argmin(axis=1)
+                nearest_t = t[np.arange(len(t)), nearest]
+                indices[rays] = np.where(np.isfinite(nearest_t), nearest, -1)
+                dists[rays] = nearest_t
+            return indices, dists
+
+        if self._ray_bvh is None:
+            bvh = HakoWallBVH(self._area_mins, self._area_maxs)
+            # BVHの葉の区間を複製せずに参照できるよう、BVHの並び順の配列も用意する
+            self._ray_bvh_arrays = (self._area_mins[bvh.order], self._area_maxs[bvh.order])
+            self._ray_bvh = bvh
+        area_mins, area_maxs = self._ray_bvh_arrays
+        for r in range(len(origins)):
+            origin, direction, max_dist = origins[r:r + 1], directions[r:r + 1], max_dists[r:r + 1]
+            def leaf_query(leaf):
+                t = self._ray_entry_distances(origin, direction, max_dist, area_mins[leaf], area_maxs[leaf])[0]
+                return t, np.isfinite(t)
+            index, dist = self._ray_bvh.first_hit(origins[r], directions[r], max_dists[r], leaf_query)
+            if index is not None:
+                indices[r], dists[r] = index, dist
+        return indices, dists
+
+    @staticmethod
+    def _ray_entry_distances(origins, directions, max_dists, area_mins, area_maxs):
+        """光線が各エリアに入る位置までの距離 (R,A)。当たらない場合は inf"""
+        t_near, t_far = ray_box_intervals(origins, directions, area_mins, area_maxs)
+        t_near = np.maximum(t_near, 0.0)
+        valid = (t_near <= t_far) & (t_near <= max_dists[:, None])
+        return np.where(valid, t_near, np.inf)
+
+    def _area_id(self, index):
+        area_id = self._area_ids[index]
+        # バイナリバンドルから読み込んだ場合は UTF-8 のバイト列で保持している
+        return area_id.decode('utf-8') if isinstance(area_id, bytes) else area_id
+
+    def _get_area_id_by_bounds(self, obj_min, obj_max):
+        if self._grid is None:
+            return self._find_first_overlap(None, obj_min, obj_max)
+
+        lo = self._cell_of(obj_min)
+        hi = self._cell_of(obj_max)
+        if self._cell_count(lo, hi) > GRID_MAX_CELLS_PER_AREA:
+            # 巨大なオブジェクトはセルを列挙するより線形探索の方が速い
+            return self._find_first_overlap(None, obj_min, obj_max)
+
+        if lo == hi:
+            candidates = self._cell_items(lo)
+        else:
+            candidates = [self._cell_items((ix, iy, iz))
+                          for ix in range(lo[0], hi[0] + 1)
+                          for iy in range(lo[1], hi[1] + 1)
+                          for iz in range(lo[2], hi[2] + 1)]
+            candidates = np.unique(np.concatenate(candidates))
+        if len(self._large_areas) > 0:
+            candidates = np.union1d(candidates, self._large_areas)
+        if len(candidates) == 0:
+            return None
+        return self._find_first_overlap(candidates, obj_min, obj_max)
+
+    def _find_first_overlap(self, candidates, obj_min, obj_max):
+        """
+        候補のエリア番号（昇順の配列。None の場合は全てのエリア）を調べ、
+        オブジェクトのAABBと最初に重なったエリアのIDを返す
+        """
+        if candidates is None:
+            area_mins, area_maxs = self._area_mins, self._area_maxs
+        elif len(candidates) <= SMALL_CANDIDATES:
+            # 候補が少ない場合は配列演算よりも1件ずつ判定する方が速い
+            for index, area_min, area_max in zip(candidates.tolist(), self._area_mins[candidates].tolist(),
+                                                 self._area_maxs[candidates].tolist()):
+                if (area_min[0] <= obj_max[0] and obj_min[0] <= area_max[0] and
+                    area_min[1] <= obj_max[1] and obj_min[1] <= area_max[1] and
+                    area_min[2] <= obj_max[2] and obj_min[2] <= area_max[2]):
+                    return self._area_id(index)
+            return None
+        else:
+            area_mins, area_maxs = self._area_mins[candidates], self._area_maxs[candidates]
+        # オブジェクトのAABBがエリアのAABBと重なっているかを判定
+        overlap = ((area_mins <= obj_max) & (np.asarray(obj_min) <= area_maxs)).all(axis=1)
+        first = int(overlap.argmax()) if len(overlap) > 0 else 0
+        if len(overlap) == 0 or not overlap[first]:
+            return None
+        return self._area_id(first if candidates is None else int(candidates[first]))
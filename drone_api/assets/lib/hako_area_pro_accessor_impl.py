@@ -1,8 +1,11 @@
 import json
 import os
 
+import numpy as np
+
 from ihako_area_prop_accessor import IHakoAreaPropAccessor
 from hako_area_property import HakoAreaProperty
+from hako_env_bundle import encode_names, HakoBundleNameIndex, HakoBundlePropertyTable
 
 class HakoAreaPropAccessorImpl(IHakoAreaPropAccessor):
     def __init__(self, json_file_path):
@@ -62,6 +65,36 @@ class HakoAreaPropAccessorImpl(IHakoAreaPropAccessor):
         
         return area_properties_cache
 
+    def bundle_arrays(self):
+        """バイナリバンドルに書き出す配列（値がない場合は nan）"""
+        names = encode_names(list(self.area_properties.keys()))
+        values = list(self.area_properties.values())
+        def to_float(value):
+            return np.nan if value is None else value
+        return {
+            "prop.ids": names,
+            "prop.id_order": np.argsort(names, kind='stable'),
+            "prop.wind_velocity": np.array([v["wind_velocity"] if v["wind_velocity"] is not None else [np.nan] * 3
+                                            for v in values], dtype=float).reshape(-1, 3),
+            "prop.temperature": np.array([to_float(v["temperature"]) for v in values], dtype=float),
+            "prop.sea_level_atm": np.array([to_float(v["sea_level_atm"]) for v in values], dtype=float),
+        }
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        """
+        バイナリバンドルから復元する。プロパティは参照されたときに配列から取り出す。
+
+        Args:
+            bundle (HakoEnvBundle): bundle_arrays() の配列を含むバンドル
+        """
+        self = cls.__new__(cls)
+        index = HakoBundleNameIndex(bundle.array("prop.ids"), bundle.array("prop.id_order"))
+        self.area_properties = HakoBundlePropertyTable(index, bundle.array("prop.wind_velocity"),
+                                                       bundle.array("prop.temperature"),
+                                                       bundle.array("prop.sea_level_atm"))
+        return self
+
     def get_property(self, area_id: str) -> HakoAreaProperty:
         """
         指定されたエリアIDに関連するプロパティを返す。
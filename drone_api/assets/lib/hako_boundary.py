@@ -2,84 +2,325 @@
 import numpy as np
 from scipy.spatial.transform import Rotation as R
 import json
+
+from hako_wall_bvh import HakoWallBVH, normalize_rays
+from hako_env_bundle import encode_names, HakoBundleWallList
+
+# 壁の数がこれ以上の場合にBVHを構築する（少ない場合は全ての壁をまとめて計算する方が速い）
+BVH_MIN_WALLS = 1024
+# BVHを使わない光線の判定で、一度に計算する (光線数 x 壁の数) の上限（メモリ使用量を抑える）
+RAY_CHUNK_ELEMENTS = 1 << 18
+
 class HakoBoundary:
     def __init__(self, boundary_json_file_path:str):
         with open(boundary_json_file_path, 'r') as f:
             boundary_json = f.read()
             self.wall_list = json.loads(boundary_json)
+        self.compile_walls()
 
-    # 例: ローカル法線軸を指定できるようにする
-    def compute_wall_normal_from_view(self, drone_pos, wall_def, local_normal_axis=[0, 0, 1]):
-        position = np.array(wall_def["position"])
-        rotation = wall_def["rotation"]
-        r = R.from_euler('ZYX', rotation, degrees=True)
+    def compile_walls(self):
+        """
+        壁の定義をNumPy配列にまとめる（読み込み時に1回だけ行う）
+        centers: 中心 (N,3) / rotations: 回転行列 (N,3,3)
+        tangents, bitangents: 壁のローカルx軸, y軸 (N,3) / half_sizes: 半サイズ (N,2)
+        """
+        n = len(self.wall_list)
+        self.centers = np.array([wall["position"] for wall in self.wall_list], dtype=float).reshape(n, 3)
+        self.half_sizes = np.array([wall["size"] for wall in self.wall_list], dtype=float).reshape(n, 2) / 2
+        if n > 0:
+            rotations = np.array([wall["rotation"] for wall in self.wall_list], dtype=float)
+            self.rotations = R.from_euler('ZYX', rotations, degrees=True).as_matrix()
+        else:
+            self.rotations = np.zeros((0, 3, 3))
+        self._compile_derived()
 
-        normal = r.apply(local_normal_axis)
-        v = drone_pos - position
+    def _compile_derived(self, bvh=None):
+        """回転行列などから、探索に使う配列とBVHを用意する（bvh を渡した場合は構築しない）"""
+        n = len(self.centers)
+        self.tangents = self.rotations[:, :, 0]
+        self.bitangents = self.rotations[:, :, 1]
+        # ローカル法線軸 -> 各壁の法線 (N,3)
+        self._normals_cache = {}
+        # 壁の矩形を囲むAABBの半径（各軸）
+        extents = (np.abs(self.tangents) * self.half_sizes[:, 0:1]
+                   + np.abs(self.bitangents) * self.half_sizes[:, 1:2])
+        self.bvh = bvh
+        if bvh is None and n >= BVH_MIN_WALLS:
+            self.bvh = HakoWallBVH(self.centers - extents, self.centers + extents)
+        if self.bvh is not None:
+            # BVHの葉の区間を複製せずに参照できるよう、BVHの並び順の配列も用意する
+            order = self.bvh.order
+            self._bvh_arrays = (self.centers[order], self.tangents[order], self.bitangents[order],
+                                self.half_sizes[order])
 
-        if np.dot(v, normal) < 0:
-            normal = -normal
+    def bundle_arrays(self):
+        """バイナリバンドルに書き出す配列（BVHを含む）"""
+        arrays = {
+            "wall.names": encode_names([wall.get("name", "") for wall in self.wall_list]),
+            "wall.positions": self.centers,
+            "wall.sizes": self.half_sizes * 2,
+            "wall.rotations": np.array([wall["rotation"] for wall in self.wall_list], dtype=float).reshape(-1, 3),
+            "wall.matrices": self.rotations,
+        }
+        if self.bvh is not None:
+            arrays.update({
+                "wall.bvh_leaf_size": np.array([self.bvh.leaf_size], dtype=np.int64),
+                "wall.bvh_order": self.bvh.order,
+                "wall.bvh_node_lower": self.bvh.node_lower,
+                "wall.bvh_node_upper": self.bvh.node_upper,
+                "wall.bvh_children": self.bvh.children,
+                "wall.bvh_ranges": self.bvh.ranges,
+            })
+        return arrays
 
-        return normal
+    @classmethod
+    def from_bundle(cls, bundle):
+        """
+        バイナリバンドルから復元する。壁の定義（辞書）は探索結果として返すときに作る。
 
-    def intersect_ray_with_plane(self, drone_pos, wall_pos, normal):
+        Args:
+            bundle (HakoEnvBundle): bundle_arrays() の配列を含むバンドル
         """
-        drone_pos: ドローンの世界座標 np.array([x, y, z])
-        wall_pos: 壁の中心座標 np.array([x, y, z])
-        normal: 壁の法線ベクトル（正規化済み） np.array([nx, ny, nz])
+        self = cls.__new__(cls)
+        self.wall_list = HakoBundleWallList(bundle.array("wall.names"), bundle.array("wall.positions"),
+                                            bundle.array("wall.sizes"), bundle.array("wall.rotations"))
+        self.centers = bundle.array("wall.positions")
+        self.half_sizes = bundle.array("wall.sizes") / 2
+        self.rotations = bundle.array("wall.matrices")
+        bvh = None
+        if "wall.bvh_order" in bundle:
+            # 壁のAABBは読み込み時の配列演算で求め直す
+            extents = (np.abs(self.rotations[:, :, 0]) * self.half_sizes[:, 0:1]
+                       + np.abs(self.rotations[:, :, 1]) * self.half_sizes[:, 1:2])
+            bvh = HakoWallBVH.from_arrays(self.centers - extents, self.centers + extents,
+                                          int(bundle.array("wall.bvh_leaf_size")[0]),
+                                          bundle.array("wall.bvh_order"), bundle.array("wall.bvh_node_lower"),
+                                          bundle.array("wall.bvh_node_upper"), bundle.array("wall.bvh_children"),
+                                          bundle.array("wall.bvh_ranges"))
+        self._compile_derived(bvh)
+        return self
+
+    def wall_normals(self, local_normal_axis=[0, 0, 1]):
+        """全ての壁の（向きを揃える前の）法線 (N,3)"""
+        return self._wall_normals(local_normal_axis)[0]
+
+    def _wall_normals(self, local_normal_axis):
+        # (定義順の法線, BVHの並び順の法線)
+        key = tuple(float(v) for v in local_normal_axis)
+        normals = self._normals_cache.get(key)
+        if normals is None:
+            by_index = self.rotations @ np.array(key)
+            normals = (by_index, by_index[self.bvh.order] if self.bvh is not None else None)
+            self._normals_cache[key] = normals
+        return normals
+
+    def find_nearest_wall_with_hitbox(self, drone_pos, local_normal_axis=[0, 0, 1]):
         """
-        v = drone_pos - wall_pos
-        t = np.dot(v, normal)
+        ドローンから各壁の平面へ下ろした垂線の足が壁の矩形内にある壁のうち、最も近い壁を返す
+        全ての壁をまとめて計算する（距離が等しい場合は定義順で先の壁）
 
-        # 交点 = drone_pos - t * normal
-        intersection_point = drone_pos - t * normal
+        Returns:
+            tuple: (壁の定義, ドローン側を向いた法線, 垂線の足, 距離)。該当する壁がない場合は (None, None, None, inf)
+        """
+        if len(self.wall_list) == 0:
+            return None, None, None, float('inf')
+        drone_pos = np.asarray(drone_pos, dtype=float)
+        all_normals, bvh_normals = self._wall_normals(local_normal_axis)
+        if self.bvh is None:
+            normals, points, dists, inside = self._project_to_walls(drone_pos, all_normals, self.centers,
+                                                                    self.tangents, self.bitangents,
+                                                                    self.half_sizes)
+            if not inside.any():
+                return None, None, None, float('inf')
+            index = int(np.argmin(np.where(inside, dists, np.inf)))
+            return self.wall_list[index], normals[index], points[index], dists[index]
 
-        return intersection_point, abs(t)  # tが負なら裏側、正なら正面（今回は気にしない）
-    
-    def is_point_in_wall_rectangle(self, intersection_point, wall_def):
-        wall_pos = np.array(wall_def["position"])
-        rot = wall_def["rotation"]
-        size = wall_def["size"]  # [width, height] = [x方向, y方向]
-        r = R.from_euler('ZYX', rot, degrees=True)
+        # 矩形内に垂線の足がある場合の距離は壁のAABBまでの距離以上になるため、BVHで枝刈りできる
+        centers, tangents, bitangents, half_sizes = self._bvh_arrays
+        def leaf_query(leaf):
+            _, _, dists, inside = self._project_to_walls(drone_pos, bvh_normals[leaf], centers[leaf],
+                                                         tangents[leaf], bitangents[leaf], half_sizes[leaf])
+            return dists, inside
+        index, _ = self.bvh.nearest(drone_pos, leaf_query)
+        if index is None:
+            return None, None, None, float('inf')
+        normals, points, dists, _ = self._project_to_walls(drone_pos, all_normals[index:index + 1],
+                                                           self.centers[index:index + 1],
+                                                           self.tangents[index:index + 1],
+                                                           self.bitangents[index:index + 1],
+                                                           self.half_sizes[index:index + 1])
+        return self.wall_list[index], normals[0], points[0], dists[0]
 
-        # ローカル軸（tangent: 横, bitangent: 縦）
-        tangent = r.apply([1, 0, 0])       # x方向（幅）
-        bitangent = r.apply([0, 1, 0])     # y方向（高さ）
+    def find_walls_within_radius(self, drone_pos, radius, local_normal_axis=[0, 0, 1]):
+        """
+        ドローンから radius 以内にある全ての壁を返す
+        距離は壁の矩形上の最も近い点までの距離（矩形の外側に垂線の足がある壁も対象とする）
 
-        # 交点から壁中心までのベクトル
-        d = intersection_point - wall_pos
+        Returns:
+            list: (壁の定義, ドローン側を向いた法線, 矩形上の最も近い点, 距離) のリスト（距離の昇順）
+        """
+        if len(self.wall_list) == 0:
+            return []
+        drone_pos = np.asarray(drone_pos, dtype=float)
+        if self.bvh is None:
+            indices = np.arange(len(self.wall_list))
+        else:
+            indices = self.bvh.query_radius(drone_pos, radius)
+            if len(indices) == 0:
+                return []
+        normals = self.wall_normals(local_normal_axis)[indices]
+        centers = self.centers[indices]
+        v = drone_pos - centers
+        # 矩形内に収めた射影から、矩形上の最も近い点を求める
+        x_proj = np.clip(np.einsum('ij,ij->i', v, self.tangents[indices]),
+                         -self.half_sizes[indices, 0], self.half_sizes[indices, 0])
+        y_proj = np.clip(np.einsum('ij,ij->i', v, self.bitangents[indices]),
+                         -self.half_sizes[indices, 1], self.half_sizes[indices, 1])
+        points = centers + x_proj[:, None] * self.tangents[indices] + y_proj[:, None] * self.bitangents[indices]
+        dists = np.linalg.norm(drone_pos - points, axis=1)
+        normals = normals * np.where(np.einsum('ij,ij->i', v, normals) < 0, -1.0, 1.0)[:, None]
+        hits = np.nonzero(dists <= radius)[0]
+        hits = hits[np.argsort(dists[hits], kind='stable')]
+        return [(self.wall_list[indices[i]], normals[i], points[i], dists[i]) for i in hits]
 
-        # 各軸への射影（ローカル座標系での相対位置）
-        x_proj = np.dot(d, tangent)
-        y_proj = np.dot(d, bitangent)
+    def find_nearest_walls_with_hitbox(self, drone_positions, local_normal_axis=[0, 0, 1]):
+        """
+        複数機体の最も近い壁をまとめて求める（各機体の結果は find_nearest_wall_with_hitbox と同じ）
 
-        # 半サイズ（中心からの許容範囲）
-        half_w = size[0] / 2
-        half_h = size[1] / 2
+        Args:
+            drone_positions (array_like): 機体の位置 (M,3)
 
-        # 範囲内かチェック
-        return (-half_w <= x_proj <= half_w) and (-half_h <= y_proj <= half_h)
-    
+        Returns:
+            list: 機体ごとの (壁の定義, 法線, 垂線の足, 距離) のリスト
+        """
+        drone_positions = np.asarray(drone_positions, dtype=float).reshape(-1, 3)
+        if self.bvh is not None or len(self.wall_list) == 0:
+            # BVHを使う場合は1機あたりの探索が壁の数によらないため、機体ごとに問い合わせる
+            return [self.find_nearest_wall_with_hitbox(pos, local_normal_axis) for pos in drone_positions]
+        # (M,W) の射影をまとめて計算する
+        normals, points, dists, inside = self._project_to_walls(drone_positions, self.wall_normals(local_normal_axis),
+                                                                self.centers, self.tangents, self.bitangents,
+                                                                self.half_sizes)
+        masked = np.where(inside, dists, np.inf)
+        nearest = masked.argmin(axis=1)
+        results = []
+        for m, index in enumerate(nearest.tolist()):
+            if not inside[m, index]:
+                results.append((None, None, None, float('inf')))
+                continue
+            results.append((self.wall_list[index], normals[m, index], points[m, index], dists[m, index]))
+        return results
 
-    def find_nearest_wall_with_hitbox(self, drone_pos, local_normal_axis=[0, 0, 1]):
-        min_dist = float('inf')
-        nearest_wall = None
-        nearest_normal = None
-        hit_point = None
-
-        for wall in self.wall_list:
-            wall_pos = np.array(wall["position"])
-            normal = self.compute_wall_normal_from_view(drone_pos, wall, local_normal_axis)
-
-            # 平面との交点と距離
-            point, dist = self.intersect_ray_with_plane(drone_pos, wall_pos, normal)
-
-            # 交点が壁の矩形内にあるか？
-            if self.is_point_in_wall_rectangle(point, wall):
-                if dist < min_dist:
-                    min_dist = dist
-                    nearest_wall = wall
-                    nearest_normal = normal
-                    hit_point = point
-
-        return nearest_wall, nearest_normal, hit_point, min_dist
\ No newline at end of file
+    def raycast_walls(self, origins, directions, max_dists=None, local_normal_axis=[0, 0, 1]):
+        """
+        複数の光線が最初に当たる壁の矩形をまとめて求める
+
+        Args:
+            origins (array_like): 光線の始点 (R,3)
+            directions (array_like): 光線の方向 (R,3)。正規化して使い、長さ 0 の光線はどの壁にも当たらない
+            max_dists (array_like): 調べる最大距離（スカラーまたは (R,)）。None の場合は無制限
+
+        Returns:
+            tuple: (壁番号 (R,)（当たらない場合は -1）, 距離 (R,)（当たらない場合は inf）,
+                    交点 (R,3)（当たらない場合は nan）, 始点側を向いた法線 (R,3)（当たらない場合は nan）)
+            壁の定義は wall_list[壁番号] で参照する。距離が等しい場合は定義順で先の壁を返す
+        """
+        origins = np.asarray(origins, dtype=float).reshape(-1, 3)
+        directions, max_dists = normalize_rays(directions, max_dists, len(origins))
+        indices = np.full(len(origins), -1, dtype=np.int64)
+        dists = np.full(len(origins), np.inf)
+        if len(self.wall_list) > 0:
+            all_normals, bvh_normals = self._wall_normals(local_normal_axis)
+            if self.bvh is None:
+                # (光線数, 壁の数) の交差判定を、配列の大きさを抑えながらまとめて計算する
+                step = max(1, RAY_CHUNK_ELEMENTS // len(self.wall_list))
+                for start in range(0, len(origins), step):
+                    rays = slice(start, start + step)
+                    t = self._intersect_rays_with_walls(origins[rays], directions[rays], max_dists[rays], all_normals,
+                                                        self.centers, self.tangents, self.bitangents, self.half_sizes)
+                    nearest = t.argmin(axis=1)
+                    nearest_t = t[np.arange(len(t)), nearest]
+                    hit = np.isfinite(nearest_t)
+                    indices[rays] = np.where(hit, nearest, -1)
+                    dists[rays] = nearest_t
+            else:
+                # 光線が入る位置の近いBVHのノードから順に調べる
+                centers, tangents, bitangents, half_sizes = self._bvh_arrays
+                for r in range(len(origins)):
+                    if not directions[r].any():
+                        continue
+                    origin, direction, max_dist = origins[r:r + 1], directions[r:r + 1], max_dists[r:r + 1]
+                    def leaf_query(leaf):
+                        t = self._intersect_rays_with_walls(origin, direction, max_dist, bvh_normals[leaf],
+                                                            centers[leaf], tangents[leaf], bitangents[leaf],
+                                                            half_sizes[leaf])[0]
+                        return t, np.isfinite(t)
+                    index, dist = self.bvh.first_hit(origins[r], directions[r], max_dists[r], leaf_query)
+                    if index is not None:
+                        indices[r], dists[r] = index, dist
+        hit = indices >= 0
+        points = np.full((len(origins), 3), np.nan)
+        normals = np.full((len(origins), 3), np.nan)
+        if hit.any():
+            points[hit] = origins[hit] + dists[hit, None] * directions[hit]
+            hit_normals = self.wall_normals(local_normal_axis)[indices[hit]]
+            # 法線を光線の始点側に向ける
+            facing = np.einsum('ij,ij->i', hit_normals, directions[hit]) > 0
+            normals[hit] = hit_normals * np.where(facing, -1.0, 1.0)[:, None]
+        return indices, dists, points, normals
+
+    def segments_blocked(self, starts, ends):
+        """
+        複数の線分が壁の矩形に遮られているか（見通しがないか）をまとめて判定する
+
+        Args:
+            starts (array_like): 線分の始点 (R,3)
+            ends (array_like): 線分の終点 (R,3)
+
+        Returns:
+            np.ndarray: 始点から終点までの間に壁がある場合は True (R,)
+        """
+        starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+        ends = np.asarray(ends, dtype=float).reshape(-1, 3)
+        indices, _, _, _ = self.raycast_walls(starts, ends - starts, np.linalg.norm(ends - starts, axis=1))
+        return indices >= 0
+
+    @staticmethod
+    def _intersect_rays_with_walls(origins, directions, max_dists, normals, centers, tangents, bitangents, half_sizes):
+        """
+        光線と各壁の矩形の交点までの距離を求める
+        Returns:
+            np.ndarray: 距離 (R,N)。当たらない（平行、後ろ側、max_dists より遠い、矩形の外）場合は inf
+        """
+        denom = directions @ normals.T
+        v = centers[None, :, :] - origins[:, None, :]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.einsum('rij,ij->ri', v, normals) / denom
+        valid = (denom != 0) & (t >= 0) & (t <= max_dists[:, None])
+        t = np.where(valid, t, np.inf)
+        d = origins[:, None, :] + np.where(valid, t, 0.0)[..., None] * directions[:, None, :] - centers
+        x_proj = np.einsum('rij,ij->ri', d, tangents)
+        y_proj = np.einsum('rij,ij->ri', d, bitangents)
+        inside = (np.abs(x_proj) <= half_sizes[:, 0]) & (np.abs(y_proj) <= half_sizes[:, 1])
+        return np.where(inside, t, np.inf)
+
+    @staticmethod
+    def _project_to_walls(drone_pos, normals, centers, tangents, bitangents, half_sizes):
+        """
+        ドローン位置を各壁の平面へ射影する（drone_pos が (M,3) の場合は機体ごとに (M,N) で計算する）
+        Returns:
+            tuple: (ドローン側を向いた法線 (N,3), 垂線の足 (N,3), 距離 (N,), 矩形内か (N,))
+        """
+        drone_pos = drone_pos[..., None, :]
+        v = drone_pos - centers
+        t = np.einsum('...ij,ij->...i', v, normals)
+        # 法線をドローン側に向ける
+        sign = np.where(t < 0, -1.0, 1.0)
+        normals = normals * sign[..., None]
+        dists = t * sign
+        points = drone_pos - dists[..., None] * normals
+        d = points - centers
+        x_proj = np.einsum('...ij,ij->...i', d, tangents)
+        y_proj = np.einsum('...ij,ij->...i', d, bitangents)
+        inside = (np.abs(x_proj) <= half_sizes[:, 0]) & (np.abs(y_proj) <= half_sizes[:, 1])
+        return normals, points, dists, inside
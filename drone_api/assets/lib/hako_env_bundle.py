@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import json
+import mmap
+import struct
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+# ファイル形式:
+#   マジック(8バイト) | ヘッダ長(uint64, little endian) | ヘッダ(JSON) | 配列データ（ARRAY_ALIGN 境界に整列）
+# ヘッダには {"meta": {...}, "arrays": {名前: {"dtype", "shape", "offset"}}} を保持する
+BUNDLE_MAGIC = b'HAKOENV1'
+BUNDLE_VERSION = 1
+ARRAY_ALIGN = 64
+
+def _align(offset):
+    return (offset + ARRAY_ALIGN - 1) // ARRAY_ALIGN * ARRAY_ALIGN
+
+def write_bundle(path, arrays, meta):
+    """
+    配列をまとめてバンドルファイルに書き出す
+
+    Args:
+        path (str): 出力先のパス
+        arrays (dict): 名前 -> np.ndarray
+        meta (dict): ヘッダに保持するJSONで表現可能な値
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _align(offset + array.nbytes)
+    header = json.dumps({"version": BUNDLE_VERSION, "meta": meta, "arrays": entries}).encode('utf-8')
+    data_start = _align(len(BUNDLE_MAGIC) + 8 + len(header))
+    with open(path, 'wb') as f:
+        f.write(BUNDLE_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(array.tobytes())
+        # 末尾の配列が空の場合もファイル長を揃える
+        f.truncate(data_start + offset)
+
+class HakoEnvBundle:
+    """
+    バンドルファイルを読み取り専用でメモリマップし、配列を複製せずに参照する。
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path (str): バンドルファイルのパス
+
+        Raises:
+            ValueError: バンドルファイルの形式が不正な場合。
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+            raise ValueError(f"バンドルファイルの形式が不正です: {path}")
+        header_len, = struct.unpack_from('<Q', self._mmap, len(BUNDLE_MAGIC))
+        header_start = len(BUNDLE_MAGIC) + 8
+        header = json.loads(self._mmap[header_start:header_start + header_len].decode('utf-8'))
+        if header.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"未対応のバンドルのバージョンです: {header.get('version')}")
+        self.meta = header["meta"]
+        self._entries = header["arrays"]
+        self._data_start = _align(header_start + header_len)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def array(self, name):
+        """名前の配列（メモリマップへの読み取り専用のビュー）"""
+        entry = self._entries[name]
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        count = int(np.prod(shape)) if shape else 1
+        return np.frombuffer(self._mmap, dtype=dtype, count=count,
+                             offset=self._data_start + entry["offset"]).reshape(shape)
+
+def encode_names(names):
+    """文字列のリストを UTF-8 の固定長バイト列の配列にする"""
+    encoded = [name.encode('utf-8') for name in names]
+    width = max([len(name) for name in encoded] + [1])
+    return np.array(encoded, dtype=f'S{width}')
+
+class HakoBundleNameIndex:
+    """固定長バイト列の名前から番号を二分探索で引く（辞書を作らずに済む）"""
+    def __init__(self, names, sorted_order):
+        """
+        Args:
+            names (np.ndarray): 名前の配列（定義順）
+            sorted_order (np.ndarray): names を昇順に並べる番号の配列
+        """
+        self.names = names
+        self.sorted_order = sorted_order
+        self._sorted_names = names[sorted_order]
+
+    def find(self, name):
+        """名前の番号（存在しない場合は None）"""
+        if not isinstance(name, str):
+            return None
+        key = name.encode('utf-8')
+        if len(key) > self.names.dtype.itemsize:
+            return None
+        i = int(self._sorted_names.searchsorted(key))
+        if i == len(self._sorted_names) or self._sorted_names[i] != key:
+            return None
+        return int(self.sorted_order[i])
+
+class HakoBundleAreaTable(Mapping):
+    """バンドルのエリア定義を area_id -> {'min', 'max'} の辞書として参照する"""
+    def __init__(self, index, area_mins, area_maxs):
+        self._index = index
+        self._area_mins = area_mins
+        self._area_maxs = area_maxs
+
+    def __getitem__(self, area_id):
+        i = self._index.find(area_id)
+        if i is None:
+            raise KeyError(area_id)
+        return {"min": tuple(self._area_mins[i].tolist()), "max": tuple(self._area_maxs[i].tolist())}
+
+    def __iter__(self):
+        return (name.decode('utf-8') for name in self._index.names)
+
+    def __len__(self):
+        return len(self._index.names)
+
+class HakoBundlePropertyTable(Mapping):
+    """バンドルのエリアプロパティを area_id -> {'wind_velocity', 'temperature', 'sea_level_atm'} として参照する"""
+    def __init__(self, index, wind_velocity, temperature, sea_level_atm):
+        # 値がない場合は nan で保持している
+        self._index = index
+        self._wind_velocity = wind_velocity
+        self._temperature = temperature
+        self._sea_level_atm = sea_level_atm
+
+    def __getitem__(self, area_id):
+        i = self._index.find(area_id)
+        if i is None:
+            raise KeyError(area_id)
+        wind = self._wind_velocity[i]
+        temperature = float(self._temperature[i])
+        sea_level_atm = float(self._sea_level_atm[i])
+        return {
+            "wind_velocity": None if np.isnan(wind).any() else wind.tolist(),
+            "temperature": None if np.isnan(temperature) else temperature,
+            "sea_level_atm": None if np.isnan(sea_level_atm) else sea_level_atm
+        }
+
+    def __iter__(self):
+        return (name.decode('utf-8') for name in self._index.names)
+
+    def __len__(self):
+        return len(self._index.names)
+
+class HakoBundleWallList(Sequence):
+    """
+    バンドルの壁定義を壁の定義（辞書）のリストとして参照する。
+    辞書は参照されたときに作り、同じ壁には同じ辞書を返す。
+    """
+    def __init__(self, names, positions, sizes, rotations):
+        self._names = names
+        self._positions = positions
+        self._sizes = sizes
+        self._rotations = rotations
+        self._walls = {}
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        wall = self._walls.get(index)
+        if wall is None:
+            wall = {
+                "name": self._names[index].decode('utf-8'),
+                "position": self._positions[index].tolist(),
+                "size": self._sizes[index].tolist(),
+                "rotation": self._rotations[index].tolist()
+            }
+            self._walls[index] = wall
+        return wall
+
+    def __len__(self):
+        return len(self._names)
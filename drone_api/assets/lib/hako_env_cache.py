@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+# 前回の問い合わせ位置からの移動量がこれ未満の機体は、エリアと壁の問い合わせを省略する [m]
+MOVE_THRESHOLD_M = 0.05
+# 内容が変わらなくても、この周期（tick数）ごとに書き込む（受信側の再起動などに備える）
+REFRESH_TICKS = 50
+
+class HakoEnvCache:
+    """
+    機体ごとに前回のエリア・壁の問い合わせ結果と書き込んだ内容を保持し、
+    機体がほとんど動いていない場合の問い合わせと、内容が変わらない場合の書き込みを省略する。
+    """
+    def __init__(self, drone_count, move_threshold=MOVE_THRESHOLD_M, refresh_ticks=REFRESH_TICKS):
+        """
+        Args:
+            drone_count (int): 機体数（機体番号は 0..drone_count-1）
+            move_threshold (float): 問い合わせをやり直す移動量 [m]。0 の場合は毎回問い合わせる
+            refresh_ticks (int): 内容が変わらなくても書き込む周期（tick数）。0 の場合は変わったときだけ書き込む
+        """
+        self.move_threshold = move_threshold
+        self.refresh_ticks = refresh_ticks
+        # 前回問い合わせた位置（未問い合わせは nan）
+        self.query_positions = np.full((drone_count, 3), np.nan)
+        self.area_ids = [None] * drone_count
+        self.wall_results = [None] * drone_count
+        self.payload_keys = [None] * drone_count
+        self.ticks_since_write = [0] * drone_count
+        self.counters = {
+            "query": 0,
+            "query_skipped": 0,
+            "write": 0,
+            "write_skipped": 0,
+        }
+
+    def moved(self, drone_indices, positions):
+        """
+        問い合わせが必要な機体を返す
+
+        Args:
+            drone_indices (array_like): 機体番号 (N,)
+            positions (array_like): 機体の位置 (N,3)
+
+        Returns:
+            np.ndarray: 前回の問い合わせ位置から move_threshold 以上動いた（または未問い合わせの）機体か (N,)
+        """
+        drone_indices = np.asarray(drone_indices, dtype=int)
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        dist = np.linalg.norm(positions - self.query_positions[drone_indices], axis=1)
+        # nan との比較は False になるため、未問い合わせの機体も対象になる
+        return ~(dist < self.move_threshold)
+
+    def update_queries(self, drone_indices, positions, moved, area_ids, wall_results):
+        """
+        問い合わせた機体の結果を保持し、全機体分の結果を返す
+
+        Args:
+            drone_indices (array_like): 機体番号 (N,)
+            positions (array_like): 機体の位置 (N,3)
+            moved (np.ndarray): moved() の結果 (N,)
+            area_ids (list): 問い合わせた機体（moved が True の機体）のエリアID
+            wall_results (list): 問い合わせた機体の最も近い壁の結果
+
+        Returns:
+            tuple: (全機体のエリアIDのリスト, 全機体の壁の結果のリスト)
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        queried = iter(zip(area_ids, wall_results))
+        for i, index in enumerate(drone_indices):
+            if moved[i]:
+                self.area_ids[index], self.wall_results[index] = next(queried)
+                self.query_positions[index] = positions[i]
+                self.counters["query"] += 1
+            else:
+                self.counters["query_skipped"] += 1
+        return [self.area_ids[index] for index in drone_indices], [self.wall_results[index] for index in drone_indices]
+
+    def reset_queries(self):
+        """全機体の問い合わせ結果を破棄する（エリアや壁の定義を読み込み直した場合）"""
+        self.query_positions[:] = np.nan
+
+    def should_write(self, drone_index, payload_key):
+        """
+        書き込む内容が前回と異なるか、再書き込みの周期に達した場合に True を返す
+
+        Args:
+            drone_index (int): 機体番号
+            payload_key (tuple): 書き込む内容を表す比較用の値
+        """
+        self.ticks_since_write[drone_index] += 1
+        if (payload_key == self.payload_keys[drone_index] and
+                (self.refresh_ticks <= 0 or self.ticks_since_write[drone_index] < self.refresh_ticks)):
+            self.counters["write_skipped"] += 1
+            return False
+        self.payload_keys[drone_index] = payload_key
+        self.ticks_since_write[drone_index] = 0
+        self.counters["write"] += 1
+        return True
+
+    def invalidate(self, drone_index):
+        """書き込みに失敗した場合など、次回は必ず書き込むようにする"""
+        self.payload_keys[drone_index] = None
+
+    def get_counters(self):
+        return dict(self.counters)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+
+from hako_env_bundle import write_bundle, HakoEnvBundle
+from hako_area_accessor_impl import HakoAreaAccessorImpl
+from hako_area_pro_accessor_impl import HakoAreaPropAccessorImpl
+from hako_boundary import HakoBoundary
+
+# エリア設定ディレクトリ内のバンドルファイル名
+BUNDLE_FILE_NAME = 'env_bundle.bin'
+# バンドルにまとめる定義ファイル
+SOURCE_FILE_NAMES = ['area.json', 'area_property.json', 'boundary.json']
+
+def _source_info(area_config_dir):
+    info = {}
+    for name in SOURCE_FILE_NAMES:
+        stat = os.stat(os.path.join(area_config_dir, name))
+        info[name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return info
+
+def load_env_json(area_config_dir):
+    """
+    エリア設定ディレクトリのJSONから読み込む
+
+    Returns:
+        tuple: (HakoAreaAccessorImpl, HakoAreaPropAccessorImpl, HakoBoundary)
+    """
+    return (HakoAreaAccessorImpl(os.path.join(area_config_dir, 'area.json')),
+            HakoAreaPropAccessorImpl(os.path.join(area_config_dir, 'area_property.json')),
+            HakoBoundary(os.path.join(area_config_dir, 'boundary.json')))
+
+def compile_env_bundle(area_config_dir, bundle_path=None):
+    """
+    area.json / area_property.json / boundary.json を解析し、索引を構築した上で1つのバンドルファイルに書き出す
+
+    Args:
+        area_config_dir (str): エリア設定ディレクトリ
+        bundle_path (str): 出力先。省略時はエリア設定ディレクトリの BUNDLE_FILE_NAME
+
+    Returns:
+        str: 出力したバンドルファイルのパス
+    """
+    if bundle_path is None:
+        bundle_path = os.path.join(area_config_dir, BUNDLE_FILE_NAME)
+    sources = _source_info(area_config_dir)
+    arrays = {}
+    for accessor in load_env_json(area_config_dir):
+        arrays.update(accessor.bundle_arrays())
+    # 読み込み側が途中まで書かれたファイルを開かないよう、書き終えてから置き換える
+    tmp_path = bundle_path + '.tmp'
+    write_bundle(tmp_path, arrays, {"sources": sources})
+    os.replace(tmp_path, bundle_path)
+    return bundle_path
+
+def load_env_bundle(bundle_path):
+    """
+    バンドルファイルから読み込む（配列はメモリマップで参照する）
+
+    Returns:
+        tuple: (HakoAreaAccessorImpl, HakoAreaPropAccessorImpl, HakoBoundary)
+    """
+    bundle = HakoEnvBundle(bundle_path)
+    return (HakoAreaAccessorImpl.from_bundle(bundle),
+            HakoAreaPropAccessorImpl.from_bundle(bundle),
+            HakoBoundary.from_bundle(bundle))
+
+def is_env_bundle_up_to_date(area_config_dir, bundle_path=None):
+    """バンドルファイルが存在し、元のJSONファイルの大きさと更新時刻が作成時から変わっていないか"""
+    if bundle_path is None:
+        bundle_path = os.path.join(area_config_dir, BUNDLE_FILE_NAME)
+    if not os.path.exists(bundle_path):
+        return False
+    try:
+        return HakoEnvBundle(bundle_path).meta.get("sources") == _source_info(area_config_dir)
+    except (ValueError, OSError):
+        return False
+
+def load_env(area_config_dir):
+    """
+    最新のバンドルファイルがあればバンドルから、なければJSONから読み込む
+
+    Returns:
+        tuple: (HakoAreaAccessorImpl, HakoAreaPropAccessorImpl, HakoBoundary, バンドルから読み込んだか)
+    """
+    bundle_path = os.path.join(area_config_dir, BUNDLE_FILE_NAME)
+    if is_env_bundle_up_to_date(area_config_dir, bundle_path):
+        return load_env_bundle(bundle_path) + (True,)
+    if os.path.exists(bundle_path):
+        print(f"WARNING: {bundle_path} is older than the JSON files. Loading the JSON files instead.")
+    return load_env_json(area_config_dir) + (False,)
+
+def _sample_positions(lower, upper, samples, rng):
+    """範囲（少し広げる）から評価位置を選ぶ"""
+    if len(lower) == 0:
+        return np.zeros((0, 3))
+    lower, upper = np.min(lower, axis=0), np.max(upper, axis=0)
+    margin = (upper - lower) * 0.05 + 1.0
+    return rng.uniform(lower - margin, upper + margin, size=(samples, 3))
+
+def validate_env_bundle(area_config_dir, bundle_path=None, samples=2000, drone_size=(0.4, 0.4, 0.1), seed=0):
+    """
+    バンドルから読み込んだ結果がJSONから読み込んだ結果と一致するかを確認する
+
+    Args:
+        area_config_dir (str): エリア設定ディレクトリ
+        bundle_path (str): バンドルファイル。省略時はエリア設定ディレクトリの BUNDLE_FILE_NAME
+        samples (int): エリアと最も近い壁を比較する評価位置の数
+        drone_size (tuple): エリアの判定に使う機体の大きさ
+        seed (int): 評価位置を選ぶ乱数のシード
+
+    Returns:
+        list: 一致しなかった内容のメッセージのリスト（一致した場合は空）
+    """
+    if bundle_path is None:
+        bundle_path = os.path.join(area_config_dir, BUNDLE_FILE_NAME)
+    json_area, json_prop, json_boundary = load_env_json(area_config_dir)
+    bundle_area, bundle_prop, bundle_boundary = load_env_bundle(bundle_path)
+    errors = []
+
+    if list(json_area.space_areas.keys()) != list(bundle_area.space_areas.keys()):
+        errors.append("area ids differ")
+    if set(json_prop.area_properties.keys()) != set(bundle_prop.area_properties.keys()):
+        errors.append("area property ids differ")
+    for area_id in json_prop.area_properties.keys():
+        expected = json_prop.get_property(area_id)
+        actual = bundle_prop.get_property(area_id)
+        if (expected.get_wind_velocity() != actual.get_wind_velocity() or
+                expected.get_temperature() != actual.get_temperature() or
+                expected.get_sea_level_atm() != actual.get_sea_level_atm()):
+            errors.append(f"property of {area_id} differs")
+
+    rng = np.random.default_rng(seed)
+    # エリアはエリアを囲む範囲から、壁は壁の近くから評価位置を選ぶ
+    positions = _sample_positions(json_area._area_mins, json_area._area_maxs, samples, rng)
+    expected_ids = json_area.get_area_ids(positions, drone_size)
+    actual_ids = bundle_area.get_area_ids(positions, drone_size)
+    for position, expected, actual in zip(positions, expected_ids, actual_ids):
+        if expected != actual:
+            errors.append(f"area id at {position.tolist()}: json={expected}, bundle={actual}")
+
+    positions = np.zeros((0, 3))
+    if len(json_boundary.wall_list) > 0:
+        near = rng.integers(0, len(json_boundary.wall_list), size=samples)
+        positions = json_boundary.centers[near] + rng.normal(0, 1.0, size=(samples, 3))
+    expected_walls = json_boundary.find_nearest_walls_with_hitbox(positions)
+    actual_walls = bundle_boundary.find_nearest_walls_with_hitbox(positions)
+    for position, expected, actual in zip(positions, expected_walls, actual_walls):
+        expected_name = expected[0] and expected[0].get("name", "")
+        actual_name = actual[0] and actual[0].get("name", "")
+        if expected_name != actual_name or expected[3] != actual[3]:
+            errors.append(f"nearest wall at {position.tolist()}: json={expected_name}({expected[3]}), "
+                          f"bundle={actual_name}({actual[3]})")
+        elif expected[0] is not None and not (np.array_equal(expected[1], actual[1]) and
+                                              np.array_equal(expected[2], actual[2])):
+            errors.append(f"nearest wall point or normal at {position.tolist()} differs")
+    return errors
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+
+from hako_area_accessor_impl import HakoAreaAccessorImpl
+from hako_area_pro_accessor_impl import HakoAreaPropAccessorImpl
+from hako_boundary import HakoBoundary
+from hako_wind_field import HakoWindField
+
+# 更新を確認する周期 [sec]
+POLL_INTERVAL_SEC = 1.0
+
+class HakoEnvMaps:
+    """
+    環境モデルの一式（作成後は変更しない）。
+    再読み込みでは新しい一式を作り、参照を置き換えることで切り替える。
+    """
+    def __init__(self, area_accessor, prop_accessor, boundary, wind_field=None):
+        self.area_accessor = area_accessor
+        self.prop_accessor = prop_accessor
+        self.boundary = boundary
+        self.wind_field = wind_field
+
+    def replace(self, **components):
+        """一部を置き換えた新しい一式を返す"""
+        values = dict(self.__dict__)
+        values.update(components)
+        return HakoEnvMaps(**values)
+
+def load_wind_field(area_config_dir):
+    """風の場の定義（wind_field.json）があれば読み込む。ない場合は None"""
+    path = os.path.join(area_config_dir, 'wind_field.json')
+    if not os.path.exists(path):
+        return None
+    return HakoWindField(path)
+
+# 監視するファイル -> (HakoEnvMaps の属性名, 読み込み関数)
+WATCHED_FILES = {
+    'area.json': ('area_accessor', lambda path: HakoAreaAccessorImpl(path)),
+    'area_property.json': ('prop_accessor', lambda path: HakoAreaPropAccessorImpl(path)),
+    'boundary.json': ('boundary', lambda path: HakoBoundary(path)),
+    'wind_field.json': ('wind_field', lambda path: load_wind_field(os.path.dirname(path))),
+}
+
+class HakoEnvReloader:
+    """
+    エリア設定ディレクトリの定義ファイルの更新を監視し、更新されたものだけを別スレッドで読み込み直す。
+    読み込んだ一式は take() で受け取る。tick の合間に呼び出し側で参照を置き換えるため、
+    tick の処理が読み込みを待つことはない。
+    """
+    def __init__(self, area_config_dir, maps, poll_interval_sec=POLL_INTERVAL_SEC):
+        """
+        Args:
+            area_config_dir (str): エリア設定ディレクトリ
+            maps (HakoEnvMaps): 現在使用している一式
+            poll_interval_sec (float): 更新を確認する周期 [sec]
+        """
+        self.area_config_dir = area_config_dir
+        self.maps = maps
+        self.poll_interval_sec = poll_interval_sec
+        self.reload_count = 0
+        self.error_count = 0
+        self._signatures = self._read_signatures()
+        # 書き込み途中のファイルを読まないよう、2回続けて同じ状態だった場合に読み込む
+        self._pending = None
+        self._ready = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _read_signatures(self):
+        signatures = {}
+        for name in WATCHED_FILES:
+            try:
+                stat = os.stat(os.path.join(self.area_config_dir, name))
+                signatures[name] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                signatures[name] = None
+        return signatures
+
+    def check(self):
+        """
+        更新を確認し、更新されたファイルがあれば読み込み直す（監視スレッドから周期的に呼ばれる）
+
+        Returns:
+            bool: 新しい一式を用意した場合は True
+        """
+        signatures = self._read_signatures()
+        changed = [name for name in WATCHED_FILES if signatures[name] != self._signatures[name]]
+        if not changed:
+            self._pending = None
+            return False
+        if signatures != self._pending:
+            self._pending = signatures
+            return False
+        self._pending = None
+        with self._lock:
+            base = self._ready if self._ready is not None else self.maps
+        try:
+            components = {}
+            for name in changed:
+                attr, loader = WATCHED_FILES[name]
+                components[attr] = loader(os.path.join(self.area_config_dir, name))
+        except Exception as e:
+            # 不正な内容の場合は現在の一式を使い続け、次に更新されたときに読み込み直す
+            self.error_count += 1
+            self._signatures = signatures
+            print(f"WARNING: failed to reload {changed}: {e}")
+            return False
+        with self._lock:
+            self._ready = base.replace(**components)
+            self._signatures = signatures
+        self.reload_count += 1
+        print(f"INFO: reloaded {changed}")
+        return True
+
+    def take(self):
+        """
+        読み込み直した一式があれば返す（tick の合間に呼ぶ）
+
+        Returns:
+            HakoEnvMaps: 新しい一式。ない場合は None
+        """
+        with self._lock:
+            maps = self._ready
+            self._ready = None
+            if maps is not None:
+                self.maps = maps
+        return maps
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="env-reloader", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval_sec):
+            self.check()
@@ -0,0 +1,37 @@
+import json
+import os
+
+
+def find_robots_with_pdus(config_path, pdu_names):
+    """
+    PDU定義ファイルから、指定したPDUを全て持つロボット名を定義順で返す。
+
+    Args:
+        config_path (str): PDU定義ファイル（robots を含むJSON）のパス。
+        pdu_names (list): 必要なPDUの org_name のリスト（例: ['pos', 'disturb']）。
+
+    Returns:
+        list: 該当するロボット名のリスト。
+
+    Raises:
+        FileNotFoundError: 指定されたファイルが存在しない場合。
+        ValueError: JSONファイルのフォーマットが不正な場合。
+    """
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(f"指定されたファイルが見つかりません: {config_path}")
+    try:
+        with open(config_path, 'r') as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSONファイルのフォーマットが不正です: {e}")
+
+    robot_names = []
+    for robot in data.get('robots', []):
+        org_names = set()
+        for key, pdus in robot.items():
+            # shm_pdu_readers / shm_pdu_writers / rpc_pdu_readers / rpc_pdu_writers
+            if key.endswith('_pdu_readers') or key.endswith('_pdu_writers'):
+                org_names.update(pdu['org_name'] for pdu in pdus)
+        if all(name in org_names for name in pdu_names):
+            robot_names.append(robot['name'])
+    return robot_names
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+# 光線の問い合わせに使うPDU（org_name）。どちらも sensor_msgs/PointCloud2 で、1点が1本の光線を表す
+RAY_REQUEST_PDU = 'env_ray_req'
+RAY_RESPONSE_PDU = 'env_ray_res'
+
+# 要求の1点の形式（max_dist は inf で無制限。線分の場合は direction=終点-始点, max_dist=線分の長さ）
+RAY_REQUEST_DTYPE = np.dtype([
+    ('x', '<f4'), ('y', '<f4'), ('z', '<f4'),
+    ('dir_x', '<f4'), ('dir_y', '<f4'), ('dir_z', '<f4'),
+    ('max_dist', '<f4'),
+])
+
+# 応答の1点の形式（当たらない場合は index が -1、distance が inf、座標と法線が nan）
+RAY_RESULT_DTYPE = np.dtype([
+    ('wall_index', '<i4'), ('wall_dist', '<f4'),
+    ('x', '<f4'), ('y', '<f4'), ('z', '<f4'),
+    ('normal_x', '<f4'), ('normal_y', '<f4'), ('normal_z', '<f4'),
+    ('area_index', '<i4'), ('area_dist', '<f4'),
+])
+
+# sensor_msgs/PointField の datatype
+POINT_FIELD_DATATYPES = {
+    np.dtype('<i4'): 5,  # INT32
+    np.dtype('<f4'): 7,  # FLOAT32
+}
+
+def point_fields(dtype):
+    """
+    点の形式を sensor_msgs/PointField の定義に変換する
+
+    Returns:
+        list: (name, offset, datatype, count) のリスト
+    """
+    return [(name, dtype.fields[name][1], POINT_FIELD_DATATYPES[dtype.fields[name][0]], 1) for name in dtype.names]
+
+def decode_ray_request(data, point_count, point_step):
+    """
+    要求の PointCloud2 のデータから光線を取り出す
+
+    Args:
+        data (bytes): PointCloud2 の data
+        point_count (int): 光線の数（width * height）
+        point_step (int): 1点のバイト数
+
+    Returns:
+        tuple: (始点 (R,3), 方向 (R,3), 最大距離 (R,))
+
+    Raises:
+        ValueError: 点の形式やデータの長さが RAY_REQUEST_DTYPE と合わない場合。
+    """
+    if point_step != RAY_REQUEST_DTYPE.itemsize:
+        raise ValueError(f"point_step must be {RAY_REQUEST_DTYPE.itemsize}: {point_step}")
+    if len(data) < point_count * point_step:
+        raise ValueError(f"data is too short: {len(data)} < {point_count * point_step}")
+    rays = np.frombuffer(bytes(data), dtype=RAY_REQUEST_DTYPE, count=point_count)
+    origins = np.column_stack([rays['x'], rays['y'], rays['z']]).astype(float)
+    directions = np.column_stack([rays['dir_x'], rays['dir_y'], rays['dir_z']]).astype(float)
+    return origins, directions, rays['max_dist'].astype(float)
+
+def encode_ray_request(origins, directions, max_dists=None):
+    """要求の PointCloud2 の data を作る（問い合わせ側で使う）"""
+    origins = np.asarray(origins, dtype=float).reshape(-1, 3)
+    rays = np.zeros(len(origins), dtype=RAY_REQUEST_DTYPE)
+    rays['x'], rays['y'], rays['z'] = origins.T
+    rays['dir_x'], rays['dir_y'], rays['dir_z'] = np.asarray(directions, dtype=float).reshape(-1, 3).T
+    rays['max_dist'] = np.inf if max_dists is None else max_dists
+    return rays.tobytes()
+
+def decode_ray_results(data, point_count):
+    """応答の PointCloud2 の data を RAY_RESULT_DTYPE の配列にする（問い合わせ側で使う）"""
+    return np.frombuffer(bytes(data), dtype=RAY_RESULT_DTYPE, count=point_count)
+
+def query_rays(boundary, area_accessor, origins, directions, max_dists=None, local_normal_axis=[0, 0, 1]):
+    """
+    光線ごとに最初に当たる壁と最初に入るエリアをまとめて求める
+
+    Args:
+        boundary (HakoBoundary): 壁の定義
+        area_accessor (HakoAreaAccessorImpl): エリアの定義
+        origins (array_like): 光線の始点 (R,3)
+        directions (array_like): 光線の方向 (R,3)
+        max_dists (array_like): 調べる最大距離（スカラーまたは (R,)）。None の場合は無制限
+
+    Returns:
+        np.ndarray: RAY_RESULT_DTYPE の配列 (R,)
+    """
+    wall_indices, wall_dists, points, normals = boundary.raycast_walls(origins, directions, max_dists,
+                                                                       local_normal_axis)
+    area_indices, area_dists = area_accessor.raycast_area_indices(origins, directions, max_dists)
+    results = np.zeros(len(wall_indices), dtype=RAY_RESULT_DTYPE)
+    results['wall_index'] = wall_indices
+    results['wall_dist'] = wall_dists
+    results['x'], results['y'], results['z'] = points.T
+    results['normal_x'], results['normal_y'], results['normal_z'] = normals.T
+    results['area_index'] = area_indices
+    results['area_dist'] = area_dists
+    return results
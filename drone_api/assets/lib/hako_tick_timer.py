@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import time
+
+# 超過の報告をまとめる周期（tick数）
+REPORT_INTERVAL_TICKS = 500
+
+class HakoTickTimer:
+    """
+    1 tick あたりの処理時間を delta_time_usec と比較して計測し、超過（オーバーラン）を報告する。
+    realtime を指定した場合は、実時間がシミュレーション時間より先に進まないよう tick ごとに待つ。
+    """
+    def __init__(self, delta_time_usec, realtime=False, report_interval_ticks=REPORT_INTERVAL_TICKS,
+                 clock=time.perf_counter, sleep=time.sleep):
+        """
+        Args:
+            delta_time_usec (int): 1 tick のシミュレーション時間 [usec]
+            realtime (bool): 実時間に合わせて待つかどうか
+            report_interval_ticks (int): 超過を報告する周期（tick数）。0 の場合は報告しない
+            clock (callable): 秒を返す時計（試験用）
+            sleep (callable): 秒を受け取って待つ関数（試験用）
+        """
+        self.budget_sec = delta_time_usec / 1_000_000.0
+        self.realtime = realtime
+        self.report_interval_ticks = report_interval_ticks
+        self.clock = clock
+        self.sleep = sleep
+        self._tick_start = None
+        self._deadline = None
+        self.ticks = 0
+        self.overruns = 0
+        self.compute_sum = 0.0
+        self.compute_max = 0.0
+        # 実時間に追いつけず、待たずに次の tick に進んだ回数
+        self.realtime_late = 0
+        self._window_ticks = 0
+        self._window_overruns = 0
+        self._window_max = 0.0
+
+    def start_tick(self):
+        """シミュレーション時間が進んだ直後（tick の処理の開始時）に呼ぶ"""
+        self._tick_start = self.clock()
+
+    def end_tick(self):
+        """
+        tick の処理の終了時に呼ぶ（start_tick() を呼んでいない場合は何もしない）
+
+        Returns:
+            float: この tick の処理時間 [sec]。計測していない場合は None
+        """
+        if self._tick_start is None:
+            return None
+        compute = self.clock() - self._tick_start
+        self._tick_start = None
+        self.ticks += 1
+        self.compute_sum += compute
+        self.compute_max = max(self.compute_max, compute)
+        self._window_ticks += 1
+        self._window_max = max(self._window_max, compute)
+        if compute > self.budget_sec:
+            self.overruns += 1
+            self._window_overruns += 1
+        if self.report_interval_ticks > 0 and self._window_ticks >= self.report_interval_ticks:
+            if self._window_overruns > 0:
+                print(f"WARNING: {self._window_overruns}/{self._window_ticks} ticks overran "
+                      f"{self.budget_sec * 1000:.1f}ms (max {self._window_max * 1000:.1f}ms)")
+            self._window_ticks = 0
+            self._window_overruns = 0
+            self._window_max = 0.0
+        return compute
+
+    def pace(self):
+        """
+        realtime の場合に、前回の期限から 1 tick 分の実時間が経つまで待つ
+        期限は前回の期限に加算するため、待ち時間の誤差は蓄積しない
+        """
+        if not self.realtime:
+            return
+        now = self.clock()
+        if self._deadline is None:
+            self._deadline = now
+            return
+        self._deadline += self.budget_sec
+        wait = self._deadline - now
+        if wait > 0:
+            self.sleep(wait)
+        elif -wait > self.budget_sec:
+            # 1 tick 以上遅れた場合は、遅れを取り戻そうとせずに期限を現在時刻に合わせる
+            self.realtime_late += 1
+            self._deadline = now
+
+    def get_stats(self):
+        """処理時間の統計（ミリ秒）"""
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "budget_ms": self.budget_sec * 1000.0,
+            "mean_ms": self.compute_sum / self.ticks * 1000.0 if self.ticks else 0.0,
+            "max_ms": self.compute_max * 1000.0,
+            "realtime_late": self.realtime_late,
+        }
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+import heapq
+import math
+import numpy as np
+
+def ray_box_intervals(origins, directions, lower, upper):
+    """
+    光線とAABBの交差区間をまとめて求める（スラブ法）
+
+    Args:
+        origins (np.ndarray): 光線の始点 (R,3)
+        directions (np.ndarray): 光線の方向 (R,3)
+        lower (np.ndarray): AABBの最小座標 (B,3)
+        upper (np.ndarray): AABBの最大座標 (B,3)
+
+    Returns:
+        tuple: (入る位置の係数 (R,B), 出る位置の係数 (R,B))。交差しない場合は入る位置 > 出る位置
+    """
+    origins = origins[:, None, :]
+    directions = directions[:, None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv = 1.0 / directions
+        t0 = (lower - origins) * inv
+        t1 = (upper - origins) * inv
+    t_near = np.minimum(t0, t1)
+    t_far = np.maximum(t0, t1)
+    # 軸に平行な光線は、始点がスラブ内であれば制約なし、外であれば交差しない
+    parallel = directions == 0
+    inside = (lower <= origins) & (origins <= upper)
+    t_near = np.where(parallel, np.where(inside, -np.inf, np.inf), t_near)
+    t_far = np.where(parallel, np.where(inside, np.inf, -np.inf), t_far)
+    return t_near.max(axis=2), t_far.min(axis=2)
+
+def normalize_rays(directions, max_dists, count):
+    """光線の方向を正規化し、最大距離を (R,) にそろえる（長さ 0 の方向は 0 のまま）"""
+    directions = np.asarray(directions, dtype=float).reshape(-1, 3)
+    lengths = np.linalg.norm(directions, axis=1)
+    directions = directions / np.where(lengths > 0, lengths, 1.0)[:, None]
+    if max_dists is None:
+        max_dists = np.inf
+    max_dists = np.broadcast_to(np.asarray(max_dists, dtype=float), (count,))
+    return directions, max_dists
+
+class HakoWallBVH:
+    """
+    壁のAABBに対するバウンディングボリューム階層（BVH）。光線の判定ではエリアのAABBにも使う。
+    ノードは配列で保持し、葉には並べ替えた壁番号の連続区間を持たせる。
+    """
+    def __init__(self, lower, upper, leaf_size=16):
+        """
+        Args:
+            lower (np.ndarray): 各壁のAABBの最小座標 (N,3)
+            upper (np.ndarray): 各壁のAABBの最大座標 (N,3)
+            leaf_size (int): 葉に含める壁の最大数
+        """
+        self.lower = np.asarray(lower, dtype=float)
+        self.upper = np.asarray(upper, dtype=float)
+        self.leaf_size = leaf_size
+        # 葉の区間 [start, start+count) は order の並びで壁番号を表す
+        self.order = np.arange(len(self.lower))
+        node_lower, node_upper, children, ranges = [], [], [], []
+        if len(self.lower) > 0:
+            self._build(0, len(self.lower), node_lower, node_upper, children, ranges)
+        self.node_lower = np.array(node_lower, dtype=float).reshape(-1, 3)
+        self.node_upper = np.array(node_upper, dtype=float).reshape(-1, 3)
+        # 内部ノードは子ノード番号 (left, right)、葉は (-1, -1)
+        self.children = np.array(children, dtype=int).reshape(-1, 2)
+        self.ranges = np.array(ranges, dtype=int).reshape(-1, 2)
+        self._prepare()
+
+    @classmethod
+    def from_arrays(cls, lower, upper, leaf_size, order, node_lower, node_upper, children, ranges):
+        """構築済みのノード配列（バイナリバンドルなど）から復元する"""
+        self = cls.__new__(cls)
+        self.lower = np.asarray(lower, dtype=float)
+        self.upper = np.asarray(upper, dtype=float)
+        self.leaf_size = leaf_size
+        self.order = order
+        self.node_lower = node_lower
+        self.node_upper = node_upper
+        self.children = children
+        self.ranges = ranges
+        self._prepare()
+        return self
+
+    def _prepare(self):
+        # 探索はノード単位のため、NumPy配列より呼び出しの軽いタプルで参照する
+        self._node_bounds = [tuple(lo) + tuple(hi) for lo, hi in zip(self.node_lower.tolist(), self.node_upper.tolist())]
+        self._node_children = [tuple(c) for c in self.children.tolist()]
+        # 葉の区間（order の並びでの slice）
+        self._leaf_slices = [slice(start, start + count) if left < 0 else None
+                             for (start, count), (left, _) in zip(self.ranges.tolist(), self._node_children)]
+
+    def _build(self, start, end, node_lower, node_upper, children, ranges):
+        node = len(node_lower)
+        indices = self.order[start:end]
+        node_lower.append(self.lower[indices].min(axis=0))
+        node_upper.append(self.upper[indices].max(axis=0))
+        children.append((-1, -1))
+        ranges.append((start, end - start))
+        if end - start <= self.leaf_size:
+            return node
+        # 中心の分布が最も広い軸で、中央値により2分割する
+        centers = (self.lower[indices] + self.upper[indices]) / 2
+        axis = int(np.argmax(centers.max(axis=0) - centers.min(axis=0)))
+        mid = (end - start) // 2
+        part = np.argpartition(centers[:, axis], mid)
+        self.order[start:end] = indices[part]
+        left = self._build(start, start + mid, node_lower, node_upper, children, ranges)
+        right = self._build(start + mid, end, node_lower, node_upper, children, ranges)
+        children[node] = (left, right)
+        return node
+
+    def _node_distance(self, px, py, pz, node):
+        """点からノードのAABBまでの距離"""
+        lx, ly, lz, ux, uy, uz = self._node_bounds[node]
+        dx = lx - px if px < lx else (px - ux if px > ux else 0.0)
+        dy = ly - py if py < ly else (py - uy if py > uy else 0.0)
+        dz = lz - pz if pz < lz else (pz - uz if pz > uz else 0.0)
+        return math.sqrt(dx * dx + dy * dy + dz * dz)
+
+    def nearest(self, point, leaf_query, eps=1e-9):
+        """
+        距離の下限の小さいノードから順に調べ、最も近い壁を求める
+        現在の最短距離よりAABBが遠いノードは調べない。距離が等しい場合は壁番号の小さい方を返す
+
+        Args:
+            point (np.ndarray): 問い合わせ位置 (3,)
+            leaf_query (callable): 葉の区間（order の並びでの slice）を受け取り (距離 (k,), 有効か (k,)) を返す関数。
+                距離はその壁のAABBまでの距離以上であること。order の並びで配列を用意しておくと複製せずに参照できる
+            eps (float): 枝刈りの判定に加える誤差の許容値
+
+        Returns:
+            tuple: (壁番号, 距離)。有効な壁がない場合は (None, inf)
+        """
+        if len(self.node_lower) == 0:
+            return None, float('inf')
+        px, py, pz = (float(v) for v in point)
+        best_index, best_dist = None, float('inf')
+        heap = [(self._node_distance(px, py, pz, 0), 0)]
+        while heap:
+            node_dist, node = heapq.heappop(heap)
+            if node_dist > best_dist + eps:
+                break
+            left, right = self._node_children[node]
+            if left < 0:
+                leaf = self._leaf_slices[node]
+                dists, valid = leaf_query(leaf)
+                for i in np.nonzero(valid)[0].tolist():
+                    dist, index = float(dists[i]), int(self.order[leaf.start + i])
+                    if dist < best_dist or (dist == best_dist and index < best_index):
+                        best_index, best_dist = index, dist
+                continue
+            for child in (left, right):
+                child_dist = self._node_distance(px, py, pz, child)
+                if child_dist <= best_dist + eps:
+                    heapq.heappush(heap, (child_dist, child))
+        return best_index, best_dist
+
+    def _node_ray_entry(self, origin, inv, node):
+        """光線がノードのAABBに入る位置の係数（交差しない場合は inf）"""
+        bounds = self._node_bounds[node]
+        t_near, t_far = 0.0, math.inf
+        for axis in range(3):
+            o, lo, hi = origin[axis], bounds[axis], bounds[axis + 3]
+            if inv[axis] is None:
+                # 軸に平行な光線
+                if o < lo or o > hi:
+                    return math.inf
+                continue
+            t0, t1 = (lo - o) * inv[axis], (hi - o) * inv[axis]
+            if t0 > t1:
+                t0, t1 = t1, t0
+            if t0 > t_near:
+                t_near = t0
+            if t1 < t_far:
+                t_far = t1
+            if t_near > t_far:
+                return math.inf
+        return t_near
+
+    def first_hit(self, origin, direction, max_dist, leaf_query, eps=1e-9):
+        """
+        光線が最初に当たるものを求める
+        光線が入る位置の近いノードから順に調べ、光線が入らないノードと現在の最短距離より先で入るノードは調べない。
+        距離が等しい場合は番号の小さい方を返す
+
+        Args:
+            origin (np.ndarray): 光線の始点 (3,)
+            direction (np.ndarray): 光線の方向（正規化済み） (3,)
+            max_dist (float): 調べる最大距離
+            leaf_query (callable): 葉の区間（order の並びでの slice）を受け取り (距離 (k,), 当たったか (k,)) を返す関数
+            eps (float): 枝刈りの判定に加える誤差の許容値
+
+        Returns:
+            tuple: (番号, 距離)。当たらない場合は (None, inf)
+        """
+        if len(self.node_lower) == 0:
+            return None, float('inf')
+        origin = tuple(float(v) for v in origin)
+        inv = tuple(1.0 / float(v) if v != 0 else None for v in direction)
+        best_index, best_dist = None, float('inf')
+        limit = float(max_dist)
+        # 光線が入らないノード（inf）は、max_dist も最短距離も inf の場合に枝刈りの比較で除けないため積まない
+        root_dist = self._node_ray_entry(origin, inv, 0)
+        heap = [(root_dist, 0)] if root_dist != math.inf else []
+        while heap:
+            node_dist, node = heapq.heappop(heap)
+            if node_dist > min(best_dist, limit) + eps:
+                break
+            left, right = self._node_children[node]
+            if left < 0:
+                leaf = self._leaf_slices[node]
+                dists, valid = leaf_query(leaf)
+                for i in np.nonzero(valid)[0].tolist():
+                    dist, index = float(dists[i]), int(self.order[leaf.start + i])
+                    if dist < best_dist or (dist == best_dist and index < best_index):
+                        best_index, best_dist = index, dist
+                continue
+            for child in (left, right):
+                child_dist = self._node_ray_entry(origin, inv, child)
+                if child_dist != math.inf and child_dist <= min(best_dist, limit) + eps:
+                    heapq.heappush(heap, (child_dist, child))
+        return best_index, best_dist
+
+    def query_radius(self, point, radius):
+        """
+        AABBが点から radius 以内にある壁の番号を返す（候補の絞り込み用）
+
+        Returns:
+            np.ndarray: 壁番号の配列（昇順）
+        """
+        if len(self.node_lower) == 0:
+            return np.zeros(0, dtype=int)
+        px, py, pz = (float(v) for v in point)
+        leaves = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self._node_distance(px, py, pz, node) > radius:
+                continue
+            left, right = self._node_children[node]
+            if left < 0:
+                leaves.append(self.order[self._leaf_slices[node]])
+                continue
+            stack.append(right)
+            stack.append(left)
+        if not leaves:
+            return np.zeros(0, dtype=int)
+        # 葉に含まれる壁のAABBをまとめて判定する
+        indices = np.concatenate(leaves)
+        d = np.maximum(np.maximum(self.lower[indices] - point, point - self.upper[indices]), 0.0)
+        return np.sort(indices[(d * d).sum(axis=1) <= radius * radius])
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import json
+import math
+import os
+
+import numpy as np
+
+
+class HakoWindGrid:
+    """
+    格子点上の風速 (nx,ny,nz,3) を三線形補間で評価する。
+    格子の外側では最も近い境界の値を使う。
+    """
+    def __init__(self, values, origin, spacing):
+        """
+        Args:
+            values (np.ndarray): 格子点の風速 (nx,ny,nz,3) [m/s]。np.load(mmap_mode='r') の配列をそのまま渡せる
+            origin (tuple): 格子点 (0,0,0) の位置 (x, y, z)
+            spacing (tuple): 格子間隔 (dx, dy, dz)
+        """
+        if values.ndim != 4 or values.shape[3] != 3 or min(values.shape[:3]) < 1:
+            raise ValueError(f"風速格子の形状が不正です: {values.shape}（(nx,ny,nz,3) が必要）")
+        self.values = values
+        self.origin = np.asarray(origin, dtype=float)
+        self.spacing = np.asarray(spacing, dtype=float)
+        if np.any(self.spacing <= 0):
+            raise ValueError(f"格子間隔は正の値が必要です: {spacing}")
+        self.shape = np.array(values.shape[:3])
+
+    @classmethod
+    def load(cls, npy_file_path, origin, spacing):
+        """ファイル全体を読み込まずに参照するため、メモリマップで開く"""
+        return cls(np.load(npy_file_path, mmap_mode='r'), origin, spacing)
+
+    def sample(self, positions):
+        """
+        Args:
+            positions (np.ndarray): 評価位置 (N,3)
+
+        Returns:
+            np.ndarray: 風速 (N,3)
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        # 格子座標に変換し、範囲外は境界に寄せる
+        g = np.clip((positions - self.origin) / self.spacing, 0, self.shape - 1)
+        i0 = np.minimum(np.floor(g).astype(int), np.maximum(self.shape - 2, 0))
+        i1 = np.minimum(i0 + 1, self.shape - 1)
+        f = g - i0
+        ix, iy, iz = (np.stack([i0[:, k], i1[:, k]]) for k in range(3))
+        # 8つの隣接格子点を (2,2,2,N,3) で取り出し、軸ごとに補間する
+        corners = np.asarray(self.values[ix[:, None, None, :], iy[None, :, None, :], iz[None, None, :, :]],
+                             dtype=float)
+        fx, fy, fz = (f[:, k][:, None] for k in range(3))
+        c = corners[0] * (1 - fx) + corners[1] * fx
+        c = c[0] * (1 - fy) + c[1] * fy
+        return c[0] * (1 - fz) + c[1] * fz
+
+
+class HakoGust:
+    """
+    1-cosine 型の離散突風。start_sec から duration_sec の間、amplitude まで滑らかに増減する。
+    """
+    def __init__(self, start_sec, duration_sec, amplitude):
+        self.start_sec = float(start_sec)
+        self.duration_sec = float(duration_sec)
+        self.amplitude = np.asarray(amplitude, dtype=float)
+
+    def velocity(self, time_sec):
+        t = time_sec - self.start_sec
+        if t < 0 or t > self.duration_sec or self.duration_sec <= 0:
+            return np.zeros(3)
+        return self.amplitude * (0.5 * (1 - math.cos(2 * math.pi * t / self.duration_sec)))
+
+
+class HakoDrydenTurbulence:
+    """
+    Dryden モデルの乱流。各軸を相関長 L / 対気速度 V の時定数をもつ1次のフィルタ（ガウス・マルコフ過程）で近似し、
+    標準偏差 intensity の乱流成分を機体ごとに生成する。
+    """
+    def __init__(self, intensity, length_scale, airspeed=5.0, seed=None):
+        """
+        Args:
+            intensity (tuple): 各軸の乱流強度（標準偏差）[m/s]
+            length_scale (tuple): 各軸の相関長 [m]
+            airspeed (float): 相関時間の計算に使う機体の対気速度 [m/s]
+            seed (int): 乱数のシード（再現性が必要な場合に指定する）
+        """
+        self.intensity = np.asarray(intensity, dtype=float)
+        self.length_scale = np.asarray(length_scale, dtype=float)
+        self.airspeed = max(float(airspeed), 1e-3)
+        self.rng = np.random.default_rng(seed)
+        # 機体ごとのフィルタの状態 (M,3)
+        self.state = np.zeros((0, 3))
+
+    def step(self, dt_sec, drone_indices):
+        """
+        乱流の状態を dt_sec 進め、指定した機体の乱流成分を返す
+
+        Args:
+            dt_sec (float): 前回からの経過時間 [s]
+            drone_indices (np.ndarray): 機体番号 (N,)
+
+        Returns:
+            np.ndarray: 乱流成分 (N,3)
+        """
+        drone_indices = np.asarray(drone_indices, dtype=int)
+        count = int(drone_indices.max()) + 1 if len(drone_indices) > 0 else 0
+        if count > len(self.state):
+            # 初めて現れた機体は定常分布から始める
+            added = self.rng.standard_normal((count - len(self.state), 3)) * self.intensity
+            self.state = np.vstack([self.state, added])
+        # 離散化した1次フィルタ: x <- a x + sigma sqrt(1 - a^2) w
+        a = np.exp(-self.airspeed * dt_sec / self.length_scale)
+        noise = self.rng.standard_normal((len(drone_indices), 3))
+        self.state[drone_indices] = (a * self.state[drone_indices]
+                                     + self.intensity * np.sqrt(1 - a * a) * noise)
+        return self.state[drone_indices]
+
+
+class HakoWindField:
+    """
+    風速格子・突風・乱流を合成した風の場。全機体の位置をまとめて評価する。
+    風速格子がない場合は、呼び出し側が渡す平均風（エリアの風速など）に突風と乱流を加える。
+
+    定義ファイルの例（各要素は省略可）:
+        {
+          "grid": {"file": "wind_grid.npy", "origin": [0, 0, 0], "spacing": [1, 1, 1]},
+          "gusts": [{"start_sec": 10, "duration_sec": 2, "amplitude": [3, 0, 0]}],
+          "turbulence": {"model": "dryden", "intensity": [1, 1, 0.5], "length_scale": [200, 200, 50],
+                         "airspeed": 5.0, "seed": 0}
+        }
+    """
+    def __init__(self, json_file_path):
+        """
+        Args:
+            json_file_path (str): 風の場の定義ファイルのパス。格子ファイルはこのファイルからの相対パスで指定する。
+
+        Raises:
+            FileNotFoundError: 指定されたファイルが存在しない場合。
+            ValueError: JSONファイルのフォーマットが不正な場合。
+        """
+        if not os.path.exists(json_file_path):
+            raise FileNotFoundError(f"指定されたファイルが見つかりません: {json_file_path}")
+        try:
+            with open(json_file_path, 'r') as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSONファイルのフォーマットが不正です: {e}")
+
+        self.grid = None
+        grid = data.get('grid')
+        if grid is not None:
+            npy_path = os.path.join(os.path.dirname(json_file_path), grid['file'])
+            self.grid = HakoWindGrid.load(npy_path, grid.get('origin', [0.0, 0.0, 0.0]), grid['spacing'])
+        self.gusts = [HakoGust(g['start_sec'], g['duration_sec'], g['amplitude']) for g in data.get('gusts', [])]
+        self.turbulence = None
+        turbulence = data.get('turbulence')
+        if turbulence is not None:
+            if turbulence.get('model', 'dryden') != 'dryden':
+                raise ValueError(f"未対応の乱流モデルです: {turbulence['model']}")
+            self.turbulence = HakoDrydenTurbulence(turbulence['intensity'], turbulence['length_scale'],
+                                                   turbulence.get('airspeed', 5.0), turbulence.get('seed'))
+
+    def has_grid(self):
+        return self.grid is not None
+
+    def evaluate(self, positions, time_sec, dt_sec, drone_indices=None, mean_wind=None):
+        """
+        全機体の位置における風速をまとめて求める
+
+        Args:
+            positions (array_like): 機体の位置 (N,3)
+            time_sec (float): シミュレーション時刻 [s]（突風の評価に使う）
+            dt_sec (float): 前回の評価からの経過時間 [s]（乱流の更新に使う）
+            drone_indices (array_like): 乱流の状態を対応付ける機体番号 (N,)。省略時は 0..N-1
+            mean_wind (array_like): 風速格子がない場合の平均風 (N,3)。省略時は無風
+
+        Returns:
+            np.ndarray: 風速 (N,3) [m/s]
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        if self.grid is not None:
+            wind = self.grid.sample(positions)
+        elif mean_wind is not None:
+            wind = np.array(mean_wind, dtype=float).reshape(-1, 3)
+        else:
+            wind = np.zeros_like(positions)
+        for gust in self.gusts:
+            wind += gust.velocity(time_sec)
+        if self.turbulence is not None:
+            if drone_indices is None:
+                drone_indices = np.arange(len(positions))
+            wind += self.turbulence.step(dt_sec, drone_indices)
+        return wind
@@ -1,8 +1,8 @@
 #!/bin/bash
 
-if [ $# -ne 1 ]
+if [ $# -ne 1 ] && [ $# -ne 2 ]
 then
-    echo "Usage: $0 <config-path>"
+    echo "Usage: $0 <config-path> [--realtime]"
     exit 1
 fi
 
@@ -26,4 +26,4 @@ export PYTHONPATH=${PYTHONPATH}:`pwd`/assets
 export PYTHONPATH=${PYTHONPATH}:`pwd`/assets/lib
 
 cd assets
-python3 hako_env_event.py ${CONFIG_PATH} 20 config
+python3 hako_env_event.py ${CONFIG_PATH} 20 config $2
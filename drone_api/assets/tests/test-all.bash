@@ -6,3 +6,19 @@ echo "INFO: test_area_prop:"
 python -m unittest tests.test_area_prop
 echo "INFO: test_asset:"
 python -m unittest tests.test_asset
+echo "INFO: test_boundary:"
+python -m unittest tests.test_boundary
+echo "INFO: test_pdu_robots:"
+python -m unittest tests.test_pdu_robots
+echo "INFO: test_wind_field:"
+python -m unittest tests.test_wind_field
+echo "INFO: test_env_cache:"
+python -m unittest tests.test_env_cache
+echo "INFO: test_tick_timer:"
+python -m unittest tests.test_tick_timer
+echo "INFO: test_env_bundle:"
+python -m unittest tests.test_env_bundle
+echo "INFO: test_env_reloader:"
+python -m unittest tests.test_env_reloader
+echo "INFO: test_ray_query:"
+python -m unittest tests.test_ray_query
@@ -3,7 +3,12 @@ import os
 # libディレクトリをモジュール検索パスに追加
 sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
 
+import json
+import random
+import tempfile
 import unittest
+import numpy as np
+import lib.hako_area_accessor_impl as hako_area_accessor_impl
 from lib.hako_area_accessor_impl import HakoAreaAccessorImpl
 from lib.hako_aabb_object_space import HakoAABBObjectSpace
 
@@ -40,5 +45,122 @@ class TestHakoAreaAccessor(unittest.TestCase):
         area_id = self.area_accessor.get_area_id(object_space)
         self.assertIsNone(area_id, "エリア外のオブジェクトがエリア内と判定されました。")
 
+    def test_area_ids_batch(self):
+        """複数機体をまとめて判定した結果が1機ずつの判定と一致するか確認"""
+        positions = [(50, 50, 25), (150, 50, 25), (250, 250, 25)]
+        area_ids = self.area_accessor.get_area_ids(positions, (10, 10, 10))
+        self.assertEqual(area_ids, ["area_1", "area_2", None])
+
+    def test_raycast_areas(self):
+        """光線が最初に入るエリアと距離を求められるか確認（始点を含むエリアは距離 0）"""
+        origins = [(50, 50, 25), (-10, 50, 25), (100.5, 50, 25), (250, 250, 25), (-10, 50, 25)]
+        directions = [(1, 0, 0), (2, 0, 0), (1, 0, 0), (1, 0, 0), (1, 0, 0)]
+        max_dists = [np.inf, np.inf, np.inf, np.inf, 5.0]
+        area_ids, dists = self.area_accessor.raycast_areas(origins, directions, max_dists)
+        self.assertEqual(area_ids, ["area_1", "area_1", "area_2", None, None])
+        np.testing.assert_allclose(dists[:3], [0.0, 10.0, 0.5])
+        self.assertEqual(dists[3], np.inf)
+
+class TestHakoAreaAccessorIndex(unittest.TestCase):
+
+    def setUp(self):
+        # 重なり合うエリアと巨大なエリアを含むエリア定義を生成する
+        rng = random.Random(1234)
+        areas = []
+        for i in range(500):
+            x, y, z = rng.uniform(0, 500), rng.uniform(0, 500), rng.uniform(0, 50)
+            w, d, h = rng.uniform(1, 40), rng.uniform(1, 40), rng.uniform(1, 20)
+            areas.append({
+                "area_id": f"area_{i}",
+                "bounds": {
+                    "min": {"x": x, "y": y, "z": z},
+                    "max": {"x": x + w, "y": y + d, "z": z + h}
+                }
+            })
+        areas.insert(250, {
+            "area_id": "large_area",
+            "bounds": {"min": {"x": -100, "y": -100, "z": -10}, "max": {"x": 600, "y": 600, "z": 100}}
+        })
+        self.tmp = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+        json.dump({"space_areas": areas}, self.tmp)
+        self.tmp.close()
+        self.area_accessor = HakoAreaAccessorImpl(self.tmp.name)
+        self.rng = rng
+
+    def tearDown(self):
+        os.remove(self.tmp.name)
+
+    def linear_area_id(self, object_space):
+        obj = object_space.get_bounds()
+        for area_id, bounds in self.area_accessor.space_areas.items():
+            if all(bounds['min'][i] <= obj['max'][i] and obj['min'][i] <= bounds['max'][i] for i in range(3)):
+                return area_id
+        return None
+
+    def test_index_is_built(self):
+        """エリア数が多い場合は索引が構築されるか確認"""
+        self.assertIsNotNone(self.area_accessor._grid)
+
+    def test_first_match_order(self):
+        """索引を使っても定義順で最初に重なったエリアが返るか確認"""
+        for _ in range(2000):
+            position = (self.rng.uniform(-150, 650), self.rng.uniform(-150, 650), self.rng.uniform(-20, 110))
+            size = (self.rng.uniform(0.1, 30), self.rng.uniform(0.1, 30), self.rng.uniform(0.1, 10))
+            object_space = HakoAABBObjectSpace(position, size)
+            self.assertEqual(self.area_accessor.get_area_id(object_space), self.linear_area_id(object_space))
+
+    def test_touching_boundary(self):
+        """エリアの境界にちょうど接するオブジェクトも重なりとして判定されるか確認"""
+        bounds = self.area_accessor.space_areas['area_0']
+        position = (bounds['max'][0] + 0.5, bounds['min'][1], bounds['min'][2])
+        object_space = HakoAABBObjectSpace(position, (1.0, 1.0, 1.0))
+        self.assertEqual(self.area_accessor.get_area_id(object_space), self.linear_area_id(object_space))
+
+    def test_area_ids_batch(self):
+        """索引の有無によらず、まとめて判定した結果が1機ずつの判定と一致するか確認"""
+        size = (0.4, 0.4, 0.1)
+        positions = [(self.rng.uniform(-150, 650), self.rng.uniform(-150, 650), self.rng.uniform(-20, 110))
+                     for _ in range(500)]
+        expected = [self.linear_area_id(HakoAABBObjectSpace(position, size)) for position in positions]
+        self.assertEqual(self.area_accessor.get_area_ids(positions, size), expected)
+        self.area_accessor._grid = None
+        self.assertEqual(self.area_accessor.get_area_ids(positions, size), expected)
+
+    def test_raycast_bvh_matches_linear(self):
+        """BVHによる光線の判定が全てのエリアを調べた結果と一致するか確認"""
+        rng = np.random.default_rng(5)
+        origins = rng.uniform(-150, 650, size=(200, 3))
+        directions = rng.normal(size=(200, 3))
+        directions[:20, :2] = 0.0
+        max_dists = rng.uniform(0, 300, size=200)
+        expected = self.area_accessor.raycast_area_indices(origins, directions, max_dists)
+        original = hako_area_accessor_impl.RAY_BVH_MIN_AREAS
+        hako_area_accessor_impl.RAY_BVH_MIN_AREAS = 1
+        try:
+            actual = self.area_accessor.raycast_area_indices(origins, directions, max_dists)
+        finally:
+            hako_area_accessor_impl.RAY_BVH_MIN_AREAS = original
+        self.assertIsNotNone(self.area_accessor._ray_bvh)
+        self.assertEqual(actual[0].tolist(), expected[0].tolist())
+        np.testing.assert_allclose(actual[1], expected[1])
+
+    def test_raycast_bvh_missing_ray_skips_leaves(self):
+        """BVHを使う場合も、当たらない無制限の光線は光線が入らない葉を調べないか確認"""
+        calls = []
+        entry_distances = self.area_accessor._ray_entry_distances
+        def counting(*args):
+            calls.append(len(args[3]))
+            return entry_distances(*args)
+        self.area_accessor._ray_entry_distances = counting
+        original = hako_area_accessor_impl.RAY_BVH_MIN_AREAS
+        hako_area_accessor_impl.RAY_BVH_MIN_AREAS = 1
+        try:
+            indices, dists = self.area_accessor.raycast_area_indices([(250.0, 250.0, 200.0)], [(0.0, 0.0, 1.0)])
+        finally:
+            hako_area_accessor_impl.RAY_BVH_MIN_AREAS = original
+        self.assertEqual(indices.tolist(), [-1])
+        self.assertEqual(dists.tolist(), [np.inf])
+        self.assertEqual(calls, [])
+
 if __name__ == '__main__':
     unittest.main()
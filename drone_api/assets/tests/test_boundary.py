@@ -0,0 +1,262 @@
+import sys
+import os
+# libディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
+
+import json
+import random
+import tempfile
+import unittest
+import numpy as np
+from scipy.spatial.transform import Rotation as R
+from lib.hako_boundary import HakoBoundary, BVH_MIN_WALLS
+
+def find_nearest_wall_per_wall(wall_list, drone_pos, local_normal_axis=[0, 0, 1]):
+    """壁ごとに判定する従来の方法で最も近い壁を求める（まとめて計算する実装の検証用）"""
+    min_dist = float('inf')
+    result = (None, None, None, min_dist)
+    for wall in wall_list:
+        wall_pos = np.array(wall["position"])
+        r = R.from_euler('ZYX', wall["rotation"], degrees=True)
+        # ドローン側を向く法線
+        normal = r.apply(local_normal_axis)
+        if np.dot(drone_pos - wall_pos, normal) < 0:
+            normal = -normal
+        # 壁の平面へ下ろした垂線の足
+        t = np.dot(drone_pos - wall_pos, normal)
+        point = drone_pos - t * normal
+        dist = abs(t)
+        # 垂線の足が壁の矩形内にあるか
+        d = point - wall_pos
+        half_w = wall["size"][0] / 2
+        half_h = wall["size"][1] / 2
+        inside = (-half_w <= np.dot(d, r.apply([1, 0, 0])) <= half_w) and \
+                 (-half_h <= np.dot(d, r.apply([0, 1, 0])) <= half_h)
+        if inside and dist < min_dist:
+            min_dist = dist
+            result = (wall, normal, point, dist)
+    return result
+
+class TestHakoBoundary(unittest.TestCase):
+
+    def setUp(self):
+        # テスト用のJSONファイルのパスを指定
+        self.json_file_path = 'tests/test_data/boundary.json'
+        self.boundary = HakoBoundary(self.json_file_path)
+
+    def test_compile_walls(self):
+        """壁の定義が配列にまとめられるかを確認"""
+        self.assertEqual(self.boundary.centers.shape, (4, 3))
+        self.assertEqual(self.boundary.half_sizes.shape, (4, 2))
+        np.testing.assert_allclose(self.boundary.half_sizes[0], [5.0, 5.0])
+
+    def test_nearest_ground(self):
+        """地面の上にいる場合は地面が最も近い壁になるか確認"""
+        wall, normal, point, dist = self.boundary.find_nearest_wall_with_hitbox(np.array([2.0, 3.0, 0.5]))
+        self.assertEqual(wall["name"], "ground")
+        np.testing.assert_allclose(normal, [0.0, 0.0, 1.0], atol=1e-12)
+        np.testing.assert_allclose(point, [2.0, 3.0, 0.0], atol=1e-12)
+        self.assertAlmostEqual(dist, 0.5)
+
+    def test_equal_distance_prefers_first_wall(self):
+        """距離が等しい場合は定義順で先の壁が返るか確認"""
+        wall, normal, point, dist = self.boundary.find_nearest_wall_with_hitbox((0.0, 0.0, 1.0))
+        self.assertEqual(wall["name"], "ground")
+        self.assertAlmostEqual(dist, 1.0)
+
+    def test_no_wall(self):
+        """どの壁の矩形にも入らない場合"""
+        wall, normal, point, dist = self.boundary.find_nearest_wall_with_hitbox((50.0, 50.0, 50.0))
+        self.assertIsNone(wall)
+        self.assertIsNone(normal)
+        self.assertIsNone(point)
+        self.assertEqual(dist, float('inf'))
+
+    def test_matches_per_wall_computation(self):
+        """まとめて計算した結果が壁ごとの計算と一致するか確認"""
+        rng = random.Random(42)
+        for _ in range(500):
+            drone_pos = np.array([rng.uniform(-7, 7), rng.uniform(-7, 7), rng.uniform(-1, 4)])
+            for axis in ([0, 0, 1], [1, 0, 0]):
+                expected = find_nearest_wall_per_wall(self.boundary.wall_list, drone_pos, axis)
+                actual = self.boundary.find_nearest_wall_with_hitbox(drone_pos, axis)
+                self.assertIs(actual[0], expected[0])
+                if expected[0] is not None:
+                    np.testing.assert_allclose(actual[1], expected[1], atol=1e-9)
+                    np.testing.assert_allclose(actual[2], expected[2], atol=1e-9)
+                    self.assertAlmostEqual(actual[3], expected[3])
+
+    def test_nearest_walls_batch(self):
+        """複数機体をまとめて求めた結果が1機ずつの結果と一致するか確認"""
+        rng = random.Random(3)
+        positions = np.array([[rng.uniform(-7, 7), rng.uniform(-7, 7), rng.uniform(-1, 4)] for _ in range(200)])
+        positions[0] = (50.0, 50.0, 50.0)
+        results = self.boundary.find_nearest_walls_with_hitbox(positions)
+        self.assertEqual(len(results), len(positions))
+        for drone_pos, actual in zip(positions, results):
+            expected = self.boundary.find_nearest_wall_with_hitbox(drone_pos)
+            self.assertIs(actual[0], expected[0])
+            self.assertEqual(actual[3], expected[3])
+            if expected[0] is not None:
+                np.testing.assert_allclose(actual[1], expected[1])
+                np.testing.assert_allclose(actual[2], expected[2])
+
+    def test_raycast_walls(self):
+        """光線が最初に当たる壁と交点、始点側を向いた法線を求められるか確認"""
+        origins = [(2.0, 3.0, 5.0), (0.0, 0.0, 5.0), (0.0, 0.0, 5.0), (0.0, 0.0, 1.0), (0.0, 0.0, 1.0), (0.0, 0.0, 1.0)]
+        directions = [(0, 0, -1), (0, 0, -2), (0, 0, -1), (0, 0, 1), (3, 0, 0), (0, 0, 0)]
+        max_dists = [np.inf, np.inf, 2.0, np.inf, np.inf, np.inf]
+        indices, dists, points, normals = self.boundary.raycast_walls(origins, directions, max_dists)
+        self.assertEqual(indices.tolist(), [0, 1, -1, 1, 2, -1])
+        np.testing.assert_allclose(dists[[0, 1, 3, 4]], [5.0, 3.0, 1.0, 5.0])
+        np.testing.assert_allclose(points[0], [2.0, 3.0, 0.0], atol=1e-12)
+        np.testing.assert_allclose(normals[0], [0.0, 0.0, 1.0], atol=1e-12)
+        np.testing.assert_allclose(normals[3], [0.0, 0.0, -1.0], atol=1e-12)
+        np.testing.assert_allclose(normals[4], [-1.0, 0.0, 0.0], atol=1e-12)
+        self.assertEqual(dists[2], np.inf)
+        self.assertTrue(np.isnan(points[2]).all())
+
+    def test_segments_blocked(self):
+        """線分の間に壁がある場合だけ遮られていると判定されるか確認"""
+        starts = [(0.0, 0.0, 1.0), (0.0, 0.0, 1.0), (2.0, 3.0, 1.0), (50.0, 50.0, 50.0)]
+        ends = [(4.0, 0.0, 1.0), (6.0, 0.0, 1.0), (2.0, 3.0, -1.0), (50.0, 50.0, 50.0)]
+        self.assertEqual(self.boundary.segments_blocked(starts, ends).tolist(), [False, True, True, False])
+
+ROOM_SIZE = 10.0
+ROOM_HEIGHT = 3.0
+
+def generate_walls(count, rng):
+    """
+    部屋（床・天井・4面の壁）を格子状に並べた建物規模の壁定義を生成する
+    Returns:
+        list: 壁定義のリスト（count 枚）。建物の範囲は building_extent() で求める
+    """
+    walls = []
+    rooms = building_rooms(count)
+    for room in range(rooms[0] * rooms[1] * rooms[2]):
+        ix, iy, iz = room % rooms[0], (room // rooms[0]) % rooms[1], room // (rooms[0] * rooms[1])
+        cx, cy, cz = (ix + 0.5) * ROOM_SIZE, (iy + 0.5) * ROOM_SIZE, iz * ROOM_HEIGHT
+        # 扉や窓の位置を再現するため、パネルの大きさと位置を少しずらす
+        jitter = lambda: rng.uniform(-0.3, 0.3)
+        panels = [
+            ([cx, cy, cz], [ROOM_SIZE, ROOM_SIZE], [0.0, 0.0, 0.0]),
+            ([cx, cy, cz + ROOM_HEIGHT - 0.01], [ROOM_SIZE, ROOM_SIZE], [0.0, 0.0, 0.0]),
+            ([cx - ROOM_SIZE / 2, cy + jitter(), cz + ROOM_HEIGHT / 2], [ROOM_HEIGHT, ROOM_SIZE - 1], [0.0, 90.0, 0.0]),
+            ([cx + ROOM_SIZE / 2, cy + jitter(), cz + ROOM_HEIGHT / 2], [ROOM_HEIGHT, ROOM_SIZE - 1], [0.0, 90.0, 0.0]),
+            ([cx + jitter(), cy - ROOM_SIZE / 2, cz + ROOM_HEIGHT / 2], [ROOM_SIZE - 1, ROOM_HEIGHT], [0.0, 0.0, 90.0]),
+            ([cx + jitter(), cy + ROOM_SIZE / 2, cz + ROOM_HEIGHT / 2], [ROOM_SIZE - 1, ROOM_HEIGHT], [0.0, 0.0, 90.0]),
+        ]
+        for position, size, rotation in panels:
+            if len(walls) >= count:
+                return walls
+            walls.append({"name": f"panel_{len(walls)}", "position": position, "size": size, "rotation": rotation})
+    return walls
+
+def building_rooms(count):
+    """壁 count 枚に必要な部屋数 (x, y, 階数)"""
+    rooms = max(1, -(-count // 6))
+    floors = max(1, min(10, rooms // 16))
+    per_floor = -(-rooms // floors)
+    nx = max(1, int(per_floor ** 0.5))
+    return nx, -(-per_floor // nx), floors
+
+def building_extent(count):
+    """建物の範囲 (x, y, z) の最大値"""
+    nx, ny, floors = building_rooms(count)
+    return nx * ROOM_SIZE, ny * ROOM_SIZE, floors * ROOM_HEIGHT
+
+class TestHakoBoundaryBVH(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(7)
+        self.tmp = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+        json.dump(generate_walls(2000, self.rng), self.tmp)
+        self.extent = building_extent(2000)
+        self.tmp.close()
+        self.boundary = HakoBoundary(self.tmp.name)
+        # BVHを使わずに全ての壁をまとめて計算する比較用
+        self.linear = HakoBoundary(self.tmp.name)
+        self.linear.bvh = None
+
+    def tearDown(self):
+        os.remove(self.tmp.name)
+
+    def random_position(self, margin):
+        return np.array([self.rng.uniform(-margin, self.extent[i] + margin) for i in range(3)])
+
+    def test_bvh_is_built(self):
+        """壁の数が多い場合はBVHが構築されるか確認"""
+        self.assertGreaterEqual(len(self.boundary.wall_list), BVH_MIN_WALLS)
+        self.assertIsNotNone(self.boundary.bvh)
+        self.assertEqual(sorted(self.boundary.bvh.order.tolist()), list(range(2000)))
+
+    def test_nearest_matches_linear(self):
+        """BVHによる最近傍の壁が全ての壁を調べた結果と一致するか確認"""
+        for _ in range(300):
+            drone_pos = self.random_position(margin=5.0)
+            expected = self.linear.find_nearest_wall_with_hitbox(drone_pos)
+            actual = self.boundary.find_nearest_wall_with_hitbox(drone_pos)
+            self.assertEqual(actual[0] and actual[0]["name"], expected[0] and expected[0]["name"])
+            if expected[0] is not None:
+                np.testing.assert_allclose(actual[1], expected[1])
+                np.testing.assert_allclose(actual[2], expected[2])
+                self.assertEqual(actual[3], expected[3])
+
+    def test_nearest_walls_batch_matches_linear(self):
+        """BVHを使う場合も複数機体をまとめて求めた結果が全ての壁を調べた結果と一致するか確認"""
+        positions = np.array([self.random_position(margin=5.0) for _ in range(100)])
+        actual = self.boundary.find_nearest_walls_with_hitbox(positions)
+        expected = self.linear.find_nearest_walls_with_hitbox(positions)
+        self.assertEqual([w and w["name"] for w, _, _, _ in actual], [w and w["name"] for w, _, _, _ in expected])
+        self.assertEqual([d for _, _, _, d in actual], [d for _, _, _, d in expected])
+
+    def test_raycast_matches_linear(self):
+        """BVHによる光線の判定が全ての壁を調べた結果と一致するか確認"""
+        origins = np.array([self.random_position(margin=5.0) for _ in range(200)])
+        directions = np.array([[self.rng.gauss(0, 1) for _ in range(3)] for _ in range(200)])
+        # 軸に平行な光線も含める
+        directions[:20, 1:] = 0.0
+        max_dists = np.array([self.rng.uniform(0, 40) for _ in range(200)])
+        expected = self.linear.raycast_walls(origins, directions, max_dists)
+        actual = self.boundary.raycast_walls(origins, directions, max_dists)
+        self.assertEqual(actual[0].tolist(), expected[0].tolist())
+        np.testing.assert_allclose(actual[1], expected[1])
+        np.testing.assert_allclose(actual[3], expected[3])
+
+    def test_raycast_missing_ray_skips_leaves(self):
+        """当たらない無制限の光線は、光線が入らない葉を調べないか確認（空に向けたLiDARの光線など）"""
+        calls = []
+        intersect = self.boundary._intersect_rays_with_walls
+        def counting(*args):
+            calls.append(len(args[4]))
+            return intersect(*args)
+        self.boundary._intersect_rays_with_walls = counting
+        above = np.array([self.extent[0] / 2, self.extent[1] / 2, self.extent[2] + 10.0])
+        indices, dists, _, _ = self.boundary.raycast_walls([above, above], [(0, 0, 1), (1, 1, 0)])
+        self.assertEqual(indices.tolist(), [-1, -1])
+        self.assertEqual(dists.tolist(), [np.inf, np.inf])
+        self.assertEqual(calls, [])
+        # 建物を貫く光線は、光線が入る葉だけを調べる
+        origin = np.array([-5.0, self.extent[1] / 2 + 0.01, self.extent[2] / 2 + 0.01])
+        bvh = self.boundary.bvh
+        inv = (1.0, None, None)
+        entered = [node for node in range(len(bvh.ranges))
+                   if bvh._node_children[node][0] < 0 and bvh._node_ray_entry(tuple(origin), inv, node) != np.inf]
+        self.boundary.raycast_walls([origin], [(1, 0, 0)])
+        self.assertGreater(len(calls), 0)
+        self.assertLessEqual(len(calls), len(entered))
+
+    def test_within_radius_matches_linear(self):
+        """半径内の壁の問い合わせがBVHの有無で一致するか確認"""
+        for _ in range(100):
+            drone_pos = self.random_position(margin=0.0)
+            radius = self.rng.uniform(0.5, 8.0)
+            expected = self.linear.find_walls_within_radius(drone_pos, radius)
+            actual = self.boundary.find_walls_within_radius(drone_pos, radius)
+            self.assertEqual([w["name"] for w, _, _, _ in actual], [w["name"] for w, _, _, _ in expected])
+            for _, _, point, dist in actual:
+                self.assertLessEqual(dist, radius)
+                self.assertAlmostEqual(np.linalg.norm(drone_pos - point), dist)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import sys
+import os
+# libディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
+
+import json
+import random
+import shutil
+import tempfile
+import time
+import unittest
+import numpy as np
+from lib.hako_env_bundle import HakoEnvBundle
+from lib.hako_env_compiler import (compile_env_bundle, load_env_bundle, load_env_json, load_env,
+                                   is_env_bundle_up_to_date, validate_env_bundle)
+from lib.hako_aabb_object_space import HakoAABBObjectSpace
+from lib.hako_boundary import BVH_MIN_WALLS
+from tests.test_boundary import generate_walls
+
+class TestHakoEnvBundle(unittest.TestCase):
+
+    def setUp(self):
+        # テスト用の定義ファイルを一時ディレクトリに複製してバンドルを作る
+        self.tmpdir = tempfile.mkdtemp()
+        for name in ['area.json', 'area_property.json', 'boundary.json']:
+            shutil.copy(os.path.join('tests/test_data', name), self.tmpdir)
+        self.bundle_path = compile_env_bundle(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_load_bundle(self):
+        """バンドルから読み込んだ結果がJSONと同じになるか確認"""
+        area_accessor, prop_accessor, boundary = load_env_bundle(self.bundle_path)
+        object_space = HakoAABBObjectSpace(position=(150, 50, 25), size=(10, 10, 10))
+        self.assertEqual(area_accessor.get_area_id(object_space), "area_2")
+        self.assertEqual(area_accessor.space_areas['area_1'], {"min": (0, 0, 0), "max": (100, 100, 50)})
+        self.assertEqual(prop_accessor.get_property("area_1").get_wind_velocity(), (5.0, 0.0, 0.0))
+        self.assertIsNone(prop_accessor.get_property("area_4").get_temperature())
+        self.assertIsNone(prop_accessor.get_property("not_found"))
+        wall, normal, point, dist = boundary.find_nearest_wall_with_hitbox(np.array([2.0, 3.0, 0.5]))
+        self.assertEqual(wall["name"], "ground")
+        self.assertAlmostEqual(dist, 0.5)
+
+    def test_validate(self):
+        """検証でJSONとの一致が確認できるか"""
+        self.assertEqual(validate_env_bundle(self.tmpdir, samples=500), [])
+
+    def test_up_to_date(self):
+        """JSONを更新するとバンドルが古いと判定され、JSONから読み込まれるか確認"""
+        self.assertTrue(is_env_bundle_up_to_date(self.tmpdir))
+        self.assertTrue(load_env(self.tmpdir)[3])
+        path = os.path.join(self.tmpdir, 'area_property.json')
+        with open(path) as f:
+            data = json.load(f)
+        data["area_properties"][0]["properties"]["temperature"] = 0.0
+        with open(path, 'w') as f:
+            json.dump(data, f)
+        self.assertFalse(is_env_bundle_up_to_date(self.tmpdir))
+        area_accessor, prop_accessor, boundary, from_bundle = load_env(self.tmpdir)
+        self.assertFalse(from_bundle)
+        self.assertEqual(prop_accessor.get_property("area_1").get_temperature(), 0.0)
+
+    def test_invalid_file(self):
+        """バンドル以外のファイルを指定した場合"""
+        with self.assertRaises(ValueError):
+            HakoEnvBundle(os.path.join(self.tmpdir, 'area.json'))
+
+class TestHakoEnvBundleLarge(unittest.TestCase):
+
+    def setUp(self):
+        # 索引とBVHが構築される規模の定義ファイルを生成する
+        rng = random.Random(11)
+        self.tmpdir = tempfile.mkdtemp()
+        areas, properties = [], []
+        for i in range(2000):
+            x, y, z = rng.uniform(0, 200), rng.uniform(0, 200), rng.uniform(0, 20)
+            areas.append({"area_id": f"area_{i}", "bounds": {
+                "min": {"x": x, "y": y, "z": z},
+                "max": {"x": x + rng.uniform(1, 20), "y": y + rng.uniform(1, 20), "z": z + rng.uniform(1, 10)}}})
+            if i % 3 != 0:
+                properties.append({"area_id": f"area_{i}",
+                                   "properties": {"wind_velocity": [rng.uniform(-5, 5), 0.0, 0.0],
+                                                  "sea_level_atm": rng.uniform(0.9, 1.1)}})
+        areas.append({"area_id": "large_area", "bounds": {"min": {"x": -50, "y": -50, "z": -5},
+                                                          "max": {"x": 250, "y": 250, "z": 40}}})
+        with open(os.path.join(self.tmpdir, 'area.json'), 'w') as f:
+            json.dump({"space_areas": areas}, f)
+        with open(os.path.join(self.tmpdir, 'area_property.json'), 'w') as f:
+            json.dump({"area_properties": properties}, f)
+        with open(os.path.join(self.tmpdir, 'boundary.json'), 'w') as f:
+            json.dump(generate_walls(2000, rng), f)
+        self.bundle_path = compile_env_bundle(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_index_is_restored(self):
+        """索引とBVHがバンドルから復元されるか確認"""
+        area_accessor, _, boundary = load_env_bundle(self.bundle_path)
+        self.assertIsNotNone(area_accessor._grid)
+        self.assertGreater(len(area_accessor._large_areas), 0)
+        self.assertGreaterEqual(len(boundary.wall_list), BVH_MIN_WALLS)
+        self.assertIsNotNone(boundary.bvh)
+
+    def test_validate(self):
+        """索引とBVHを使う場合も検証でJSONとの一致が確認できるか"""
+        self.assertEqual(validate_env_bundle(self.tmpdir, samples=500), [])
+
+    def test_load_is_faster_than_json(self):
+        """バンドルからの読み込みがJSONからの読み込みより速いか確認"""
+        t0 = time.perf_counter()
+        load_env_json(self.tmpdir)
+        json_sec = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        load_env_bundle(self.bundle_path)
+        bundle_sec = time.perf_counter() - t0
+        self.assertLess(bundle_sec, json_sec)
+
+if __name__ == '__main__':
+    unittest.main()
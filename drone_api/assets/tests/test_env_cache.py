@@ -0,0 +1,55 @@
+import sys
+import os
+# libディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
+
+import unittest
+import numpy as np
+from lib.hako_env_cache import HakoEnvCache
+
+class TestHakoEnvCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = HakoEnvCache(3, move_threshold=0.1, refresh_ticks=5)
+
+    def test_first_query(self):
+        """未問い合わせの機体は必ず問い合わせ対象になるか確認"""
+        moved = self.cache.moved([0, 2], [(0.0, 0.0, 0.0), (1.0, 1.0, 1.0)])
+        self.assertEqual(moved.tolist(), [True, True])
+
+    def test_hysteresis(self):
+        """問い合わせ位置から閾値未満の移動では前回の結果を使い、閾値以上で問い合わせるか確認"""
+        drone_indices = [0, 1]
+        positions = np.array([(0.0, 0.0, 0.0), (5.0, 0.0, 0.0)])
+        moved = self.cache.moved(drone_indices, positions)
+        area_ids, walls = self.cache.update_queries(drone_indices, positions, moved, ["a", "b"], ["wa", "wb"])
+        self.assertEqual((area_ids, walls), (["a", "b"], ["wa", "wb"]))
+
+        # 機体0は少しずつ動き、問い合わせ位置からの累積の移動量で判定する
+        for step in range(1, 4):
+            positions = np.array([(0.04 * step, 0.0, 0.0), (5.0, 0.0, 0.0)])
+            moved = self.cache.moved(drone_indices, positions)
+            self.assertEqual(moved.tolist(), [step >= 3, False])
+            queried = ["c"] if moved[0] else []
+            area_ids, walls = self.cache.update_queries(drone_indices, positions, moved, queried, ["wc"] * len(queried))
+        self.assertEqual((area_ids, walls), (["c", "b"], ["wc", "wb"]))
+        self.assertEqual(self.cache.get_counters()["query"], 3)
+        self.assertEqual(self.cache.get_counters()["query_skipped"], 5)
+
+    def test_write_on_change(self):
+        """内容が変わった場合と再書き込みの周期に達した場合だけ書き込むか確認"""
+        results = [self.cache.should_write(0, ("same",)) for _ in range(12)]
+        self.assertEqual(results, [True, False, False, False, False, True, False, False, False, False, True, False])
+        self.assertTrue(self.cache.should_write(0, ("changed",)))
+        self.assertFalse(self.cache.should_write(0, ("changed",)))
+        # 他の機体の書き込みには影響しない
+        self.assertTrue(self.cache.should_write(1, ("changed",)))
+
+    def test_invalidate(self):
+        """書き込みに失敗した場合は次回必ず書き込むか確認"""
+        self.assertTrue(self.cache.should_write(0, ("same",)))
+        self.cache.invalidate(0)
+        self.assertTrue(self.cache.should_write(0, ("same",)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import sys
+import os
+# libディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
+
+import json
+import shutil
+import tempfile
+import time
+import unittest
+from lib.hako_env_compiler import load_env_json
+from lib.hako_env_reloader import HakoEnvReloader, HakoEnvMaps
+
+class TestHakoEnvReloader(unittest.TestCase):
+
+    def setUp(self):
+        # テスト用の定義ファイルを一時ディレクトリに複製する
+        self.tmpdir = tempfile.mkdtemp()
+        for name in ['area.json', 'area_property.json', 'boundary.json']:
+            shutil.copy(os.path.join('tests/test_data', name), self.tmpdir)
+        self.maps = HakoEnvMaps(*load_env_json(self.tmpdir))
+        self.reloader = HakoEnvReloader(self.tmpdir, self.maps, poll_interval_sec=0.02)
+        self.mtime_ns = time.time_ns()
+
+    def tearDown(self):
+        self.reloader.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def write_json(self, name, data):
+        """更新時刻を進めてファイルを書き込む"""
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w') as f:
+            f.write(data if isinstance(data, str) else json.dumps(data))
+        self.mtime_ns += 1_000_000_000
+        os.utime(path, ns=(self.mtime_ns, self.mtime_ns))
+
+    def set_area_1_wind(self, wind):
+        with open('tests/test_data/area_property.json') as f:
+            data = json.load(f)
+        data["area_properties"][0]["properties"]["wind_velocity"] = wind
+        self.write_json('area_property.json', data)
+
+    def test_no_change(self):
+        """更新がない場合は読み込み直さないか確認"""
+        self.assertFalse(self.reloader.check())
+        self.assertFalse(self.reloader.check())
+        self.assertIsNone(self.reloader.take())
+
+    def test_reload_changed_file_only(self):
+        """更新されたファイルだけが読み込み直され、take() で受け取れるか確認"""
+        self.set_area_1_wind([9.0, 0.0, 0.0])
+        # 書き込み途中の可能性があるため、最初の確認では読み込まない
+        self.assertFalse(self.reloader.check())
+        self.assertTrue(self.reloader.check())
+        maps = self.reloader.take()
+        self.assertIsNotNone(maps)
+        self.assertEqual(maps.prop_accessor.get_property("area_1").get_wind_velocity(), (9.0, 0.0, 0.0))
+        self.assertIs(maps.area_accessor, self.maps.area_accessor)
+        self.assertIs(maps.boundary, self.maps.boundary)
+        # 元の一式は変更されない
+        self.assertEqual(self.maps.prop_accessor.get_property("area_1").get_wind_velocity(), (5.0, 0.0, 0.0))
+        self.assertIsNone(self.reloader.take())
+
+    def test_invalid_file_keeps_current_maps(self):
+        """不正な内容の場合は現在の一式を使い続け、修正後に読み込み直すか確認"""
+        self.write_json('area_property.json', '{"area_properties": [')
+        self.assertFalse(self.reloader.check())
+        self.assertFalse(self.reloader.check())
+        self.assertEqual(self.reloader.error_count, 1)
+        self.assertIsNone(self.reloader.take())
+        self.set_area_1_wind([1.0, 2.0, 3.0])
+        self.reloader.check()
+        self.assertTrue(self.reloader.check())
+        self.assertEqual(self.reloader.take().prop_accessor.get_property("area_1").get_wind_velocity(), (1.0, 2.0, 3.0))
+
+    def test_add_wind_field(self):
+        """風の場の定義を追加すると読み込まれるか確認"""
+        self.write_json('wind_field.json', {"gusts": [{"start_sec": 0, "duration_sec": 1, "amplitude": [1, 0, 0]}]})
+        self.reloader.check()
+        self.assertTrue(self.reloader.check())
+        self.assertEqual(len(self.reloader.take().wind_field.gusts), 1)
+
+    def test_background_thread(self):
+        """監視スレッドが更新を検出するか確認"""
+        self.reloader.start()
+        self.set_area_1_wind([7.0, 0.0, 0.0])
+        maps = None
+        deadline = time.time() + 5.0
+        while maps is None and time.time() < deadline:
+            time.sleep(0.01)
+            maps = self.reloader.take()
+        self.assertIsNotNone(maps)
+        self.assertEqual(maps.prop_accessor.get_property("area_1").get_wind_velocity(), (7.0, 0.0, 0.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import sys
+import os
+# libディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
+
+import unittest
+from lib.hako_pdu_robots import find_robots_with_pdus
+
+class TestHakoPduRobots(unittest.TestCase):
+
+    def setUp(self):
+        # テスト用のJSONファイルのパスを指定
+        self.json_file_path = 'tests/test_data/pdudef.json'
+
+    def test_find_drones(self):
+        """pos と disturb を持つロボットだけが定義順で返るか確認"""
+        robot_names = find_robots_with_pdus(self.json_file_path, ['pos', 'disturb'])
+        self.assertEqual(robot_names, ["Drone", "Drone1"])
+
+    def test_find_by_single_pdu(self):
+        """指定したPDUを持つロボットが全て返るか確認"""
+        robot_names = find_robots_with_pdus(self.json_file_path, ['pos'])
+        self.assertEqual(robot_names, ["Drone", "Drone1", "Camera"])
+
+    def test_file_not_found(self):
+        """存在しないファイルを指定した場合"""
+        with self.assertRaises(FileNotFoundError):
+            find_robots_with_pdus('tests/test_data/not_found.json', ['pos'])
+
+if __name__ == '__main__':
+    unittest.main()
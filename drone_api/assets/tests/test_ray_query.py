@@ -0,0 +1,61 @@
+import sys
+import os
+# libディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
+
+import unittest
+import numpy as np
+from lib.hako_area_accessor_impl import HakoAreaAccessorImpl
+from lib.hako_boundary import HakoBoundary
+from lib.hako_ray_query import (RAY_REQUEST_DTYPE, RAY_RESULT_DTYPE, point_fields, encode_ray_request,
+                                decode_ray_request, decode_ray_results, query_rays)
+
+class TestHakoRayQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.boundary = HakoBoundary('tests/test_data/boundary.json')
+        self.area_accessor = HakoAreaAccessorImpl('tests/test_data/area.json')
+
+    def test_request_round_trip(self):
+        """要求の PointCloud2 のデータを作って読み戻せるか確認"""
+        origins = [(1.0, 2.0, 3.0), (4.0, 5.0, 6.0)]
+        directions = [(0.0, 0.0, -1.0), (1.0, 0.0, 0.0)]
+        data = encode_ray_request(origins, directions, [10.0, np.inf])
+        self.assertEqual(len(data), 2 * RAY_REQUEST_DTYPE.itemsize)
+        decoded = decode_ray_request(data, 2, RAY_REQUEST_DTYPE.itemsize)
+        np.testing.assert_allclose(decoded[0], origins)
+        np.testing.assert_allclose(decoded[1], directions)
+        self.assertEqual(decoded[2].tolist(), [10.0, np.inf])
+
+    def test_invalid_request(self):
+        """点の形式やデータの長さが合わない要求は ValueError になるか確認"""
+        data = encode_ray_request([(0.0, 0.0, 0.0)], [(1.0, 0.0, 0.0)])
+        with self.assertRaises(ValueError):
+            decode_ray_request(data, 1, 16)
+        with self.assertRaises(ValueError):
+            decode_ray_request(data, 2, RAY_REQUEST_DTYPE.itemsize)
+
+    def test_point_fields(self):
+        """応答の点の形式が PointField の定義に変換されるか確認"""
+        fields = point_fields(RAY_RESULT_DTYPE)
+        self.assertEqual([name for name, _, _, _ in fields], list(RAY_RESULT_DTYPE.names))
+        self.assertEqual(fields[0], ('wall_index', 0, 5, 1))
+        self.assertEqual(fields[1], ('wall_dist', 4, 7, 1))
+
+    def test_query_rays(self):
+        """壁とエリアの判定結果が応答の形式にまとめられ、読み戻せるか確認"""
+        origins = [(0.0, 0.0, 5.0), (50.0, 50.0, 25.0)]
+        directions = [(0.0, 0.0, -1.0), (1.0, 0.0, 0.0)]
+        results = query_rays(self.boundary, self.area_accessor, origins, directions, [10.0, 10.0])
+        results = decode_ray_results(results.tobytes(), len(results))
+        self.assertEqual(results['wall_index'].tolist(), [1, -1])
+        self.assertEqual(results['wall_dist'].tolist(), [3.0, np.inf])
+        self.assertEqual([results['x'][0], results['y'][0], results['z'][0]], [0.0, 0.0, 2.0])
+        self.assertEqual([results['normal_x'][0], results['normal_y'][0], results['normal_z'][0]], [0.0, 0.0, 1.0])
+        self.assertTrue(np.isnan(results['x'][1]))
+        # どちらも始点が area_1 に含まれる
+        self.assertEqual(results['area_index'].tolist(), [0, 0])
+        self.assertEqual(results['area_dist'].tolist(), [0.0, 0.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import sys
+import os
+# libディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
+
+import unittest
+from lib.hako_tick_timer import HakoTickTimer
+
+class FakeClock:
+    """手動で進める時計"""
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, sec):
+        self.sleeps.append(sec)
+        self.now += sec
+
+class TestHakoTickTimer(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def create_timer(self, realtime=False):
+        return HakoTickTimer(20000, realtime=realtime, report_interval_ticks=0, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_compute_time_and_overrun(self):
+        """tick の処理時間と超過回数が計測されるか確認"""
+        timer = self.create_timer()
+        self.assertIsNone(timer.end_tick())
+        for compute in (0.005, 0.025, 0.010):
+            timer.start_tick()
+            self.clock.now += compute
+            self.assertAlmostEqual(timer.end_tick(), compute)
+        stats = timer.get_stats()
+        self.assertEqual(stats["ticks"], 3)
+        self.assertEqual(stats["overruns"], 1)
+        self.assertAlmostEqual(stats["mean_ms"], 40.0 / 3)
+        self.assertAlmostEqual(stats["max_ms"], 25.0)
+
+    def test_no_wait_without_realtime(self):
+        """実時間に合わせない場合は待たないか確認"""
+        timer = self.create_timer()
+        for _ in range(3):
+            timer.pace()
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_realtime_pacing(self):
+        """実時間に合わせる場合は、処理時間を差し引いた残りだけ待つか確認"""
+        timer = self.create_timer(realtime=True)
+        timer.pace()
+        for compute in (0.005, 0.015, 0.0):
+            self.clock.now += compute
+            timer.pace()
+        for expected, actual in zip([0.015, 0.005, 0.020], self.clock.sleeps):
+            self.assertAlmostEqual(actual, expected)
+        self.assertAlmostEqual(self.clock.now, 100.06)
+
+    def test_realtime_late(self):
+        """1 tick 以上遅れた場合は遅れを取り戻そうとしないか確認"""
+        timer = self.create_timer(realtime=True)
+        timer.pace()
+        self.clock.now += 0.1
+        timer.pace()
+        self.assertEqual(timer.get_stats()["realtime_late"], 1)
+        self.clock.now += 0.001
+        timer.pace()
+        self.assertAlmostEqual(self.clock.sleeps[-1], 0.019)
+
+if __name__ == '__main__':
+    unittest.main()
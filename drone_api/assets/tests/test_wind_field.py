@@ -0,0 +1,99 @@
+import sys
+import os
+# libディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
+
+import json
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from lib.hako_wind_field import HakoWindField, HakoDrydenTurbulence
+
+def linear_wind(positions):
+    """三線形補間で厳密に再現できる（各軸に1次の）風速"""
+    x, y, z = positions[..., 0], positions[..., 1], positions[..., 2]
+    return np.stack([1.0 + 0.5 * x, -0.2 * y + 0.1 * z, 0.3 * x - 0.4 * z], axis=-1)
+
+class TestHakoWindField(unittest.TestCase):
+
+    def setUp(self):
+        # 原点 (-10,-10,0)、間隔 (5,5,2) の格子に1次の風速を書き込む
+        self.tmpdir = tempfile.mkdtemp()
+        self.origin = np.array([-10.0, -10.0, 0.0])
+        self.spacing = np.array([5.0, 5.0, 2.0])
+        index = np.stack(np.meshgrid(np.arange(5), np.arange(4), np.arange(3), indexing='ij'), axis=-1)
+        np.save(os.path.join(self.tmpdir, 'wind_grid.npy'), linear_wind(self.origin + index * self.spacing))
+        self.json_file_path = os.path.join(self.tmpdir, 'wind_field.json')
+        with open(self.json_file_path, 'w') as f:
+            json.dump({
+                "grid": {"file": "wind_grid.npy", "origin": self.origin.tolist(), "spacing": self.spacing.tolist()},
+                "gusts": [{"start_sec": 1.0, "duration_sec": 2.0, "amplitude": [2.0, 0.0, 0.0]}]
+            }, f)
+        self.wind_field = HakoWindField(self.json_file_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_grid_is_memory_mapped(self):
+        """格子がメモリマップで読み込まれるか確認"""
+        self.assertTrue(self.wind_field.has_grid())
+        self.assertIsInstance(self.wind_field.grid.values, np.memmap)
+
+    def test_trilinear_interpolation(self):
+        """格子内の任意の位置で1次の風速が再現されるか確認"""
+        rng = np.random.default_rng(0)
+        positions = rng.uniform([-10, -10, 0], [10, 5, 4], size=(200, 3))
+        np.testing.assert_allclose(self.wind_field.grid.sample(positions), linear_wind(positions), atol=1e-12)
+
+    def test_outside_grid_is_clamped(self):
+        """格子の外側では境界の値になるか確認"""
+        wind = self.wind_field.grid.sample([[-50.0, 0.0, 1.0], [20.0, 30.0, 10.0]])
+        np.testing.assert_allclose(wind, linear_wind(np.array([[-10.0, 0.0, 1.0], [10.0, 5.0, 4.0]])), atol=1e-12)
+
+    def test_gust(self):
+        """突風が開始前後で0、中間で振幅の最大値になるか確認"""
+        positions = np.zeros((2, 3))
+        base = self.wind_field.evaluate(positions, 0.5, 0.02)
+        np.testing.assert_allclose(self.wind_field.evaluate(positions, 2.0, 0.02) - base, [[2.0, 0.0, 0.0]] * 2)
+        np.testing.assert_allclose(self.wind_field.evaluate(positions, 3.5, 0.02), base)
+
+    def test_mean_wind_without_grid(self):
+        """格子がない場合は渡した平均風に突風を加えるか確認"""
+        with open(self.json_file_path, 'w') as f:
+            json.dump({"gusts": [{"start_sec": 0.0, "duration_sec": 2.0, "amplitude": [0.0, 1.0, 0.0]}]}, f)
+        wind_field = HakoWindField(self.json_file_path)
+        wind = wind_field.evaluate(np.zeros((2, 3)), 1.0, 0.02, mean_wind=[(1.0, 0.0, 0.0), (0.0, -1.0, 0.0)])
+        np.testing.assert_allclose(wind, [[1.0, 1.0, 0.0], [0.0, 0.0, 0.0]])
+
+    def test_file_not_found(self):
+        """存在しないファイルを指定した場合"""
+        with self.assertRaises(FileNotFoundError):
+            HakoWindField(os.path.join(self.tmpdir, 'not_found.json'))
+
+class TestHakoDrydenTurbulence(unittest.TestCase):
+
+    def test_intensity(self):
+        """乱流成分の標準偏差が乱流強度に一致するか確認"""
+        turbulence = HakoDrydenTurbulence([1.0, 2.0, 0.5], [20.0, 20.0, 5.0], airspeed=5.0, seed=1)
+        samples = np.array([turbulence.step(0.02, np.arange(50)) for _ in range(2000)])
+        np.testing.assert_allclose(samples.reshape(-1, 3).std(axis=0), [1.0, 2.0, 0.5], rtol=0.1)
+
+    def test_drones_are_independent(self):
+        """機体ごとに別の状態を持ち、指定していない機体の状態は変わらないか確認"""
+        turbulence = HakoDrydenTurbulence([1.0, 1.0, 1.0], [20.0, 20.0, 20.0], seed=2)
+        turbulence.step(0.02, [0, 1, 2])
+        state = turbulence.state.copy()
+        turbulence.step(0.02, [0, 2])
+        np.testing.assert_array_equal(turbulence.state[1], state[1])
+        self.assertFalse(np.allclose(turbulence.state[0], turbulence.state[2]))
+
+    def test_seed(self):
+        """同じシードでは同じ乱流が再現されるか確認"""
+        a = HakoDrydenTurbulence([1.0, 1.0, 1.0], [20.0, 20.0, 20.0], seed=3)
+        b = HakoDrydenTurbulence([1.0, 1.0, 1.0], [20.0, 20.0, 20.0], seed=3)
+        for _ in range(10):
+            np.testing.assert_array_equal(a.step(0.02, [0, 1]), b.step(0.02, [0, 1]))
+
+if __name__ == '__main__':
+    unittest.main()
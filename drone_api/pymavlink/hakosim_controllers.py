@@ -2,47 +2,108 @@
 # -*- coding: utf-8 -*-
 
 import abc
+import threading
 import time
 import math
-import threading
 from pymavlink import mavutil
 from typing import Any, Callable
 
+from hakosim_telemetry import TelemetryReader
+from hakosim_setpoint_scheduler import SetpointScheduler, get_default_scheduler
+from hakosim_path import PathTracker, PolylinePath, local_ned_to_global
+
 # PX4 OFFBOARDモードで目標値を送り続ける頻度
 PX4_KEEPALIVE_HZ = 10.0
 
+# クライアントが使用するメッセージの要求レート(Hz)
+DEFAULT_STREAM_RATES_HZ = {
+    "ATTITUDE": 50.0,
+    "LOCAL_POSITION_NED": 50.0,
+    "GPS_RAW_INT": 5.0,
+}
+# 要求レートに対して、この割合以上で受信できていれば達成とみなす
+STREAM_RATE_TOLERANCE = 0.8
+# 達成レートを計測する時間（秒）
+STREAM_RATE_VERIFY_SEC = 1.0
+# レート要求の全ACKを待つ時間（秒）
+STREAM_RATE_ACK_TIMEOUT_SEC = 1.0
+
+# ArduPilot SITL 接続時に設定するパラメータ (名前, 値, 型)
+ARDUPILOT_INIT_PARAMS = [
+    ("ARMING_CHECK", 0, mavutil.mavlink.MAV_PARAM_TYPE_INT32),
+    ("SIM_SPEEDUP", 1, mavutil.mavlink.MAV_PARAM_TYPE_REAL32),
+    ("GPS_TYPE", 1, mavutil.mavlink.MAV_PARAM_TYPE_INT8),
+    ("EK3_ENABLE", 1, mavutil.mavlink.MAV_PARAM_TYPE_INT8),
+    ("AHRS_EKF_TYPE", 3, mavutil.mavlink.MAV_PARAM_TYPE_INT8),
+    ("BATT_MONITOR", 4, mavutil.mavlink.MAV_PARAM_TYPE_INT8),
+    ("FS_BATT_ENABLE", 0, mavutil.mavlink.MAV_PARAM_TYPE_INT8),
+]
+# エコーが返らなかったパラメータを再送する回数
+PARAM_SET_RETRIES = 2
+
+# 経路追従で経由点に到達したとみなす距離（m）
+PATH_ACCEPT_RADIUS_M = 1.0
+# 経路追従（PX4）で目標位置を先読みする時間（秒）と最小距離（m）
+PATH_LOOKAHEAD_SEC = 1.0
+PATH_MIN_LOOKAHEAD_M = 1.0
+# ミッションのアップロードで機体の応答を待つ時間（秒）
+MISSION_UPLOAD_TIMEOUT_SEC = 5.0
+
 class AbstractFlightController(abc.ABC):
     """
     フライトスタック(ArduPilot/PX4)ごとのMAVLink通信の違いを吸収するインターフェース。
     """
     def __init__(self):
         self.mav_conn = None
+        self.telemetry = None
         self.target_system = None
         self.target_component = None
-
-    def init_connection(self, mav_conn: mavutil.mavlink_connection):
+        self.stream_rates_hz = dict(DEFAULT_STREAM_RATES_HZ)
+        self.achieved_rates_hz = {}
+        # 接続時に達成レートを計測するか（計測する場合は STREAM_RATE_VERIFY_SEC だけ接続が遅くなる）
+        self.verify_stream_rates_on_connect = False
+        # command -> 最後に送信した時刻(time.monotonic)。ACKの取りこぼし防止に使う
+        self._command_sent_at = {}
+
+    def init_connection(self, mav_conn: mavutil.mavlink_connection, telemetry: TelemetryReader = None):
         self.mav_conn = mav_conn
+        if telemetry is None:
+            telemetry = TelemetryReader(mav_conn)
+            telemetry.start()
+        self.telemetry = telemetry
         self.target_system = mav_conn.target_system
         self._initialize()
+        self.request_stream_rates()
+        if self.verify_stream_rates_on_connect:
+            self.verify_stream_rates()
+        # 機体の再起動などで接続が途絶えた場合は、復帰後にレートを要求し直す
+        self.telemetry.add_reconnect_callback(self.request_stream_rates)
 
     def _param_id_to_str(self, pid):
         if isinstance(pid, (bytes, bytearray)):
             pid = pid.decode("utf-8", errors="ignore")
         return pid.strip("\x00")
 
-    def _wait_for_message(self, msg_type: str, condition: Callable[[Any], bool], timeout: float):
-        t0 = time.time()
-        while time.time() - t0 < timeout:
-            msg = self.mav_conn.recv_match(type=msg_type, blocking=True, timeout=1)
-            if msg and condition(msg):
-                return msg
-        return None
+    def _wait_for_message(self, msg_type, condition: Callable[[Any], bool], timeout: float):
+        # 受信スレッドの購読として待つため、他の処理が待っているメッセージを奪わない
+        return self.telemetry.wait_for(msg_type, condition, timeout)
+
+    def _send_command_long(self, command: int, confirmation: int = 0,
+                           p1=0, p2=0, p3=0, p4=0, p5=0, p6=0, p7=0):
+        self._command_sent_at[command] = time.monotonic()
+        self.mav_conn.mav.command_long_send(
+            self.target_system, self.target_component,
+            command, confirmation,
+            p1, p2, p3, p4, p5, p6, p7
+        )
 
     def _wait_for_command_ack(self, command: int, timeout: float = 5.0):
-        ack = self._wait_for_message(
-            msg_type='COMMAND_ACK',
-            condition=lambda msg: getattr(msg, 'command', None) == command,
-            timeout=timeout
+        # 送信後、待ち始める前に届いたACKも対象にする
+        ack = self.telemetry.wait_for(
+            'COMMAND_ACK',
+            lambda msg: getattr(msg, 'command', None) == command,
+            timeout,
+            since=self._command_sent_at.get(command)
         )
         if ack:
             print(f"ACK received: command={ack.command}, result={ack.result}")
@@ -50,6 +111,66 @@ class AbstractFlightController(abc.ABC):
             print(f"ACK timeout for command {command}")
         return ack
 
+    def request_stream_rates(self, rates_hz: dict = None) -> dict:
+        """
+        MAV_CMD_SET_MESSAGE_INTERVAL で各メッセージの送信レートを要求する
+        全ての要求を送信してからACKをまとめて待つため、待ち時間はメッセージ数によらず最大 STREAM_RATE_ACK_TIMEOUT_SEC
+        戻り値は {メッセージ名: ACKが受理されたか}
+        """
+        if rates_hz is not None:
+            self.stream_rates_hz.update(rates_hz)
+        command = mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL
+        names = []
+        # 送信前に購読し、以前の要求に対する遅れたACKを今回の要求のACKとして扱わない
+        subscription = self.telemetry.subscribe('COMMAND_ACK')
+        try:
+            for name, rate_hz in self.stream_rates_hz.items():
+                msg_id = getattr(mavutil.mavlink, f"MAVLINK_MSG_ID_{name}", None)
+                if msg_id is None:
+                    print(f"⚠ Unknown MAVLink message for stream rate: {name}")
+                    continue
+                interval_us = 1e6 / rate_hz if rate_hz > 0 else -1  # -1: 送信停止
+                self._send_command_long(command, 0, msg_id, interval_us, 0, 0, 0, 0, 0)
+                names.append(name)
+            # ACKは要求したメッセージIDを含まないため、送信順に届くACKを順に対応付ける
+            acks = []
+            deadline = time.monotonic() + STREAM_RATE_ACK_TIMEOUT_SEC
+            while len(acks) < len(names):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                msg = subscription.get(remaining)
+                if msg is None:
+                    break
+                if getattr(msg, 'command', None) == command:
+                    acks.append(msg)
+        finally:
+            self.telemetry.unsubscribe(subscription)
+        results = {}
+        for i, name in enumerate(names):
+            results[name] = i < len(acks) and acks[i].result == mavutil.mavlink.MAV_RESULT_ACCEPTED
+        if len(acks) < len(names):
+            print(f"ACK timeout for command {command}: {len(acks)}/{len(names)} received")
+        return results
+
+    def verify_stream_rates(self, duration: float = STREAM_RATE_VERIFY_SEC) -> bool:
+        """
+        受信数から達成レートを計測し、要求レートに届いているかを確認する
+        計測結果は achieved_rates_hz に保持する
+        """
+        names = [name for name, rate_hz in self.stream_rates_hz.items() if rate_hz > 0]
+        start_counts = {name: self.telemetry.count(name) for name in names}
+        time.sleep(duration)
+        ok = True
+        for name in names:
+            achieved = (self.telemetry.count(name) - start_counts[name]) / duration
+            self.achieved_rates_hz[name] = achieved
+            requested = self.stream_rates_hz[name]
+            if achieved < requested * STREAM_RATE_TOLERANCE:
+                print(f"⚠ Stream rate for {name}: {achieved:.1f}Hz (requested {requested:.1f}Hz)")
+                ok = False
+        return ok
+
     @abc.abstractmethod
     def _initialize(self):
         pass
@@ -82,35 +203,70 @@ class AbstractFlightController(abc.ABC):
     def stop_movement(self):
         pass
 
+    @abc.abstractmethod
+    def start_path(self, points, speed: float, yaw_deg: float = None) -> bool:
+        """ローカルNEDの経由点列を一括で指示し、停止せずに連続して飛行させる"""
+        pass
+
+    @abc.abstractmethod
+    def path_progress(self) -> int:
+        """到達済みの経由点の番号（未到達の場合は-1）"""
+        pass
+
+    @abc.abstractmethod
+    def stop_path(self):
+        pass
+
 class ArduPilotController(AbstractFlightController):
     """ArduPilot用のフライトコントローラ実装"""
 
+    def __init__(self):
+        super().__init__()
+        # 実行中の経路（ミッション）の経由点数と、最初の経由点のseq、開始時刻(time.monotonic)
+        self._path_count = 0
+        self._path_first_seq = 0
+        self._path_started_at = 0.0
+
     def _initialize(self):
         self.target_component = self.mav_conn.target_component
         print("=== [ArduPilot] Setting Parameters ===")
-        self._set_param("ARMING_CHECK", 0)
-        self._set_param("SIM_SPEEDUP", 1, mavutil.mavlink.MAV_PARAM_TYPE_REAL32)
-        self._set_param("GPS_TYPE", 1, mavutil.mavlink.MAV_PARAM_TYPE_INT8)
-        self._set_param("EK3_ENABLE", 1, mavutil.mavlink.MAV_PARAM_TYPE_INT8)
-        self._set_param("AHRS_EKF_TYPE", 3, mavutil.mavlink.MAV_PARAM_TYPE_INT8)
-        self._set_param("BATT_MONITOR", 4, mavutil.mavlink.MAV_PARAM_TYPE_INT8)
-        self._set_param("FS_BATT_ENABLE", 0, mavutil.mavlink.MAV_PARAM_TYPE_INT8)
+        self._set_params(ARDUPILOT_INIT_PARAMS)
         time.sleep(1.0)
 
     def _set_param(self, name: str, value, ptype=mavutil.mavlink.MAV_PARAM_TYPE_INT32, timeout=3):
-        self.mav_conn.mav.param_set_send(
-            self.target_system, self.target_component,
-            name.encode("utf-8"), float(value), ptype
-        )
-        msg = self._wait_for_message(
-            "PARAM_VALUE",
-            lambda m: self._param_id_to_str(m.param_id) == name,
-            timeout
-        )
-        if msg:
-            print(f"[ArduPilot] {name} = {msg.param_value}")
-            return True
-        print(f"⚠ [ArduPilot] PARAM echo timeout: {name}")
+        return self._set_params([(name, value, ptype)], timeout)
+
+    def _set_params(self, params, timeout=3) -> bool:
+        """
+        複数のパラメータをまとめて送信し、PARAM_VALUE のエコーを1つの購読で照合する
+        （1件ずつエコーを待たないため、件数が増えても待ち時間は増えない）
+        """
+        subscription = self.telemetry.subscribe("PARAM_VALUE")
+        try:
+            pending = {name: (value, ptype) for name, value, ptype in params}
+            for _ in range(1 + PARAM_SET_RETRIES):
+                for name, (value, ptype) in pending.items():
+                    self.mav_conn.mav.param_set_send(
+                        self.target_system, self.target_component,
+                        name.encode("utf-8"), float(value), ptype
+                    )
+                deadline = time.monotonic() + timeout
+                while pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    msg = subscription.get(remaining)
+                    if msg is None:
+                        break
+                    name = self._param_id_to_str(msg.param_id)
+                    if pending.pop(name, None) is not None:
+                        print(f"[ArduPilot] {name} = {msg.param_value}")
+                if not pending:
+                    return True
+        finally:
+            self.telemetry.unsubscribe(subscription)
+        for name in pending:
+            print(f"⚠ [ArduPilot] PARAM echo timeout: {name}")
         return False
 
     def set_api_mode(self) -> bool:
@@ -146,8 +302,7 @@ class ArduPilotController(AbstractFlightController):
     def _arm_and_verify(self) -> bool:
         print("=== [ArduPilot] Attempting to ARM ===")
         # Attempt 1: Basic ARM
-        self.mav_conn.mav.command_long_send(
-            self.target_system, self.target_component,
+        self._send_command_long(
             mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM, 0,
             1, 0, 0, 0, 0, 0, 0
         )
@@ -159,8 +314,7 @@ class ArduPilotController(AbstractFlightController):
 
         # Attempt 2: Force ARM (magic number)
         print("[ArduPilot] ARM attempt 2: Force ARM")
-        self.mav_conn.mav.command_long_send(
-            self.target_system, self.target_component,
+        self._send_command_long(
             mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM, 0,
             1, 21196, 0, 0, 0, 0, 0
         )
@@ -179,8 +333,7 @@ class ArduPilotController(AbstractFlightController):
 
     def disarm(self) -> bool:
         print("=== [ArduPilot] Attempting to DISARM ===")
-        self.mav_conn.mav.command_long_send(
-            self.target_system, self.target_component,
+        self._send_command_long(
             mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM, 0,
             0, 0, 0, 0, 0, 0, 0
         )
@@ -189,8 +342,7 @@ class ArduPilotController(AbstractFlightController):
 
     def takeoff(self, height_m: float) -> bool:
         print(f"=== [ArduPilot] Takeoff to {abs(height_m)}m (ROS frame) ===")
-        self.mav_conn.mav.command_long_send(
-            self.target_system, self.target_component,
+        self._send_command_long(
             mavutil.mavlink.MAV_CMD_NAV_TAKEOFF, 0,
             0, 0, 0, 0, 0, 0, -height_m
         )
@@ -199,8 +351,7 @@ class ArduPilotController(AbstractFlightController):
 
     def land(self) -> bool:
         print("=== [ArduPilot] Landing ===")
-        self.mav_conn.mav.command_long_send(
-            self.target_system, self.target_component,
+        self._send_command_long(
             mavutil.mavlink.MAV_CMD_NAV_LAND, 0,
             0, 0, 0, 0, 0, 0, 0
         )
@@ -221,11 +372,111 @@ class ArduPilotController(AbstractFlightController):
     def stop_movement(self):
         pass # Not needed for ArduPilot
 
+    # --- Path following (MAVLink mission) ---
+    def start_path(self, points, speed: float, yaw_deg: float = None) -> bool:
+        home = self._get_home_position()
+        if home is None:
+            print("⚠ [ArduPilot] HOME position is not available; cannot upload path")
+            return False
+        home_lat, home_lon = home.latitude * 1e-7, home.longitude * 1e-7
+        yaw = float(yaw_deg) % 360.0 if yaw_deg is not None else float("nan")
+        frame = mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT_INT
+        # seq 0 はHOMEとして扱われるため、経由点は DO_CHANGE_SPEED の後の seq 2 から始まる
+        items = [
+            (mavutil.mavlink.MAV_CMD_NAV_WAYPOINT, frame, (0, 0, 0, 0), home.latitude, home.longitude, 0),
+            (mavutil.mavlink.MAV_CMD_DO_CHANGE_SPEED, frame, (1, speed, -1, 0), 0, 0, 0),
+        ]
+        for x, y, z in points:
+            lat, lon = local_ned_to_global(home_lat, home_lon, x - home.x, y - home.y)
+            items.append((mavutil.mavlink.MAV_CMD_NAV_WAYPOINT, frame, (0, PATH_ACCEPT_RADIUS_M, 0, yaw),
+                          int(round(lat * 1e7)), int(round(lon * 1e7)), -(z - home.z)))
+        print(f"=== [ArduPilot] Uploading path ({len(points)} waypoints) ===")
+        if not self._upload_mission(items):
+            return False
+        self._path_first_seq = 2
+        self._path_started_at = time.monotonic()
+
+        self.mav_conn.set_mode_apm("AUTO")
+        if not self._wait_for_message("HEARTBEAT", lambda m: m.custom_mode == 3, timeout=5): # AUTO is 3
+            print("⚠ [ArduPilot] Failed to set mode to AUTO")
+            return False
+        self._send_command_long(mavutil.mavlink.MAV_CMD_MISSION_START, 0, 0, 0, 0, 0, 0, 0, 0)
+        ack = self._wait_for_command_ack(mavutil.mavlink.MAV_CMD_MISSION_START, timeout=3)
+        if not (ack and ack.result == mavutil.mavlink.MAV_RESULT_ACCEPTED):
+            print("⚠ [ArduPilot] Failed to start mission")
+            self.set_api_mode()
+            return False
+        self._path_count = len(points)
+        return True
+
+    def path_progress(self) -> int:
+        if not self._path_count:
+            return -1
+        msg = self.telemetry.latest("MISSION_ITEM_REACHED")
+        # 今回の経路を開始する前に受信したものは対象外
+        if msg is None or time.monotonic() - self.telemetry.age("MISSION_ITEM_REACHED") < self._path_started_at:
+            return -1
+        return max(-1, min(msg.seq - self._path_first_seq, self._path_count - 1))
+
+    def stop_path(self):
+        if not self._path_count:
+            return
+        self._path_count = 0
+        # AUTOのままでは go_to_local_ned を受け付けないため、GUIDEDに戻して現在位置で待機させる
+        self.set_api_mode()
+
+    def _get_home_position(self, timeout=3):
+        home = self.telemetry.latest("HOME_POSITION")
+        if home is None:
+            self._send_command_long(mavutil.mavlink.MAV_CMD_GET_HOME_POSITION, 0, 0, 0, 0, 0, 0, 0, 0)
+            home = self._wait_for_message("HOME_POSITION", lambda m: True, timeout)
+        return home
+
+    def _upload_mission(self, items, timeout=MISSION_UPLOAD_TIMEOUT_SEC) -> bool:
+        """
+        MISSION_COUNT を送信し、機体からの MISSION_REQUEST(_INT) に応じて MISSION_ITEM_INT を送る
+        :param items: (command, frame, (param1..4), x, y, z) のリスト
+        """
+        subscription = self.telemetry.subscribe(["MISSION_REQUEST_INT", "MISSION_REQUEST", "MISSION_ACK"])
+        try:
+            self.mav_conn.mav.mission_count_send(
+                self.target_system, self.target_component, len(items),
+                mavutil.mavlink.MAV_MISSION_TYPE_MISSION
+            )
+            while True:
+                msg = subscription.get(timeout)
+                if msg is None:
+                    print("⚠ [ArduPilot] Mission upload timeout")
+                    return False
+                if getattr(msg, "mission_type", 0) != mavutil.mavlink.MAV_MISSION_TYPE_MISSION:
+                    continue
+                if msg.get_type() == "MISSION_ACK":
+                    if msg.type == mavutil.mavlink.MAV_MISSION_ACCEPTED:
+                        print(f"[ArduPilot] Mission uploaded ({len(items)} items)")
+                        return True
+                    print(f"⚠ [ArduPilot] Mission rejected: result={msg.type}")
+                    return False
+                if msg.seq >= len(items):
+                    continue
+                command, frame, params, x, y, z = items[msg.seq]
+                self.mav_conn.mav.mission_item_int_send(
+                    self.target_system, self.target_component,
+                    msg.seq, frame, command,
+                    0, 1, # current, autocontinue
+                    float(params[0]), float(params[1]), float(params[2]), float(params[3]),
+                    int(x), int(y), float(z),
+                    mavutil.mavlink.MAV_MISSION_TYPE_MISSION
+                )
+        finally:
+            self.telemetry.unsubscribe(subscription)
+
     # --- Helper methods for pre-arm checks ---
     def wait_gps_fix(self, min_fix=3, min_sats=6, timeout=30) -> bool:
         print("[ArduPilot] Waiting for GPS fix...")
         condition = lambda g: g.fix_type >= min_fix and g.satellites_visible >= min_sats
-        initial_msg = self.mav_conn.recv_match(type="GPS_RAW_INT", blocking=True, timeout=1)
+        initial_msg = self.telemetry.latest("GPS_RAW_INT", max_age=1.0)
+        if initial_msg is None:
+            initial_msg = self._wait_for_message("GPS_RAW_INT", lambda g: True, 1)
         if initial_msg:
             print(f"GPS status: fix={initial_msg.fix_type}, sats={initial_msg.satellites_visible}")
             if condition(initial_msg): return True
@@ -238,32 +489,37 @@ class ArduPilotController(AbstractFlightController):
         last_req = 0.0
         while time.time() - t0 < timeout:
             if time.time() - last_req > 3.0:
-                self.mav_conn.mav.command_long_send(
-                    self.target_system, self.target_component,
+                self._send_command_long(
                     mavutil.mavlink.MAV_CMD_GET_HOME_POSITION, 0, 0,0,0,0,0,0,0)
                 last_req = time.time()
-            msg = self.mav_conn.recv_match(type=["HOME_POSITION", "GPS_GLOBAL_ORIGIN"], blocking=True, timeout=1)
+            msg = self._wait_for_message(["HOME_POSITION", "GPS_GLOBAL_ORIGIN"], lambda m: True, 1)
             if msg: return True
         return False
 
     def set_home_manually(self):
         print("[ArduPilot] Trying to set HOME manually...")
-        self.mav_conn.mav.command_long_send(
-            self.target_system, self.target_component,
+        self._send_command_long(
             mavutil.mavlink.MAV_CMD_DO_SET_HOME, 0, 1, 0,0,0,0,0,0)
 
 class PX4Controller(AbstractFlightController):
     """PX4用のフライトコントローラ実装"""
 
-    def __init__(self):
+    def __init__(self, scheduler: SetpointScheduler = None):
         super().__init__()
-        self._streaming_thread = None
-        self._stop_event = threading.Event()
-        self._target_pos = (0, 0, 0)
-        self._target_yaw_deg = 0
+        # 全機体の目標値送信は共有のスケジューラで行う（機体ごとにスレッドを持たない）
+        self._scheduler = scheduler if scheduler is not None else get_default_scheduler()
+        # _target・_path・_path_setpoint は利用側のスレッドと送信スレッドの両方から参照するため、このロックでまとめて更新する
+        self._setpoint_lock = threading.Lock()
+        # (x, y, z, yaw_deg)。利用側のスレッドのみが更新する
+        self._target = (0, 0, 0, 0)
+        # 経路追従中の PathTracker と、送信スレッドが最後に送った経路上の目標位置（_target には書き戻さない）
+        self._path = None
+        self._path_setpoint = None
+        self._connected_time = time.monotonic()
 
     def _initialize(self):
         self.target_component = 1 # PX4 Autopilot is typically component 1
+        self._connected_time = time.monotonic()
         print("=== [PX4] Initialized ===")
         time.sleep(1.0)
 
@@ -274,8 +530,7 @@ class PX4Controller(AbstractFlightController):
         time.sleep(0.5)
 
         PX4_CUSTOM_MAIN_MODE_OFFBOARD = 6
-        self.mav_conn.mav.command_long_send(
-            self.target_system, self.target_component,
+        self._send_command_long(
             mavutil.mavlink.MAV_CMD_DO_SET_MODE, 0,
             mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
             PX4_CUSTOM_MAIN_MODE_OFFBOARD, 0, 0, 0, 0, 0
@@ -291,8 +546,7 @@ class PX4Controller(AbstractFlightController):
 
     def arm(self) -> bool:
         print("=== [PX4] Attempting to ARM ===")
-        self.mav_conn.mav.command_long_send(
-            self.target_system, self.target_component,
+        self._send_command_long(
             mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM, 0, 1, 0, 0, 0, 0, 0, 0
         )
         ack = self._wait_for_command_ack(mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM, timeout=3)
@@ -305,8 +559,7 @@ class PX4Controller(AbstractFlightController):
     def disarm(self) -> bool:
         print("=== [PX4] Attempting to DISARM ===")
         self.stop_movement()
-        self.mav_conn.mav.command_long_send(
-            self.target_system, self.target_component,
+        self._send_command_long(
             mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM, 0, 0, 0, 0, 0, 0, 0, 0
         )
         ack = self._wait_for_command_ack(mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM, timeout=3)
@@ -320,45 +573,104 @@ class PX4Controller(AbstractFlightController):
     def land(self) -> bool:
         print("=== [PX4] Landing ===")
         self.stop_movement()
-        self.mav_conn.mav.command_long_send(
-            self.target_system, self.target_component,
+        self._send_command_long(
             mavutil.mavlink.MAV_CMD_NAV_LAND, 0, 0, 0, 0, 0, 0, 0, 0
         )
         ack = self._wait_for_command_ack(mavutil.mavlink.MAV_CMD_NAV_LAND)
         return ack and ack.result == mavutil.mavlink.MAV_RESULT_ACCEPTED
 
     def go_to_local_ned(self, x: float, y: float, z: float, yaw_deg: float):
-        self._target_pos = (x, y, z)
-        self._target_yaw_deg = yaw_deg
-        
-        if self._streaming_thread is None or not self._streaming_thread.is_alive():
-            self._stop_event.clear()
-            self._streaming_thread = threading.Thread(target=self._stream_setpoints, daemon=True)
-            self._streaming_thread.start()
+        with self._setpoint_lock:
+            self._path = None
+            self._path_setpoint = None
+            self._target = (x, y, z, yaw_deg)
+        self._start_streaming()
+
+    def _start_streaming(self):
+        if not self._scheduler.is_active(self):
+            self._scheduler.add(self, self._send_setpoint, PX4_KEEPALIVE_HZ)
             print("[PX4] Setpoint streaming started.")
 
     def stop_movement(self):
-        if self._streaming_thread and self._streaming_thread.is_alive():
-            self._stop_event.set()
-            self._streaming_thread.join(timeout=1.0)
+        with self._setpoint_lock:
+            self._path = None
+            self._path_setpoint = None
+        if self._scheduler.remove(self):
             print("[PX4] Setpoint streaming stopped.")
-        self._streaming_thread = None
 
-    def _stream_setpoints(self):
+    # --- Path following (streamed setpoints with lookahead) ---
+    def start_path(self, points, speed: float, yaw_deg: float = None) -> bool:
+        pos = self.telemetry.latest('LOCAL_POSITION_NED')
+        if pos is None:
+            pos = self._wait_for_message('LOCAL_POSITION_NED', lambda m: True, 1)
+        if pos is None:
+            print("⚠ [PX4] Position is not available; cannot start path")
+            return False
+        if yaw_deg is None:
+            att = self.telemetry.latest('ATTITUDE')
+            yaw_deg = self._target[3] if self._scheduler.is_active(self) else (math.degrees(att.yaw) if att else 0.0)
+        # 現在位置を始点とし、経由点 i は頂点 i+1 になる
+        path = PolylinePath([(pos.x, pos.y, pos.z)] + [tuple(p) for p in points])
+        with self._setpoint_lock:
+            self._target = (pos.x, pos.y, pos.z, yaw_deg)
+            self._path = PathTracker(path, speed, PATH_ACCEPT_RADIUS_M)
+            self._path_setpoint = None
+        self._start_streaming()
+        print(f"[PX4] Path started ({len(points)} waypoints, {path.length:.1f}m)")
+        return True
+
+    def path_progress(self) -> int:
+        tracker = self._path
+        return tracker.reached - 1 if tracker is not None else -1
+
+    def stop_path(self):
+        with self._setpoint_lock:
+            tracker = self._path
+            setpoint = self._path_setpoint
+            self._path = None
+            self._path_setpoint = None
+            if tracker is None:
+                return
+            # 終点に到達済みの場合は終点、途中の場合は最後に送った経路上の位置で停止する
+            if tracker.done:
+                setpoint = tracker.path.points[-1]
+            if setpoint is not None:
+                x, y, z = setpoint
+                self._target = (x, y, z, self._target[3])
+
+    def setpoint_jitter_stats(self):
+        """目標値送信のジッタ統計（送信中でない場合はNone）"""
+        return self._scheduler.stats(self)
+
+    def _time_boot_ms(self) -> int:
+        # 機体の起動からの時刻を、最新のATTITUDEの time_boot_ms と受信からの経過時間で推定する
+        att = self.telemetry.latest('ATTITUDE') if self.telemetry else None
+        if att is not None:
+            return int(att.time_boot_ms + self.telemetry.age('ATTITUDE') * 1000.0) & 0xFFFFFFFF
+        return int((time.monotonic() - self._connected_time) * 1000.0) & 0xFFFFFFFF
+
+    def _send_setpoint(self):
         MASK_POS_YAW = 0x09F8
-        dt = 1.0 / PX4_KEEPALIVE_HZ
-        
-        while not self._stop_event.is_set():
-            x, y, z = self._target_pos
-            yaw_deg = self._target_yaw_deg
-            
-            self.mav_conn.mav.set_position_target_local_ned_send(
-                0, # time_boot_ms (0 for now)
-                self.target_system, self.target_component,
-                mavutil.mavlink.MAV_FRAME_LOCAL_NED,
-                MASK_POS_YAW,
-                float(x), float(y), float(z),
-                0, 0, 0, 0, 0, 0,
-                math.radians(float(yaw_deg)), 0
-            )
-            time.sleep(dt)
+        MASK_POS_VEL_YAW = 0x09C0
+        mask = MASK_POS_YAW
+        vx = vy = vz = 0.0
+        # 経路の解除・目標の変更と入れ違いにならないよう、経路上の目標の計算までロックを取る（送信は外で行う）
+        with self._setpoint_lock:
+            x, y, z, yaw_deg = self._target
+            tracker = self._path
+            pos = self.telemetry.latest('LOCAL_POSITION_NED') if tracker is not None else None
+            if pos is not None:
+                # 経路上の現在位置から先読みした点を目標とし、進行方向の速度をフィードフォワードする
+                lookahead = max(PATH_MIN_LOOKAHEAD_M, tracker.speed * PATH_LOOKAHEAD_SEC)
+                (x, y, z), (vx, vy, vz) = tracker.update((pos.x, pos.y, pos.z), lookahead)
+                self._path_setpoint = (x, y, z)
+                mask = MASK_POS_VEL_YAW
+        self.mav_conn.mav.set_position_target_local_ned_send(
+            self._time_boot_ms(),
+            self.target_system, self.target_component,
+            mavutil.mavlink.MAV_FRAME_LOCAL_NED,
+            mask,
+            float(x), float(y), float(z),
+            float(vx), float(vy), float(vz), 0, 0, 0,
+            math.radians(float(yaw_deg)), 0
+        )
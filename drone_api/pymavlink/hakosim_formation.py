@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+複数機体の編隊制御
+全機体の目標位置をNumPyでまとめて計算し、1回の送信周期で全機体に指示する
+座標はROS(FLU)座標系で扱い、機体への指示時にNEDへ変換する
+"""
+
+import contextlib
+import math
+import time
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# enforce_spacing で押し離す処理の上限回数
+ENFORCE_SPACING_MAX_ITERATIONS = 1000
+# enforce_spacing で押し離す距離に加える余裕（min_spacing に対する割合）
+SPACING_MARGIN = 1e-3
+
+
+def line_offsets(n: int, spacing: float) -> np.ndarray:
+    """横一列（y方向）に並ぶ編隊のオフセット"""
+    y = (np.arange(n) - (n - 1) / 2.0) * spacing
+    return np.column_stack([np.zeros(n), y, np.zeros(n)])
+
+
+def grid_offsets(n: int, spacing: float, cols: Optional[int] = None) -> np.ndarray:
+    """格子状に並ぶ編隊のオフセット"""
+    if cols is None:
+        cols = int(math.ceil(math.sqrt(n)))
+    rows = int(math.ceil(n / cols))
+    idx = np.arange(n)
+    x = -(idx // cols - (rows - 1) / 2.0) * spacing
+    y = (idx % cols - (cols - 1) / 2.0) * spacing
+    return np.column_stack([x, y, np.zeros(n)])
+
+
+def circle_offsets(n: int, radius: float) -> np.ndarray:
+    """円周上に並ぶ編隊のオフセット"""
+    theta = 2.0 * math.pi * np.arange(n) / n
+    return np.column_stack([radius * np.cos(theta), radius * np.sin(theta), np.zeros(n)])
+
+
+def v_offsets(n: int, spacing: float) -> np.ndarray:
+    """先頭機を頂点とするV字編隊のオフセット"""
+    idx = np.arange(n)
+    rank = (idx + 1) // 2
+    side = np.where(idx % 2 == 1, 1.0, -1.0)
+    return np.column_stack([-rank * spacing, side * rank * spacing, np.zeros(n)])
+
+
+def enforce_spacing(targets: np.ndarray, min_spacing: float,
+                    max_iterations: int = ENFORCE_SPACING_MAX_ITERATIONS) -> np.ndarray:
+    """
+    目標位置同士が min_spacing 未満に近づかないよう、近すぎる組がなくなるまで互いに押し離す
+    :param targets: (N, 3) の目標位置
+    :param max_iterations: 押し離す処理の上限回数（安全のための上限）
+    :return: 調整後の (N, 3) の目標位置（全ての組が min_spacing 以上離れている）
+    :raises RuntimeError: 上限回数までに間隔を確保できなかった場合（間隔が不足した目標位置は返さない）
+    """
+    targets = np.array(targets, dtype=float)
+    n = len(targets)
+    if n < 2 or min_spacing <= 0:
+        return targets
+    # 押し離す目標を少しだけ広げ、min_spacing に漸近し続けて終わらないことを防ぐ
+    push_spacing = min_spacing * (1.0 + SPACING_MARGIN)
+    index = np.arange(n)
+    for _ in range(max_iterations):
+        diff = targets[:, None, :] - targets[None, :, :]
+        dist = np.linalg.norm(diff, axis=2)
+        np.fill_diagonal(dist, np.inf)
+        if dist.min() >= min_spacing:
+            return targets
+        # 互いに最も近い組（同じ機体を含まない組の集合）だけを同時に押し離す
+        # （全組を同時に押すと、密集した一列などで押し合いが打ち消し合って収束しない）
+        nearest = dist.argmin(axis=1)
+        i = index[(nearest[nearest] == index) & (index < nearest) & (dist[index, nearest] < push_spacing)]
+        j = nearest[i]
+        d = dist[i, j]
+        # 同じ位置の組はインデックスに応じた方向へ離す
+        same = d < 1e-9
+        angle = (i + j) * 0.5
+        fallback = np.column_stack([np.cos(angle), np.sin(angle), np.zeros(len(i))])
+        direction = np.where(same[:, None], fallback, diff[i, j] / np.where(same, 1.0, d)[:, None])
+        # 不足分の半分ずつを、組の方向に押し出す
+        push = direction * ((push_spacing - d) / 2.0)[:, None]
+        targets[i] += push
+        targets[j] -= push
+    dist = np.linalg.norm(targets[:, None, :] - targets[None, :, :], axis=2)
+    np.fill_diagonal(dist, np.inf)
+    if dist.min() >= min_spacing:
+        return targets
+    raise RuntimeError(f"enforce_spacing: could not separate targets to {min_spacing} m "
+                       f"within {max_iterations} iterations (closest pair {dist.min():.3f} m)")
+
+class FormationController:
+    """
+    MavlinkMultirotorClient の複数機体をまとめて動かす編隊制御
+    各機体の位置は編隊中心からのオフセットで指定し、回転・拡大縮小した上で最小間隔を確保する
+    """
+    def __init__(self, client, vehicle_names: Sequence[str], offsets, min_spacing: float = 2.0):
+        """
+        :param client: MavlinkMultirotorClient
+        :param vehicle_names: 編隊を組む機体名（offsets と同じ順）
+        :param offsets: 編隊中心からの (N, 3) のオフセット（ROS座標系、ヨー0度の向き）
+        :param min_spacing: 機体間の最小間隔（m）
+        """
+        offsets = np.asarray(offsets, dtype=float)
+        if offsets.shape != (len(vehicle_names), 3):
+            raise ValueError(f"offsets must be shaped ({len(vehicle_names)}, 3), got {offsets.shape}")
+        self.client = client
+        self.vehicle_names = list(vehicle_names)
+        self.vehicles = [client.vehicles[name] for name in self.vehicle_names]
+        self.offsets = offsets
+        self.min_spacing = min_spacing
+        self.targets: Optional[np.ndarray] = None
+
+    def compute_targets(self, center, yaw_deg: float = 0.0, scale: float = 1.0) -> np.ndarray:
+        """
+        編隊中心・向き・拡大率から全機体の目標位置を計算する
+        :return: (N, 3) の目標位置（ROS座標系）
+        """
+        yaw = math.radians(yaw_deg)
+        c, s = math.cos(yaw), math.sin(yaw)
+        rotation = np.array([[c, -s, 0.0], [s, c, 0.0], [0.0, 0.0, 1.0]])
+        targets = np.asarray(center, dtype=float) + (self.offsets * scale) @ rotation.T
+        return enforce_spacing(targets, self.min_spacing)
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        各機体の受信済みの最新位置をまとめて取得する（待たない）
+        :return: ((N, 3) の位置（ROS座標系）, (N,) の有効フラグ)
+        """
+        positions = np.full((len(self.vehicles), 3), np.nan)
+        for i, vehicle in enumerate(self.vehicles):
+            pos = vehicle.telemetry.latest('LOCAL_POSITION_NED') if vehicle.telemetry else None
+            if pos is not None:
+                positions[i] = (pos.x, pos.y, pos.z)
+        valid = ~np.isnan(positions[:, 0])
+        return self.client.converter.ned_to_ros_positions(positions), valid
+
+    def dispatch(self, targets, yaw_deg: float = 0.0):
+        """
+        全機体に目標位置を指示する
+        共有スケジューラで送信する機体（PX4）は、全機体の更新が同じ送信周期に反映される
+        """
+        targets = np.asarray(targets, dtype=float)
+        ned_targets = self.client.converter.ros_to_ned_positions(targets)
+        ned_yaw = self.client.converter.ros_to_ned_yaw(yaw_deg)
+        schedulers = {id(s): s for s in (getattr(v.controller, "_scheduler", None) for v in self.vehicles) if s}
+        with contextlib.ExitStack() as stack:
+            for scheduler in schedulers.values():
+                stack.enter_context(scheduler.hold())
+            for vehicle, (x, y, z) in zip(self.vehicles, ned_targets.tolist()):
+                vehicle.controller.go_to_local_ned(x, y, z, ned_yaw)
+        self.targets = targets
+
+    def errors(self) -> np.ndarray:
+        """各機体の目標位置までの距離（位置未受信の機体は inf）"""
+        if self.targets is None:
+            raise ValueError("No formation targets dispatched")
+        positions, valid = self.snapshot()
+        err = np.linalg.norm(positions - self.targets, axis=1)
+        return np.where(valid, err, np.inf)
+
+    def move(self, center, yaw_deg: float = 0.0, scale: float = 1.0,
+             tolerance: float = 0.5, timeout_sec: float = -1, poll_sec: float = 0.1) -> bool:
+        """
+        編隊を指定した位置・向きへ移動し、全機体が tolerance 以内に収束するまで待つ
+        """
+        targets = self.compute_targets(center, yaw_deg, scale)
+        self.dispatch(targets, yaw_deg)
+        print(f"[FORMATION] move {len(self.vehicles)} vehicles to center={np.round(np.asarray(center, dtype=float), 2).tolist()}, yaw={yaw_deg:.1f}")
+        t0 = time.time()
+        while True:
+            err = self.errors()
+            if np.all(err <= tolerance):
+                print(f"[FORMATION] converged: max_err={err.max():.2f}m in {time.time() - t0:.1f}s")
+                return True
+            if timeout_sec > 0 and (time.time() - t0) > timeout_sec:
+                lagging = [name for name, e in zip(self.vehicle_names, err) if e > tolerance]
+                print(f"[FORMATION] timeout: not converged {lagging}")
+                return False
+            time.sleep(poll_sec)
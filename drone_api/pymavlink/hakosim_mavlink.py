@@ -11,6 +11,7 @@ from collections import deque
 import math, time
 import queue
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any, List, Tuple, Callable
 
 from hakoniwa_pdu.apps.drone.hakosim import MultirotorClient as HakoniwaSensorClient
@@ -21,6 +22,12 @@ from hakoniwa_pdu.pdu_msgs.hako_msgs.pdu_pytype_GameControllerOperation import G
 
 # 新しいコントローラークラスをインポート
 from hakosim_controllers import AbstractFlightController, ArduPilotController, PX4Controller
+from hakosim_telemetry import TelemetryReader
+
+# 複数機体の接続・初期化を並列に行う際の最大スレッド数
+MAX_PARALLEL_VEHICLES = 32
+# 姿勢として返す ATTITUDE / LOCAL_POSITION_NED の最大経過時間（秒）。これより古い場合は通信途絶とみなす
+POSE_MAX_AGE_SEC = 1.0
 
 
 class FrameConverter:
@@ -42,6 +49,20 @@ class FrameConverter:
             z_val=-ned_pos.z_val
         )
 
+    @staticmethod
+    def ros_to_ned_positions(ros_positions):
+        """ROS(FLU)座標系の (N, 3) の位置の配列をNED座標系に変換"""
+        ned_positions = ros_positions.copy()
+        ned_positions[:, 1:] *= -1.0
+        return ned_positions
+
+    @staticmethod
+    def ned_to_ros_positions(ned_positions):
+        """NED座標系の (N, 3) の位置の配列をROS(FLU)座標系に変換"""
+        ros_positions = ned_positions.copy()
+        ros_positions[:, 1:] *= -1.0
+        return ros_positions
+
     @staticmethod
     def ned_to_ros_orient(ned_q: Quaternionr) -> Quaternionr:
         # x軸にπ回転（Rx(π) = [0, 1, 0, 0]）
@@ -71,11 +92,24 @@ class MavlinkDrone:
         self.connection_string = connection_string
         self.controller = controller
         self.mavlink_connection = None
+        self.telemetry: Optional[TelemetryReader] = None
         self.enableApiControl = False
         self.arm = False
+        # 接続状態: "disconnected" / "connecting" / "connected" / "failed"
+        self.status = "disconnected"
+        self.error: Optional[str] = None
 
     def connect(self) -> bool:
         """MAVLink接続を確立し、コントローラを初期化する"""
+        self.status = "connecting"
+        self.error = None
+        if self._connect():
+            self.status = "connected"
+            return True
+        self.status = "failed"
+        return False
+
+    def _connect(self) -> bool:
         try:
             self.mavlink_connection = mavutil.mavlink_connection(
                 self.connection_string,
@@ -94,35 +128,48 @@ class MavlinkDrone:
 
             if self.mavlink_connection.target_system == 0:
                 print("Error: Timed out waiting for a valid heartbeat.")
+                self.error = "heartbeat timeout"
                 return False
 
             print(f"HB from sys {self.mavlink_connection.target_system} comp {self.mavlink_connection.target_component}")
             
+            # 以降の受信は全てテレメトリ受信スレッドが行う
+            self.telemetry = TelemetryReader(self.mavlink_connection, self.name)
+            self.telemetry.start()
+
             # コントローラに接続を渡し、初期化を実行
-            self.controller.init_connection(self.mavlink_connection)
+            self.controller.init_connection(self.mavlink_connection, self.telemetry)
             
             print(f"Connected to {self.name}")
             return True
         except Exception as e:
             print(f"Failed to connect to {self.name}: {e}")
+            self.error = str(e)
             return False
 
     def disconnect(self):
         """接続を切断"""
         # PX4のストリーミングを停止
         self.controller.stop_movement()
+        if self.telemetry:
+            self.telemetry.stop()
+            self.telemetry = None
         if self.mavlink_connection:
             self.mavlink_connection.close()
+        self.status = "disconnected"
         print(f"Disconnected from {self.name}")
 
-    def get_vehicle_pose(self) -> Optional[Pose]:
-        """車両の姿勢(NED)を取得"""
-        if not self.mavlink_connection:
+    def get_vehicle_pose(self, max_age: float = POSE_MAX_AGE_SEC) -> Optional[Pose]:
+        """
+        車両の姿勢(NED)を取得（受信済みの最新値を返すため待たない）
+        :param max_age: 受信からの経過時間の上限（秒）。通信途絶などでこれより古い場合はNoneを返す
+        """
+        if not self.telemetry:
             return None
         
         try:
-            att = self.mavlink_connection.recv_match(type='ATTITUDE', blocking=True, timeout=1.0)
-            pos = self.mavlink_connection.recv_match(type='LOCAL_POSITION_NED', blocking=True, timeout=1.0)
+            att = self._latest_or_first('ATTITUDE', max_age)
+            pos = self._latest_or_first('LOCAL_POSITION_NED', max_age)
             
             if not att or not pos:
                 return None
@@ -135,6 +182,12 @@ class MavlinkDrone:
             print(f"Failed to get pose for {self.name}: {e}")
             return None
 
+    def _latest_or_first(self, msg_type: str, max_age: float):
+        # 接続直後でまだ受信していない場合のみ、最初の1件を待つ
+        if self.telemetry.age(msg_type) is None:
+            return self.telemetry.wait_for(msg_type, timeout=1.0)
+        return self.telemetry.latest(msg_type, max_age=max_age)
+
 
 class MavlinkMultirotorClient:
     def __init__(self, default_drone_name: str = None, sensor_client: HakoniwaSensorClient = None):
@@ -162,7 +215,12 @@ class MavlinkMultirotorClient:
             return False
             
         print("Connecting to MAVLink vehicles...")
-        controller_ok = all(vehicle.connect() for vehicle in self.vehicles.values())
+        # 機体ごとのハートビート待ち・パラメータ設定は独立しているため並列に実行する
+        results = self._run_parallel(lambda vehicle: vehicle.connect(), self.vehicles.values())
+        for name, vehicle in self.vehicles.items():
+            if not results[name]:
+                print(f"  {name}: {vehicle.status} ({vehicle.error})")
+        controller_ok = all(results.values())
 
         if self.sensor_client:
             print("Connecting to Hakoniwa PDU for sensors...")
@@ -173,6 +231,36 @@ class MavlinkMultirotorClient:
         
         return self._connected
 
+    def _run_parallel(self, func: Callable[[MavlinkDrone], Any], vehicles) -> Dict[str, Any]:
+        """機体ごとの処理を並列に実行し、{機体名: 戻り値} を返す"""
+        vehicles = list(vehicles)
+        if len(vehicles) <= 1:
+            return {vehicle.name: func(vehicle) for vehicle in vehicles}
+        with ThreadPoolExecutor(max_workers=min(len(vehicles), MAX_PARALLEL_VEHICLES)) as executor:
+            futures = {vehicle.name: executor.submit(func, vehicle) for vehicle in vehicles}
+            return {name: future.result() for name, future in futures.items()}
+
+    def _select_vehicles(self, vehicle_names: Optional[List[str]]) -> List[MavlinkDrone]:
+        if vehicle_names is None:
+            return list(self.vehicles.values())
+        return [self.vehicles[name] for name in vehicle_names if self.get_vehicle_name(name)]
+
+    def connection_status(self) -> Dict[str, str]:
+        """機体ごとの接続状態を返す"""
+        return {name: vehicle.status for name, vehicle in self.vehicles.items()}
+
+    def enableApiControlAll(self, enable: bool, vehicle_names: Optional[List[str]] = None) -> Dict[str, bool]:
+        """複数機体のAPI制御を並列に切り替える"""
+        def enable_vehicle(vehicle: MavlinkDrone) -> bool:
+            self.enableApiControl(enable, vehicle.name)
+            return vehicle.enableApiControl == enable
+        return self._run_parallel(enable_vehicle, self._select_vehicles(vehicle_names))
+
+    def armDisarmAll(self, arm: bool, vehicle_names: Optional[List[str]] = None) -> Dict[str, bool]:
+        """複数機体のアーム・ディスアームを並列に実行する"""
+        return self._run_parallel(lambda vehicle: self.armDisarm(arm, vehicle.name),
+                                  self._select_vehicles(vehicle_names))
+
     def disconnect_all(self):
         for vehicle in self.vehicles.values():
             vehicle.disconnect()
@@ -317,7 +405,8 @@ class MavlinkMultirotorClient:
                     continue
 
                 cur_ros = (pose.position.x_val, pose.position.y_val, pose.position.z_val)
-                cur_yaw_ros = self._get_yaw_degree(vehicle_name)
+                _, _, cur_yaw = Quaternionr.quaternion_to_euler(pose.orientation)
+                cur_yaw_ros = math.degrees(cur_yaw)
 
                 pos_err = self._dist3(cur_ros, target_ros)
                 yaw_err = abs(self._yaw_wrap_deg(cur_yaw_ros - ros_yaw_cmd))
@@ -357,6 +446,54 @@ class MavlinkMultirotorClient:
             if vehicle: vehicle.controller.stop_movement()
             return False
 
+    def followPath(self, points: List[Tuple[float, float, float]], speed: float,
+                   yaw_deg: float = None, timeout_sec: float = -1,
+                   vehicle_name: str = None) -> bool:
+        """
+        経由点列(ROS座標系)を一括で指示し、各経由点で停止せずに連続して飛行する
+        ArduPilotはミッション(MISSION_ITEM_INT)としてアップロードし、PX4は先読みした目標値を送り続ける
+        """
+        vehicle = self._get_vehicle(vehicle_name)
+        if not vehicle: return False
+        if not points:
+            return True
+
+        POLL = 0.1
+        try:
+            ned_points = []
+            for x, y, z in points:
+                ned_pos = self.converter.ros_to_ned_pos(Vector3r(x, y, z))
+                ned_points.append((ned_pos.x_val, ned_pos.y_val, ned_pos.z_val))
+            ned_yaw = self.converter.ros_to_ned_yaw(yaw_deg) if yaw_deg is not None else None
+
+            print(f"[CMD] followPath {len(points)} waypoints at {speed:.1f}m/s")
+            if not vehicle.controller.start_path(ned_points, speed, ned_yaw):
+                print(f"Failed to start path for {vehicle.name}")
+                return False
+
+            t0 = time.time()
+            last_reached = -1
+            while True:
+                reached = vehicle.controller.path_progress()
+                if reached > last_reached:
+                    for i in range(last_reached + 1, reached + 1):
+                        print(f"[PATH] reached waypoint {i + 1}/{len(points)}: {points[i]}")
+                    last_reached = reached
+                if reached >= len(points) - 1:
+                    print(f"[DONE] Path completed in {time.time() - t0:.1f}s")
+                    vehicle.controller.stop_path()
+                    return True
+                if timeout_sec > 0 and (time.time() - t0) > timeout_sec:
+                    print(f"[TIMEOUT] Path not completed in time (reached {last_reached + 1}/{len(points)}).")
+                    vehicle.controller.stop_path()
+                    return False
+                time.sleep(POLL)
+
+        except Exception as e:
+            print(f"Path following failed for {vehicle.name}: {e}")
+            if vehicle: vehicle.controller.stop_path()
+            return False
+
     def moveToPositionUnityFrame(self, x: float, y: float, z: float, speed: float,
                                yaw_deg: Optional[float] = None, timeout_sec: float = -1,
                                vehicle_name: Optional[str] = None) -> bool:
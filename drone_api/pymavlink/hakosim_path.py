@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+経路追従で使用する折れ線経路と座標変換
+"""
+
+import bisect
+import math
+from typing import List, Sequence, Tuple
+
+# 地球の半径（m）。ローカルNEDのオフセットを緯度経度に変換する際に使用する
+EARTH_RADIUS_M = 6378137.0
+
+
+class PolylinePath:
+    """
+    ローカルNED座標の頂点列からなる折れ線経路。
+    経路上の位置は始点からの道のり s（m）で表す。
+    """
+    def __init__(self, points: Sequence[Tuple[float, float, float]]):
+        if len(points) < 2:
+            raise ValueError("PolylinePath requires at least 2 points")
+        self.points = [tuple(float(v) for v in p) for p in points]
+        # 各頂点までの道のり
+        self.cumulative: List[float] = [0.0]
+        for a, b in zip(self.points, self.points[1:]):
+            self.cumulative.append(self.cumulative[-1] + math.dist(a, b))
+        self.length = self.cumulative[-1]
+
+    def point_at(self, s: float) -> Tuple[float, float, float]:
+        """道のり s の位置"""
+        seg = self._segment_at(s)
+        a, b = self.points[seg], self.points[seg + 1]
+        seg_len = self.cumulative[seg + 1] - self.cumulative[seg]
+        t = 0.0 if seg_len <= 0 else min(1.0, max(0.0, (s - self.cumulative[seg]) / seg_len))
+        return (a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t, a[2] + (b[2] - a[2]) * t)
+
+    def tangent_at(self, s: float) -> Tuple[float, float, float]:
+        """道のり s における進行方向の単位ベクトル"""
+        seg = self._segment_at(s)
+        a, b = self.points[seg], self.points[seg + 1]
+        seg_len = self.cumulative[seg + 1] - self.cumulative[seg]
+        if seg_len <= 0:
+            return (0.0, 0.0, 0.0)
+        return ((b[0] - a[0]) / seg_len, (b[1] - a[1]) / seg_len, (b[2] - a[2]) / seg_len)
+
+    def project(self, pos: Tuple[float, float, float], seg_hint: int = 0, search: int = 2) -> Tuple[float, int]:
+        """
+        位置 pos を経路上に射影する
+        経路が交差する場合に後戻りしないよう、seg_hint から search 区間先までの範囲で探す
+        :return: (道のり, 区間番号)
+        """
+        best = (math.inf, self.cumulative[seg_hint], seg_hint)
+        last_seg = min(len(self.points) - 2, seg_hint + search)
+        for seg in range(seg_hint, last_seg + 1):
+            a, b = self.points[seg], self.points[seg + 1]
+            ab = (b[0] - a[0], b[1] - a[1], b[2] - a[2])
+            seg_len2 = ab[0] ** 2 + ab[1] ** 2 + ab[2] ** 2
+            t = 0.0
+            if seg_len2 > 0:
+                t = ((pos[0] - a[0]) * ab[0] + (pos[1] - a[1]) * ab[1] + (pos[2] - a[2]) * ab[2]) / seg_len2
+                t = min(1.0, max(0.0, t))
+            q = (a[0] + ab[0] * t, a[1] + ab[1] * t, a[2] + ab[2] * t)
+            d = math.dist(pos, q)
+            if d < best[0]:
+                best = (d, self.cumulative[seg] + math.sqrt(seg_len2) * t, seg)
+        return best[1], best[2]
+
+    def _segment_at(self, s: float) -> int:
+        seg = bisect.bisect_right(self.cumulative, s) - 1
+        return min(max(seg, 0), len(self.points) - 2)
+
+
+def local_ned_to_global(home_lat_deg: float, home_lon_deg: float,
+                        north: float, east: float) -> Tuple[float, float]:
+    """
+    基準点からのNEDオフセット（m）を緯度経度（度）に変換する（近距離用の平面近似）
+    """
+    lat = home_lat_deg + math.degrees(north / EARTH_RADIUS_M)
+    lon = home_lon_deg + math.degrees(east / (EARTH_RADIUS_M * math.cos(math.radians(home_lat_deg))))
+    return lat, lon
+
+
+class PathTracker:
+    """
+    経路上の機体位置から、先読みした目標位置と送り速度を求める
+    頂点0を始点とし、reached は到達済みの頂点番号を表す
+    """
+    def __init__(self, path: PolylinePath, speed: float, accept_radius: float):
+        self.path = path
+        self.speed = speed
+        self.accept_radius = accept_radius
+        self.segment = 0
+        self.reached = 0
+
+    @property
+    def last_index(self) -> int:
+        return len(self.path.points) - 1
+
+    @property
+    def done(self) -> bool:
+        return self.reached >= self.last_index
+
+    def update(self, pos: Tuple[float, float, float], lookahead_m: float):
+        """
+        機体位置から到達状況を更新し、目標位置と速度を返す
+        :return: (目標位置, 速度ベクトル)
+        """
+        path = self.path
+        s, self.segment = path.project(pos, self.segment)
+        while self.reached + 1 < self.last_index and s >= path.cumulative[self.reached + 1] - self.accept_radius:
+            self.reached += 1
+        if self.reached + 1 == self.last_index and math.dist(pos, path.points[-1]) <= self.accept_radius:
+            self.reached = self.last_index
+        s_target = min(s + lookahead_m, path.length)
+        # 終点の手前では速度を落とす
+        ramp = min(1.0, (path.length - s) / lookahead_m) if lookahead_m > 0 else 0.0
+        tangent = path.tangent_at(s_target)
+        return path.point_at(s_target), tuple(c * self.speed * ramp for c in tangent)
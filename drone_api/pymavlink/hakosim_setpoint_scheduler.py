@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+複数機体の目標値送信を1つのスレッドで周期実行するスケジューラ
+送信予定時刻をヒープで管理し、前回の予定時刻に周期を加算することで時刻のずれを蓄積させない
+"""
+
+import contextlib
+import heapq
+import itertools
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class SetpointStream:
+    """1機体分の周期送信と、その送信時刻の揺らぎ（ジッタ）の統計"""
+    def __init__(self, key: Hashable, send: Callable[[], None], rate_hz: float):
+        self.key = key
+        self.send = send
+        self.period = 1.0 / rate_hz
+        self.active = True
+        self.sent_count = 0
+        # 予定時刻に間に合わず送信を省略した回数
+        self.skipped_count = 0
+        self.error_count = 0
+        # 予定時刻からの遅れ（秒）
+        self.lateness_sum = 0.0
+        self.lateness_max = 0.0
+
+    def record(self, lateness: float):
+        self.sent_count += 1
+        self.lateness_sum += lateness
+        if lateness > self.lateness_max:
+            self.lateness_max = lateness
+
+    def stats(self) -> Dict[str, Any]:
+        """ジッタの統計（ミリ秒）"""
+        return {
+            "rate_hz": 1.0 / self.period,
+            "sent": self.sent_count,
+            "skipped": self.skipped_count,
+            "errors": self.error_count,
+            "mean_lateness_ms": self.lateness_sum / self.sent_count * 1000.0 if self.sent_count else 0.0,
+            "max_lateness_ms": self.lateness_max * 1000.0,
+        }
+
+
+class SetpointScheduler:
+    """
+    登録された全ての送信を1つのスレッドで実行する。
+    同じ周期の送信は周期の整数倍の時刻に揃えるため、全機体分を1回の起床でまとめて送信する。
+    """
+    def __init__(self, name: str = "setpoint", clock: Callable[[], float] = time.monotonic, autostart: bool = True):
+        """
+        :param name: スレッド名に使う名前
+        :param clock: 現在時刻（秒）を返す関数（テストで差し替える）
+        :param autostart: False の場合はスレッドを起動せず、呼び出し側が run_pending() で送信する
+        """
+        self.name = name
+        self._clock = clock
+        self._autostart = autostart
+        # (予定時刻(clock), 登録順, SetpointStream)
+        self._heap = []
+        self._order = itertools.count()
+        self._streams: Dict[Hashable, SetpointStream] = {}
+        self._cond = threading.Condition()
+        # 1回の起床分の送信中に保持する。hold() で目標値をまとめて更新する間は送信を待たせる
+        self._send_lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_started(self):
+        if not self._autostart:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-scheduler", daemon=True)
+            self._thread.start()
+
+    def add(self, key: Hashable, send: Callable[[], None], rate_hz: float) -> SetpointStream:
+        """
+        周期送信を登録する（同じキーで登録済みの場合は置き換える）
+        最初の送信は直ちに行い、以降は周期の整数倍の時刻に送信する（2回目は登録から1周期以内）
+        """
+        stream = SetpointStream(key, send, rate_hz)
+        now = self._clock()
+        with self._cond:
+            old = self._streams.get(key)
+            if old is not None:
+                old.active = False
+            self._streams[key] = stream
+            heapq.heappush(self._heap, (now, next(self._order), stream))
+            self._ensure_started()
+            self._cond.notify()
+        return stream
+
+    def remove(self, key: Hashable) -> bool:
+        """周期送信を停止する。ヒープ上の予定は次に取り出したときに破棄する"""
+        with self._cond:
+            stream = self._streams.pop(key, None)
+            if stream is None:
+                return False
+            stream.active = False
+            return True
+
+    @contextlib.contextmanager
+    def hold(self):
+        """
+        この中で行った目標値の更新が、全て同じ起床の送信に反映されるようにする
+        （更新の途中で一部の機体だけが送信されることを防ぐ）
+        """
+        with self._send_lock:
+            yield
+
+    def is_active(self, key: Hashable) -> bool:
+        return key in self._streams
+
+    def stats(self, key: Optional[Hashable] = None):
+        """key を指定した場合はその送信の統計、省略時は {key: 統計} を返す"""
+        if key is not None:
+            stream = self._streams.get(key)
+            return stream.stats() if stream else None
+        return {k: stream.stats() for k, stream in list(self._streams.items())}
+
+    def _next_due(self, stream: SetpointStream, due: float, now: float) -> float:
+        # due の次の周期の境界（周期の整数倍の時刻）に揃える（同じ周期の機体の送信を同じ起床にまとめる）
+        # 登録直後の送信は境界からずれているため、2回目の送信は登録から1周期以内になる
+        tick = math.floor(due / stream.period + 1e-9) + 1
+        if tick * stream.period <= now:
+            # 処理が遅れて予定時刻を過ぎた場合は、まとめて送らずに次の周期の境界まで飛ばす
+            missed = int((now - tick * stream.period) / stream.period) + 1
+            stream.skipped_count += missed
+            tick += missed
+        return tick * stream.period
+
+    def run_pending(self) -> int:
+        """
+        予定時刻を過ぎた送信を呼び出し元のスレッドで実行する（autostart=False の場合に使う）
+        :return: 送信した数
+        """
+        with self._cond:
+            batch = self._take_due(self._clock())
+        return self._send_batch(batch)
+
+    def _take_due(self, now: float):
+        """予定時刻を過ぎた送信をまとめて取り出す（self._cond を保持して呼ぶ）"""
+        batch = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if entry[2].active:
+                batch.append(entry)
+        return batch
+
+    def _send_batch(self, batch) -> int:
+        sent = 0
+        with self._send_lock:
+            for due, _, stream in batch:
+                if not stream.active:
+                    continue
+                try:
+                    stream.send()
+                except Exception as e:
+                    stream.error_count += 1
+                    print(f"[SetpointScheduler] send failed for {stream.key}: {e}")
+                sent_time = self._clock()
+                stream.record(max(0.0, sent_time - due))
+                sent += 1
+        now = self._clock()
+        with self._cond:
+            for due, _, stream in batch:
+                if stream.active:
+                    heapq.heappush(self._heap, (self._next_due(stream, due, now), next(self._order), stream))
+        return sent
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    while self._heap and not self._heap[0][2].active:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    due = self._heap[0][0]
+                    now = self._clock()
+                    if due <= now:
+                        break
+                    self._cond.wait(due - now)
+                batch = self._take_due(now)
+            self._send_batch(batch)
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_default_scheduler() -> SetpointScheduler:
+    """プロセス内で共有するスケジューラを返す"""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = SetpointScheduler()
+        return _default_scheduler
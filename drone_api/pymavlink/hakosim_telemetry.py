@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+MAVLink接続ごとのテレメトリ受信スレッド
+受信した全メッセージのうち、メッセージタイプ毎の最新値を保持する
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional, Tuple, Union
+
+# 受信スレッドが停止要求を確認する間隔
+RECV_POLL_SEC = 0.1
+# この時間（秒）以上HEARTBEATが途絶えた後に受信した場合を再接続とみなす
+LINK_LOST_SEC = 3.0
+
+
+class TelemetrySubscription:
+    """指定したメッセージタイプを受信順に受け取るための購読"""
+    def __init__(self, msg_types: Iterable[str]):
+        self.msg_types = frozenset(msg_types)
+        self.queue = queue.SimpleQueue()
+
+    def get(self, timeout: float):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class TelemetryReader:
+    """
+    1つのMAVLink接続から全メッセージを受信し続けるスレッド。
+    最新値の参照はロックを取らずにO(1)で行える。
+    メッセージを待つ処理は購読を登録して受け取るため、他の処理のメッセージを奪わない。
+    """
+    def __init__(self, mav_conn, name: str = ""):
+        self.mav_conn = mav_conn
+        self.name = name
+        # msg_type -> (受信時刻(time.monotonic), メッセージ)。要素の差し替えのみで更新する
+        self._latest = {}
+        # 購読の一覧。追加・削除時はタプルごと差し替える（受信スレッドはロック不要）
+        self._subscriptions: Tuple[TelemetrySubscription, ...] = ()
+        self._subscribe_lock = threading.Lock()
+        # msg_type -> 受信数（受信レートの計測用）
+        self._counts = {}
+        self._last_heartbeat_time = None
+        self._reconnect_callbacks = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"telemetry-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                msg = self.mav_conn.recv_match(blocking=True, timeout=RECV_POLL_SEC)
+            except Exception as e:
+                if self._stop_event.is_set():
+                    break
+                print(f"[Telemetry] receive error on {self.name}: {e}")
+                time.sleep(RECV_POLL_SEC)
+                continue
+            if msg is None:
+                continue
+            msg_type = msg.get_type()
+            if msg_type == "BAD_DATA":
+                continue
+            now = time.monotonic()
+            self._latest[msg_type] = (now, msg)
+            self._counts[msg_type] = self._counts.get(msg_type, 0) + 1
+            if msg_type == "HEARTBEAT":
+                self._check_reconnect(now)
+            for subscription in self._subscriptions:
+                if msg_type in subscription.msg_types:
+                    subscription.queue.put(msg)
+
+    def _check_reconnect(self, now: float):
+        last = self._last_heartbeat_time
+        self._last_heartbeat_time = now
+        if last is None or now - last < LINK_LOST_SEC:
+            return
+        print(f"[Telemetry] link to {self.name} restored after {now - last:.1f}s")
+        # コールバックはメッセージを待つことがあるため、受信スレッドとは別に実行する
+        for callback in list(self._reconnect_callbacks):
+            threading.Thread(target=callback, daemon=True).start()
+
+    def add_reconnect_callback(self, callback: Callable[[], None]):
+        """HEARTBEATが途絶えた後に再び受信したときに呼び出す関数を登録する"""
+        self._reconnect_callbacks.append(callback)
+
+    def count(self, msg_type: str) -> int:
+        """これまでに受信したメッセージ数"""
+        return self._counts.get(msg_type, 0)
+
+    def latest(self, msg_type: str, max_age: Optional[float] = None):
+        """最新のメッセージを返す（max_age秒より古い場合や未受信の場合はNone）"""
+        entry = self._latest.get(msg_type)
+        if entry is None:
+            return None
+        recv_time, msg = entry
+        if max_age is not None and time.monotonic() - recv_time > max_age:
+            return None
+        return msg
+
+    def age(self, msg_type: str) -> Optional[float]:
+        """最新のメッセージを受信してからの経過時間（秒）。未受信の場合はNone"""
+        entry = self._latest.get(msg_type)
+        if entry is None:
+            return None
+        return time.monotonic() - entry[0]
+
+    def subscribe(self, msg_types: Union[str, Iterable[str]]) -> TelemetrySubscription:
+        if isinstance(msg_types, str):
+            msg_types = [msg_types]
+        subscription = TelemetrySubscription(msg_types)
+        with self._subscribe_lock:
+            self._subscriptions = self._subscriptions + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: TelemetrySubscription):
+        with self._subscribe_lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+
+    def wait_for(self, msg_types: Union[str, Iterable[str]],
+                 condition: Callable[[Any], bool] = None, timeout: float = 1.0,
+                 since: Optional[float] = None):
+        """
+        購読を登録してから受信するメッセージのうち、条件を満たす最初のものを待つ
+        since（time.monotonic）を指定した場合は、購読前でもその時刻以降に受信した最新値を対象とする
+        （コマンド送信から購読までの間に応答が届いた場合の取りこぼしを防ぐ）
+        """
+        if isinstance(msg_types, str):
+            msg_types = [msg_types]
+        subscription = self.subscribe(msg_types)
+        try:
+            if since is not None:
+                for msg_type in msg_types:
+                    entry = self._latest.get(msg_type)
+                    if entry is not None and entry[0] >= since and (condition is None or condition(entry[1])):
+                        return entry[1]
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                msg = subscription.get(remaining)
+                if msg is None:
+                    return None
+                if condition is None or condition(msg):
+                    return msg
+        finally:
+            self.unsubscribe(subscription)
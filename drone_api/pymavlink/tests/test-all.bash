@@ -0,0 +1,14 @@
+#!/bin/bash
+
+echo "INFO: test_setpoint_scheduler:"
+python -m unittest tests.test_setpoint_scheduler
+echo "INFO: test_path:"
+python -m unittest tests.test_path
+echo "INFO: test_formation:"
+python -m unittest tests.test_formation
+echo "INFO: test_stream_rates:"
+python -m unittest tests.test_stream_rates
+echo "INFO: test_px4_setpoint:"
+python -m unittest tests.test_px4_setpoint
+echo "INFO: test_telemetry:"
+python -m unittest tests.test_telemetry
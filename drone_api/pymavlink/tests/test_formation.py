@@ -0,0 +1,52 @@
+import sys
+import os
+# pymavlink ディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import unittest
+import numpy as np
+from hakosim_formation import enforce_spacing, line_offsets, grid_offsets
+
+EPS = 1e-9
+
+def min_pairwise_distance(targets):
+    dist = np.linalg.norm(targets[:, None, :] - targets[None, :, :], axis=2)
+    np.fill_diagonal(dist, np.inf)
+    return dist.min()
+
+class TestEnforceSpacing(unittest.TestCase):
+
+    def assert_spaced(self, targets, min_spacing):
+        result = enforce_spacing(targets, min_spacing)
+        self.assertEqual(result.shape, np.asarray(targets).shape)
+        self.assertGreaterEqual(min_pairwise_distance(result), min_spacing - EPS)
+        return result
+
+    def test_coincident_points(self):
+        """全機体が同じ位置でも離れるか確認"""
+        self.assert_spaced(np.zeros((2, 3)), 2.0)
+        self.assert_spaced(np.zeros((8, 3)), 2.0)
+
+    def test_tight_line(self):
+        """間隔 0.5m の一列を 2m に広げられるか確認（10回で打ち切っていた頃は 1.87m 止まり）"""
+        self.assert_spaced(line_offsets(5, 0.5), 2.0)
+        self.assert_spaced(line_offsets(30, 0.1), 2.0)
+        self.assert_spaced(line_offsets(60, 0.05), 2.0)
+
+    def test_grid(self):
+        self.assert_spaced(grid_offsets(9, 1.0), 2.0)
+        self.assert_spaced(grid_offsets(25, 0.3), 2.0)
+
+    def test_already_spaced(self):
+        """十分に離れている場合は動かさない"""
+        targets = grid_offsets(9, 3.0)
+        np.testing.assert_array_equal(enforce_spacing(targets, 2.0), targets)
+        np.testing.assert_array_equal(enforce_spacing(np.zeros((1, 3)), 2.0), np.zeros((1, 3)))
+
+    def test_iteration_limit(self):
+        """上限回数で間隔を確保できなければ、間隔が不足した目標位置を返さずに例外にする"""
+        with self.assertRaises(RuntimeError):
+            enforce_spacing(line_offsets(30, 0.1), 2.0, max_iterations=1)
+
+if __name__ == '__main__':
+    unittest.main()
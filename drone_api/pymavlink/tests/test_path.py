@@ -0,0 +1,98 @@
+import sys
+import os
+# pymavlink ディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import math
+import unittest
+from hakosim_path import PolylinePath, PathTracker, local_ned_to_global
+
+def assert_vec_almost_equal(test, actual, expected):
+    for a, e in zip(actual, expected):
+        test.assertAlmostEqual(a, e)
+
+class TestPolylinePath(unittest.TestCase):
+
+    def setUp(self):
+        # L字の経路（長さ 20m）
+        self.path = PolylinePath([(0, 0, 0), (10, 0, 0), (10, 10, 0)])
+
+    def test_length(self):
+        self.assertEqual(self.path.cumulative, [0.0, 10.0, 20.0])
+        self.assertEqual(self.path.length, 20.0)
+        with self.assertRaises(ValueError):
+            PolylinePath([(0, 0, 0)])
+
+    def test_point_and_tangent(self):
+        """頂点の前後と範囲外で位置と進行方向が求められるか確認"""
+        assert_vec_almost_equal(self, self.path.point_at(5), (5, 0, 0))
+        assert_vec_almost_equal(self, self.path.point_at(10), (10, 0, 0))
+        assert_vec_almost_equal(self, self.path.point_at(12), (10, 2, 0))
+        assert_vec_almost_equal(self, self.path.tangent_at(9.9), (1, 0, 0))
+        assert_vec_almost_equal(self, self.path.tangent_at(10), (0, 1, 0))
+        # 範囲外は始点・終点に留める
+        assert_vec_almost_equal(self, self.path.point_at(-3), (0, 0, 0))
+        assert_vec_almost_equal(self, self.path.point_at(25), (10, 10, 0))
+        assert_vec_almost_equal(self, self.path.tangent_at(25), (0, 1, 0))
+
+    def test_project_does_not_jump_back(self):
+        """経路が交差する場合も、現在の区間より前の区間には射影しないか確認"""
+        path = PolylinePath([(0, 0, 0), (10, 0, 0), (10, 10, 0), (5, 10, 0), (5, -5, 0)])
+        # (5, 0) は区間0と区間3の交点
+        s, seg = path.project((5, 0.1, 0), seg_hint=3)
+        self.assertEqual(seg, 3)
+        self.assertAlmostEqual(s, 25 + 9.9)
+        s, seg = path.project((5, 0.1, 0), seg_hint=0, search=0)
+        self.assertEqual(seg, 0)
+        self.assertAlmostEqual(s, 5)
+
+class TestPathTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.path = PolylinePath([(0, 0, 0), (10, 0, 0), (10, 10, 0)])
+        self.tracker = PathTracker(self.path, speed=2.0, accept_radius=1.0)
+
+    def test_lookahead_across_join(self):
+        """先読みの目標位置が頂点を越えて次の区間に入り、速度も次の区間の方向になるか確認"""
+        target, velocity = self.tracker.update((8, 0, 0), lookahead_m=4.0)
+        assert_vec_almost_equal(self, target, (10, 2, 0))
+        assert_vec_almost_equal(self, velocity, (0, 2, 0))
+        self.assertEqual(self.tracker.reached, 0)
+
+    def test_reach_join(self):
+        """頂点の accept_radius 手前で頂点に到達したとみなすか確認"""
+        self.tracker.update((8.5, 0, 0), lookahead_m=4.0)
+        self.assertEqual(self.tracker.reached, 0)
+        self.tracker.update((9.2, 0.1, 0), lookahead_m=4.0)
+        self.assertEqual(self.tracker.reached, 1)
+        self.assertEqual(self.tracker.segment, 0)
+        self.tracker.update((10, 3, 0), lookahead_m=4.0)
+        self.assertEqual(self.tracker.segment, 1)
+        self.assertFalse(self.tracker.done)
+
+    def test_path_end(self):
+        """終点の手前では目標位置を終点に留めて減速し、終点に近づくと完了するか確認"""
+        self.tracker.update((9.5, 0, 0), lookahead_m=4.0)
+        target, velocity = self.tracker.update((10, 8, 0), lookahead_m=4.0)
+        assert_vec_almost_equal(self, target, (10, 10, 0))
+        # 残り 2m / 先読み 4m の割合で減速する
+        assert_vec_almost_equal(self, velocity, (0, 1, 0))
+        self.assertFalse(self.tracker.done)
+        target, velocity = self.tracker.update((10, 9.5, 0), lookahead_m=4.0)
+        self.assertTrue(self.tracker.done)
+        # 残り 0.5m のため速度は 2.0 * 0.5 / 4 まで落ちる（完了後は呼び出し側が終点で保持する）
+        assert_vec_almost_equal(self, velocity, (0, 0.25, 0))
+
+class TestLocalNedToGlobal(unittest.TestCase):
+
+    def test_offsets(self):
+        """北に 1 度分・東にずらした場合の緯度経度を確認"""
+        lat, lon = local_ned_to_global(35.0, 139.0, 6378137.0 * math.radians(1.0), 0.0)
+        self.assertAlmostEqual(lat, 36.0)
+        self.assertAlmostEqual(lon, 139.0)
+        lat, lon = local_ned_to_global(0.0, 139.0, 0.0, 6378137.0 * math.radians(1.0))
+        self.assertAlmostEqual(lat, 0.0)
+        self.assertAlmostEqual(lon, 140.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import sys
+import os
+# pymavlink ディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import unittest
+from types import SimpleNamespace
+from hakosim_controllers import PX4Controller
+from hakosim_setpoint_scheduler import SetpointScheduler
+
+class FakeTelemetry:
+    """最新値のみを返すテレメトリ"""
+    def __init__(self):
+        self.messages = {}
+
+    def latest(self, msg_type, max_age=None):
+        return self.messages.get(msg_type)
+
+    def age(self, msg_type):
+        return 0.0 if msg_type in self.messages else None
+
+class FakeMav:
+    def __init__(self):
+        self.setpoints = []
+
+    def set_position_target_local_ned_send(self, time_boot_ms, target_system, target_component, frame, mask,
+                                           x, y, z, vx, vy, vz, afx, afy, afz, yaw, yaw_rate):
+        self.setpoints.append((x, y, z))
+
+def create_controller():
+    controller = PX4Controller(scheduler=SetpointScheduler(autostart=False))
+    controller.telemetry = FakeTelemetry()
+    controller.mav_conn = SimpleNamespace(mav=FakeMav())
+    controller.telemetry.messages['LOCAL_POSITION_NED'] = SimpleNamespace(x=0.0, y=0.0, z=-5.0)
+    return controller
+
+def move_to(controller, x, y, z):
+    controller.telemetry.messages['LOCAL_POSITION_NED'] = SimpleNamespace(x=x, y=y, z=z)
+
+class TestPX4Setpoint(unittest.TestCase):
+
+    def test_path_does_not_overwrite_target(self):
+        """経路上の目標は _target に書き戻さず、経路解除後は利用側の目標を送る"""
+        controller = create_controller()
+        self.assertTrue(controller.start_path([(10, 0, -5)], speed=2.0, yaw_deg=0.0))
+        controller._send_setpoint()
+        self.assertEqual(controller.mav_conn.mav.setpoints[-1], (2.0, 0.0, -5.0))
+        self.assertEqual(controller._target, (0.0, 0.0, -5.0, 0.0))
+        controller.go_to_local_ned(-3, 4, -6, 90)
+        controller._send_setpoint()
+        self.assertEqual(controller.mav_conn.mav.setpoints[-1], (-3.0, 4.0, -6.0))
+        self.assertEqual(controller._target, (-3, 4, -6, 90))
+        self.assertEqual(controller.path_progress(), -1)
+
+    def test_stop_path_holds_last_setpoint(self):
+        """経路の途中で止めた場合は最後に送った経路上の位置、終点到達後は終点で停止する"""
+        controller = create_controller()
+        controller.start_path([(10, 0, -5)], speed=2.0, yaw_deg=30.0)
+        move_to(controller, 3.0, 0.0, -5.0)
+        controller._send_setpoint()
+        controller.stop_path()
+        self.assertEqual(controller._target, (5.0, 0.0, -5.0, 30.0))
+
+        controller.start_path([(10, 0, -5)], speed=2.0, yaw_deg=30.0)
+        move_to(controller, 9.5, 0.0, -5.0)
+        controller._send_setpoint()
+        self.assertEqual(controller.path_progress(), 0)
+        controller.stop_path()
+        self.assertEqual(controller._target, (10, 0, -5, 30.0))
+        controller._send_setpoint()
+        self.assertEqual(controller.mav_conn.mav.setpoints[-1], (10.0, 0.0, -5.0))
+
+    def test_stop_path_before_first_setpoint(self):
+        """一度も経路上の目標を送っていない場合は開始位置のまま"""
+        controller = create_controller()
+        controller.start_path([(10, 0, -5)], speed=2.0, yaw_deg=0.0)
+        controller.stop_path()
+        self.assertEqual(controller._target, (0.0, 0.0, -5.0, 0.0))
+
+if __name__ == '__main__':
+    unittest.main()
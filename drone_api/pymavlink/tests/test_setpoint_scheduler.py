@@ -0,0 +1,103 @@
+import sys
+import os
+# pymavlink ディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import unittest
+from hakosim_setpoint_scheduler import SetpointScheduler
+
+class FakeClock:
+    """手動で進める時計"""
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestSetpointScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(100.03)
+        self.scheduler = SetpointScheduler(clock=self.clock, autostart=False)
+        self.sent = []
+
+    def sender(self, key):
+        return lambda: self.sent.append((key, self.clock.now))
+
+    def next_dues(self):
+        return sorted(round(due, 6) for due, _, stream in self.scheduler._heap if stream.active)
+
+    def test_no_thread(self):
+        """autostart=False の場合はスレッドを起動しないか確認"""
+        self.scheduler.add("A", self.sender("A"), 10.0)
+        self.assertIsNone(self.scheduler._thread)
+
+    def test_first_send_and_alignment(self):
+        """最初は直ちに送信し、以降は周期の整数倍の時刻に揃えて送信するか確認"""
+        self.scheduler.add("A", self.sender("A"), 10.0)
+        self.assertEqual(self.scheduler.run_pending(), 1)
+        # 2回目の送信は登録から1周期以内の境界
+        self.assertEqual(self.next_dues(), [100.1])
+        self.clock.now = 100.05
+        self.scheduler.add("B", self.sender("B"), 10.0)
+        self.assertEqual(self.scheduler.run_pending(), 1)
+        # 異なる時刻に登録した機体も、同じ予定時刻にまとめられる
+        self.assertEqual(self.next_dues(), [100.1, 100.1])
+        self.clock.now = 100.09
+        self.assertEqual(self.scheduler.run_pending(), 0)
+        self.clock.now = 100.11
+        self.assertEqual(self.scheduler.run_pending(), 2)
+        self.assertEqual([key for key, _ in self.sent], ["A", "B", "A", "B"])
+        self.assertEqual(self.next_dues(), [100.2, 100.2])
+
+    def test_second_send_within_one_period(self):
+        """境界の直後に登録した場合も、2回目の送信まで1周期以上待たないか確認"""
+        self.clock.now = 100.101
+        self.scheduler.add("A", self.sender("A"), 10.0)
+        self.scheduler.run_pending()
+        self.assertEqual(self.next_dues(), [100.2])
+        # 境界ちょうどに登録した場合は、次の境界
+        self.clock.now = 100.2
+        self.scheduler.add("B", self.sender("B"), 10.0)
+        self.assertEqual(self.scheduler.run_pending(), 2)
+        self.assertEqual(self.next_dues(), [100.3, 100.3])
+
+    def test_skip_when_late(self):
+        """予定時刻に大きく遅れた場合は、まとめて送らずに省略した回数を数えるか確認"""
+        stream = self.scheduler.add("A", self.sender("A"), 10.0)
+        self.scheduler.run_pending()
+        # 100.1, 100.2, 100.3, 100.4, 100.5 の予定に対して 100.55 に起床する
+        self.clock.now = 100.55
+        self.assertEqual(self.scheduler.run_pending(), 1)
+        self.assertEqual(self.scheduler.run_pending(), 0)
+        stats = self.scheduler.stats("A")
+        self.assertEqual(stats["sent"], 2)
+        self.assertEqual(stats["skipped"], 4)
+        self.assertAlmostEqual(stats["max_lateness_ms"], 450.0)
+        self.assertEqual(self.next_dues(), [100.6])
+        self.assertIs(stream, self.scheduler._streams["A"])
+
+    def test_remove_and_replace(self):
+        """停止した送信は行わず、同じキーで登録し直すと置き換わるか確認"""
+        self.scheduler.add("A", self.sender("A"), 10.0)
+        self.scheduler.add("B", self.sender("B"), 10.0)
+        self.assertTrue(self.scheduler.remove("B"))
+        self.assertFalse(self.scheduler.remove("B"))
+        self.scheduler.add("A", self.sender("A2"), 10.0)
+        self.assertEqual(self.scheduler.run_pending(), 1)
+        self.assertEqual([key for key, _ in self.sent], ["A2"])
+        self.assertFalse(self.scheduler.is_active("B"))
+
+    def test_send_error(self):
+        """送信が例外を投げても次の周期の送信を続けるか確認"""
+        def fail():
+            raise RuntimeError("link down")
+        self.scheduler.add("A", fail, 10.0)
+        self.scheduler.run_pending()
+        self.clock.now = 100.2
+        self.scheduler.run_pending()
+        self.assertEqual(self.scheduler.stats("A")["errors"], 2)
+        self.assertEqual(self.next_dues(), [100.3])
+
+if __name__ == '__main__':
+    unittest.main()
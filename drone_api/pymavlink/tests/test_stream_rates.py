@@ -0,0 +1,97 @@
+import sys
+import os
+# pymavlink ディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+import unittest
+from types import SimpleNamespace
+from pymavlink import mavutil
+from hakosim_telemetry import TelemetryReader
+from hakosim_controllers import ArduPilotController
+
+SET_MESSAGE_INTERVAL = mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL
+
+def command_ack(command, result=mavutil.mavlink.MAV_RESULT_ACCEPTED):
+    return SimpleNamespace(command=command, result=result, get_type=lambda: 'COMMAND_ACK')
+
+class FakeMav:
+    """command_long_send を記録し、指定した結果の COMMAND_ACK を受信スレッドの代わりに配信する"""
+    def __init__(self, telemetry, results):
+        self.telemetry = telemetry
+        self.results = list(results)
+        self.sent = []
+
+    def command_long_send(self, target_system, target_component, command, confirmation, *params):
+        self.sent.append((command, params[0]))
+        if self.results:
+            result = self.results.pop(0)
+            if result is not None:
+                self.deliver(command_ack(command, result))
+
+    def deliver(self, msg):
+        for subscription in self.telemetry._subscriptions:
+            if msg.get_type() in subscription.msg_types:
+                subscription.queue.put(msg)
+
+def create_controller(results):
+    controller = ArduPilotController()
+    controller.telemetry = TelemetryReader(None, "test")
+    controller.mav_conn = SimpleNamespace(mav=FakeMav(controller.telemetry, results))
+    controller.target_system = 1
+    controller.target_component = 1
+    controller.stream_rates_hz = {"ATTITUDE": 50.0, "LOCAL_POSITION_NED": 25.0, "GPS_RAW_INT": 0.0}
+    return controller
+
+class TestRequestStreamRates(unittest.TestCase):
+
+    def test_send_all_then_collect(self):
+        """全ての要求を送信し、ACKを送信順に対応付ける"""
+        accepted = mavutil.mavlink.MAV_RESULT_ACCEPTED
+        controller = create_controller([accepted, mavutil.mavlink.MAV_RESULT_DENIED, accepted])
+        results = controller.request_stream_rates()
+        self.assertEqual(results, {"ATTITUDE": True, "LOCAL_POSITION_NED": False, "GPS_RAW_INT": True})
+        self.assertEqual(controller.mav_conn.mav.sent, [
+            (SET_MESSAGE_INTERVAL, mavutil.mavlink.MAVLINK_MSG_ID_ATTITUDE),
+            (SET_MESSAGE_INTERVAL, mavutil.mavlink.MAVLINK_MSG_ID_LOCAL_POSITION_NED),
+            (SET_MESSAGE_INTERVAL, mavutil.mavlink.MAVLINK_MSG_ID_GPS_RAW_INT),
+        ])
+
+    def test_missing_acks_wait_once(self):
+        """ACKが返らなくても、待ち時間はメッセージ数によらずタイムアウト1回分"""
+        controller = create_controller([None, None, None])
+        start = time.monotonic()
+        results = controller.request_stream_rates()
+        self.assertLess(time.monotonic() - start, 2.0)
+        self.assertEqual(results, {"ATTITUDE": False, "LOCAL_POSITION_NED": False, "GPS_RAW_INT": False})
+
+    def test_stale_ack_ignored(self):
+        """要求前に届いたACKや他のコマンドのACKは対象にしない"""
+        accepted = mavutil.mavlink.MAV_RESULT_ACCEPTED
+        controller = create_controller([accepted, accepted, accepted])
+        controller.telemetry._latest['COMMAND_ACK'] = (time.monotonic(), command_ack(SET_MESSAGE_INTERVAL))
+        mav = controller.mav_conn.mav
+        original_send = mav.command_long_send
+        def send_with_other_ack(*args):
+            mav.deliver(command_ack(mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM))
+            original_send(*args)
+        mav.command_long_send = send_with_other_ack
+        results = controller.request_stream_rates({"GPS_RAW_INT": 5.0})
+        self.assertTrue(all(results.values()))
+        self.assertEqual(controller.telemetry._subscriptions, ())
+
+    def test_verify_is_opt_in(self):
+        """接続時の達成レートの計測は、有効にした場合のみ行う"""
+        for enabled in (False, True):
+            accepted = mavutil.mavlink.MAV_RESULT_ACCEPTED
+            controller = create_controller([accepted] * 3)
+            controller.mav_conn.target_system = 1
+            controller._initialize = lambda: None
+            verified = []
+            controller.verify_stream_rates = lambda: verified.append(True)
+            controller.verify_stream_rates_on_connect = enabled
+            controller.init_connection(controller.mav_conn, controller.telemetry)
+            self.assertEqual(verified, [True] if enabled else [])
+
+if __name__ == '__main__':
+    unittest.main()
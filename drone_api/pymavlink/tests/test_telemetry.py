@@ -0,0 +1,137 @@
+import sys
+import os
+# pymavlink ディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import queue
+import threading
+import time
+import unittest
+import hakosim_telemetry
+from hakosim_telemetry import TelemetryReader
+
+class FakeMessage:
+    def __init__(self, msg_type, **fields):
+        self.msg_type = msg_type
+        self.__dict__.update(fields)
+
+    def get_type(self):
+        return self.msg_type
+
+class FakeConnection:
+    """recv_match で送り込んだメッセージを順に返す接続（例外を入れた場合は送出する）"""
+    def __init__(self):
+        self.messages = queue.Queue()
+        self.recv_calls = 0
+
+    def send(self, msg_type, **fields):
+        self.messages.put(FakeMessage(msg_type, **fields))
+
+    def recv_match(self, blocking=True, timeout=None):
+        self.recv_calls += 1
+        try:
+            item = self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+class TestTelemetryReader(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = FakeConnection()
+        self.reader = TelemetryReader(self.conn, "test")
+        self.reader.start()
+
+    def tearDown(self):
+        self.reader.stop()
+
+    def test_latest_and_count(self):
+        self.assertIsNone(self.reader.latest('ATTITUDE'))
+        self.conn.send('ATTITUDE', roll=0.1)
+        self.conn.send('ATTITUDE', roll=0.2)
+        self.conn.send('BAD_DATA')
+        self.assertTrue(wait_until(lambda: self.reader.count('ATTITUDE') == 2))
+        self.assertEqual(self.reader.latest('ATTITUDE').roll, 0.2)
+        self.assertEqual(self.reader.count('BAD_DATA'), 0)
+        self.assertIsNone(self.reader.latest('BAD_DATA'))
+
+    def test_age_and_max_age(self):
+        """受信からの経過時間が max_age を超えた最新値は返さない"""
+        self.assertIsNone(self.reader.age('ATTITUDE'))
+        self.conn.send('ATTITUDE', roll=0.1)
+        self.assertTrue(wait_until(lambda: self.reader.age('ATTITUDE') is not None))
+        self.assertLess(self.reader.age('ATTITUDE'), 1.0)
+        self.assertIsNotNone(self.reader.latest('ATTITUDE', max_age=1.0))
+        # 受信時刻を過去にずらして通信途絶を模擬する
+        recv_time, msg = self.reader._latest['ATTITUDE']
+        self.reader._latest['ATTITUDE'] = (recv_time - 5.0, msg)
+        self.assertGreaterEqual(self.reader.age('ATTITUDE'), 5.0)
+        self.assertIsNone(self.reader.latest('ATTITUDE', max_age=1.0))
+        self.assertIs(self.reader.latest('ATTITUDE'), msg)
+
+    def test_wait_for_timeout(self):
+        start = time.monotonic()
+        self.assertIsNone(self.reader.wait_for('COMMAND_ACK', timeout=0.2))
+        self.assertLess(time.monotonic() - start, 1.0)
+        # 条件を満たさないメッセージだけの場合もタイムアウトする
+        self.conn.send('COMMAND_ACK', command=1)
+        self.assertIsNone(self.reader.wait_for('COMMAND_ACK', lambda m: m.command == 2, timeout=0.2))
+        self.assertEqual(self.reader._subscriptions, ())
+
+    def test_wait_for_message(self):
+        threading.Timer(0.05, lambda: (self.conn.send('COMMAND_ACK', command=1),
+                                       self.conn.send('COMMAND_ACK', command=2))).start()
+        msg = self.reader.wait_for('COMMAND_ACK', lambda m: m.command == 2, timeout=2.0)
+        self.assertEqual(msg.command, 2)
+
+    def test_wait_for_since(self):
+        """since 以降に受信済みのメッセージは購読前でも返す"""
+        since = time.monotonic()
+        self.conn.send('COMMAND_ACK', command=3)
+        self.assertTrue(wait_until(lambda: self.reader.count('COMMAND_ACK') == 1))
+        self.assertEqual(self.reader.wait_for('COMMAND_ACK', timeout=0.1, since=since).command, 3)
+        self.assertIsNone(self.reader.wait_for('COMMAND_ACK', timeout=0.1, since=time.monotonic()))
+
+    def test_receive_error_continues(self):
+        self.conn.messages.put(OSError("temporary"))
+        self.conn.send('ATTITUDE', roll=0.3)
+        self.assertTrue(wait_until(lambda: self.reader.count('ATTITUDE') == 1, timeout=3.0))
+
+    def test_reconnect_callback(self):
+        """HEARTBEAT が LINK_LOST_SEC 以上途絶えた後に受信するとコールバックを呼ぶ"""
+        called = threading.Event()
+        self.reader.add_reconnect_callback(called.set)
+        self.conn.send('HEARTBEAT')
+        self.assertTrue(wait_until(lambda: self.reader.count('HEARTBEAT') == 1))
+        self.conn.send('HEARTBEAT')
+        self.assertTrue(wait_until(lambda: self.reader.count('HEARTBEAT') == 2))
+        self.assertFalse(called.is_set())
+        self.reader._last_heartbeat_time -= hakosim_telemetry.LINK_LOST_SEC + 1.0
+        self.conn.send('HEARTBEAT')
+        self.assertTrue(called.wait(2.0))
+
+    def test_stop(self):
+        """stop() で受信スレッドが終了し、以降のメッセージは受信しない"""
+        thread = self.reader._thread
+        self.reader.stop()
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(self.reader._thread)
+        self.conn.send('ATTITUDE', roll=0.1)
+        time.sleep(0.05)
+        self.assertEqual(self.reader.count('ATTITUDE'), 0)
+        # 再開できる
+        self.reader.start()
+        self.assertTrue(wait_until(lambda: self.reader.count('ATTITUDE') == 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+AHRS2 / SERVO_OUTPUT_RAW コンバータのベンチマーク
+
+辞書経由の従来パス (msg.to_dict() + convert()) と、
+pymavlinkメッセージを直接参照する高速パス (convert_msg()) の1メッセージあたりの処理時間を比較する。
+
+使い方:
+    cd hakoniwa-drone-core/mavlink/bridge
+    source setup.bash
+    python bench/bench_converters.py [--count 200000]
+"""
+import argparse
+import time
+from pymavlink import mavutil
+
+from msg.pdu_message import PduMessage
+from msg.conv.AHRS2_to_Twist import AHRS2ToTwistConvertor
+from msg.conv.SERVO_OUTPUT_RAW_to_HakoHilActuatorControls import SERVO_OUTPUT_RAWToHakoHilActuatorControlsConvertor
+
+ROBOT_NAME = "Drone"
+
+
+def create_messages(count):
+    mavlink = mavutil.mavlink
+    ahrs2_msgs = [
+        mavlink.MAVLink_ahrs2_message(0.01 * i, -0.02 * i, 0.03 * i, 584.0 + i * 0.01,
+                                      -353632621 + i, 1491652374 - i)
+        for i in range(count)
+    ]
+    servo_msgs = [
+        mavlink.MAVLink_servo_output_raw_message(i, 0, *[1000 + (i + ch) % 1000 for ch in range(8)])
+        for i in range(count)
+    ]
+    return ahrs2_msgs, servo_msgs
+
+
+def run_legacy(converter, msgs, msg_type):
+    t0 = time.perf_counter()
+    for msg in msgs:
+        converter.convert(PduMessage(robot_name=ROBOT_NAME, msg_type=msg_type, data=msg.to_dict()))
+    return time.perf_counter() - t0
+
+
+def run_fast(converter, msgs):
+    t0 = time.perf_counter()
+    for msg in msgs:
+        converter.convert_msg(ROBOT_NAME, msg)
+    return time.perf_counter() - t0
+
+
+def report(name, count, legacy_sec, fast_sec):
+    legacy_ns = legacy_sec / count * 1e9
+    fast_ns = fast_sec / count * 1e9
+    print(f"{name:<18} legacy: {legacy_ns:8.0f} ns/msg  fast: {fast_ns:8.0f} ns/msg  "
+          f"speedup: x{legacy_ns / fast_ns:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MAVLink to PDU converters.")
+    parser.add_argument("--count", type=int, default=200000, help="Number of messages per converter.")
+    args = parser.parse_args()
+
+    ahrs2_msgs, servo_msgs = create_messages(args.count)
+
+    ahrs2_conv = AHRS2ToTwistConvertor()
+    ahrs2_conv.addInitialPosition(ROBOT_NAME, -353632621, 1491652374, 584.0899658203125, False, 0)
+    servo_conv = SERVO_OUTPUT_RAWToHakoHilActuatorControlsConvertor()
+
+    report("AHRS2", args.count,
+           run_legacy(ahrs2_conv, ahrs2_msgs, "hako_mavlink_msgs/HakoAHRS2"),
+           run_fast(ahrs2_conv, ahrs2_msgs))
+    report("SERVO_OUTPUT_RAW", args.count,
+           run_legacy(servo_conv, servo_msgs, "hako_mavlink_msgs/HakoSERVO_OUTPUT_RAW"),
+           run_fast(servo_conv, servo_msgs))
+
+
+if __name__ == "__main__":
+    main()
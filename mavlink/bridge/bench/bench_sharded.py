@@ -0,0 +1,138 @@
+"""
+シャード構成 (main.py udp --shards N) のスケーラビリティを測るベンチマーク
+
+ローカルのUDPトラフィック生成プロセスから多数のVehicle分のAHRS2/SERVO_OUTPUT_RAWを送信し、
+シャード数を変えながら箱庭側のプロセスに届いたPDU書き込み件数/秒を計測する。
+hakopy は使用せず、共有メモリリングから取り出した件数を数える。
+
+使い方:
+    cd hakoniwa-drone-core/mavlink/bridge
+    source setup.bash
+    python bench/bench_sharded.py [--vehicles 64] [--shards 1 2 4 8] [--duration 5]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+from pymavlink import mavutil
+
+from shard.sharded_bridge import ShardedBridge
+
+BASE_PORT = 56000
+REF_LAT = -353632621
+REF_LNG = 1491652374
+REF_ALT = 584.0899658203125
+
+
+def write_configs(workdir, num_vehicles):
+    vehicles = {}
+    robots = []
+    for i in range(num_vehicles):
+        name = f"Drone{i}"
+        port = BASE_PORT + i
+        vehicles[name] = {
+            "ip_address": "127.0.0.1",
+            "port": port,
+            "my_port": port,
+            "initial_position": {"latitude": REF_LAT, "longitude": REF_LNG, "altitude": REF_ALT},
+        }
+        robots.append({
+            "name": name,
+            "shm_pdu_readers": [
+                {"type": "geometry_msgs/Twist", "org_name": "pos", "channel_id": 0, "pdu_size": 72},
+                {"type": "hako_mavlink_msgs/HakoHilActuatorControls", "org_name": "motor", "channel_id": 1, "pdu_size": 112},
+            ],
+            "shm_pdu_writers": [],
+        })
+    paths = {}
+    for key, data in (("comm", {"vehicles": vehicles}), ("pdu", {"robots": robots}), ("mavlink", {"robots": []})):
+        paths[key] = os.path.join(workdir, f"{key}.json")
+        with open(paths[key], "w") as f:
+            json.dump(data, f)
+    return paths, {name: info["my_port"] for name, info in vehicles.items()}
+
+
+def generate_traffic(ports, stop_event, msgs_per_packet):
+    """
+    指定ポートへAHRS2/SERVO_OUTPUT_RAWを送り続けるトラフィック生成プロセス
+    """
+    mav = mavutil.mavlink.MAVLink(None, srcSystem=1, srcComponent=1)
+    packet = b""
+    for i in range(msgs_per_packet):
+        if i % 2 == 0:
+            msg = mavutil.mavlink.MAVLink_ahrs2_message(0.1, 0.2, 0.3, REF_ALT + 1.0, REF_LAT + i, REF_LNG + i)
+        else:
+            msg = mavutil.mavlink.MAVLink_servo_output_raw_message(i, 0, *[1500] * 8)
+        packet += msg.pack(mav)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    while not stop_event.is_set():
+        for port in ports:
+            try:
+                sock.sendto(packet, ("127.0.0.1", port))
+            except OSError:
+                pass
+
+
+def run_case(paths, vehicle_ports, num_shards, num_generators, duration, msgs_per_packet):
+    bridge = ShardedBridge("127.0.0.1", vehicle_ports, num_shards,
+                           paths["mavlink"], paths["pdu"], paths["comm"])
+    bridge.start()
+    time.sleep(2.0)  # ワーカの起動待ち
+
+    mp_context = multiprocessing.get_context("spawn")
+    stop_event = mp_context.Event()
+    ports = list(vehicle_ports.values())
+    generators = [
+        mp_context.Process(target=generate_traffic, args=(ports[i::num_generators], stop_event, msgs_per_packet), daemon=True)
+        for i in range(num_generators)
+    ]
+    for generator in generators:
+        generator.start()
+
+    count = 0
+    def handler(robot_name, channel_id, data):
+        nonlocal count
+        count += 1
+
+    time.sleep(0.5)
+    bridge.drain(handler)
+    count = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < duration:
+        bridge.drain(handler)
+        time.sleep(0.02)  # 箱庭アセットの周期 (20ms) を模擬
+    elapsed = time.perf_counter() - t0
+
+    stop_event.set()
+    for generator in generators:
+        generator.join(timeout=2.0)
+    drops = bridge.drops()
+    bridge.stop()
+    return count / elapsed, drops
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sharded MAVLink bridge.")
+    parser.add_argument("--vehicles", type=int, default=64, help="Number of simulated vehicles.")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8], help="Shard counts to measure.")
+    parser.add_argument("--generators", type=int, default=2, help="Number of traffic generator processes.")
+    parser.add_argument("--msgs-per-packet", type=int, default=10, help="MAVLink messages per UDP datagram.")
+    parser.add_argument("--duration", type=float, default=5.0, help="Measurement time per case (sec).")
+    args = parser.parse_args()
+
+    print(f"CPU cores: {os.cpu_count()}, vehicles: {args.vehicles}")
+    with tempfile.TemporaryDirectory() as workdir:
+        paths, vehicle_ports = write_configs(workdir, args.vehicles)
+        baseline = None
+        for num_shards in args.shards:
+            rate, drops = run_case(paths, vehicle_ports, num_shards, args.generators,
+                                   args.duration, args.msgs_per_packet)
+            baseline = baseline or rate
+            print(f"shards={num_shards:<3} {rate:12.0f} PDU/s  scale: x{rate / baseline:.2f}  ring drops: {drops}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import struct
+import zlib
+from multiprocessing import resource_tracker, shared_memory
+
+# ヘッダ: 書き込み位置(head), 読み出し位置(tail), 破棄数(drops) いずれも単調増加の uint64
+_HEADER = struct.Struct("<QQQ")
+# レコードヘッダ: データ長, チェックサム（レコードの書き込み位置とデータの CRC32）
+_RECORD_HEADER = struct.Struct("<II")
+_POSITION = struct.Struct("<Q")
+
+# このプロセスで作成した共有メモリ名（接続時に resource_tracker の登録を解除してよいかの判定に使う）
+_created_names = set()
+
+def _attach(name):
+    """
+    既存の共有メモリに接続する（resource_tracker には登録しない）
+    Python 3.12 以前は接続しただけでも resource_tracker に登録され、接続したプロセスの tracker が
+    終了時に共有メモリを削除（およびリーク警告を出力）してしまうため、登録を解除する。
+    ただし multiprocessing で起動したワーカは作成側の tracker を引き継いでおり、登録は重複するだけである。
+    この場合に解除すると作成側の登録まで消えるため、自プロセスで tracker を起動した場合に限り解除する。
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, create=False, track=False)
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name=name, create=False)
+    own_tracker = getattr(resource_tracker._resource_tracker, "_pid", None) is not None
+    if own_tracker and shm.name not in _created_names:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+class ShmRingBuffer:
+    def __init__(self, name=None, capacity=4 * 1024 * 1024, create=True):
+        """
+        共有メモリ上のリングバッファ（書き込み1プロセス・読み出し1プロセス専用）
+        レコードはヘッダ(長さ・チェックサム 8バイト) + データの可変長形式で格納する
+        メモリ順序: Python からはメモリバリアを入れられないため、ARM などストアの順序が保たれない
+        CPU では、読み出し側から head の更新がデータより先に見える場合がある。
+        読み出し側はチェックサムでレコードが書き終わっていることを確認し、一致しない場合は
+        そのレコード以降を次回の読み出しで再試行する。チェックサムには書き込み位置を含めるため、
+        1周前に同じ位置へ書かれた古いレコードを誤って読むことはない
+        :param name: 共有メモリ名（create=False の場合は必須）
+        :param capacity: データ領域のサイズ（バイト）
+        :param create: Trueの場合は共有メモリを新規作成する
+        """
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=_HEADER.size + capacity)
+            _HEADER.pack_into(self.shm.buf, 0, 0, 0, 0)
+            _created_names.add(self.shm.name)
+        else:
+            self.shm = _attach(name)
+        self.name = self.shm.name
+        self.capacity = self.shm.size - _HEADER.size
+        self.owner = create
+        self.data = self.shm.buf[_HEADER.size:_HEADER.size + self.capacity]
+
+    def _copy_in(self, pos, payload):
+        offset = pos % self.capacity
+        first = min(len(payload), self.capacity - offset)
+        self.data[offset:offset + first] = payload[:first]
+        if first < len(payload):
+            self.data[0:len(payload) - first] = payload[first:]
+
+    def _copy_out(self, pos, size):
+        offset = pos % self.capacity
+        first = min(size, self.capacity - offset)
+        if first == size:
+            return bytes(self.data[offset:offset + size])
+        return bytes(self.data[offset:offset + first]) + bytes(self.data[0:size - first])
+
+    @staticmethod
+    def _checksum(pos, payload):
+        return zlib.crc32(payload, zlib.crc32(_POSITION.pack(pos)))
+
+    def push(self, payload: bytes) -> bool:
+        """
+        レコードを書き込む（空きがない場合は破棄してFalseを返す）
+        :param payload: 書き込むデータ
+        :return: 書き込みに成功した場合True
+        """
+        head, tail, drops = _HEADER.unpack_from(self.shm.buf, 0)
+        size = _RECORD_HEADER.size + len(payload)
+        if size > self.capacity - (head - tail):
+            struct.pack_into("<Q", self.shm.buf, 16, drops + 1)
+            return False
+        self._copy_in(head, _RECORD_HEADER.pack(len(payload), self._checksum(head, payload)))
+        self._copy_in(head + _RECORD_HEADER.size, payload)
+        # データを書き終えてから head を進める（読み出し側は head までを読む）
+        # 他のコアから head が先に見えた場合は、読み出し側のチェックサム検証で弾かれる
+        struct.pack_into("<Q", self.shm.buf, 0, head + size)
+        return True
+
+    def pop_all(self):
+        """
+        読み出し可能なレコードを全て取得
+        書き込みが見えていないレコード（チェックサム不一致）以降は、次回の呼び出しで読み出す
+        :return: レコード(bytes)のリスト
+        """
+        head, tail, _ = _HEADER.unpack_from(self.shm.buf, 0)
+        records = []
+        while tail + _RECORD_HEADER.size <= head:
+            size, checksum = _RECORD_HEADER.unpack(self._copy_out(tail, _RECORD_HEADER.size))
+            if size > head - tail - _RECORD_HEADER.size:
+                break
+            payload = self._copy_out(tail + _RECORD_HEADER.size, size)
+            if checksum != self._checksum(tail, payload):
+                break
+            records.append(payload)
+            tail += _RECORD_HEADER.size + size
+        struct.pack_into("<Q", self.shm.buf, 8, tail)
+        return records
+
+    def drops(self):
+        """
+        空き不足で破棄したレコード数を返す
+        """
+        return _HEADER.unpack_from(self.shm.buf, 0)[2]
+
+    def close(self):
+        """
+        共有メモリを解放する（作成したプロセスの場合は削除も行う）
+        """
+        self.data.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+            _created_names.discard(self.shm.name)
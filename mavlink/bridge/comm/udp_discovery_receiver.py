@@ -0,0 +1,88 @@
+import socket
+import time
+from msg.mavlink_message import MavlinkMessage
+from pymavlink import mavutil
+
+# 未参加の送信元用パーサの保持数の上限（超えた場合は全て破棄する）
+MAX_PENDING_SOURCES = 64
+
+
+class UdpDiscoveryReceiver:
+    def __init__(self, udp_ip, vehicle_registry, message_queue, recorder=None):
+        """
+        複数のVehicleが共有するポートで受信し、HEARTBEAT から動的にVehicleを登録するクラス
+        ロボット名は送信元アドレスから VehicleRegistry を参照して特定する（ロックは取らない）
+        :param udp_ip: バインドするIPアドレス
+        :param vehicle_registry: VehicleRegistry オブジェクト（待ち受けポートも保持する）
+        :param message_queue: メッセージキューオブジェクト
+        :param recorder: 受信パケットを記録する FramedLogWriter（省略時は記録しない）
+        """
+        self.udp_ip = udp_ip
+        self.udp_port = vehicle_registry.port
+        self.vehicle_registry = vehicle_registry
+        self.message_queue = message_queue
+        self.recorder = recorder
+        self.sock = None
+        # 未参加の送信元毎のパーサ（HEARTBEAT を待つ間の解析状態を保持する）
+        self.pending_parsers = {}
+
+    def _pending_parser(self, addr):
+        parser = self.pending_parsers.get(addr)
+        if parser is None:
+            if len(self.pending_parsers) >= MAX_PENDING_SOURCES:
+                self.pending_parsers.clear()
+            parser = mavutil.mavlink.MAVLink(None)
+            parser.robust_parsing = True
+            self.pending_parsers[addr] = parser
+        return parser
+
+    def start_receiving(self):
+        """
+        UDPパケットを受信し、参加済みVehicleのメッセージをキューに追加
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        print(f"Listening for vehicle discovery on {self.udp_ip}:{self.udp_port}...")
+        try:
+            self.sock.bind((self.udp_ip, self.udp_port))
+            while True:
+                data, addr = self.sock.recvfrom(65535)
+                recv_time_ns = time.perf_counter_ns()
+                if self.recorder is not None:
+                    self.recorder.write(data, self.udp_port)
+                entry = self.vehicle_registry.lookup(addr)
+                parser = entry.parser if entry is not None else self._pending_parser(addr)
+                msgs = parser.parse_buffer(data)
+                if not msgs:
+                    continue
+                now = time.monotonic()
+                for msg in msgs:
+                    if msg.get_type() == "HEARTBEAT":
+                        if entry is None:
+                            try:
+                                entry = self.vehicle_registry.join(addr, self.udp_port, msg)
+                            except Exception as e:
+                                # 1台の参加に失敗しても受信を止めず、他の Vehicle の検出を続ける
+                                print(f"ERROR: Failed to join vehicle {addr[0]}:{addr[1]}: {e}")
+                                continue
+                            if entry is None:
+                                continue
+                            # 解析途中の状態ごと引き継ぐ
+                            entry.parser = self.pending_parsers.pop(addr, entry.parser)
+                        entry.last_heartbeat = now
+                    if entry is None:
+                        continue
+                    self.message_queue.enqueue(MavlinkMessage(
+                        ip_addr=addr[0],
+                        port=self.udp_port,
+                        msg_type=msg.get_type(),
+                        msg_obj=msg,
+                        recv_time_ns=recv_time_ns,
+                        robot_name=entry.robot_name,
+                    ))
+                if entry is not None:
+                    entry.last_seen = now
+        except Exception as e:
+            print(f"Error receiving UDP packets: ip={self.udp_ip}, port={self.udp_port}, error={e}")
+        finally:
+            self.sock.close()
+            print("UDP discovery receiver stopped.")
@@ -0,0 +1,99 @@
+import selectors
+import socket
+import time
+from msg.mavlink_message import MavlinkMessage
+from pymavlink import mavutil
+
+
+class UdpMultiReceiver:
+    def __init__(self, udp_ip, udp_ports, message_handler, recorder=None):
+        """
+        複数ポートのUDPパケットを1スレッドで受信するクラス
+        ポート毎に専用のMAVLinkパーサを持つ
+        :param udp_ip: バインドするIPアドレス
+        :param udp_ports: バインドするポート番号のリスト
+        :param message_handler: 受信したMavlinkMessageを受け取る関数
+        :param recorder: 受信パケットを記録する FramedLogWriter（省略時は記録しない）
+        """
+        self.udp_ip = udp_ip
+        self.udp_ports = list(udp_ports)
+        self.message_handler = message_handler
+        self.recorder = recorder
+        self.selector = selectors.DefaultSelector()
+        self.socks = {}
+        self.running = False
+
+    def open(self):
+        """
+        全ポートのソケットを作成してバインド
+        """
+        for udp_port in self.udp_ports:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind((self.udp_ip, udp_port))
+            sock.setblocking(False)
+            parser = mavutil.mavlink.MAVLink(None)
+            parser.robust_parsing = True
+            self.socks[udp_port] = sock
+            self.selector.register(sock, selectors.EVENT_READ, (udp_port, parser))
+            print(f"Listening for UDP packets on {self.udp_ip}:{udp_port}...")
+
+    def poll(self, timeout):
+        """
+        受信可能なパケットを処理する
+        :param timeout: 待ち時間（秒）
+        :return: 処理したメッセージ数
+        """
+        count = 0
+        for key, _ in self.selector.select(timeout):
+            udp_port, parser = key.data
+            while True:
+                try:
+                    data, addr = key.fileobj.recvfrom(65535)
+                except BlockingIOError:
+                    break
+                recv_time_ns = time.perf_counter_ns()
+                if self.recorder is not None:
+                    self.recorder.write(data, udp_port)
+                msgs = parser.parse_buffer(data)
+                if not msgs:
+                    continue
+                for msg in msgs:
+                    self.message_handler(MavlinkMessage(
+                        ip_addr=addr[0],
+                        port=udp_port,
+                        msg_type=msg.get_type(),
+                        msg_obj=msg,
+                        recv_time_ns=recv_time_ns,
+                    ))
+                    count += 1
+        return count
+
+    def start_receiving(self, stop_event=None, timeout=0.1, on_poll=None):
+        """
+        停止要求があるまで受信を続ける
+        :param stop_event: 停止要求を通知するイベント（threading/multiprocessing）
+        :param timeout: 1回の待ち時間（秒）
+        :param on_poll: 受信の有無によらず1回の待ち毎に呼び出す関数（省略可）
+        """
+        if not self.socks:
+            self.open()
+        self.running = True
+        try:
+            while self.running and (stop_event is None or not stop_event.is_set()):
+                self.poll(timeout)
+                if on_poll is not None:
+                    on_poll()
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        全ソケットをクローズ
+        """
+        for sock in self.socks.values():
+            self.selector.unregister(sock)
+            sock.close()
+        self.socks.clear()
+        if self.recorder is not None:
+            self.recorder.close()
+        print("UDP receiver stopped.")
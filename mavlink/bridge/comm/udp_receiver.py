@@ -1,23 +1,26 @@
 import socket
+import time
 from msg.message_queue import MessageQueue
 from msg.mavlink_message import MavlinkMessage
 from pymavlink import mavutil
 
 
 class UdpReceiver:
-    def __init__(self, udp_ip, udp_port, mavlink_connection, message_queue):
+    def __init__(self, udp_ip, udp_port, mavlink_connection, message_queue, recorder=None):
         """
         UdpReceiverクラス
         :param udp_ip: バインドするIPアドレス
         :param udp_port: バインドするポート番号
         :param mavlink_connection: pymavlink の接続オブジェクト
         :param message_queue: メッセージキューオブジェクト
+        :param recorder: 受信パケットを記録する FramedLogWriter（省略時は記録しない）
         """
         self.udp_ip = udp_ip
         self.udp_port = udp_port
         self.sock = None
         self.mavlink_connection = mavlink_connection
         self.message_queue = message_queue
+        self.recorder = recorder
 
     def start_receiving(self):
         """
@@ -31,21 +34,26 @@ class UdpReceiver:
             self.sock.bind((self.udp_ip, self.udp_port))
             while True:
                 data, addr = self.sock.recvfrom(1024)  # UDPパケットを受信
+                recv_time_ns = time.perf_counter_ns()
                 ip_addr, port = addr
+                if self.recorder is not None:
+                    self.recorder.write(data, self.udp_port)
                 #print(f"Received {len(data)} bytes from {ip_addr}:{port}")
-                # MAVLinkメッセージを解析
-                for byte in data:
-                    msg = self.mavlink_connection.parse_char(bytes([byte]))
-                    if msg:
-                        # メッセージをキューに追加
-                        message = MavlinkMessage(
-                            ip_addr=ip_addr,
-                            port=self.udp_port,
-                            msg_type=msg.get_type(),
-                            msg_data=msg.to_dict(),
-                        )
-                        #print(f"msg_type: {msg.get_type()}")
-                        self.message_queue.enqueue(message)
+                # MAVLinkメッセージを解析（パケット単位でまとめて解析する）
+                msgs = self.mavlink_connection.parse_buffer(data)
+                if not msgs:
+                    continue
+                for msg in msgs:
+                    # メッセージをキューに追加
+                    message = MavlinkMessage(
+                        ip_addr=ip_addr,
+                        port=self.udp_port,
+                        msg_type=msg.get_type(),
+                        msg_obj=msg,
+                        recv_time_ns=recv_time_ns,
+                    )
+                    #print(f"msg_type: {msg.get_type()}")
+                    self.message_queue.enqueue(message)
 
         except Exception as e:
             print(f"Error receiving UDP packets: ip={self.udp_ip}, port={self.udp_port}, error={e}")
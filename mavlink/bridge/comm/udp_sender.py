@@ -0,0 +1,22 @@
+class UdpSendLink:
+    def __init__(self, addr, receiver=None, sock=None):
+        """
+        Vehicle への送信先（pymavlink の MAVLink(file) として使う write() を持つ）
+        受信ソケットがある場合はそれを使い、Vehicle から見た送信元ポートを受信ポートと揃える
+        :param addr: 送信先の (IPアドレス, ポート番号)
+        :param receiver: 送信に使うソケットを持つ UdpReceiver（省略時は sock を使う）
+        :param sock: 送信に使うソケット
+        """
+        self.addr = addr
+        self.receiver = receiver
+        self.sock = sock
+
+    def write(self, data):
+        sock = self.receiver.sock if self.receiver is not None else self.sock
+        if sock is None:
+            return 0
+        try:
+            return sock.sendto(data, self.addr)
+        except OSError as e:
+            print(f"ERROR: Failed to send MAVLink message to {self.addr[0]}:{self.addr[1]}: {e}")
+            return 0
@@ -0,0 +1,70 @@
+import time
+from pymavlink import mavutil
+
+# 地上局として送信する際の送信元ID
+DOWNLINK_SOURCE_SYSTEM = 255
+DOWNLINK_SOURCE_COMPONENT = mavutil.mavlink.MAV_COMP_ID_MISSIONPLANNER
+
+
+class HakoBridgePduDownlink:
+    def __init__(self, routes, pdu_io, links):
+        """
+        PDUチャネルを監視し、変化したデータをMAVLinkに変換してVehicleへ送信する
+        タイミングループの周期毎に tick() を呼び出す（スレッドは持たない）
+        :param routes: DownlinkRoute のリスト
+        :param pdu_io: read_pdu(robot_name, channel_id) を持つPDUアクセス（HakoBridgePduWriter）
+        :param links: {ロボット名: write(data) を持つ送信先}
+        """
+        self.routes = routes
+        self.pdu_io = pdu_io
+        self.mavs = {}
+        for robot_name, link in links.items():
+            self.mavs[robot_name] = mavutil.mavlink.MAVLink(
+                link, srcSystem=DOWNLINK_SOURCE_SYSTEM, srcComponent=DOWNLINK_SOURCE_COMPONENT)
+        self.sent_count = 0
+        self.suppressed_count = 0
+
+    def tick(self, now=None):
+        """
+        送信レートの上限に達していない経路のPDUを読み込み、内容が変化していれば送信する
+        :param now: 現在時刻（time.monotonic()、省略時は取得する）
+        :return: 送信したMAVLinkメッセージ数
+        """
+        if now is None:
+            now = time.monotonic()
+        count = 0
+        for route in self.routes:
+            if now < route.next_check_time:
+                continue
+            route.next_check_time = now + route.min_interval_sec
+            mav = self.mavs.get(route.robot_name)
+            if mav is None:
+                continue
+            data = self.pdu_io.read_pdu(route.robot_name, route.channel_id)
+            if data is None:
+                continue
+            try:
+                msgs = route.encoder.encode(route.robot_name, data)
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Downlink encode error: robot={route.robot_name}, pdu={route.pdu_name}, error={e}")
+                continue
+            if not msgs:
+                continue
+            # 変化検出はエンコード後のメッセージ内容で比較する（seqなどのヘッダは含まない）
+            contents = [msg.to_dict() for msg in msgs]
+            if contents == route.last_sent and not self._resend_due(route, now):
+                self.suppressed_count += 1
+                continue
+            for msg in msgs:
+                mav.send(msg)
+            route.last_sent = contents
+            route.last_sent_time = now
+            count += len(msgs)
+        self.sent_count += count
+        return count
+
+    @staticmethod
+    def _resend_due(route, now):
+        if route.resend_interval_sec <= 0 or route.last_sent_time is None:
+            return False
+        return now - route.last_sent_time >= route.resend_interval_sec
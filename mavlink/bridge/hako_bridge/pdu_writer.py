@@ -8,15 +8,79 @@ class HakoBridgePduWriter:
     def __init__(self, config_path: str):
         hako_binary_path = os.getenv('HAKO_BINARY_PATH', '/usr/local/lib/hakoniwa/hako_binary/offset')
         self.pdu_manager = hako_pdu.HakoPduManager(hako_binary_path, config_path)
+        # (robot_name, channel_id) をキーとした PDU ハンドルのキャッシュ
+        self.pdu_handles = {}
+        # 1周期分の書き込み待ちデータ (同一チャネルは最新値のみ保持)
+        self.pending = {}
         #ret = hakopy.init_for_external()
         #if ret == False:
         #    raise ValueError("Failed to initialize Hakopy")
 
+    def get_pdu(self, robot_name, channel_id):
+        """
+        PDUハンドルを取得する（初回のみ生成し、以降はキャッシュを再利用）
+        :param robot_name: ロボット名
+        :param channel_id: チャネルID
+        :return: PDUハンドル
+        """
+        key = (robot_name, channel_id)
+        pdu = self.pdu_handles.get(key)
+        if pdu is None:
+            pdu = self.pdu_manager.get_pdu(robot_name, channel_id)
+            self.pdu_handles[key] = pdu
+        return pdu
+
     def write_pdu_message(self, pdu_message: PduMessage):
         """
         PduMessageデータをHakoniwa PDUに書き込む
         :param pdu_message: 書き込み対象のPduMessageオブジェクト
         """
-        pdu = self.pdu_manager.get_pdu(pdu_message.robot_name, pdu_message.channel_id)
+        pdu = self.get_pdu(pdu_message.robot_name, pdu_message.channel_id)
         pdu.obj = pdu_message.data
-        pdu.write()
+        return pdu.write()
+
+    def read_pdu(self, robot_name, channel_id):
+        """
+        PDUデータを読み込む（キャッシュしたハンドルを使用）
+        :param robot_name: ロボット名
+        :param channel_id: チャネルID
+        :return: PDUデータ（辞書形式）。読み込みに失敗した場合はNone
+        """
+        return self.get_pdu(robot_name, channel_id).read()
+
+    def stage_pdu_message(self, pdu_message: PduMessage):
+        """
+        PduMessageを書き込み待ちに登録する（write_many()でまとめて書き込む）
+        同一の (robot_name, channel_id) に対しては最新のデータのみが残る
+        :param pdu_message: 書き込み対象のPduMessageオブジェクト
+        """
+        self.pending[(pdu_message.robot_name, pdu_message.channel_id)] = pdu_message.data
+
+    def stage_pdu(self, robot_name, channel_id, data):
+        """
+        PDUデータを書き込み待ちに登録する（PduMessageを経由しない版）
+        :param robot_name: ロボット名
+        :param channel_id: チャネルID
+        :param data: PDUデータ（辞書形式）
+        """
+        self.pending[(robot_name, channel_id)] = data
+
+    def write_many(self, pdu_messages=None):
+        """
+        書き込み待ちのPDUを1周期分まとめて書き込む
+        :param pdu_messages: 追加で書き込むPduMessageのリスト（省略可）
+        :return: 書き込んだPDU数
+        """
+        if pdu_messages:
+            for pdu_message in pdu_messages:
+                self.stage_pdu_message(pdu_message)
+        count = 0
+        for (robot_name, channel_id), data in self.pending.items():
+            pdu = self.get_pdu(robot_name, channel_id)
+            pdu.obj = data
+            if pdu.write() is False:
+                print(f"ERROR: Failed to write PDU: robot={robot_name}, channel_id={channel_id}")
+                continue
+            count += 1
+        self.pending.clear()
+        return count
@@ -1,16 +1,22 @@
 import os
+import time
 
 class BinaryLogger:
-    def __init__(self, log_filename):
+    def __init__(self, log_filename, buffer_size=1024 * 1024, flush_interval_sec=1.0):
         """
         バイナリデータ保存用のロガー
         :param log_filename: 保存するファイルのパス
+        :param buffer_size: 書き込みバッファのサイズ（バイト）
+        :param flush_interval_sec: バッファをフラッシュする間隔（秒）
         """
         self.log_filename = log_filename
+        self.buffer_size = buffer_size
+        self.flush_interval_sec = flush_interval_sec
 
         # 初期化時にログファイルを空にする（既存データをクリア）
-        with open(self.log_filename, "wb") as log_file:
-            pass
+        # 書き込み毎にファイルを開き直さないよう、ファイルは開いたままにする
+        self.log_file = open(self.log_filename, "wb", buffering=self.buffer_size)
+        self.last_flush = time.monotonic()
 
     def save_binary_data(self, data):
         """
@@ -18,14 +24,29 @@ class BinaryLogger:
         :param data: 保存するバイナリデータ
         """
         try:
-            with open(self.log_filename, "ab") as log_file:
-                log_file.write(data)
+            self.log_file.write(data)
+            now = time.monotonic()
+            if now - self.last_flush >= self.flush_interval_sec:
+                self.log_file.flush()
+                self.last_flush = now
         except Exception as e:
             print(f"Failed to save binary data: {e}")
 
+    def flush(self):
+        """
+        バッファの内容をファイルに書き出す
+        """
+        self.log_file.flush()
+
     def clear_log(self):
         """
         ログファイルを初期化（既存の内容を削除）
         """
-        with open(self.log_filename, "wb") as log_file:
-            pass
+        self.log_file.close()
+        self.log_file = open(self.log_filename, "wb", buffering=self.buffer_size)
+
+    def close(self):
+        """
+        ログファイルをクローズ
+        """
+        self.log_file.close()
@@ -0,0 +1,172 @@
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+
+# ファイルヘッダ: マジック(8バイト) + バージョン(uint32) + 予約(uint32)
+FRAMED_LOG_MAGIC = b"HKMAVLOG"
+FRAMED_LOG_VERSION = 1
+FILE_HEADER = struct.Struct("<8sII")
+# レコードヘッダ: 受信時刻(usec, uint64) + 送信元ポート(uint16) + パケット長(uint16)
+RECORD_HEADER = struct.Struct("<QHH")
+# インデックスエントリ: 受信時刻(usec, uint64) + レコードのファイルオフセット(uint64)
+INDEX_ENTRY = struct.Struct("<QQ")
+INDEX_SUFFIX = ".idx"
+
+
+def is_framed_log(log_filename):
+    """
+    フレーム形式のログファイルかどうかを判定
+    :param log_filename: ログファイル名
+    :return: フレーム形式であればTrue
+    """
+    try:
+        with open(log_filename, "rb") as f:
+            return f.read(len(FRAMED_LOG_MAGIC)) == FRAMED_LOG_MAGIC
+    except FileNotFoundError:
+        return False
+
+
+class FramedLogWriter:
+    def __init__(self, log_filename, buffer_size=1024 * 1024, flush_interval_sec=1.0, index_interval_usec=100 * 1000):
+        """
+        受信パケットをフレーム形式で記録するロガー
+        レコード = 受信時刻 + 送信元ポート + 生パケット
+        一定時間毎に (時刻, オフセット) をサイドカーインデックス (<log>.idx) に記録する
+        :param log_filename: 保存するファイルのパス
+        :param buffer_size: 書き込みバッファのサイズ（バイト）
+        :param flush_interval_sec: バッファをフラッシュする間隔（秒）
+        :param index_interval_usec: インデックスを記録する間隔（マイクロ秒）
+        """
+        self.log_filename = log_filename
+        self.flush_interval_sec = flush_interval_sec
+        self.index_interval_usec = index_interval_usec
+        self.log_file = open(log_filename, "wb", buffering=buffer_size)
+        self.index_file = open(log_filename + INDEX_SUFFIX, "wb", buffering=64 * 1024)
+        self.log_file.write(FILE_HEADER.pack(FRAMED_LOG_MAGIC, FRAMED_LOG_VERSION, 0))
+        self.offset = FILE_HEADER.size
+        self.last_index_usec = None
+        self.last_flush = time.monotonic()
+        # 複数の受信スレッドから共有されるため、書き込みは排他する
+        self.lock = threading.Lock()
+
+    def write(self, data, port, recv_time_usec=None):
+        """
+        受信パケットを1レコードとして記録
+        :param data: 受信した生パケット
+        :param port: 送信元（受信）ポート番号
+        :param recv_time_usec: 受信時刻（マイクロ秒）。省略時は現在時刻
+        """
+        if recv_time_usec is None:
+            recv_time_usec = time.time_ns() // 1000
+        with self.lock:
+            if self.last_index_usec is None or recv_time_usec - self.last_index_usec >= self.index_interval_usec:
+                self.index_file.write(INDEX_ENTRY.pack(recv_time_usec, self.offset))
+                self.last_index_usec = recv_time_usec
+            self.log_file.write(RECORD_HEADER.pack(recv_time_usec, port, len(data)))
+            self.log_file.write(data)
+            self.offset += RECORD_HEADER.size + len(data)
+            now = time.monotonic()
+            if now - self.last_flush >= self.flush_interval_sec:
+                self.log_file.flush()
+                self.index_file.flush()
+                self.last_flush = now
+
+    def flush(self):
+        """
+        バッファの内容をファイルに書き出す
+        """
+        with self.lock:
+            self.log_file.flush()
+            self.index_file.flush()
+
+    def close(self):
+        """
+        ログファイルをクローズ
+        """
+        with self.lock:
+            self.log_file.close()
+            self.index_file.close()
+
+
+class FramedLogReader:
+    def __init__(self, log_filename):
+        """
+        フレーム形式のログファイルをメモリマップして読み出すクラス
+        :param log_filename: ログファイル名
+        """
+        self.log_filename = log_filename
+        self.log_file = open(log_filename, "rb")
+        self.mm = mmap.mmap(self.log_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _ = FILE_HEADER.unpack_from(self.mm, 0)
+        if magic != FRAMED_LOG_MAGIC or version != FRAMED_LOG_VERSION:
+            self.close()
+            if magic != FRAMED_LOG_MAGIC:
+                raise ValueError(f"Not a framed MAVLink log: {log_filename}")
+            raise ValueError(f"Unsupported framed log version {version}: {log_filename}")
+        self.index_times, self.index_offsets = self._load_index()
+
+    def _load_index(self):
+        index_filename = self.log_filename + INDEX_SUFFIX
+        times = []
+        offsets = []
+        if os.path.exists(index_filename):
+            with open(index_filename, "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            for recv_time_usec, offset in INDEX_ENTRY.iter_unpack(data[:usable]):
+                if offset < len(self.mm):
+                    times.append(recv_time_usec)
+                    offsets.append(offset)
+        return times, offsets
+
+    def start_time_usec(self):
+        """
+        最初のレコードの受信時刻を返す（レコードがない場合はNone）
+        """
+        for recv_time_usec, _, _ in self.records():
+            return recv_time_usec
+        return None
+
+    def seek_offset(self, time_usec):
+        """
+        指定時刻以降のレコードを読み出すための開始オフセットを返す
+        インデックスで近傍まで移動し、以降はレコードを順に辿る
+        :param time_usec: 受信時刻（マイクロ秒）
+        :return: ファイルオフセット
+        """
+        pos = bisect.bisect_right(self.index_times, time_usec) - 1
+        offset = self.index_offsets[pos] if pos >= 0 else FILE_HEADER.size
+        size = len(self.mm)
+        while offset + RECORD_HEADER.size <= size:
+            recv_time_usec, _, length = RECORD_HEADER.unpack_from(self.mm, offset)
+            if recv_time_usec >= time_usec:
+                break
+            offset += RECORD_HEADER.size + length
+        return offset
+
+    def records(self, offset=None):
+        """
+        レコードを順に返すジェネレータ
+        :param offset: 開始オフセット（省略時は先頭）
+        :return: (受信時刻usec, ポート番号, パケット) のイテレータ
+        """
+        mm = self.mm
+        offset = FILE_HEADER.size if offset is None else offset
+        size = len(mm)
+        while offset + RECORD_HEADER.size <= size:
+            recv_time_usec, port, length = RECORD_HEADER.unpack_from(mm, offset)
+            start = offset + RECORD_HEADER.size
+            if start + length > size:
+                break  # 書き込み途中の末尾レコードは無視する
+            yield recv_time_usec, port, mm[start:start + length]
+            offset = start + length
+
+    def close(self):
+        """
+        ログファイルをクローズ
+        """
+        self.mm.close()
+        self.log_file.close()
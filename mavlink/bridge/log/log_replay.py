@@ -1,21 +1,49 @@
+import threading
 import time
 from pymavlink import mavutil
 from msg.message_queue import MessageQueue  # 先ほど作成したMessageQueueをインポート
 from msg.mavlink_message import MavlinkMessage  # MavlinkMessageをインポート
+from log.framed_log import FramedLogReader, is_framed_log
+
+# 生ログをまとめて読み込む単位（バイト）
+RAW_READ_CHUNK_SIZE = 64 * 1024
+# この時間（秒）以上先のメッセージまでは待たずにまとめてキューへ投入する
+MIN_SLEEP_SEC = 0.001
+
+
+class _ReplayStopped(Exception):
+    """stop() で再生を中断した"""
 
 class LogReplay:
-    def __init__(self, log_filename, mavlink_connection, message_queue, replay=True):
+    def __init__(self, log_filename, mavlink_connection, message_queue, replay=True,
+                 speed=1.0, start_time_sec=0.0, ip_addr_map=None, batch_size=256):
         """
         LogReplayクラス
         :param log_filename: 再生するログファイル名
         :param mavlink_connection: pymavlink の接続オブジェクト
         :param message_queue: メッセージキューオブジェクト
         :param replay: タイムスタンプスリープを有効にするか
+        :param speed: 再生速度の倍率（0以下の場合は待たずに最速で再生）
+        :param start_time_sec: フレーム形式ログの再生開始位置（ログ先頭からの秒数）
+        :param ip_addr_map: フレーム形式ログのポート番号から送信元IPアドレスへの対応表
+        :param batch_size: まとめてキューに投入するメッセージ数の上限
+            キューに空きがない場合は取り出されるまで待つため、キューのサイズを超えても再生したメッセージは失われない
         """
         self.log_filename = log_filename
         self.mavlink_connection = mavlink_connection
         self.message_queue = message_queue
         self.replay = replay
+        self.speed = speed
+        self.start_time_sec = start_time_sec
+        self.ip_addr_map = ip_addr_map or {}
+        self.batch_size = batch_size
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        """
+        再生を中断する（キューの空きを待っている場合も抜ける）
+        """
+        self.stop_event.set()
 
     def replay_log(self):
         """
@@ -23,30 +51,109 @@ class LogReplay:
         """
         print(f"Replaying log file: {self.log_filename}")
         try:
-            with open(self.log_filename, "rb") as log_file:
-                prev_timestamp = None
-
-                while byte := log_file.read(1):  # 1バイトずつ読み取る
-                    msg = self.mavlink_connection.parse_char(byte)
-                    if msg:
-                        # タイムスタンプ処理
-                        if self.replay and hasattr(msg, 'time_usec'):
-                            current_timestamp = msg.time_usec / 1e6  # マイクロ秒から秒に変換
-                            if prev_timestamp is not None:
-                                sleep_time = current_timestamp - prev_timestamp
-                                if sleep_time > 0:
-                                    time.sleep(sleep_time)
-                            prev_timestamp = current_timestamp
-
-                        # メッセージをキューに追加
-                        message = MavlinkMessage(
-                            ip_addr="127.0.0.1",  # ログ再生では固定値
-                            port=0,              # ログ再生ではポート番号は不要
-                            msg_type=msg.get_type(),
-                            msg_data=msg.to_dict(),
-                        )
-                        self.message_queue.enqueue(message)
+            if is_framed_log(self.log_filename):
+                self._replay_framed_log()
+            else:
+                self._replay_raw_log()
+        except _ReplayStopped:
+            print("Log replay stopped.")
         except FileNotFoundError:
             print(f"Log file {self.log_filename} not found.")
         except Exception as e:
             print(f"Error replaying log file: {e}")
+
+    def _paced(self):
+        return self.replay and self.speed > 0
+
+    def _replay_raw_log(self):
+        """
+        生のMAVLinkバイト列のログを再生（メッセージの time_usec を基準に待つ）
+        """
+        batch = []
+        prev_timestamp = None
+        with open(self.log_filename, "rb") as log_file:
+            while chunk := log_file.read(RAW_READ_CHUNK_SIZE):
+                msgs = self.mavlink_connection.parse_buffer(chunk)
+                if not msgs:
+                    continue
+                recv_time_ns = time.perf_counter_ns()
+                for msg in msgs:
+                    # タイムスタンプ処理
+                    if self._paced() and hasattr(msg, 'time_usec'):
+                        current_timestamp = msg.time_usec / 1e6  # マイクロ秒から秒に変換
+                        if prev_timestamp is not None:
+                            sleep_time = (current_timestamp - prev_timestamp) / self.speed
+                            if sleep_time > MIN_SLEEP_SEC:
+                                self._flush(batch)
+                                time.sleep(sleep_time)
+                        prev_timestamp = current_timestamp
+
+                    batch.append(MavlinkMessage(
+                        ip_addr="127.0.0.1",  # ログ再生では固定値
+                        port=0,              # ログ再生ではポート番号は不要
+                        msg_type=msg.get_type(),
+                        msg_obj=msg,
+                        recv_time_ns=recv_time_ns,
+                    ))
+                    if len(batch) >= self.batch_size:
+                        self._flush(batch)
+        self._flush(batch)
+
+    def _replay_framed_log(self):
+        """
+        フレーム形式のログをメモリマップして再生（受信時刻を基準に待つ）
+        """
+        reader = FramedLogReader(self.log_filename)
+        try:
+            log_start_usec = reader.start_time_usec()
+            if log_start_usec is None:
+                return
+            offset = None
+            if self.start_time_sec > 0:
+                offset = reader.seek_offset(log_start_usec + int(self.start_time_sec * 1e6))
+
+            parsers = {}
+            batch = []
+            base_usec = None
+            wall_start = time.monotonic()
+            for recv_time_usec, port, packet in reader.records(offset):
+                if base_usec is None:
+                    base_usec = recv_time_usec
+                if self._paced():
+                    # 再生開始からの経過時間に合わせる（スリープ誤差が累積しない）
+                    wait = (recv_time_usec - base_usec) / 1e6 / self.speed - (time.monotonic() - wall_start)
+                    if wait > MIN_SLEEP_SEC:
+                        self._flush(batch)
+                        time.sleep(wait)
+
+                parser = parsers.get(port)
+                if parser is None:
+                    parser = mavutil.mavlink.MAVLink(None)
+                    parser.robust_parsing = True
+                    parsers[port] = parser
+                msgs = parser.parse_buffer(packet)
+                if not msgs:
+                    continue
+                ip_addr = self.ip_addr_map.get(port, "127.0.0.1")
+                recv_time_ns = time.perf_counter_ns()
+                for msg in msgs:
+                    batch.append(MavlinkMessage(
+                        ip_addr=ip_addr,
+                        port=port,
+                        msg_type=msg.get_type(),
+                        msg_obj=msg,
+                        recv_time_ns=recv_time_ns,
+                    ))
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+            self._flush(batch)
+        finally:
+            reader.close()
+
+    def _flush(self, batch):
+        if batch:
+            # 受信と異なり、キューが一杯でも古いメッセージを破棄せずに取り出されるのを待つ
+            self.message_queue.enqueue_many(batch, wait=True, stop_event=self.stop_event)
+            batch.clear()
+            if self.stop_event.is_set():
+                raise _ReplayStopped()
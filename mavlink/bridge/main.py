@@ -1,14 +1,25 @@
 import argparse
+import socket
 import threading
+import time
 from pymavlink import mavutil
 from msg.mavlink_message import MavlinkMessage
 from msg.message_queue import MessageQueue
 from log.log_replay import LogReplay
+from log.framed_log import FramedLogWriter
 from comm.udp_receiver import UdpReceiver
+from comm.udp_sender import UdpSendLink
+from comm.udp_discovery_receiver import UdpDiscoveryReceiver
 from msg.pdu_message_convertor import PduMessageConvertor
 from hako_bridge.pdu_writer import HakoBridgePduWriter
-from registry.conv import setup_converters
+from hako_bridge.pdu_downlink import HakoBridgePduDownlink
+from registry.conv import DEFAULT_CONVERTERS, setup_converters
+from registry.downlink import setup_downlink
 from registry.listen import setup_listen_msgs
+from registry.vehicle import VehicleRegistry
+from shard.sharded_bridge import ShardedBridge
+from telemetry.bridge_telemetry import BridgeTelemetry
+from telemetry.stats_server import StatsServer
 import hakopy
 import json
 
@@ -17,31 +28,70 @@ class BridgeContext:
     def __init__(self, args):
         self.pdu_config = args.pdu_config
         self.delta_time_usec = 20 * 1000
-        self.message_queue = MessageQueue(max_size=100)
+        self.telemetry = None
+        if args.stats_interval > 0 or args.stats_port:
+            self.telemetry = BridgeTelemetry()
+        self.stats_interval = args.stats_interval
+        self.stats_server = None
+        self.message_queue = MessageQueue(max_size=100, telemetry=self.telemetry)
         self.mavlink_connection = mavutil.mavlink.MAVLink(None)
         self.threads = []
         self.conv_registry = setup_converters(args.comm_config)
-        self.list_registry = setup_listen_msgs()
-        self.message_queue.set_listened_types(self.list_registry.msgs)
+        self.list_registry = setup_listen_msgs(self.conv_registry)
         self.convertor = PduMessageConvertor(args.mavlink_config, args.pdu_config, args.comm_config)
+        self.vehicle_registry = None
+        self.next_evict_time = 0.0
+        comm_config = self.convertor.comm_config
+        if "discovery" in comm_config:
+            self.vehicle_registry = VehicleRegistry(
+                comm_config["discovery"],
+                comm_config["vehicles"],
+                [robot["name"] for robot in self.convertor.pdu_config["robots"]],
+                self.conv_registry,
+                comm_config.get("converters", DEFAULT_CONVERTERS),
+            )
+            # 設定の誤りは受信スレッドの中ではなく、起動時にエラーにする
+            self.vehicle_registry.validate()
+            for msg_type in self.vehicle_registry.msg_types():
+                self.list_registry.register(msg_type)
+        self.message_queue.set_listened_types(self.list_registry.msgs)
+        self.pdu_writer = None
+        self.sharded_bridge = None
+        self.recorder = None
+        self.downlink_routes = setup_downlink(args.comm_config, args.pdu_config)
+        self.downlink_links = {}
+        self.downlink = None
+        self.log_replay = None
 
-def start_log_replay(context, log_filename):
+def start_log_replay(context, log_filename, speed=1.0, start_time_sec=0.0):
+    # フレーム形式のログは受信ポート番号を記録しているため、ポートから送信元IPアドレスを復元する
+    ip_addr_map = {
+        int(vehicle_info["my_port"]): vehicle_info["ip_address"]
+        for vehicle_info in context.convertor.comm_config["vehicles"].values()
+    }
     log_replay = LogReplay(
         log_filename=log_filename,
         mavlink_connection=context.mavlink_connection,
         message_queue=context.message_queue,
         replay=True,
+        speed=speed,
+        start_time_sec=start_time_sec,
+        ip_addr_map=ip_addr_map,
     )
+    context.log_replay = log_replay
     log_replay.replay_log()
 
-def start_udp_receiver(context, udp_ip, udp_port):
-    udp_receiver = UdpReceiver(
+def create_udp_receiver(context, udp_ip, udp_port):
+    # 受信スレッド間でパーサの状態が混ざらないよう、ポート毎にパーサを用意する
+    mavlink_connection = mavutil.mavlink.MAVLink(None)
+    mavlink_connection.robust_parsing = True
+    return UdpReceiver(
         udp_ip=udp_ip,
         udp_port=udp_port,
-        mavlink_connection=context.mavlink_connection,
+        mavlink_connection=mavlink_connection,
         message_queue=context.message_queue,
+        recorder=context.recorder,
     )
-    udp_receiver.start_receiving()
 
 def my_on_initialize(context):
     return 0
@@ -49,26 +99,112 @@ def my_on_initialize(context):
 def my_on_reset(context):
     return 0
 
+def convert_messages(context, pdu_writer):
+    """
+    1周期分のメッセージを変換して書き込み待ちに登録する
+    :return: 変換したメッセージの受信時刻のリスト（計測無効時は None）
+    """
+    telemetry = context.telemetry
+    messages = context.message_queue.dequeue_all()
+    if telemetry is None:
+        for mavlink_message in messages:
+            try:
+                pdu_message = context.convertor.convert(mavlink_message, context.conv_registry)
+                if pdu_message is None:
+                    continue
+                #print(f"Sending PDU message: {pdu_message}")
+                pdu_writer.stage_pdu_message(pdu_message)
+            except ValueError as e:
+                print(f"Conversion error: {e}")
+        return None
+
+    dequeue_time_ns = time.perf_counter_ns()
+    queue_latencies = []
+    convert_latencies = []
+    recv_times = []
+    for mavlink_message in messages:
+        recv_time_ns = mavlink_message.recv_time_ns
+        if recv_time_ns is not None:
+            queue_latencies.append(dequeue_time_ns - recv_time_ns)
+        start_ns = time.perf_counter_ns()
+        try:
+            pdu_message = context.convertor.convert(mavlink_message, context.conv_registry)
+        except ValueError as e:
+            print(f"Conversion error: {e}")
+            telemetry.count(mavlink_message.msg_type, "failed")
+            continue
+        if pdu_message is None:
+            telemetry.count(mavlink_message.msg_type, "filtered")
+            continue
+        pdu_writer.stage_pdu_message(pdu_message)
+        convert_latencies.append(time.perf_counter_ns() - start_ns)
+        telemetry.count(mavlink_message.msg_type, "converted")
+        if recv_time_ns is not None:
+            recv_times.append(recv_time_ns)
+    telemetry.record_many("queue", queue_latencies)
+    telemetry.record_many("convert", convert_latencies)
+    return recv_times
+
+def write_pdus(context, pdu_writer, recv_times):
+    """
+    書き込み待ちのPDUをまとめて書き込み、計測有効時はレイテンシを記録する
+    """
+    telemetry = context.telemetry
+    if telemetry is None:
+        pdu_writer.write_many()
+        return
+    start_ns = time.perf_counter_ns()
+    pdu_writer.write_many()
+    end_ns = time.perf_counter_ns()
+    telemetry.record("write", end_ns - start_ns)
+    telemetry.record_many("end_to_end", [end_ns - recv_time_ns for recv_time_ns in recv_times])
+    telemetry.set_gauge("queue_size", context.message_queue.size())
+    if context.sharded_bridge is not None:
+        telemetry.set_gauge("ring_drops", context.sharded_bridge.drops())
+    if context.stats_interval > 0 and time.monotonic() - telemetry.last_summary_time >= context.stats_interval:
+        print(telemetry.summary_line())
+
+def evict_idle_vehicles(context):
+    """
+    一定時間受信のない動的Vehicleを1秒毎に削除する
+    """
+    now = time.monotonic()
+    if now < context.next_evict_time:
+        return
+    context.next_evict_time = now + 1.0
+    context.vehicle_registry.evict_idle(now)
+    if context.telemetry is not None:
+        context.telemetry.set_gauge("vehicles", len(context.vehicle_registry.vehicles()))
+
 def my_on_manual_timing_control(arg):
-    pdu_writer = HakoBridgePduWriter(my_context.pdu_config)
+    if my_context.pdu_writer is None:
+        my_context.pdu_writer = HakoBridgePduWriter(my_context.pdu_config)
+    pdu_writer = my_context.pdu_writer
     try:
         while True:
-            if not my_context.message_queue.is_empty():
-                mavlink_message = my_context.message_queue.dequeue()
-                #print(f"queue len: {my_context.message_queue.size()}")
-                try:
-                    pdu_message = my_context.convertor.create_pdu(mavlink_message)
-                    if my_context.conv_registry.get_converter(pdu_message.msg_type):
-                        pdu_message = my_context.conv_registry.get_converter(pdu_message.msg_type).convert(pdu_message)
-                    pdu_message = my_context.convertor.compile_pdu(pdu_message)
-                    #print(f"Sending PDU message: {pdu_message}")
-                    pdu_writer.write_pdu_message(pdu_message)
-                except ValueError as e:
-                    print(f"Conversion error: {e}")
+            # 1周期分のメッセージをまとめて変換し、PDUへの書き込みは最後に一括で行う
+            recv_times = convert_messages(my_context, pdu_writer)
+            if my_context.sharded_bridge is not None:
+                my_context.sharded_bridge.drain(pdu_writer.stage_pdu, recv_times)
+            write_pdus(my_context, pdu_writer, recv_times)
+            if my_context.vehicle_registry is not None:
+                evict_idle_vehicles(my_context)
+            if my_context.downlink_links:
+                if my_context.downlink is None:
+                    my_context.downlink = HakoBridgePduDownlink(
+                        my_context.downlink_routes, pdu_writer, my_context.downlink_links)
+                my_context.downlink.tick()
+                if my_context.telemetry is not None:
+                    my_context.telemetry.set_gauge("downlink_sent", my_context.downlink.sent_count)
             if not hakopy.usleep(my_context.delta_time_usec):
                 break
     except KeyboardInterrupt:
         print("Terminating program...")
+        if my_context.sharded_bridge is not None:
+            my_context.sharded_bridge.stop()
+        if my_context.log_replay is not None:
+            # 再生スレッドがキューの空きを待ったままにならないようにする
+            my_context.log_replay.stop()
         for thread in my_context.threads:
             thread.join()
     return 0
@@ -78,11 +214,23 @@ def parse_arguments():
     parser.add_argument("--mavlink-config", required=True, help="Path to the mavlink-custom.json configuration file.")
     parser.add_argument("--pdu-config", required=True, help="Path to the pdu-custom.json configuration file.")
     parser.add_argument("--comm-config", required=True, help="Path to the comm_config.json configuration file.")
+    parser.add_argument("--stats-interval", type=float, default=0.0,
+                        help="Print a latency/throughput summary line every N seconds (0: disabled).")
+    parser.add_argument("--stats-port", type=int, default=0,
+                        help="Serve latency/throughput statistics as JSON on http://127.0.0.1:<port>/stats (0: disabled).")
     subparsers = parser.add_subparsers(dest="mode", required=True)
     log_parser = subparsers.add_parser("log", help="Replay a MAVLink log file.")
     log_parser.add_argument("log_file", type=str, help="Path to the MAVLink log file.")
+    log_parser.add_argument("--speed", type=float, default=1.0,
+                            help="Replay speed factor (0: as fast as possible).")
+    log_parser.add_argument("--start", type=float, default=0.0,
+                            help="Start position in seconds from the beginning of a framed log.")
     udp_parser = subparsers.add_parser("udp", help="Receive MAVLink messages over UDP.")
     udp_parser.add_argument("udp_address", type=str, help="IP and port to bind to, in the format <ip>.")
+    udp_parser.add_argument("--shards", type=int, default=0,
+                            help="Number of worker processes to partition vehicles across (0: receive in this process).")
+    udp_parser.add_argument("--record", type=str, default=None,
+                            help="Record received packets to this file in the framed log format.")
     return parser.parse_args()
 
 def main():
@@ -91,25 +239,58 @@ def main():
     my_context = BridgeContext(args)
 
     hakopy.conductor_start(my_context.delta_time_usec, 100*1000)
+
+    if args.stats_port:
+        my_context.stats_server = StatsServer(my_context.telemetry, args.stats_port)
+        my_context.stats_server.start()
     
     if args.mode == "log":
+        if my_context.downlink_routes:
+            print("INFO: downlink is disabled in log replay mode.")
         log_thread = threading.Thread(
             target=start_log_replay,
-            args=(my_context, args.log_file)
+            args=(my_context, args.log_file, args.speed, args.start)
         )
         my_context.threads.append(log_thread)
     elif args.mode == "udp":
         with open(args.comm_config, 'r') as f:
             comm_config = json.load(f)
+        if args.shards > 0:
+            vehicle_ports = {
+                vehicle_name: int(vehicle_info["my_port"])
+                for vehicle_name, vehicle_info in comm_config["vehicles"].items()
+            }
+            my_context.sharded_bridge = ShardedBridge(
+                args.udp_address, vehicle_ports, args.shards,
+                args.mavlink_config, args.pdu_config, args.comm_config,
+                record_filename=args.record, telemetry=my_context.telemetry)
+            my_context.sharded_bridge.start()
+            if my_context.downlink_routes:
+                # 受信ソケットはワーカプロセスが持つため、送信用のソケットを別に用意する
+                send_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                for vehicle_name, vehicle_info in comm_config["vehicles"].items():
+                    my_context.downlink_links[vehicle_name] = UdpSendLink(
+                        (vehicle_info["ip_address"], int(vehicle_info["port"])), sock=send_sock)
+        else:
+            if args.record:
+                my_context.recorder = FramedLogWriter(args.record)
             for vehicle_name, vehicle_info in comm_config["vehicles"].items():
                 #udp_ip, udp_port = args.udp_address.split(":")
                 udp_ip = args.udp_address
                 udp_port = comm_config["vehicles"][vehicle_name]["my_port"]
-                udp_thread = threading.Thread(
-                    target=start_udp_receiver,
-                    args=(my_context, udp_ip, int(udp_port))
-                )
+                udp_receiver = create_udp_receiver(my_context, udp_ip, int(udp_port))
+                udp_thread = threading.Thread(target=udp_receiver.start_receiving)
                 my_context.threads.append(udp_thread)
+                if my_context.downlink_routes:
+                    # 受信ソケットから送信し、Vehicle から見た送信元ポートを揃える
+                    my_context.downlink_links[vehicle_name] = UdpSendLink(
+                        (vehicle_info["ip_address"], int(vehicle_info["port"])), receiver=udp_receiver)
+
+        if my_context.vehicle_registry is not None:
+            discovery_receiver = UdpDiscoveryReceiver(
+                args.udp_address, my_context.vehicle_registry, my_context.message_queue,
+                recorder=my_context.recorder)
+            my_context.threads.append(threading.Thread(target=discovery_receiver.start_receiving))
 
     for thread in my_context.threads:
         thread.start()
@@ -135,6 +316,12 @@ def main():
 
     ret = hakopy.start()
     print(f"INFO: hako_asset_start() returns {ret}")
+    if my_context.sharded_bridge is not None:
+        my_context.sharded_bridge.stop()
+    if my_context.recorder is not None:
+        my_context.recorder.flush()
+    if my_context.stats_server is not None:
+        my_context.stats_server.stop()
 
 if __name__ == "__main__":
     main()
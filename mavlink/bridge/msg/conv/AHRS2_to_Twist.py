@@ -1,6 +1,9 @@
 import math
 from msg.pdu_message import PduMessage
 
+# 地球の半径（平均半径）: メートル
+EARTH_RADIUS = 6378137.0
+
 class AHRS2PrivatePosition:
     def __init__(self, ref_lat: int, ref_lng: int, ref_alt: float,is_fixed_altitude: bool, fixed_altitude: float):
         """
@@ -14,6 +17,15 @@ class AHRS2PrivatePosition:
         self.ref_alt = ref_alt
         self.is_fixed_altitude = is_fixed_altitude
         self.fixed_altitude = fixed_altitude
+        # 変換毎に再計算しないよう、度単位の基準値を事前計算しておく
+        self.ref_lat_deg = ref_lat / 1E7
+        self.ref_lng_deg = ref_lng / 1E7
+        # 高速変換パス用に出力先のTwistを事前に確保しておく
+        self.twist_data = {
+            "linear": {"x": 0.0, "y": 0.0, "z": 0.0},
+            "angular": {"x": 0.0, "y": 0.0, "z": 0.0},
+        }
+        self.pdu_message = None
         print(f"ref_lat: {ref_lat}, ref_lng: {ref_lng}, ref_alt: {ref_alt}, is_fixed_altitude: {is_fixed_altitude}, fixed_altitude: {fixed_altitude}")
 
 class AHRS2ToTwistConvertor:
@@ -27,7 +39,38 @@ class AHRS2ToTwistConvertor:
         :param ref_lng: 基準経度 (度)
         :param ref_alt: 基準高度 (メートル)
         """
-        self.map_for_initial_position[robot_name] = AHRS2PrivatePosition(ref_lat, ref_lng, ref_alt, is_fixed_altitude, fixed_altitude)
+        position = AHRS2PrivatePosition(ref_lat, ref_lng, ref_alt, is_fixed_altitude, fixed_altitude)
+        position.pdu_message = PduMessage(
+            robot_name=robot_name,
+            msg_type="geometry_msgs/Twist",
+            data=position.twist_data,
+        )
+        self.map_for_initial_position[robot_name] = position
+
+    def configure(self, robot_name: str, vehicle_info: dict, params: dict):
+        """
+        comm_config.json のVehicle定義から基準位置を登録
+        :param robot_name: ロボット名
+        :param vehicle_info: comm_config.json の vehicles 配下のVehicle定義
+        :param params: コンバータ定義の params（未使用）
+        """
+        initial_pos = vehicle_info["initial_position"]
+        if "fixed_altitude" in initial_pos:
+            self.addInitialPosition(
+                robot_name=robot_name,
+                ref_lat=initial_pos["latitude"],
+                ref_lng=initial_pos["longitude"],
+                ref_alt=initial_pos["altitude"],
+                is_fixed_altitude=True,
+                fixed_altitude=initial_pos["fixed_altitude"]["value"])
+        else:
+            self.addInitialPosition(
+                robot_name=robot_name,
+                ref_lat=initial_pos["latitude"],
+                ref_lng=initial_pos["longitude"],
+                ref_alt=initial_pos["altitude"],
+                is_fixed_altitude=False,
+                fixed_altitude=0)
 
     def _calculate_relative_position(self, robot_name, lat, lng, altitude):
         """
@@ -39,32 +82,30 @@ class AHRS2ToTwistConvertor:
         """
         # 緯度経度のスケール変換 (基準値も同じスケールで扱う)
         #print(f"lat: {lat}, lng: {lng}")
+        initial_position = self.map_for_initial_position[robot_name]
         lat = lat / 1E7
         lng = lng / 1E7
-        ref_lat = self.map_for_initial_position[robot_name].ref_lat / 1E7
-        ref_lng = self.map_for_initial_position[robot_name].ref_lng / 1E7
+        ref_lat = initial_position.ref_lat_deg
+        ref_lng = initial_position.ref_lng_deg
 
         # デバッグ出力
         #print(f"lat: {lat}, lng: {lng}, altitude: {altitude}")
         #print(f"ref_lat: {ref_lat}, ref_lng: {ref_lng}")
         #print(f"delta_lat: {lat - ref_lat}, delta_lng: {lng - ref_lng}")
 
-        # 地球の半径（平均半径）: メートル
-        earth_radius = 6378137.0
-
         # 緯度と経度の差分 (ラジアン)
         delta_lat = math.radians(lat - ref_lat)
         delta_lng = math.radians(lng - ref_lng)
         mean_lat = math.radians((lat + ref_lat) / 2.0)
 
         # メートル単位での相対位置
-        x = earth_radius * delta_lat                      # 緯度方向
-        y = -earth_radius * delta_lng * math.cos(mean_lat)  # 経度方向
-        if self.map_for_initial_position[robot_name].is_fixed_altitude:
-            z = self.map_for_initial_position[robot_name].fixed_altitude
+        x = EARTH_RADIUS * delta_lat                      # 緯度方向
+        y = -EARTH_RADIUS * delta_lng * math.cos(mean_lat)  # 経度方向
+        if initial_position.is_fixed_altitude:
+            z = initial_position.fixed_altitude
             #print(f"Fixed Altitude: {z}")
         else:
-            z = altitude - self.map_for_initial_position[robot_name].ref_alt  # 高度方向
+            z = altitude - initial_position.ref_alt  # 高度方向
 
         # デバッグ出力
         #print(f"Relative Position: x={x}, y={y}, z={z}")
@@ -114,3 +155,37 @@ class AHRS2ToTwistConvertor:
             msg_type="geometry_msgs/Twist",
             data=twist_data,
         )
+
+    def convert_msg(self, robot_name: str, msg) -> PduMessage:
+        """
+        AHRS2をTwistに変換する高速パス
+        pymavlinkのメッセージオブジェクトから直接フィールドを読み取り、
+        ロボット毎に事前確保したPduMessageへ書き込む（戻り値は毎回同じオブジェクト）
+        :param robot_name: ロボット名
+        :param msg: pymavlinkのAHRS2メッセージオブジェクト
+        :return: Twistデータを含むPduMessage
+        """
+        initial_position = self.map_for_initial_position.get(robot_name)
+        if initial_position is None:
+            raise ValueError(f"Initial position is not registered for robot {robot_name}")
+
+        lat = msg.lat / 1E7
+        ref_lat = initial_position.ref_lat_deg
+        delta_lat = math.radians(lat - ref_lat)
+        delta_lng = math.radians(msg.lng / 1E7 - initial_position.ref_lng_deg)
+        mean_lat = math.radians((lat + ref_lat) / 2.0)
+
+        linear = initial_position.twist_data["linear"]
+        linear["x"] = EARTH_RADIUS * delta_lat
+        linear["y"] = -EARTH_RADIUS * delta_lng * math.cos(mean_lat)
+        if initial_position.is_fixed_altitude:
+            linear["z"] = initial_position.fixed_altitude
+        else:
+            linear["z"] = msg.altitude - initial_position.ref_alt
+
+        # MAVLink座標系からROS座標系への変換（ピッチ・ヨーの符号を反転）
+        angular = initial_position.twist_data["angular"]
+        angular["x"] = msg.roll
+        angular["y"] = -msg.pitch
+        angular["z"] = -msg.yaw
+        return initial_position.pdu_message
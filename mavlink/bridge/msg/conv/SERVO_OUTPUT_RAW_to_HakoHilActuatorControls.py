@@ -5,7 +5,8 @@ class SERVO_OUTPUT_RAWToHakoHilActuatorControlsConvertor:
         """
         SERVO_OUTPUT_RAWからHakoHilActuatorControlsへのコンバータ
         """
-        pass  # 必要なら初期化処理を追加
+        # 高速変換パス用にロボット毎の出力先を事前確保する (robot_name -> PduMessage)
+        self.preallocated = {}
 
     def get_duty(self, pwm: float):
         if pwm < 1000.0:
@@ -49,3 +50,38 @@ class SERVO_OUTPUT_RAWToHakoHilActuatorControlsConvertor:
             msg_type="hako_mavlink_msgs/HakoHilActuatorControls",
             data=hako_hil_data,
         )
+
+    def _get_preallocated(self, robot_name: str) -> PduMessage:
+        pdu_message = self.preallocated.get(robot_name)
+        if pdu_message is None:
+            pdu_message = PduMessage(
+                robot_name=robot_name,
+                msg_type="hako_mavlink_msgs/HakoHilActuatorControls",
+                data={
+                    "time_usec": 0,
+                    "controls": [0.0] * 16,
+                    "mode": 0,
+                    "flags": 0,
+                },
+            )
+            self.preallocated[robot_name] = pdu_message
+        return pdu_message
+
+    def convert_msg(self, robot_name: str, msg) -> PduMessage:
+        """
+        SERVO_OUTPUT_RAWをHakoHilActuatorControlsに変換する高速パス
+        pymavlinkのメッセージオブジェクトから直接フィールドを読み取り、
+        ロボット毎に事前確保したPduMessageへ書き込む（戻り値は毎回同じオブジェクト）
+        :param robot_name: ロボット名
+        :param msg: pymavlinkのSERVO_OUTPUT_RAWメッセージオブジェクト
+        :return: HakoHilActuatorControlsデータを含むPduMessage
+        """
+        pdu_message = self._get_preallocated(robot_name)
+        data = pdu_message.data
+        controls = data["controls"]
+        for i, pwm in enumerate((msg.servo1_raw, msg.servo2_raw, msg.servo3_raw, msg.servo4_raw,
+                                 msg.servo5_raw, msg.servo6_raw, msg.servo7_raw, msg.servo8_raw)):
+            controls[i] = 0 if pwm < 1000.0 else (pwm - 1000.0) / 1000.0
+        data["time_usec"] = msg.time_usec
+        data["mode"] = msg.port
+        return pdu_message
@@ -0,0 +1,52 @@
+import math
+from pymavlink import mavutil
+
+
+class DisturbanceToSimWindEncoder:
+    def __init__(self):
+        """
+        Disturbance の風速を ArduPilot SITL の SIM_WIND_* パラメータ（PARAM_SET）へ変換するエンコーダ
+        """
+        self.target_system = 1
+        self.target_component = 1
+
+    def configure(self, robot_name: str, vehicle_info: dict, params: dict):
+        """
+        Vehicle 定義とパラメータから設定を行う
+        :param robot_name: ロボット名
+        :param vehicle_info: comm_config.json の Vehicle 定義
+        :param params: downlink 定義の params
+        """
+        self.target_system = params.get("target_system", self.target_system)
+        self.target_component = params.get("target_component", self.target_component)
+
+    def _param_set(self, name, value):
+        return mavutil.mavlink.MAVLink_param_set_message(
+            target_system=self.target_system,
+            target_component=self.target_component,
+            param_id=name.encode("ascii"),
+            param_value=value,
+            param_type=mavutil.mavlink.MAV_PARAM_TYPE_REAL32,
+        )
+
+    def encode(self, robot_name: str, data: dict):
+        """
+        Disturbance の風速（ROS座標系、吹いていく方向）を SIM_WIND_SPD / SIM_WIND_DIR / SIM_WIND_DIR_Z に変換
+        :param robot_name: ロボット名
+        :param data: Disturbance の PDU データ
+        :return: MAVLink メッセージのリスト
+        """
+        wind = data["d_wind"]["value"]
+        north = wind["x"]
+        east = -wind["y"]
+        up = wind["z"]
+        horizontal = math.hypot(north, east)
+        speed = math.sqrt(horizontal * horizontal + up * up)
+        # SIM_WIND_DIR は風が吹いてくる方位（度）
+        direction = math.degrees(math.atan2(-east, -north)) % 360.0 if horizontal > 0 else 0.0
+        direction_z = math.degrees(math.atan2(up, horizontal)) if speed > 0 else 0.0
+        return [
+            self._param_set("SIM_WIND_SPD", speed),
+            self._param_set("SIM_WIND_DIR", direction),
+            self._param_set("SIM_WIND_DIR_Z", direction_z),
+        ]
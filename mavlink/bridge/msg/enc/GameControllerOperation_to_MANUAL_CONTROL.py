@@ -0,0 +1,56 @@
+from pymavlink import mavutil
+
+# GameControllerOperation の axis 番号（drone_api/rc と同じ割り当て）
+DEFAULT_AXIS_MAP = {
+    "r": 0,  # ヨー
+    "z": 1,  # 上昇・下降
+    "y": 2,  # ロール
+    "x": 3,  # ピッチ
+}
+
+
+class GameControllerOperationToManualControlEncoder:
+    def __init__(self):
+        """
+        GameControllerOperation から MANUAL_CONTROL へのエンコーダ
+        """
+        self.target_system = 1
+        self.axis_map = dict(DEFAULT_AXIS_MAP)
+
+    def configure(self, robot_name: str, vehicle_info: dict, params: dict):
+        """
+        Vehicle 定義とパラメータから設定を行う
+        :param robot_name: ロボット名
+        :param vehicle_info: comm_config.json の Vehicle 定義
+        :param params: downlink 定義の params
+        """
+        self.target_system = params.get("target_system", self.target_system)
+        self.axis_map.update(params.get("axis_map", {}))
+
+    def _axis(self, axis, name):
+        index = self.axis_map[name]
+        if index >= len(axis):
+            return 0.0
+        return max(-1.0, min(1.0, float(axis[index])))
+
+    def encode(self, robot_name: str, data: dict):
+        """
+        GameControllerOperation を MANUAL_CONTROL に変換
+        スティックは上・前方向が負の値（pygame と同じ）として扱う
+        :param robot_name: ロボット名
+        :param data: GameControllerOperation の PDU データ（axis, button）
+        :return: MAVLink メッセージのリスト
+        """
+        axis = data["axis"]
+        buttons = 0
+        for i, pressed in enumerate(data.get("button", [])[:16]):
+            if pressed:
+                buttons |= 1 << i
+        return [mavutil.mavlink.MAVLink_manual_control_message(
+            target=self.target_system,
+            x=int(-self._axis(axis, "x") * 1000),
+            y=int(self._axis(axis, "y") * 1000),
+            z=int(500 - self._axis(axis, "z") * 500),  # 0〜1000（500が中立）
+            r=int(self._axis(axis, "r") * 1000),
+            buttons=buttons,
+        )]
@@ -1,16 +1,36 @@
 class MavlinkMessage:
-    def __init__(self, ip_addr, port, msg_type, msg_data):
+    def __init__(self, ip_addr, port, msg_type, msg_data=None, msg_obj=None, recv_time_ns=None, robot_name=None):
         """
         MavlinkMessageオブジェクト
         :param ip_addr: 送信元または受信先のIPアドレス
         :param port: 送信元または受信先のポート番号
         :param msg_type: メッセージタイプ（例: "GLOBAL_POSITION_INT", "AHRS2"）
-        :param msg_data: メッセージデータ（辞書形式）
+        :param msg_data: メッセージデータ（辞書形式）。省略時は msg_obj から必要になった時点で生成する
+        :param msg_obj: pymavlinkのメッセージオブジェクト（高速変換パスで直接参照する）
+        :param recv_time_ns: 受信時刻（time.perf_counter_ns()、レイテンシ計測用）
+        :param robot_name: 受信時に特定済みのロボット名（動的に参加したVehicle。省略時はIPアドレスとポートから特定する）
         """
         self.ip_addr = ip_addr
         self.port = port
         self.msg_type = MavlinkMessage.get_pdu_msg_type(msg_type)
-        self.msg_data = msg_data
+        self.msg_obj = msg_obj
+        self._msg_data = msg_data
+        self.recv_time_ns = recv_time_ns
+        self.robot_name = robot_name
+
+    @property
+    def msg_data(self):
+        """
+        メッセージデータ（辞書形式）を返す
+        msg_obj のみ保持している場合は、初回アクセス時に to_dict() で生成する
+        """
+        if self._msg_data is None and self.msg_obj is not None:
+            self._msg_data = self.msg_obj.to_dict()
+        return self._msg_data
+
+    @msg_data.setter
+    def msg_data(self, value):
+        self._msg_data = value
 
     @staticmethod
     def get_pdu_msg_type(msg_type):
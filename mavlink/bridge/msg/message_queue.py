@@ -1,15 +1,22 @@
 import queue
 import threading
 
+# enqueue_many(wait=True) で空きを待つ間に停止要求を確認する間隔（秒）
+WAIT_POLL_SEC = 0.1
+
 class MessageQueue:
-    def __init__(self, max_size=100):
+    def __init__(self, max_size=100, telemetry=None):
         """
         メッセージキュー
         :param max_size: キューの最大サイズ（デフォルト: 100）
+        :param telemetry: 受信・破棄数を記録する BridgeTelemetry（省略時は記録しない）
         """
         self.queue = queue.Queue(maxsize=max_size)
         self.lock = threading.Lock()
+        # 取り出し時に通知し、空きを待つ投入側（ログ再生）を起こす
+        self.not_full = threading.Condition(self.lock)
         self.listened_types = set()  # リッスンするメッセージタイプを保持するセット
+        self.telemetry = telemetry
 
     def set_listened_types(self, types):
         """
@@ -25,15 +32,46 @@ class MessageQueue:
         :param message: MavlinkMessageオブジェクト
         """
         with self.lock:
-            if message.msg_type not in self.listened_types:
-                return  # リッスン対象でないメッセージは無視
+            self._put(message)
 
-            try:
-                self.queue.put(message, block=False)
-            except queue.Full:
-                #print("Queue is full! Oldest message will be discarded.")
-                self.queue.get()  # 古いメッセージを削除
-                self.queue.put(message, block=False)
+    def enqueue_many(self, messages, wait=False, stop_event=None):
+        """
+        複数のメッセージをまとめてキューに追加（ロックの取得は1回のみ）
+        :param messages: MavlinkMessageオブジェクトのリスト
+        :param wait: Trueの場合は古いメッセージを破棄せず、キューに空きができるまで待つ（ログ再生用）
+        :param stop_event: wait=True で待っている間に停止を通知する threading.Event（省略可）
+        :return: 追加したメッセージ数（リッスン対象外で無視したものを含む。停止した場合は残りを追加しない）
+        """
+        count = 0
+        with self.lock:
+            for message in messages:
+                if wait:
+                    while message.msg_type in self.listened_types and self.queue.full():
+                        if stop_event is not None and stop_event.is_set():
+                            return count
+                        self.not_full.wait(WAIT_POLL_SEC)
+                self._put(message)
+                count += 1
+        return count
+
+    def _put(self, message):
+        # self.lock を取得した状態で呼び出すこと
+        telemetry = self.telemetry
+        if telemetry is not None:
+            telemetry.count(message.msg_type, "received")
+        if message.msg_type not in self.listened_types:
+            # リッスン対象でないメッセージは無視
+            if telemetry is not None:
+                telemetry.count(message.msg_type, "filtered")
+            return
+        try:
+            self.queue.put(message, block=False)
+        except queue.Full:
+            #print("Queue is full! Oldest message will be discarded.")
+            dropped = self.queue.get()  # 古いメッセージを削除
+            if telemetry is not None:
+                telemetry.count(dropped.msg_type, "dropped")
+            self.queue.put(message, block=False)
 
     def dequeue(self):
         """
@@ -42,10 +80,28 @@ class MessageQueue:
         """
         with self.lock:
             try:
-                return self.queue.get(block=False)
+                message = self.queue.get(block=False)
             except queue.Empty:
                 print("Queue is empty!")
                 return None
+            self.not_full.notify_all()
+            return message
+
+    def dequeue_all(self):
+        """
+        キューに溜まっているメッセージをまとめて取得
+        :return: MavlinkMessageオブジェクトのリスト（空の場合は空リスト）
+        """
+        messages = []
+        with self.lock:
+            while True:
+                try:
+                    messages.append(self.queue.get(block=False))
+                except queue.Empty:
+                    break
+            if messages:
+                self.not_full.notify_all()
+        return messages
 
     def size(self):
         """
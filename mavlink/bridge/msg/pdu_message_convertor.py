@@ -21,6 +21,15 @@ class PduMessageConvertor:
         with open(comm_config_path, "r") as comm_file:
             self.comm_config = json.load(comm_file)
 
+        # メッセージ毎の線形探索を避けるため、ルーティング表を事前に構築する
+        self.robot_names = {}
+        for robot_name, robot_info in self.comm_config["vehicles"].items():
+            self.robot_names.setdefault((robot_info["ip_address"], robot_info["port"]), robot_name)
+        self.pdu_infos = {}
+        for robot in self.pdu_config["robots"]:
+            for reader in robot["shm_pdu_readers"]:
+                self.pdu_infos.setdefault((robot["name"], reader["type"]), (reader["channel_id"], reader["pdu_size"]))
+
     def get_robot_name(self, ip_addr, port):
         """
         IPアドレスとポートからロボット名を特定
@@ -28,10 +37,7 @@ class PduMessageConvertor:
         :param port: MAVLinkメッセージのポート番号
         :return: ロボット名
         """
-        for robot_name, robot_info in self.comm_config["vehicles"].items():
-            if robot_info["ip_address"] == ip_addr and robot_info["port"] == port:
-                return robot_name
-        return None
+        return self.robot_names.get((ip_addr, port))
 
     def get_pdu_info(self, robot_name, msg_type):
         """
@@ -41,12 +47,7 @@ class PduMessageConvertor:
         :return: チャネルID
         """
         #print(f"robot_name: {robot_name}, msg_type: {msg_type}")
-        for robot in self.pdu_config["robots"]:
-            if robot["name"] == robot_name:
-                for reader in robot["shm_pdu_readers"]:
-                    if reader["type"] ==  msg_type:
-                        return reader["channel_id"], reader["pdu_size"]
-        return None
+        return self.pdu_infos.get((robot_name, msg_type))
 
     def create_pdu(self, mavlink_message):
         """
@@ -77,10 +78,41 @@ class PduMessageConvertor:
         """
 
         # チャネルID と PDUサイズを取得
-        channel_id, pdu_size= self.get_pdu_info(pdu_message.robot_name, pdu_message.msg_type)
-        if channel_id is None:
+        pdu_info = self.get_pdu_info(pdu_message.robot_name, pdu_message.msg_type)
+        if pdu_info is None:
             raise ValueError(f"Cannot find channel ID for robot {pdu_message.robot_name} and message type {pdu_message.msg_type}")
 
+        channel_id, pdu_size = pdu_info
         pdu_message.channel_id = channel_id
         pdu_message.pdu_size = pdu_size
         return pdu_message
+
+    def convert(self, mavlink_message, conv_registry):
+        """
+        MavlinkMessageを書き込み可能なPduMessageに変換（コンバータ適用とチャネル解決を含む）
+        コンバータが高速パス(convert_msg)を持ち、pymavlinkのメッセージオブジェクトが
+        保持されている場合は辞書を経由せずに変換する
+        :param mavlink_message: MavlinkMessageオブジェクト
+        :param conv_registry: ConverterRegistryオブジェクト
+        :return: PduMessageオブジェクト（当該ロボットの変換対象でない場合はNone）
+        """
+        robot_name = mavlink_message.robot_name
+        if robot_name is None:
+            robot_name = self.get_robot_name(mavlink_message.ip_addr, mavlink_message.port)
+        if robot_name is None:
+            raise ValueError(f"Cannot identify robot for IP {mavlink_message.ip_addr} and port {mavlink_message.port}")
+        if not conv_registry.has_route(robot_name, mavlink_message.msg_type):
+            return None
+
+        converter = conv_registry.get_converter(mavlink_message.msg_type, robot_name)
+        if converter is not None and mavlink_message.msg_obj is not None and hasattr(converter, "convert_msg"):
+            pdu_message = converter.convert_msg(robot_name, mavlink_message.msg_obj)
+        else:
+            pdu_message = PduMessage(
+                robot_name=robot_name,
+                msg_type=mavlink_message.msg_type,
+                data=mavlink_message.msg_data
+            )
+            if converter is not None:
+                pdu_message = converter.convert(pdu_message)
+        return self.compile_pdu(pdu_message)
@@ -1,69 +1,156 @@
 from msg.mavlink_message import MavlinkMessage
-from msg.conv.AHRS2_to_Twist import AHRS2ToTwistConvertor
-from msg.conv.SERVO_OUTPUT_RAW_to_HakoHilActuatorControls import SERVO_OUTPUT_RAWToHakoHilActuatorControlsConvertor
+import importlib
 import json
 
+# comm_config.json に "converters" の定義がない場合に使用するデフォルト設定
+DEFAULT_CONVERTERS = [
+    {
+        "mavlink": "AHRS2",
+        "converter": "msg.conv.AHRS2_to_Twist.AHRS2ToTwistConvertor"
+    },
+    {
+        "mavlink": "SERVO_OUTPUT_RAW",
+        "converter": "msg.conv.SERVO_OUTPUT_RAW_to_HakoHilActuatorControls.SERVO_OUTPUT_RAWToHakoHilActuatorControlsConvertor"
+    }
+]
+
 class ConverterRegistry:
     def __init__(self):
         self._converters = {}
+        # (robot_name, msg_type) -> コンバータインスタンス（変換不要の場合はNone）
+        # 受信中のVehicle追加・削除があるため、更新時は辞書を複製して差し替える（参照側はロック不要）
+        self._routes = {}
 
-    def register(self, msg_type, converter):
+    def register(self, msg_type, converter, robot_name=None):
         """
         コンバータをメッセージタイプに関連付けて登録
         :param msg_type: MAVLinkメッセージタイプ (例: "AHRS2")
-        :param converter: コンバータインスタンス
+        :param converter: コンバータインスタンス（Noneの場合は変換せずにそのままPDUへ書き込む）
+        :param robot_name: ロボット名（省略時は全ロボット共通のコンバータとして登録）
+        """
+        if robot_name is None:
+            self._converters[msg_type] = converter
+        else:
+            routes = dict(self._routes)
+            routes[(robot_name, msg_type)] = converter
+            self._routes = routes
+
+    def unregister_robot(self, robot_name):
+        """
+        ロボットの登録を全て削除
+        :param robot_name: ロボット名
         """
-        self._converters[msg_type] = converter
+        self._routes = {key: converter for key, converter in self._routes.items() if key[0] != robot_name}
 
-    def get_converter(self, msg_type):
+    def get_converter(self, msg_type, robot_name=None):
         """
         指定したメッセージタイプに対応するコンバータを取得
         :param msg_type: MAVLinkメッセージタイプ
+        :param robot_name: ロボット名（指定時はロボット毎の登録を優先）
         :return: コンバータインスタンス (該当なしの場合はNone)
         """
+        if robot_name is not None:
+            routes = self._routes
+            if (robot_name, msg_type) in routes:
+                return routes[(robot_name, msg_type)]
         return self._converters.get(msg_type)
 
+    def has_route(self, robot_name, msg_type):
+        """
+        指定したロボットのメッセージタイプがPDUへの変換対象かどうかを返す
+        :param robot_name: ロボット名
+        :param msg_type: MAVLinkメッセージタイプ
+        :return: 変換対象であればTrue
+        """
+        return (robot_name, msg_type) in self._routes or msg_type in self._converters
 
-def setup_converters(comm_config_path: str) -> ConverterRegistry:
+    def get_msg_types(self):
+        """
+        登録されている全てのメッセージタイプを返す
+        :return: メッセージタイプのリスト
+        """
+        msg_types = list(self._converters.keys())
+        for _, msg_type in self._routes.keys():
+            if msg_type not in msg_types:
+                msg_types.append(msg_type)
+        return msg_types
+
+
+def load_converter_class(class_path: str):
     """
-    コンバータを初期化して登録
-    :return: ConverterRegistry インスタンス
+    "パッケージ.モジュール.クラス名" 形式の文字列からコンバータクラスをロード
+    :param class_path: コンバータクラスのパス
+    :return: コンバータクラス
     """
+    module_name, _, class_name = class_path.rpartition(".")
+    if not module_name:
+        raise ValueError(f"Invalid converter class path: {class_path}")
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)
 
-    initial_pos = None
-    ahrs2_conv = AHRS2ToTwistConvertor()
+
+def merge_converter_entries(default_entries, vehicle_entries, key="mavlink"):
+    """
+    共通のコンバータ定義にロボット毎の定義をマージする（同じMAVLinkメッセージは上書き）
+    :param default_entries: 共通のコンバータ定義のリスト
+    :param vehicle_entries: ロボット毎のコンバータ定義のリスト
+    :param key: 上書きの単位とする項目名
+    :return: マージ後のコンバータ定義のリスト
+    """
+    merged = {}
+    for entry in list(default_entries) + list(vehicle_entries or []):
+        if key not in entry:
+            raise KeyError(f"Converter entry must have '{key}': {entry}")
+        merged[entry[key]] = entry
+    return [entry for entry in merged.values() if entry.get("enabled", True)]
+
+
+def setup_converters(comm_config_path: str, vehicle_names=None) -> ConverterRegistry:
+    """
+    comm_config.json の定義に従ってコンバータを初期化し、ロボット毎に登録
+    :param vehicle_names: 登録対象のロボット名のリスト（省略時は全ロボット）
+    :return: ConverterRegistry インスタンス
+    """
     with open(comm_config_path, 'r') as f:
         comm_config = json.load(f)
-        for vehicle_name, vehicle_info in comm_config["vehicles"].items():
-            initial_pos = comm_config["vehicles"][vehicle_name]["initial_position"]
-            registry = ConverterRegistry()
-            if "fixed_altitude" in initial_pos:
-                ahrs2_conv.addInitialPosition(
-                    robot_name=vehicle_name,
-                    ref_lat=initial_pos["latitude"], 
-                    ref_lng=initial_pos["longitude"], 
-                    ref_alt=initial_pos["altitude"],
-                    is_fixed_altitude=True,
-                    fixed_altitude=initial_pos["fixed_altitude"]["value"])
-            else:
-                ahrs2_conv.addInitialPosition(
-                    robot_name=vehicle_name,
-                    ref_lat=initial_pos["latitude"], 
-                    ref_lng=initial_pos["longitude"], 
-                    ref_alt=initial_pos["altitude"],
-                    is_fixed_altitude=False,
-                    fixed_altitude=0)
-
-    # AHRS2 → Twist変換コンバータ
-    registry.register(
-        MavlinkMessage.get_pdu_msg_type("AHRS2"),
-        ahrs2_conv
-    )
-
-    # SERVO_OUTPUT_RAW → HakoHilActuatorControls変換コンバータ
-    registry.register(
-        MavlinkMessage.get_pdu_msg_type("SERVO_OUTPUT_RAW"),
-        SERVO_OUTPUT_RAWToHakoHilActuatorControlsConvertor()
-    )
+
+    registry = ConverterRegistry()
+    default_entries = comm_config.get("converters", DEFAULT_CONVERTERS)
+    for vehicle_name, vehicle_info in comm_config["vehicles"].items():
+        if vehicle_names is not None and vehicle_name not in vehicle_names:
+            continue
+        register_vehicle_converters(registry, default_entries, vehicle_name, vehicle_info)
 
     return registry
+
+
+def build_vehicle_converters(default_entries, vehicle_name, vehicle_info):
+    """
+    1台分のコンバータを初期化する（登録はしない）
+    :param default_entries: 共通のコンバータ定義のリスト
+    :param vehicle_name: ロボット名
+    :param vehicle_info: comm_config.json の Vehicle 定義
+    :return: (メッセージタイプ, コンバータインスタンス) のリスト
+    """
+    converters = []
+    for entry in merge_converter_entries(default_entries, vehicle_info.get("converters")):
+        msg_type = MavlinkMessage.get_pdu_msg_type(entry["mavlink"])
+        converter = None
+        if entry.get("converter"):
+            converter = load_converter_class(entry["converter"])()
+            if hasattr(converter, "configure"):
+                converter.configure(vehicle_name, vehicle_info, entry.get("params", {}))
+        converters.append((msg_type, converter))
+    return converters
+
+
+def register_vehicle_converters(registry, default_entries, vehicle_name, vehicle_info):
+    """
+    1台分のコンバータを初期化して登録
+    :param registry: ConverterRegistry インスタンス
+    :param default_entries: 共通のコンバータ定義のリスト
+    :param vehicle_name: ロボット名
+    :param vehicle_info: comm_config.json の Vehicle 定義
+    """
+    for msg_type, converter in build_vehicle_converters(default_entries, vehicle_name, vehicle_info):
+        registry.register(msg_type, converter, robot_name=vehicle_name)
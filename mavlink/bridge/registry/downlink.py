@@ -0,0 +1,82 @@
+import json
+from registry.conv import load_converter_class, merge_converter_entries
+
+# rate_hz 省略時の送信レートの上限
+DEFAULT_DOWNLINK_RATE_HZ = 10.0
+
+
+class DownlinkRoute:
+    def __init__(self, robot_name, pdu_name, channel_id, encoder, rate_hz=DEFAULT_DOWNLINK_RATE_HZ,
+                 resend_interval_sec=0.0):
+        """
+        PDUチャネルからMAVLinkへの送信経路
+        :param robot_name: ロボット名
+        :param pdu_name: PDUチャネル名（org_name）
+        :param channel_id: チャネルID
+        :param encoder: エンコーダインスタンス（encode(robot_name, data) でMAVLinkメッセージのリストを返す）
+        :param rate_hz: 送信レートの上限（Hz）
+        :param resend_interval_sec: 内容が変化しない場合も再送する間隔（秒、0の場合は変化時のみ送信）
+        """
+        self.robot_name = robot_name
+        self.pdu_name = pdu_name
+        self.channel_id = channel_id
+        self.encoder = encoder
+        self.min_interval_sec = 1.0 / rate_hz if rate_hz > 0 else 0.0
+        self.resend_interval_sec = resend_interval_sec
+        self.next_check_time = 0.0
+        self.last_sent_time = None
+        self.last_sent = None
+
+
+def load_pdu_channels(pdu_config_path: str):
+    """
+    PDU設定ファイルからチャネル名とチャネルIDの対応を読み込む
+    :param pdu_config_path: PDU設定ファイル（custom.json）のパス
+    :return: {(ロボット名, チャネル名): チャネルID}
+    """
+    with open(pdu_config_path, 'r') as f:
+        pdu_config = json.load(f)
+    channels = {}
+    for robot in pdu_config["robots"]:
+        for key in ("shm_pdu_readers", "shm_pdu_writers"):
+            for pdu in robot.get(key, []):
+                channels.setdefault((robot["name"], pdu["org_name"]), pdu["channel_id"])
+    return channels
+
+
+def setup_downlink(comm_config_path: str, pdu_config_path: str, vehicle_names=None):
+    """
+    comm_config.json の "downlink" 定義に従ってPDUからMAVLinkへの送信経路を作成
+    :param comm_config_path: comm_config.json ファイルのパス
+    :param pdu_config_path: PDU設定ファイルのパス
+    :param vehicle_names: 対象のロボット名のリスト（省略時は全ロボット）
+    :return: DownlinkRoute のリスト（定義がない場合は空リスト）
+    """
+    with open(comm_config_path, 'r') as f:
+        comm_config = json.load(f)
+
+    default_entries = comm_config.get("downlink", [])
+    channels = None
+    routes = []
+    for vehicle_name, vehicle_info in comm_config["vehicles"].items():
+        if vehicle_names is not None and vehicle_name not in vehicle_names:
+            continue
+        for entry in merge_converter_entries(default_entries, vehicle_info.get("downlink"), key="pdu"):
+            if channels is None:
+                channels = load_pdu_channels(pdu_config_path)
+            channel_id = channels.get((vehicle_name, entry["pdu"]))
+            if channel_id is None:
+                print(f"WARNING: downlink PDU channel not found: robot={vehicle_name}, pdu={entry['pdu']}")
+                continue
+            encoder = load_converter_class(entry["encoder"])()
+            if hasattr(encoder, "configure"):
+                encoder.configure(vehicle_name, vehicle_info, entry.get("params", {}))
+            routes.append(DownlinkRoute(
+                robot_name=vehicle_name,
+                pdu_name=entry["pdu"],
+                channel_id=channel_id,
+                encoder=encoder,
+                rate_hz=entry.get("rate_hz", DEFAULT_DOWNLINK_RATE_HZ),
+                resend_interval_sec=entry.get("resend_interval_sec", 0.0),
+            ))
+    return routes
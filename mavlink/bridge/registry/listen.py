@@ -5,13 +5,23 @@ class ListenMessageRegistry:
         self.msgs = []
 
     def register(self, msg_type):
-        self.msgs.append(msg_type)
+        if msg_type not in self.msgs:
+            self.msgs.append(msg_type)
 
 
-def setup_listen_msgs():
-
+def setup_listen_msgs(conv_registry=None):
+    """
+    受信対象のメッセージタイプを登録
+    :param conv_registry: ConverterRegistry インスタンス（指定時は登録済みの全メッセージタイプを受信対象とする）
+    :return: ListenMessageRegistry インスタンス
+    """
     registry = ListenMessageRegistry()
 
+    if conv_registry is not None:
+        for msg_type in conv_registry.get_msg_types():
+            registry.register(msg_type)
+        return registry
+
     registry.register(MavlinkMessage.get_pdu_msg_type("AHRS2"))
     registry.register(MavlinkMessage.get_pdu_msg_type("SERVO_OUTPUT_RAW"))
 
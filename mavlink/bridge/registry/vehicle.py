@@ -0,0 +1,186 @@
+import threading
+import time
+from pymavlink import mavutil
+from msg.mavlink_message import MavlinkMessage
+from registry.conv import (ConverterRegistry, DEFAULT_CONVERTERS, build_vehicle_converters,
+                           merge_converter_entries, register_vehicle_converters)
+
+# discovery 定義で idle_timeout_sec を省略した場合の値（秒）
+DEFAULT_IDLE_TIMEOUT_SEC = 10.0
+# 同じIPアドレス・システムIDの送信元がこの時間（秒）以上受信のない場合は、再起動とみなしてロボット名を引き継ぐ
+RESTART_TAKEOVER_SEC = 2.0
+
+
+class VehicleEntry:
+    def __init__(self, robot_name, source_addr, local_port, system_id):
+        """
+        動的に参加したVehicleの情報
+        :param robot_name: 割り当てたロボット名
+        :param source_addr: 送信元の (IPアドレス, ポート番号)
+        :param local_port: 受信したブリッジ側のポート番号
+        :param system_id: HEARTBEAT の送信元システムID
+        """
+        self.robot_name = robot_name
+        self.source_addr = source_addr
+        self.local_port = local_port
+        self.system_id = system_id
+        # 送信元毎に専用のパーサを持ち、他のVehicleのパケットと解析状態が混ざらないようにする
+        self.parser = mavutil.mavlink.MAVLink(None)
+        self.parser.robust_parsing = True
+        self.joined_time = time.monotonic()
+        # 受信スレッドのみが更新する（ロック不要）
+        self.last_seen = self.joined_time
+        self.last_heartbeat = self.joined_time
+
+
+class VehicleRegistry:
+    def __init__(self, discovery_config, static_vehicles, pdu_robot_names, conv_registry,
+                 default_converters=None):
+        """
+        HEARTBEAT と送信元アドレスから動的にVehicleを検出するレジストリ
+        受信パスは現在の辞書を参照するだけでロックを取らない。参加・削除時は辞書を複製して差し替える
+        :param discovery_config: comm_config.json の "discovery" 定義
+        :param static_vehicles: comm_config.json の "vehicles" 定義（ロボット名の重複を避けるために使用）
+        :param pdu_robot_names: PDU設定ファイルに定義されているロボット名の集合
+        :param conv_registry: 参加時にコンバータを登録する ConverterRegistry
+        :param default_converters: 共通のコンバータ定義（省略時は DEFAULT_CONVERTERS）
+        """
+        self.port = int(discovery_config["port"])
+        self.idle_timeout_sec = discovery_config.get("idle_timeout_sec", DEFAULT_IDLE_TIMEOUT_SEC)
+        self.name_format = discovery_config.get("name_format")
+        self.robot_names = [
+            name for name in discovery_config.get("robot_names", []) if name not in static_vehicles
+        ]
+        self.vehicle_template = discovery_config.get("vehicle", {})
+        self.static_names = set(static_vehicles.keys())
+        self.pdu_robot_names = set(pdu_robot_names)
+        self.conv_registry = conv_registry
+        self.default_converters = default_converters if default_converters is not None else DEFAULT_CONVERTERS
+        # 送信元アドレス -> VehicleEntry（差し替えのみで更新する）
+        self._vehicles = {}
+        self._update_lock = threading.Lock()
+
+    def validate(self):
+        """
+        参加時と同じ手順でコンバータを一度初期化し、"vehicle" 定義やコンバータ定義の誤りを起動時に検出する
+        （参加時に初めて失敗すると、その Vehicle はいつまでも参加できない）
+        :raises ValueError: コンバータを初期化できない場合
+        """
+        try:
+            register_vehicle_converters(ConverterRegistry(), self.default_converters,
+                                        "discovery", self.vehicle_template)
+        except Exception as e:
+            raise ValueError(f"Invalid discovery vehicle definition: {type(e).__name__}: {e}") from e
+
+    def lookup(self, source_addr):
+        """
+        送信元アドレスから参加済みのVehicleを取得する（ロック不要）
+        :param source_addr: 送信元の (IPアドレス, ポート番号)
+        :return: VehicleEntry（未参加の場合はNone）
+        """
+        return self._vehicles.get(source_addr)
+
+    def vehicles(self):
+        """
+        参加中のVehicleの一覧を返す
+        :return: VehicleEntry のリスト
+        """
+        return list(self._vehicles.values())
+
+    def msg_types(self):
+        """
+        動的に参加するVehicleで受信対象となるメッセージタイプを返す
+        :return: メッセージタイプのリスト
+        """
+        return [MavlinkMessage.get_pdu_msg_type(entry["mavlink"])
+                for entry in merge_converter_entries(self.default_converters, self.vehicle_template.get("converters"))]
+
+    def _allocate_name(self, system_id, used_names):
+        if self.robot_names:
+            for name in self.robot_names:
+                if name not in used_names:
+                    return name
+            return None
+        if self.name_format:
+            name = self.name_format.format(sysid=system_id)
+            if name in used_names or name in self.static_names:
+                return None
+            return name
+        return None
+
+    def join(self, source_addr, local_port, heartbeat):
+        """
+        HEARTBEAT を受信した未参加の送信元をVehicleとして登録する
+        :param source_addr: 送信元の (IPアドレス, ポート番号)
+        :param local_port: 受信したブリッジ側のポート番号
+        :param heartbeat: pymavlink の HEARTBEAT メッセージ
+        :return: 登録した VehicleEntry（登録できない場合はNone）
+        """
+        if heartbeat.type == mavutil.mavlink.MAV_TYPE_GCS:
+            return None
+        system_id = heartbeat.get_srcSystem()
+        while True:
+            # ロボット名の割り当てとコンバータ・パーサの初期化はロックの外で行い、
+            # ロックは辞書の差し替えにのみ使う（他の受信スレッドの参加を待たせない）
+            vehicles = self._vehicles
+            entry = vehicles.get(source_addr)
+            if entry is not None:
+                return entry
+            robot_name, takeover_addr = self._plan_join(vehicles, source_addr, system_id)
+            if robot_name is None:
+                print(f"WARNING: No robot name available for vehicle {source_addr[0]}:{source_addr[1]}")
+                return None
+            if robot_name not in self.pdu_robot_names:
+                print(f"WARNING: Robot {robot_name} is not defined in the PDU config; ignoring {source_addr[0]}:{source_addr[1]}")
+                return None
+            converters = build_vehicle_converters(self.default_converters, robot_name, self.vehicle_template)
+            entry = VehicleEntry(robot_name, source_addr, local_port, system_id)
+            with self._update_lock:
+                if self._vehicles is not vehicles:
+                    # 割り当ての間に他の参加・削除があった場合は、最新の辞書でやり直す
+                    continue
+                updated = dict(vehicles)
+                if takeover_addr is not None:
+                    del updated[takeover_addr]
+                for msg_type, converter in converters:
+                    self.conv_registry.register(msg_type, converter, robot_name=robot_name)
+                updated[source_addr] = entry
+                self._vehicles = updated
+            break
+        print(f"INFO: Vehicle joined: {robot_name} ({source_addr[0]}:{source_addr[1]}, sysid={entry.system_id})")
+        return entry
+
+    def _plan_join(self, vehicles, source_addr, system_id):
+        """
+        参加する送信元に割り当てるロボット名を決める（辞書は変更しない）
+        :return: (ロボット名（割り当てられない場合はNone）, ロボット名を引き継ぐ送信元アドレス（ない場合はNone）)
+        """
+        # 同じIPアドレス・システムIDのVehicleが途絶えた後に別ポートから接続した場合（SITLの再起動）はロボット名を引き継ぐ
+        now = time.monotonic()
+        for old_addr, old_entry in vehicles.items():
+            if (old_addr[0] == source_addr[0] and old_entry.system_id == system_id
+                    and now - old_entry.last_seen >= RESTART_TAKEOVER_SEC):
+                return old_entry.robot_name, old_addr
+        used_names = {vehicle.robot_name for vehicle in vehicles.values()}
+        return self._allocate_name(system_id, used_names), None
+
+    def evict_idle(self, now=None):
+        """
+        一定時間受信のないVehicleを削除する
+        :param now: 現在時刻（time.monotonic()、省略時は取得する）
+        :return: 削除した VehicleEntry のリスト
+        """
+        if now is None:
+            now = time.monotonic()
+        if not any(now - entry.last_seen >= self.idle_timeout_sec for entry in self._vehicles.values()):
+            return []
+        with self._update_lock:
+            idle = [entry for entry in self._vehicles.values() if now - entry.last_seen >= self.idle_timeout_sec]
+            self._vehicles = {
+                source_addr: entry for source_addr, entry in self._vehicles.items() if entry not in idle
+            }
+            for entry in idle:
+                self.conv_registry.unregister_robot(entry.robot_name)
+        for entry in idle:
+            print(f"INFO: Vehicle left: {entry.robot_name} ({entry.source_addr[0]}:{entry.source_addr[1]})")
+        return idle
@@ -0,0 +1,128 @@
+import multiprocessing
+import pickle
+import time
+from comm.shm_ring import ShmRingBuffer
+from shard.worker import run_shard_worker
+
+
+def partition_vehicles(vehicle_ports, num_shards):
+    """
+    Vehicleをシャードに均等に振り分ける（ロボット名順のラウンドロビン）
+    :param vehicle_ports: {ロボット名: ポート番号}
+    :param num_shards: シャード数
+    :return: シャード毎の {ロボット名: ポート番号} のリスト（空のシャードは含まない）
+    """
+    shards = [{} for _ in range(num_shards)]
+    for index, vehicle_name in enumerate(sorted(vehicle_ports.keys())):
+        shards[index % num_shards][vehicle_name] = vehicle_ports[vehicle_name]
+    return [shard for shard in shards if shard]
+
+
+class ShardedBridge:
+    def __init__(self, udp_ip, vehicle_ports, num_shards,
+                 mavlink_config, pdu_config, comm_config, ring_capacity=4 * 1024 * 1024,
+                 record_filename=None, telemetry=None):
+        """
+        Vehicleを複数のワーカプロセスに分割して受信・変換するブリッジ
+        ワーカの変換結果は共有メモリリング経由で箱庭アセットのプロセスに集約する
+        :param udp_ip: バインドするIPアドレス
+        :param vehicle_ports: {ロボット名: ポート番号}
+        :param num_shards: ワーカプロセス数
+        :param mavlink_config: mavlink custom.json ファイルのパス
+        :param pdu_config: pdu custom.json ファイルのパス
+        :param comm_config: comm_config.json ファイルのパス
+        :param ring_capacity: ワーカ毎の共有メモリリングのサイズ（バイト）
+        :param record_filename: 受信パケットの記録先（ワーカ毎に <ファイル名>.<シャード番号> に保存）
+        :param telemetry: ワーカのカウンタとレイテンシを集計する BridgeTelemetry（省略時は計測しない）
+        """
+        self.udp_ip = udp_ip
+        self.shards = partition_vehicles(vehicle_ports, num_shards)
+        self.mavlink_config = mavlink_config
+        self.pdu_config = pdu_config
+        self.comm_config = comm_config
+        self.ring_capacity = ring_capacity
+        self.record_filename = record_filename
+        self.telemetry = telemetry
+        self.mp_context = multiprocessing.get_context("spawn")
+        self.stop_event = self.mp_context.Event()
+        self.rings = []
+        self.processes = []
+
+    def start(self):
+        """
+        ワーカプロセスを起動
+        """
+        for shard_id, vehicle_ports in enumerate(self.shards):
+            ring = ShmRingBuffer(capacity=self.ring_capacity)
+            process = self.mp_context.Process(
+                target=run_shard_worker,
+                args=(shard_id, self.udp_ip, vehicle_ports, ring.name,
+                      self.mavlink_config, self.pdu_config, self.comm_config, self.stop_event,
+                      self.record_filename, self.telemetry is not None),
+                daemon=True,
+            )
+            process.start()
+            self.rings.append(ring)
+            self.processes.append(process)
+
+    def drain(self, handler, recv_times=None):
+        """
+        全ワーカの変換結果を取り出す
+        計測有効時はワーカのカウンタと、受信→取り出し（queue）・変換（convert）のレイテンシを記録する
+        :param handler: (robot_name, channel_id, data) を受け取る関数
+        :param recv_times: 計測有効時に、変換結果の受信時刻を追加するリスト（end_to_end の計測用）
+        :return: 取り出したレコード数
+        """
+        telemetry = self.telemetry
+        if telemetry is None:
+            count = 0
+            for ring in self.rings:
+                for record in ring.pop_all():
+                    robot_name, channel_id, data = pickle.loads(record)
+                    handler(robot_name, channel_id, data)
+                    count += 1
+            return count
+
+        drain_time_ns = time.perf_counter_ns()
+        queue_latencies = []
+        convert_latencies = []
+        count = 0
+        for ring in self.rings:
+            for record in ring.pop_all():
+                record = pickle.loads(record)
+                if record[0] is None:
+                    for msg_type, counters in record[1].items():
+                        for name, n in counters.items():
+                            telemetry.count(msg_type, name, n)
+                    continue
+                robot_name, channel_id, data, msg_type, recv_time_ns, convert_ns = record
+                handler(robot_name, channel_id, data)
+                telemetry.count(msg_type, "converted")
+                queue_latencies.append(drain_time_ns - recv_time_ns)
+                convert_latencies.append(convert_ns)
+                if recv_times is not None:
+                    recv_times.append(recv_time_ns)
+                count += 1
+        telemetry.record_many("queue", queue_latencies)
+        telemetry.record_many("convert", convert_latencies)
+        return count
+
+    def drops(self):
+        """
+        リングの空き不足で破棄されたレコード数の合計を返す
+        """
+        return sum(ring.drops() for ring in self.rings)
+
+    def stop(self):
+        """
+        ワーカプロセスを停止し、共有メモリを解放
+        """
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        for ring in self.rings:
+            ring.close()
+        self.processes.clear()
+        self.rings.clear()
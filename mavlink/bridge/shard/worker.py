@@ -0,0 +1,113 @@
+import pickle
+import time
+from comm.shm_ring import ShmRingBuffer
+from comm.udp_multi_receiver import UdpMultiReceiver
+from log.framed_log import FramedLogWriter
+from msg.pdu_message_convertor import PduMessageConvertor
+from registry.conv import setup_converters
+from registry.listen import setup_listen_msgs
+
+# 計測有効時に、メッセージタイプ毎のカウンタをリングへ送る間隔（秒）
+STATS_FLUSH_SEC = 0.5
+
+
+def run_shard_worker(shard_id, udp_ip, vehicle_ports, ring_name,
+                     mavlink_config, pdu_config, comm_config, stop_event, record_filename=None,
+                     collect_stats=False):
+    """
+    シャードのワーカプロセス本体
+    担当Vehicleの受信・解析・変換を行い、書き込むPDUデータのみを共有メモリリングへ送る
+    :param shard_id: シャード番号
+    :param udp_ip: バインドするIPアドレス
+    :param vehicle_ports: 担当Vehicleの {ロボット名: ポート番号}
+    :param ring_name: 結果を書き込む共有メモリリングの名前
+    :param mavlink_config: mavlink custom.json ファイルのパス
+    :param pdu_config: pdu custom.json ファイルのパス
+    :param comm_config: comm_config.json ファイルのパス
+    :param stop_event: 停止要求を通知する multiprocessing.Event
+    :param record_filename: 受信パケットの記録先（シャード番号を付加して保存。省略時は記録しない）
+    :param collect_stats: Trueの場合は計測値もリングへ送る
+        変換結果のレコードに (メッセージタイプ, 受信時刻, 変換時間) を付加し、
+        カウンタは STATS_FLUSH_SEC 毎に (None, {メッセージタイプ: {カウンタ名: 加算値}}) のレコードで送る
+        受信時刻の time.perf_counter_ns() はシステム全体で共通の単調時計のため、プロセスをまたいで比較できる
+    """
+    # 接続側は共有メモリを削除しない（ワーカの終了で親プロセスのリングが消えないようにする）
+    ring = ShmRingBuffer(name=ring_name, create=False)
+    conv_registry = setup_converters(comm_config, vehicle_names=list(vehicle_ports.keys()))
+    listened_types = set(setup_listen_msgs(conv_registry).msgs)
+    convertor = PduMessageConvertor(mavlink_config, pdu_config, comm_config)
+
+    def handle_message(mavlink_message):
+        if mavlink_message.msg_type not in listened_types:
+            return
+        try:
+            pdu_message = convertor.convert(mavlink_message, conv_registry)
+        except ValueError as e:
+            print(f"[shard {shard_id}] Conversion error: {e}")
+            return
+        if pdu_message is None:
+            return
+        ring.push(pickle.dumps(
+            (pdu_message.robot_name, pdu_message.channel_id, pdu_message.data),
+            protocol=pickle.HIGHEST_PROTOCOL))
+
+    counts = {}
+    next_flush_time = time.monotonic() + STATS_FLUSH_SEC
+
+    def count(msg_type, name):
+        counters = counts.get(msg_type)
+        if counters is None:
+            counters = counts[msg_type] = {}
+        counters[name] = counters.get(name, 0) + 1
+
+    def flush_counts():
+        # 送れなかった場合は次の機会に再送する
+        if counts and ring.push(pickle.dumps((None, counts), protocol=pickle.HIGHEST_PROTOCOL)):
+            counts.clear()
+
+    def flush_counts_periodically():
+        # 受信が途絶えても、それまでのカウンタが届くよう受信の待ち毎に確認する
+        nonlocal next_flush_time
+        now = time.monotonic()
+        if now >= next_flush_time:
+            next_flush_time = now + STATS_FLUSH_SEC
+            flush_counts()
+
+    def handle_message_with_stats(mavlink_message):
+        msg_type = mavlink_message.msg_type
+        count(msg_type, "received")
+        if msg_type not in listened_types:
+            count(msg_type, "filtered")
+            return
+        start_ns = time.perf_counter_ns()
+        try:
+            pdu_message = convertor.convert(mavlink_message, conv_registry)
+        except ValueError as e:
+            print(f"[shard {shard_id}] Conversion error: {e}")
+            count(msg_type, "failed")
+            return
+        if pdu_message is None:
+            count(msg_type, "filtered")
+            return
+        # converted は取り出し側で数える（リングが一杯で破棄された分は ring_drops に表れる）
+        ring.push(pickle.dumps(
+            (pdu_message.robot_name, pdu_message.channel_id, pdu_message.data,
+             msg_type, mavlink_message.recv_time_ns, time.perf_counter_ns() - start_ns),
+            protocol=pickle.HIGHEST_PROTOCOL))
+
+    print(f"[shard {shard_id}] vehicles: {list(vehicle_ports.keys())}")
+    recorder = None
+    if record_filename:
+        recorder = FramedLogWriter(f"{record_filename}.{shard_id}")
+    if collect_stats:
+        receiver = UdpMultiReceiver(udp_ip, vehicle_ports.values(), handle_message_with_stats, recorder=recorder)
+    else:
+        receiver = UdpMultiReceiver(udp_ip, vehicle_ports.values(), handle_message, recorder=recorder)
+    try:
+        receiver.start_receiving(stop_event, on_poll=flush_counts_periodically if collect_stats else None)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if collect_stats:
+            flush_counts()
+        ring.close()
@@ -0,0 +1,115 @@
+import threading
+import time
+from telemetry.histogram import LatencyHistogram
+
+# メッセージタイプ毎のカウンタ
+COUNTER_NAMES = ("received", "filtered", "dropped", "converted", "failed")
+# レイテンシを計測する区間
+#   queue: 受信 → タイミングループでの取り出し
+#   convert: 取り出し → PDUへの変換完了
+#   write: 1周期分のPDU書き込み（write_many）
+#   end_to_end: 受信 → PDU書き込み完了
+STAGE_NAMES = ("queue", "convert", "write", "end_to_end")
+
+
+class BridgeTelemetry:
+    def __init__(self):
+        """
+        ブリッジのレイテンシ・スループットの計測値
+        受信スレッドとタイミングループのスレッドから更新され、統計の参照は任意のスレッドから行える
+        """
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {stage: LatencyHistogram() for stage in STAGE_NAMES}
+        self.gauges = {}
+        self.start_time = time.monotonic()
+        self.last_summary_time = self.start_time
+        self.last_summary_received = 0
+
+    def _get_counters(self, msg_type):
+        counters = self.counters.get(msg_type)
+        if counters is None:
+            counters = self.counters[msg_type] = dict.fromkeys(COUNTER_NAMES, 0)
+        return counters
+
+    def count(self, msg_type, name, n=1):
+        """
+        メッセージタイプ毎のカウンタを加算する
+        :param msg_type: メッセージタイプ
+        :param name: カウンタ名（COUNTER_NAMES のいずれか）
+        :param n: 加算する値
+        """
+        with self.lock:
+            self._get_counters(msg_type)[name] += n
+
+    def record(self, stage, latency_ns):
+        """
+        区間のレイテンシを記録する
+        :param stage: 区間名（STAGE_NAMES のいずれか）
+        :param latency_ns: レイテンシ（ナノ秒）
+        """
+        with self.lock:
+            self.histograms[stage].record(latency_ns)
+
+    def record_many(self, stage, latencies_ns):
+        """
+        区間のレイテンシをまとめて記録する
+        :param stage: 区間名
+        :param latencies_ns: レイテンシ（ナノ秒）のリスト
+        """
+        with self.lock:
+            histogram = self.histograms[stage]
+            for latency_ns in latencies_ns:
+                histogram.record(latency_ns)
+
+    def set_gauge(self, name, value):
+        """
+        現在値を記録する（キューサイズなど）
+        """
+        self.gauges[name] = value
+
+    def totals(self):
+        """
+        全メッセージタイプのカウンタの合計を返す
+        """
+        with self.lock:
+            totals = dict.fromkeys(COUNTER_NAMES, 0)
+            for counters in self.counters.values():
+                for name, value in counters.items():
+                    totals[name] += value
+            return totals
+
+    def snapshot(self):
+        """
+        統計値を辞書形式で返す
+        """
+        with self.lock:
+            return {
+                "uptime_sec": time.monotonic() - self.start_time,
+                "counters": {msg_type: dict(counters) for msg_type, counters in self.counters.items()},
+                "latency": {stage: histogram.to_dict() for stage, histogram in self.histograms.items()},
+                "gauges": dict(self.gauges),
+            }
+
+    def summary_line(self):
+        """
+        前回の呼び出しからの受信レートを含む1行の要約を返す
+        """
+        now = time.monotonic()
+        totals = self.totals()
+        elapsed = now - self.last_summary_time
+        rate = (totals["received"] - self.last_summary_received) / elapsed if elapsed > 0 else 0.0
+        self.last_summary_time = now
+        self.last_summary_received = totals["received"]
+        with self.lock:
+            e2e = self.histograms["end_to_end"]
+            queue = self.histograms["queue"]
+            line = (
+                f"[stats] recv={totals['received']} ({rate:.1f}/s) filt={totals['filtered']} "
+                f"drop={totals['dropped']} conv={totals['converted']} fail={totals['failed']} "
+                f"e2e p50={e2e.percentile(50) / 1e3:.0f}us p99={e2e.percentile(99) / 1e3:.0f}us "
+                f"max={e2e.max_ns / 1e3:.0f}us queue p99={queue.percentile(99) / 1e3:.0f}us"
+            )
+        for name, value in self.gauges.items():
+            line += f" {name}={value}"
+        return line
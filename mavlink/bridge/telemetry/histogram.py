@@ -0,0 +1,106 @@
+# 2のべき乗毎の区間を SUB_BUCKET_COUNT 個に線形分割する（相対誤差は 1/SUB_BUCKET_COUNT 以下）
+SUB_BUCKET_BITS = 4
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+# 記録できる最大値（ナノ秒）。これを超える値は最大値のバケットに入る
+MAX_TRACKABLE_NS = 60 * 1000 * 1000 * 1000
+
+
+def bucket_index(value):
+    """
+    値からバケット番号を求める
+    :param value: 0以上の整数
+    :return: バケット番号
+    """
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    if shift < 0:
+        return value
+    return shift * SUB_BUCKET_COUNT + (value >> shift)
+
+
+def bucket_upper_bound(index):
+    """
+    バケットに入る値の上限を求める
+    :param index: バケット番号
+    :return: 上限値
+    """
+    if index < 2 * SUB_BUCKET_COUNT:
+        return index
+    shift = index // SUB_BUCKET_COUNT - 1
+    mantissa = index - shift * SUB_BUCKET_COUNT
+    return ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    def __init__(self):
+        """
+        HDRヒストグラム形式のレイテンシ分布（ナノ秒単位、固定サイズの対数線形バケット）
+        """
+        self.counts = [0] * (bucket_index(MAX_TRACKABLE_NS) + 1)
+        self.max_index = len(self.counts) - 1
+        self.total_count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, value_ns):
+        """
+        値を記録する
+        :param value_ns: レイテンシ（ナノ秒）
+        """
+        if value_ns < 0:
+            value_ns = 0
+        index = bucket_index(value_ns)
+        if index > self.max_index:
+            index = self.max_index
+        self.counts[index] += 1
+        self.total_count += 1
+        self.total_ns += value_ns
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    def percentile(self, percent):
+        """
+        パーセンタイル値を求める
+        :param percent: パーセント（0〜100）
+        :return: 値（ナノ秒）。記録が無い場合は0
+        """
+        if self.total_count == 0:
+            return 0
+        target = max(1, int(self.total_count * percent / 100.0 + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(bucket_upper_bound(index), self.max_ns)
+        return self.max_ns
+
+    def mean(self):
+        """
+        平均値（ナノ秒）を返す
+        """
+        if self.total_count == 0:
+            return 0.0
+        return self.total_ns / self.total_count
+
+    def reset(self):
+        """
+        記録をクリアする
+        """
+        for index in range(len(self.counts)):
+            self.counts[index] = 0
+        self.total_count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def to_dict(self):
+        """
+        統計値を辞書形式で返す（マイクロ秒単位）
+        """
+        return {
+            "count": self.total_count,
+            "mean_us": self.mean() / 1e3,
+            "p50_us": self.percentile(50) / 1e3,
+            "p90_us": self.percentile(90) / 1e3,
+            "p99_us": self.percentile(99) / 1e3,
+            "p999_us": self.percentile(99.9) / 1e3,
+            "max_us": self.max_ns / 1e3,
+        }
@@ -0,0 +1,54 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StatsServer:
+    def __init__(self, telemetry, port, host="127.0.0.1"):
+        """
+        計測値をJSONで返すHTTPサーバ（GET /stats）
+        :param telemetry: BridgeTelemetry オブジェクト
+        :param port: 待ち受けポート番号
+        :param host: 待ち受けアドレス（既定はローカルのみ）
+        """
+        self.telemetry = telemetry
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """
+        サーバをデーモンスレッドで起動
+        """
+        telemetry = self.telemetry
+
+        class StatsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("", "/stats"):
+                    self.send_error(404)
+                    return
+                body = json.dumps(telemetry.snapshot(), indent=2).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), StatsHandler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"Stats endpoint: http://{self.host}:{self.port}/stats")
+
+    def stop(self):
+        """
+        サーバを停止
+        """
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
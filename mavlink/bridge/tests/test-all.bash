@@ -0,0 +1,18 @@
+#!/bin/bash
+
+echo "INFO: test_shm_ring:"
+python -m unittest tests.test_shm_ring
+echo "INFO: test_framed_log:"
+python -m unittest tests.test_framed_log
+echo "INFO: test_histogram:"
+python -m unittest tests.test_histogram
+echo "INFO: test_conv_registry:"
+python -m unittest tests.test_conv_registry
+echo "INFO: test_vehicle_registry:"
+python -m unittest tests.test_vehicle_registry
+echo "INFO: test_sharded_telemetry:"
+python -m unittest tests.test_sharded_telemetry
+echo "INFO: test_log_replay:"
+python -m unittest tests.test_log_replay
+echo "INFO: test_log_analyzer:"
+python -m unittest tests.test_log_analyzer
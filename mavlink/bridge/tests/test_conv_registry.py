@@ -0,0 +1,123 @@
+import sys
+import os
+# bridge ディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import unittest
+from msg.mavlink_message import MavlinkMessage
+from msg.conv.AHRS2_to_Twist import AHRS2ToTwistConvertor
+from msg.conv.SERVO_OUTPUT_RAW_to_HakoHilActuatorControls import SERVO_OUTPUT_RAWToHakoHilActuatorControlsConvertor
+from registry.conv import (ConverterRegistry, DEFAULT_CONVERTERS, load_converter_class, merge_converter_entries,
+                           register_vehicle_converters)
+
+AHRS2 = MavlinkMessage.get_pdu_msg_type("AHRS2")
+SERVO = MavlinkMessage.get_pdu_msg_type("SERVO_OUTPUT_RAW")
+HEARTBEAT = MavlinkMessage.get_pdu_msg_type("HEARTBEAT")
+
+VEHICLE_INFO = {
+    "initial_position": {"latitude": -353632621, "longitude": 1491652374, "altitude": 584.0}
+}
+
+class TestMergeConverterEntries(unittest.TestCase):
+
+    def test_vehicle_entry_overrides_default(self):
+        """同じMAVLinkメッセージはロボット毎の定義で上書きされ、順序は共通の定義のまま"""
+        merged = merge_converter_entries(DEFAULT_CONVERTERS, [{"mavlink": "AHRS2", "converter": None}])
+        self.assertEqual([entry["mavlink"] for entry in merged], ["AHRS2", "SERVO_OUTPUT_RAW"])
+        self.assertIsNone(merged[0]["converter"])
+        self.assertIs(merged[1], DEFAULT_CONVERTERS[1])
+
+    def test_vehicle_entry_added(self):
+        merged = merge_converter_entries(DEFAULT_CONVERTERS, [{"mavlink": "HEARTBEAT"}])
+        self.assertEqual([entry["mavlink"] for entry in merged], ["AHRS2", "SERVO_OUTPUT_RAW", "HEARTBEAT"])
+        self.assertEqual(merge_converter_entries(DEFAULT_CONVERTERS, None), DEFAULT_CONVERTERS)
+
+    def test_disabled_entry_removed(self):
+        """enabled: false の定義は共通の定義ごと取り除かれる"""
+        merged = merge_converter_entries(DEFAULT_CONVERTERS, [{"mavlink": "SERVO_OUTPUT_RAW", "enabled": False}])
+        self.assertEqual([entry["mavlink"] for entry in merged], ["AHRS2"])
+        # 無効化した定義をさらに有効な定義で上書きした場合は残る
+        merged = merge_converter_entries([{"mavlink": "AHRS2", "enabled": False}], [{"mavlink": "AHRS2"}])
+        self.assertEqual(merged, [{"mavlink": "AHRS2"}])
+
+    def test_missing_key(self):
+        with self.assertRaises(KeyError):
+            merge_converter_entries(DEFAULT_CONVERTERS, [{"converter": "x.Y"}])
+
+class TestConverterRegistry(unittest.TestCase):
+
+    def test_robot_route_overrides_common(self):
+        registry = ConverterRegistry()
+        common = object()
+        drone1 = object()
+        registry.register(AHRS2, common)
+        registry.register(AHRS2, drone1, robot_name="Drone1")
+        self.assertIs(registry.get_converter(AHRS2), common)
+        self.assertIs(registry.get_converter(AHRS2, "Drone1"), drone1)
+        self.assertIs(registry.get_converter(AHRS2, "Drone2"), common)
+        self.assertIsNone(registry.get_converter(SERVO, "Drone1"))
+
+    def test_pass_through_route(self):
+        """コンバータが None の登録は変換対象（そのままPDUへ書き込む）として扱われる"""
+        registry = ConverterRegistry()
+        registry.register(HEARTBEAT, None, robot_name="Drone1")
+        self.assertTrue(registry.has_route("Drone1", HEARTBEAT))
+        self.assertIsNone(registry.get_converter(HEARTBEAT, "Drone1"))
+        self.assertFalse(registry.has_route("Drone2", HEARTBEAT))
+
+    def test_copy_on_write(self):
+        """登録・削除は辞書を差し替え、受信側が参照中の辞書は変更しない"""
+        registry = ConverterRegistry()
+        converter = object()
+        registry.register(AHRS2, converter, robot_name="Drone1")
+        snapshot = registry._routes
+        registry.register(SERVO, converter, robot_name="Drone2")
+        self.assertIsNot(registry._routes, snapshot)
+        self.assertEqual(list(snapshot.keys()), [("Drone1", AHRS2)])
+        snapshot = registry._routes
+        registry.unregister_robot("Drone1")
+        self.assertIsNot(registry._routes, snapshot)
+        self.assertIn(("Drone1", AHRS2), snapshot)
+        self.assertFalse(registry.has_route("Drone1", AHRS2))
+        self.assertTrue(registry.has_route("Drone2", SERVO))
+
+    def test_msg_types(self):
+        registry = ConverterRegistry()
+        registry.register(AHRS2, None)
+        registry.register(AHRS2, None, robot_name="Drone1")
+        registry.register(SERVO, None, robot_name="Drone1")
+        self.assertEqual(registry.get_msg_types(), [AHRS2, SERVO])
+
+class TestRegisterVehicleConverters(unittest.TestCase):
+
+    def test_register_defaults(self):
+        registry = ConverterRegistry()
+        register_vehicle_converters(registry, DEFAULT_CONVERTERS, "Drone1", VEHICLE_INFO)
+        ahrs2 = registry.get_converter(AHRS2, "Drone1")
+        self.assertIsInstance(ahrs2, AHRS2ToTwistConvertor)
+        self.assertIn("Drone1", ahrs2.map_for_initial_position)
+        self.assertIsInstance(registry.get_converter(SERVO, "Drone1"),
+                              SERVO_OUTPUT_RAWToHakoHilActuatorControlsConvertor)
+
+    def test_vehicle_overrides(self):
+        """ロボット毎の定義で無効化・変換なしを指定できる"""
+        registry = ConverterRegistry()
+        vehicle_info = dict(VEHICLE_INFO, converters=[
+            {"mavlink": "SERVO_OUTPUT_RAW", "enabled": False},
+            {"mavlink": "HEARTBEAT"},
+        ])
+        register_vehicle_converters(registry, DEFAULT_CONVERTERS, "Drone1", vehicle_info)
+        self.assertFalse(registry.has_route("Drone1", SERVO))
+        self.assertTrue(registry.has_route("Drone1", HEARTBEAT))
+        self.assertIsNone(registry.get_converter(HEARTBEAT, "Drone1"))
+
+    def test_invalid_definitions(self):
+        with self.assertRaises(KeyError):
+            register_vehicle_converters(ConverterRegistry(), DEFAULT_CONVERTERS, "Drone1", {})
+        with self.assertRaises(ValueError):
+            load_converter_class("NoModule")
+        with self.assertRaises(ImportError):
+            load_converter_class("msg.conv.no_such_module.Converter")
+
+if __name__ == '__main__':
+    unittest.main()
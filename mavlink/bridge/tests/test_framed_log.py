@@ -0,0 +1,86 @@
+import sys
+import os
+# bridge ディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import shutil
+import tempfile
+import unittest
+from log.framed_log import (FramedLogWriter, FramedLogReader, is_framed_log, FILE_HEADER, RECORD_HEADER,
+                            INDEX_ENTRY, INDEX_SUFFIX)
+
+class TestFramedLog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.log_filename = os.path.join(self.tmpdir, 'mavlink.log')
+        # 10ms 間隔で 1 秒分のパケット（長さは 1..20 バイト）
+        self.records = [(1_000_000 + i * 10_000, 14550 + i % 3, bytes([i % 256]) * (i % 20 + 1))
+                        for i in range(100)]
+        writer = FramedLogWriter(self.log_filename, index_interval_usec=100_000)
+        for recv_time_usec, port, data in self.records:
+            writer.write(data, port, recv_time_usec)
+        writer.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_round_trip(self):
+        """書き込んだレコードを同じ順序・内容で読み出せるか確認"""
+        self.assertTrue(is_framed_log(self.log_filename))
+        reader = FramedLogReader(self.log_filename)
+        try:
+            actual = [(t, port, bytes(data)) for t, port, data in reader.records()]
+            self.assertEqual(actual, self.records)
+            self.assertEqual(reader.start_time_usec(), 1_000_000)
+        finally:
+            reader.close()
+
+    def test_index(self):
+        """インデックスが index_interval_usec 毎にレコードの先頭を指しているか確認"""
+        with open(self.log_filename + INDEX_SUFFIX, 'rb') as f:
+            entries = list(INDEX_ENTRY.iter_unpack(f.read()))
+        self.assertEqual([t for t, _ in entries], [1_000_000 + i * 100_000 for i in range(10)])
+        reader = FramedLogReader(self.log_filename)
+        try:
+            for recv_time_usec, offset in entries:
+                self.assertEqual(RECORD_HEADER.unpack_from(reader.mm, offset)[0], recv_time_usec)
+        finally:
+            reader.close()
+
+    def test_seek(self):
+        """指定時刻以降の最初のレコードから読み出せるか確認（インデックスの間の時刻も含む）"""
+        reader = FramedLogReader(self.log_filename)
+        try:
+            for time_usec in [0, 1_000_000, 1_005_000, 1_250_000, 1_390_000, 1_990_000]:
+                expected = [r for r in self.records if r[0] >= time_usec]
+                actual = [(t, port, bytes(data)) for t, port, data in reader.records(reader.seek_offset(time_usec))]
+                self.assertEqual(actual, expected)
+            # 最後のレコードより後の時刻では何も読み出さない
+            self.assertEqual(list(reader.records(reader.seek_offset(3_000_000))), [])
+        finally:
+            reader.close()
+
+    def test_truncated_tail(self):
+        """書き込み途中で切れた末尾のレコードは読み飛ばすか確認"""
+        size = os.path.getsize(self.log_filename)
+        with open(self.log_filename, 'r+b') as f:
+            f.truncate(size - 3)
+        reader = FramedLogReader(self.log_filename)
+        try:
+            self.assertEqual(len(list(reader.records())), len(self.records) - 1)
+        finally:
+            reader.close()
+
+    def test_not_framed_log(self):
+        """フレーム形式でないファイルは判定・読み込みで区別されるか確認"""
+        raw_filename = os.path.join(self.tmpdir, 'raw.bin')
+        with open(raw_filename, 'wb') as f:
+            f.write(b'\xfd' * (FILE_HEADER.size + 10))
+        self.assertFalse(is_framed_log(raw_filename))
+        self.assertFalse(is_framed_log(os.path.join(self.tmpdir, 'missing.bin')))
+        with self.assertRaises(ValueError):
+            FramedLogReader(raw_filename)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import sys
+import os
+# bridge ディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import unittest
+import numpy as np
+from telemetry.histogram import (LatencyHistogram, bucket_index, bucket_upper_bound, SUB_BUCKET_COUNT,
+                                 MAX_TRACKABLE_NS)
+
+PERCENTS = [1, 10, 50, 75, 90, 99, 99.9, 100]
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_bucket_bounds(self):
+        """値がバケットの上限以下に入り、バケット幅が相対誤差 1/SUB_BUCKET_COUNT 以内か確認"""
+        rng = np.random.default_rng(0)
+        values = list(range(200)) + rng.integers(0, MAX_TRACKABLE_NS, size=2000).tolist()
+        for value in values:
+            index = bucket_index(value)
+            upper = bucket_upper_bound(index)
+            self.assertLessEqual(value, upper)
+            self.assertLessEqual(upper - value, value / SUB_BUCKET_COUNT)
+            if index > 0:
+                self.assertLess(bucket_upper_bound(index - 1), value)
+
+    def test_small_values_exact(self):
+        """小さい値は1値1バケットのため numpy.percentile と一致するか確認"""
+        sample = np.arange(32)
+        histogram = LatencyHistogram()
+        for value in sample.tolist():
+            histogram.record(value)
+        for percent in [50, 90, 99, 100]:
+            self.assertEqual(histogram.percentile(percent),
+                             int(np.percentile(sample, percent, method='inverted_cdf')))
+
+    def test_percentiles_match_numpy(self):
+        """対数正規分布のレイテンシで、パーセンタイルが numpy.percentile と相対誤差の範囲で一致するか確認"""
+        rng = np.random.default_rng(42)
+        # 中央値 200us 程度のレイテンシ（ナノ秒）
+        sample = rng.lognormal(mean=np.log(200_000), sigma=1.0, size=20000).astype(np.int64)
+        histogram = LatencyHistogram()
+        for value in sample.tolist():
+            histogram.record(value)
+        self.assertEqual(histogram.total_count, len(sample))
+        self.assertEqual(histogram.max_ns, int(sample.max()))
+        self.assertAlmostEqual(histogram.mean(), float(sample.mean()), delta=1e-6 * sample.mean())
+        for percent in PERCENTS:
+            expected = float(np.percentile(sample, percent, method='inverted_cdf'))
+            actual = histogram.percentile(percent)
+            self.assertLessEqual(abs(actual - expected), expected / SUB_BUCKET_COUNT + 1,
+                                 f"p{percent}: {actual} vs {expected}")
+        self.assertEqual(histogram.percentile(100), int(sample.max()))
+
+    def test_empty_and_reset(self):
+        """記録がない場合とクリア後は 0 を返すか確認"""
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(50), 0)
+        self.assertEqual(histogram.mean(), 0.0)
+        histogram.record(1000)
+        histogram.reset()
+        self.assertEqual(histogram.to_dict()["count"], 0)
+        self.assertEqual(histogram.percentile(99), 0)
+
+    def test_out_of_range(self):
+        """負の値は 0、上限を超える値は最大のバケットとして記録されるか確認"""
+        histogram = LatencyHistogram()
+        histogram.record(-5)
+        histogram.record(MAX_TRACKABLE_NS * 10)
+        self.assertEqual(histogram.counts[0], 1)
+        self.assertEqual(histogram.counts[-1], 1)
+        # パーセンタイルは最大のバケットの上限で飽和し、最大値は別に保持する
+        self.assertEqual(histogram.percentile(100), bucket_upper_bound(len(histogram.counts) - 1))
+        self.assertEqual(histogram.max_ns, MAX_TRACKABLE_NS * 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+import sys
+import os
+# bridge ディレクトリと tools ディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'tools'))
+
+import math
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from pymavlink import mavutil
+from log.framed_log import FramedLogWriter
+from mavlink_log_analyzer import MavlinkLogAnalyzer, compute_stats, export_arrays, scan_frames
+
+def pack(mav, msg):
+    # pack() はシーケンス番号を進めないため、送信時と同様にここで進める
+    packet = msg.pack(mav)
+    mav.seq = (mav.seq + 1) % 256
+    return packet
+
+def attitude(mav, time_boot_ms):
+    return pack(mav, mavutil.mavlink.MAVLink_attitude_message(time_boot_ms, 0.1, 0.2, 0.3, 0.0, 0.0, 0.0))
+
+def heartbeat(mav):
+    return pack(mav, mavutil.mavlink.MAVLink_heartbeat_message(
+        mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA, 0, 0, 0, 3))
+
+def packets(count=10):
+    """100ms 毎の ATTITUDE と、1回おきの HEARTBEAT"""
+    mav = mavutil.mavlink.MAVLink(None, srcSystem=1, srcComponent=1)
+    result = []
+    for i in range(count):
+        packet = attitude(mav, 1000 + i * 100)
+        if i % 2 == 0:
+            packet += heartbeat(mav)
+        result.append(packet)
+    return result
+
+class TestScanFrames(unittest.TestCase):
+
+    def test_frames_between_garbage(self):
+        """ゴミのバイト列を読み飛ばし、v1/v2 のフレームを検出するか確認"""
+        mav2 = mavutil.mavlink.MAVLink(None, srcSystem=3, srcComponent=4)
+        mav1 = mavutil.mavlink.MAVLink(None, srcSystem=5, srcComponent=6)
+        mav1.WIRE_PROTOCOL_VERSION = "1.0"
+        frame2 = attitude(mav2, 1000)
+        mav1_frame = mavutil.mavlink.MAVLink_heartbeat_message(2, 3, 0, 0, 0, 3)
+        frame1 = bytes(mav1_frame.pack(mav1, force_mavlink1=True))
+        self.assertEqual(frame1[0], 0xFE)
+        buf = b"\x00\x11garbage" + frame2 + b"\x22" + frame1
+        frames = list(scan_frames(buf))
+        self.assertEqual(frames, [
+            (9, len(frame2), mavutil.mavlink.MAVLINK_MSG_ID_ATTITUDE, 3, 4, 0),
+            (9 + len(frame2) + 1, len(frame1), mavutil.mavlink.MAVLINK_MSG_ID_HEARTBEAT, 5, 6, 0),
+        ])
+
+    def test_truncated_tail(self):
+        """末尾の途切れたフレームは返さない"""
+        mav = mavutil.mavlink.MAVLink(None, srcSystem=1, srcComponent=1)
+        frame = attitude(mav, 1000)
+        # ペイロードの途中で途切れたフレーム
+        self.assertEqual(len(list(scan_frames(frame + frame[:-3]))), 1)
+        # ヘッダの途中で途切れたフレーム
+        self.assertEqual(len(list(scan_frames(frame + frame[:5]))), 1)
+        self.assertEqual(list(scan_frames(b"")), [])
+
+    def test_range(self):
+        mav = mavutil.mavlink.MAVLink(None, srcSystem=1, srcComponent=1)
+        frame = attitude(mav, 1000)
+        buf = frame * 3
+        self.assertEqual([pos for pos, *_ in scan_frames(buf, len(frame), 2 * len(frame))], [len(frame)])
+
+class TestMavlinkLogAnalyzer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_raw(self, data):
+        log_filename = os.path.join(self.tmpdir, 'raw.log')
+        with open(log_filename, 'wb') as f:
+            f.write(data)
+        return log_filename
+
+    def write_framed(self, records):
+        log_filename = os.path.join(self.tmpdir, 'framed.log')
+        writer = FramedLogWriter(log_filename)
+        for recv_time_usec, data in records:
+            writer.write(data, 14550, recv_time_usec)
+        writer.close()
+        return log_filename
+
+    def test_raw_log(self):
+        """生ログはメッセージ内の time_boot_ms を時刻とする"""
+        analyzer = MavlinkLogAnalyzer(self.write_raw(b"".join(packets())))
+        arrays = analyzer.analyze()
+        self.assertFalse(analyzer.has_recv_time)
+        self.assertEqual(analyzer.frame_count, 15)
+        self.assertEqual((analyzer.crc_errors, analyzer.seq_lost), (0, 0))
+        np.testing.assert_allclose(arrays["ATTITUDE"]["timestamp"], [1.0 + i * 0.1 for i in range(10)])
+        np.testing.assert_allclose(arrays["ATTITUDE"]["roll"], [0.1] * 10, rtol=1e-6)
+        # 時刻を持たない HEARTBEAT は直前の time_boot_ms
+        np.testing.assert_allclose(arrays["HEARTBEAT"]["timestamp"], [1.0 + i * 0.2 for i in range(5)])
+
+    def test_framed_log(self):
+        """フレーム形式ログは受信時刻を時刻とし、生ログと同じメッセージが得られるか確認"""
+        records = [(5_000_000 + i * 50_000, packet) for i, packet in enumerate(packets())]
+        analyzer = MavlinkLogAnalyzer(self.write_framed(records))
+        arrays = analyzer.analyze()
+        self.assertTrue(analyzer.has_recv_time)
+        self.assertEqual(analyzer.frame_count, 15)
+        np.testing.assert_allclose(arrays["ATTITUDE"]["timestamp"], [5.0 + i * 0.05 for i in range(10)])
+        raw = MavlinkLogAnalyzer(self.write_raw(b"".join(packets()))).analyze()
+        self.assertEqual(sorted(arrays), sorted(raw))
+        np.testing.assert_array_equal(arrays["ATTITUDE"]["time_boot_ms"], raw["ATTITUDE"]["time_boot_ms"])
+
+    def test_resync_after_corruption(self):
+        """CRCの合わないフレームの後も再同期して、後続のフレームを解析するか確認"""
+        data = packets()
+        corrupted = bytearray(data[3])
+        corrupted[12] ^= 0xFF  # ATTITUDE のペイロード
+        log = b"".join(data[:3]) + b"\x01\x02" + bytes(corrupted) + b"".join(data[4:]) + data[0][:7]
+        analyzer = MavlinkLogAnalyzer(self.write_raw(log))
+        arrays = analyzer.analyze()
+        self.assertGreaterEqual(analyzer.crc_errors, 1)
+        self.assertEqual(len(arrays["ATTITUDE"]["timestamp"]), 9)
+        self.assertEqual(len(arrays["HEARTBEAT"]["timestamp"]), 5)
+        self.assertEqual(analyzer.frame_count, 14)
+        # 破損した ATTITUDE の分だけシーケンス番号が飛ぶ
+        self.assertEqual(analyzer.seq_lost, 1)
+
+    def test_truncated_framed_log(self):
+        """レコードの途中で途切れたフレーム形式ログは、途切れる前までを解析するか確認"""
+        records = [(5_000_000 + i * 50_000, packet) for i, packet in enumerate(packets())]
+        log_filename = self.write_framed(records)
+        with open(log_filename, 'r+b') as f:
+            f.truncate(os.path.getsize(log_filename) - 5)
+        arrays = MavlinkLogAnalyzer(log_filename).analyze()
+        self.assertEqual(len(arrays["ATTITUDE"]["timestamp"]), 9)
+
+    def test_msg_types_filter(self):
+        """対象外のメッセージはデコードせず、シーケンス番号の判定のみ行う"""
+        analyzer = MavlinkLogAnalyzer(self.write_raw(b"".join(packets())), msg_types=["HEARTBEAT"])
+        arrays = analyzer.analyze()
+        self.assertEqual(list(arrays), ["HEARTBEAT"])
+        self.assertEqual(analyzer.frame_count, 15)
+        self.assertEqual(analyzer.seq_lost, 0)
+
+    def test_empty_log(self):
+        self.assertEqual(MavlinkLogAnalyzer(self.write_raw(b"")).analyze(), {})
+
+    def test_export_npz(self):
+        arrays = MavlinkLogAnalyzer(self.write_raw(b"".join(packets()))).analyze()
+        filename = os.path.join(self.tmpdir, 'out.npz')
+        export_arrays(arrays, filename)
+        with np.load(filename) as exported:
+            np.testing.assert_array_equal(exported["ATTITUDE.timestamp"], arrays["ATTITUDE"]["timestamp"])
+
+class TestComputeStats(unittest.TestCase):
+
+    def test_totals(self):
+        """100ms 間隔で1回だけ 300ms 空いた場合の統計"""
+        stats = compute_stats(np.array([0.0, 0.1, 0.2, 0.3, 0.6, 0.7]))
+        self.assertEqual(stats["count"], 6)
+        self.assertAlmostEqual(stats["duration"], 0.7)
+        self.assertAlmostEqual(stats["rate"], 5 / 0.7)
+        self.assertAlmostEqual(stats["mean_interval"], 0.14)
+        self.assertAlmostEqual(stats["max_gap"], 0.3)
+        self.assertAlmostEqual(stats["jitter"], float(np.std([0.1, 0.1, 0.1, 0.3, 0.1])))
+        self.assertEqual(stats["dropouts"], 1)
+
+    def test_nan_and_rewind(self):
+        """NaN と時刻の巻き戻りは間隔から除外する"""
+        stats = compute_stats(np.array([math.nan, 1.0, 1.5, 0.2, 0.7]))
+        self.assertEqual(stats["count"], 5)
+        self.assertAlmostEqual(stats["duration"], 1.0)
+        self.assertAlmostEqual(stats["rate"], 2.0)
+        self.assertEqual(stats["dropouts"], 0)
+
+    def test_too_few_samples(self):
+        for timestamps in ([], [1.0], [math.nan, math.nan]):
+            stats = compute_stats(np.array(timestamps, dtype=float))
+            self.assertEqual(stats["count"], len(timestamps))
+            self.assertEqual((stats["rate"], stats["duration"], stats["dropouts"]), (0.0, 0.0, 0))
+
+if __name__ == '__main__':
+    unittest.main()
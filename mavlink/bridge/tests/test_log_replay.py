@@ -0,0 +1,107 @@
+import sys
+import os
+# bridge ディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pymavlink import mavutil
+from log.framed_log import FramedLogWriter
+from log.log_replay import LogReplay
+from msg.mavlink_message import MavlinkMessage
+from msg.message_queue import MessageQueue
+
+AHRS2 = MavlinkMessage.get_pdu_msg_type("AHRS2")
+HEARTBEAT = MavlinkMessage.get_pdu_msg_type("HEARTBEAT")
+# キューのサイズ（main.py と同じ）を大きく超える数
+MESSAGE_COUNT = 629
+QUEUE_SIZE = 100
+
+def ahrs2_packets():
+    mav = mavutil.mavlink.MAVLink(None, srcSystem=1, srcComponent=1)
+    heartbeat = mavutil.mavlink.MAVLink_heartbeat_message(
+        mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA, 0, 0, 0, 3)
+    packets = []
+    for i in range(MESSAGE_COUNT):
+        packet = mavutil.mavlink.MAVLink_ahrs2_message(0.1, 0.2, 0.3, 584.0, i, i).pack(mav)
+        if i % 10 == 0:
+            # リッスン対象外のメッセージはキューの空きを待たずに無視される
+            packet += heartbeat.pack(mav)
+        packets.append(packet)
+    return packets
+
+class TestLogReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.queue = MessageQueue(max_size=QUEUE_SIZE)
+        self.queue.set_listened_types([AHRS2])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def replay(self, log_filename, **kwargs):
+        """タイミングループを模擬して20ms毎にキューを取り出しながら、最速で再生する"""
+        parser = mavutil.mavlink.MAVLink(None)
+        parser.robust_parsing = True
+        log_replay = LogReplay(log_filename, parser, self.queue, speed=0, **kwargs)
+        thread = threading.Thread(target=log_replay.replay_log)
+        thread.start()
+        received = []
+        while thread.is_alive() or not self.queue.is_empty():
+            received.extend(self.queue.dequeue_all())
+            time.sleep(0.02)
+        thread.join()
+        return received
+
+    def assert_no_loss(self, received):
+        self.assertEqual(len(received), MESSAGE_COUNT)
+        self.assertTrue(all(message.msg_type == AHRS2 for message in received))
+        self.assertEqual([message.msg_obj.lat for message in received], list(range(MESSAGE_COUNT)))
+
+    def test_framed_log_no_loss(self):
+        log_filename = os.path.join(self.tmpdir, 'mavlink.log')
+        writer = FramedLogWriter(log_filename)
+        for i, packet in enumerate(ahrs2_packets()):
+            writer.write(packet, 14550, 1_000_000 + i * 1000)
+        writer.close()
+        self.assert_no_loss(self.replay(log_filename))
+
+    def test_raw_log_no_loss(self):
+        log_filename = os.path.join(self.tmpdir, 'mavlink.raw')
+        with open(log_filename, 'wb') as f:
+            f.write(b''.join(ahrs2_packets()))
+        self.assert_no_loss(self.replay(log_filename, batch_size=256))
+
+    def test_stop_while_waiting(self):
+        """キューが取り出されない場合も stop() で再生を中断できる"""
+        log_filename = os.path.join(self.tmpdir, 'mavlink.raw')
+        with open(log_filename, 'wb') as f:
+            f.write(b''.join(ahrs2_packets()))
+        parser = mavutil.mavlink.MAVLink(None)
+        parser.robust_parsing = True
+        log_replay = LogReplay(log_filename, parser, self.queue, speed=0)
+        thread = threading.Thread(target=log_replay.replay_log)
+        thread.start()
+        time.sleep(0.2)
+        self.assertEqual(self.queue.size(), QUEUE_SIZE)
+        log_replay.stop()
+        thread.join(timeout=2.0)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.queue.size(), QUEUE_SIZE)
+
+class TestMessageQueue(unittest.TestCase):
+
+    def test_overflow_drops_oldest(self):
+        """受信側（wait=False）は従来通り古いメッセージを破棄する"""
+        queue = MessageQueue(max_size=2)
+        queue.set_listened_types([AHRS2])
+        messages = [MavlinkMessage("127.0.0.1", 0, "AHRS2", msg_data={"i": i}) for i in range(3)]
+        self.assertEqual(queue.enqueue_many(messages), 3)
+        self.assertEqual([message.msg_data["i"] for message in queue.dequeue_all()], [1, 2])
+
+if __name__ == '__main__':
+    unittest.main()
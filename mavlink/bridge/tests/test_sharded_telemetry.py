@@ -0,0 +1,93 @@
+import sys
+import os
+# bridge ディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import socket
+import tempfile
+import time
+import unittest
+from pymavlink import mavutil
+from msg.mavlink_message import MavlinkMessage
+from shard.sharded_bridge import ShardedBridge
+from telemetry.bridge_telemetry import BridgeTelemetry
+
+AHRS2 = MavlinkMessage.get_pdu_msg_type("AHRS2")
+HEARTBEAT = MavlinkMessage.get_pdu_msg_type("HEARTBEAT")
+REF_LAT = -353632621
+REF_LNG = 1491652374
+REF_ALT = 584.0
+MESSAGE_COUNT = 20
+
+def free_udp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def write_configs(workdir, port):
+    comm_config = {"vehicles": {"Drone1": {
+        "ip_address": "127.0.0.1", "port": port, "my_port": port,
+        "initial_position": {"latitude": REF_LAT, "longitude": REF_LNG, "altitude": REF_ALT},
+    }}}
+    pdu_config = {"robots": [{
+        "name": "Drone1",
+        "shm_pdu_readers": [
+            {"type": "geometry_msgs/Twist", "org_name": "pos", "channel_id": 0, "pdu_size": 72},
+        ],
+        "shm_pdu_writers": [],
+    }]}
+    paths = {}
+    for key, data in (("comm", comm_config), ("pdu", pdu_config), ("mavlink", {"robots": []})):
+        paths[key] = os.path.join(workdir, f"{key}.json")
+        with open(paths[key], "w") as f:
+            json.dump(data, f)
+    return paths
+
+class TestShardedTelemetry(unittest.TestCase):
+
+    def test_worker_stats_reach_telemetry(self):
+        """ワーカのカウンタとレイテンシがリング経由で BridgeTelemetry に集計されるか確認"""
+        port = free_udp_port()
+        telemetry = BridgeTelemetry()
+        with tempfile.TemporaryDirectory() as workdir:
+            paths = write_configs(workdir, port)
+            bridge = ShardedBridge("127.0.0.1", {"Drone1": port}, 1,
+                                   paths["mavlink"], paths["pdu"], paths["comm"], telemetry=telemetry)
+            bridge.start()
+            try:
+                mav = mavutil.mavlink.MAVLink(None, srcSystem=1, srcComponent=1)
+                heartbeat = mavutil.mavlink.MAVLink_heartbeat_message(
+                    mavutil.mavlink.MAV_TYPE_QUADROTOR, mavutil.mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA, 0, 0, 0, 3)
+                ahrs2 = mavutil.mavlink.MAVLink_ahrs2_message(0.1, 0.2, 0.3, REF_ALT + 1.0, REF_LAT, REF_LNG)
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                received = []
+                recv_times = []
+                deadline = time.monotonic() + 20.0
+                # ワーカの起動を待ちながら、全メッセージのカウンタが届くまで送受信を続ける
+                while time.monotonic() < deadline:
+                    if len(received) < MESSAGE_COUNT:
+                        sock.sendto(heartbeat.pack(mav) + ahrs2.pack(mav), ("127.0.0.1", port))
+                    time.sleep(0.02)
+                    bridge.drain(lambda robot_name, channel_id, data: received.append(robot_name), recv_times)
+                    counters = telemetry.snapshot()["counters"]
+                    if (len(received) >= MESSAGE_COUNT
+                            and counters.get(AHRS2, {}).get("received", 0) == counters[AHRS2]["converted"]):
+                        break
+                sock.close()
+            finally:
+                bridge.stop()
+
+        counters = telemetry.snapshot()["counters"]
+        self.assertGreaterEqual(len(received), MESSAGE_COUNT)
+        self.assertEqual(counters[AHRS2]["converted"], len(received))
+        self.assertEqual(counters[AHRS2]["received"], len(received))
+        self.assertEqual(counters[HEARTBEAT]["received"], counters[HEARTBEAT]["filtered"])
+        self.assertGreater(counters[HEARTBEAT]["received"], 0)
+        self.assertEqual(len(recv_times), len(received))
+        latency = telemetry.snapshot()["latency"]
+        self.assertEqual(latency["queue"]["count"], len(received))
+        self.assertEqual(latency["convert"]["count"], len(received))
+
+if __name__ == '__main__':
+    unittest.main()
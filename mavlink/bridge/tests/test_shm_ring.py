@@ -0,0 +1,94 @@
+import sys
+import os
+# bridge ディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import struct
+import unittest
+from comm.shm_ring import ShmRingBuffer
+
+class TestShmRingBuffer(unittest.TestCase):
+
+    def setUp(self):
+        # 境界をまたぐ配置を作りやすいよう、データ領域を小さくする
+        self.ring = ShmRingBuffer(capacity=32)
+
+    def tearDown(self):
+        self.ring.close()
+
+    def test_empty_pop(self):
+        """空の場合は空のリストを返すか確認"""
+        self.assertEqual(self.ring.pop_all(), [])
+        self.assertEqual(self.ring.drops(), 0)
+
+    def test_push_pop(self):
+        """書き込んだ順にレコードを取り出せるか確認"""
+        self.assertTrue(self.ring.push(b'abc'))
+        self.assertTrue(self.ring.push(b''))
+        self.assertTrue(self.ring.push(b'defgh'))
+        self.assertEqual(self.ring.pop_all(), [b'abc', b'', b'defgh'])
+        self.assertEqual(self.ring.pop_all(), [])
+
+    def test_payload_wraps_around(self):
+        """データがバッファの末尾をまたぐ場合も正しく読み出せるか確認"""
+        self.assertTrue(self.ring.push(b'x' * 10))
+        self.assertEqual(self.ring.pop_all(), [b'x' * 10])
+        # 位置 18 から 20 バイト書き込むため、データは末尾から先頭に折り返す
+        payload = bytes(range(12))
+        self.assertTrue(self.ring.push(payload))
+        self.assertEqual(self.ring.pop_all(), [payload])
+
+    def test_header_wraps_around(self):
+        """レコードヘッダがバッファの末尾をまたぐ場合も正しく読み出せるか確認"""
+        self.assertTrue(self.ring.push(b'y' * 22))
+        self.assertEqual(self.ring.pop_all(), [b'y' * 22])
+        # 位置 30 から書き込むため、8バイトのレコードヘッダが末尾から先頭に折り返す
+        self.assertTrue(self.ring.push(b'ab'))
+        self.assertTrue(self.ring.push(b'cdef'))
+        self.assertEqual(self.ring.pop_all(), [b'ab', b'cdef'])
+
+    def test_full_buffer_drops(self):
+        """空きがない場合は書き込まずに破棄数を増やすか確認"""
+        self.assertTrue(self.ring.push(b'z' * 24))
+        self.assertFalse(self.ring.push(b'1'))
+        self.assertFalse(self.ring.push(b''))
+        self.assertEqual(self.ring.drops(), 2)
+        self.assertEqual(self.ring.pop_all(), [b'z' * 24])
+        # 読み出した分の空きができれば再び書き込める
+        self.assertTrue(self.ring.push(b'1'))
+        self.assertEqual(self.ring.pop_all(), [b'1'])
+        self.assertEqual(self.ring.drops(), 2)
+
+    def test_unpublished_record_is_retried(self):
+        """データより先に head の更新が見えた場合は読み出さず、次回に再試行するか確認"""
+        self.assertTrue(self.ring.push(b'first'))
+        self.assertTrue(self.ring.push(b'second'))
+        # 2つ目のレコードのデータがまだ見えていない状態を再現する
+        offset = 8 + 5 + 8
+        self.ring.data[offset] ^= 0xFF
+        self.assertEqual(self.ring.pop_all(), [b'first'])
+        self.assertEqual(self.ring.pop_all(), [])
+        self.ring.data[offset] ^= 0xFF
+        self.assertEqual(self.ring.pop_all(), [b'second'])
+
+    def test_stale_record_is_not_read(self):
+        """1周前に同じ位置へ書かれたレコードを、新しいレコードとして読まないか確認"""
+        self.assertTrue(self.ring.push(b'w' * 24))
+        self.assertEqual(self.ring.pop_all(), [b'w' * 24])
+        # 次のレコードの head だけが先に見え、データ領域には1周前のレコードが残っている状態
+        struct.pack_into("<Q", self.ring.shm.buf, 0, 64)
+        self.assertEqual(self.ring.pop_all(), [])
+        struct.pack_into("<Q", self.ring.shm.buf, 0, 32)
+        self.assertTrue(self.ring.push(b'v' * 24))
+        self.assertEqual(self.ring.pop_all(), [b'v' * 24])
+
+    def test_attach(self):
+        """名前で接続したリングから書き込み、作成側で読み出せるか確認"""
+        writer = ShmRingBuffer(name=self.ring.name, create=False)
+        self.assertEqual(writer.capacity, 32)
+        self.assertTrue(writer.push(b'from worker'))
+        writer.close()
+        self.assertEqual(self.ring.pop_all(), [b'from worker'])
+
+if __name__ == '__main__':
+    unittest.main()
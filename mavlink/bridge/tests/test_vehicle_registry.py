@@ -0,0 +1,145 @@
+import sys
+import os
+# bridge ディレクトリをモジュール検索パスに追加
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+import time
+import unittest
+from unittest import mock
+from pymavlink import mavutil
+from msg.mavlink_message import MavlinkMessage
+from registry.conv import ConverterRegistry, build_vehicle_converters
+from registry.vehicle import VehicleRegistry, RESTART_TAKEOVER_SEC
+
+AHRS2 = MavlinkMessage.get_pdu_msg_type("AHRS2")
+PORT = 54100
+
+VEHICLE_TEMPLATE = {
+    "initial_position": {"latitude": -353632621, "longitude": 1491652374, "altitude": 584.0}
+}
+
+class FakeHeartbeat:
+    """VehicleRegistry.join が参照する HEARTBEAT の項目だけを持つメッセージ"""
+    def __init__(self, system_id, mav_type=mavutil.mavlink.MAV_TYPE_QUADROTOR):
+        self.type = mav_type
+        self.system_id = system_id
+
+    def get_srcSystem(self):
+        return self.system_id
+
+def create_registry(discovery=None, static_vehicles=None, pdu_robot_names=("Drone1", "Drone2", "Drone3")):
+    discovery_config = {"port": PORT, "robot_names": ["Drone1", "Drone2"], "idle_timeout_sec": 10,
+                        "vehicle": VEHICLE_TEMPLATE}
+    discovery_config.update(discovery or {})
+    return VehicleRegistry(discovery_config, static_vehicles or {}, pdu_robot_names, ConverterRegistry())
+
+class TestVehicleRegistry(unittest.TestCase):
+
+    def test_join_allocates_names_in_order(self):
+        registry = create_registry()
+        entry1 = registry.join(("127.0.0.1", 5001), PORT, FakeHeartbeat(1))
+        entry2 = registry.join(("127.0.0.1", 5002), PORT, FakeHeartbeat(2))
+        self.assertEqual((entry1.robot_name, entry2.robot_name), ("Drone1", "Drone2"))
+        self.assertIs(registry.lookup(("127.0.0.1", 5001)), entry1)
+        self.assertTrue(registry.conv_registry.has_route("Drone1", AHRS2))
+        # 参加済みの送信元は同じエントリを返す
+        self.assertIs(registry.join(("127.0.0.1", 5001), PORT, FakeHeartbeat(1)), entry1)
+        # 割り当てるロボット名がなくなった場合は参加させない
+        self.assertIsNone(registry.join(("127.0.0.1", 5003), PORT, FakeHeartbeat(3)))
+        self.assertEqual(len(registry.vehicles()), 2)
+
+    def test_static_and_pdu_names(self):
+        """vehicles のロボット名は割り当てず、PDU設定にないロボット名では参加させない"""
+        registry = create_registry(static_vehicles={"Drone1": {}})
+        self.assertEqual(registry.join(("127.0.0.1", 5001), PORT, FakeHeartbeat(1)).robot_name, "Drone2")
+        registry = create_registry(pdu_robot_names=["Drone2"])
+        self.assertIsNone(registry.join(("127.0.0.1", 5001), PORT, FakeHeartbeat(1)))
+
+    def test_name_format(self):
+        registry = create_registry({"robot_names": [], "name_format": "Drone{sysid}"},
+                                   static_vehicles={"Drone3": {}})
+        self.assertEqual(registry.join(("127.0.0.1", 5002), PORT, FakeHeartbeat(2)).robot_name, "Drone2")
+        # 同じシステムIDの別の送信元や、vehicles のロボット名になる場合は参加させない
+        self.assertIsNone(registry.join(("127.0.0.2", 5002), PORT, FakeHeartbeat(2)))
+        self.assertIsNone(registry.join(("127.0.0.1", 5003), PORT, FakeHeartbeat(3)))
+
+    def test_gcs_ignored(self):
+        registry = create_registry()
+        self.assertIsNone(registry.join(("127.0.0.1", 5001), PORT,
+                                        FakeHeartbeat(255, mavutil.mavlink.MAV_TYPE_GCS)))
+        self.assertEqual(registry.vehicles(), [])
+
+    def test_restart_takeover(self):
+        """途絶えた Vehicle と同じIPアドレス・システムIDの送信元はロボット名を引き継ぐ"""
+        registry = create_registry()
+        registry.join(("127.0.0.1", 5001), PORT, FakeHeartbeat(1))
+        # 受信が続いている間は引き継がない（別の Vehicle として参加する）
+        other = registry.join(("127.0.0.1", 5002), PORT, FakeHeartbeat(1))
+        self.assertEqual(other.robot_name, "Drone2")
+        registry = create_registry()
+        old = registry.join(("127.0.0.1", 5001), PORT, FakeHeartbeat(1))
+        old.last_seen = time.monotonic() - RESTART_TAKEOVER_SEC - 0.1
+        # システムIDが異なる場合は引き継がない
+        self.assertEqual(registry.join(("127.0.0.1", 5003), PORT, FakeHeartbeat(2)).robot_name, "Drone2")
+        new = registry.join(("127.0.0.1", 5002), PORT, FakeHeartbeat(1))
+        self.assertEqual(new.robot_name, "Drone1")
+        self.assertIsNone(registry.lookup(("127.0.0.1", 5001)))
+        self.assertIs(registry.lookup(("127.0.0.1", 5002)), new)
+        self.assertTrue(registry.conv_registry.has_route("Drone1", AHRS2))
+
+    def test_evict_idle(self):
+        registry = create_registry()
+        entry1 = registry.join(("127.0.0.1", 5001), PORT, FakeHeartbeat(1))
+        entry2 = registry.join(("127.0.0.1", 5002), PORT, FakeHeartbeat(2))
+        entry1.last_seen = 100.0
+        entry2.last_seen = 105.0
+        self.assertEqual(registry.evict_idle(now=109.0), [])
+        snapshot = registry._vehicles
+        self.assertEqual(registry.evict_idle(now=110.0), [entry1])
+        # 受信側が参照中の辞書は変更せずに差し替える
+        self.assertIn(("127.0.0.1", 5001), snapshot)
+        self.assertIsNone(registry.lookup(("127.0.0.1", 5001)))
+        self.assertFalse(registry.conv_registry.has_route("Drone1", AHRS2))
+        self.assertTrue(registry.conv_registry.has_route("Drone2", AHRS2))
+        # 削除したロボット名は次の参加で再び割り当てられる
+        self.assertEqual(registry.join(("127.0.0.1", 5003), PORT, FakeHeartbeat(3)).robot_name, "Drone1")
+
+    def test_concurrent_join_retries(self):
+        """コンバータの初期化中はロックを取らず、その間に他の送信元が参加した場合は割り当てをやり直す"""
+        registry = create_registry()
+        others = []
+        started = threading.Event()
+
+        def build_and_join_other(*args):
+            if not started.is_set():
+                started.set()
+                # 別の受信スレッドが同時に参加する（ロックを保持していると待ち続ける）
+                thread = threading.Thread(target=lambda: others.append(
+                    registry.join(("127.0.0.1", 5002), PORT, FakeHeartbeat(2))))
+                thread.start()
+                thread.join(timeout=2.0)
+                self.assertFalse(thread.is_alive())
+            return build_vehicle_converters(*args)
+
+        with mock.patch("registry.vehicle.build_vehicle_converters", side_effect=build_and_join_other):
+            entry = registry.join(("127.0.0.1", 5001), PORT, FakeHeartbeat(1))
+        self.assertEqual(others[0].robot_name, "Drone1")
+        self.assertEqual(entry.robot_name, "Drone2")
+        self.assertEqual(len(registry.vehicles()), 2)
+        self.assertTrue(registry.conv_registry.has_route("Drone1", AHRS2))
+        self.assertTrue(registry.conv_registry.has_route("Drone2", AHRS2))
+
+    def test_validate(self):
+        """vehicle 定義の誤りを起動時の検証で検出する"""
+        create_registry().validate()
+        registry = create_registry({"vehicle": {}})
+        with self.assertRaises(ValueError):
+            registry.validate()
+        registry = create_registry({"vehicle": dict(VEHICLE_TEMPLATE, converters=[
+            {"mavlink": "AHRS2", "converter": "msg.conv.no_such_module.Converter"}])})
+        with self.assertRaises(ValueError):
+            registry.validate()
+
+if __name__ == '__main__':
+    unittest.main()
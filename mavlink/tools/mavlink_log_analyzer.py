@@ -0,0 +1,289 @@
+import mmap
+import os
+import struct
+import numpy as np
+from pymavlink import mavutil
+
+# MAVLink フレームのヘッダ
+MAVLINK_V1_MARKER = 0xFE
+MAVLINK_V2_MARKER = 0xFD
+MAVLINK_V1_HEADER_LEN = 6
+MAVLINK_V2_HEADER_LEN = 10
+MAVLINK_CHECKSUM_LEN = 2
+MAVLINK_SIGNATURE_LEN = 13
+MAVLINK_IFLAG_SIGNED = 0x01
+
+# ブリッジの --record で保存されるフレーム形式ログ（bridge/log/framed_log.py と同じ形式）
+FRAMED_LOG_MAGIC = b"HKMAVLOG"
+FRAMED_LOG_FILE_HEADER = struct.Struct("<8sII")
+FRAMED_LOG_RECORD_HEADER = struct.Struct("<QHH")
+
+# 中央値の何倍以上の間隔を欠落とみなすか
+DROPOUT_FACTOR = 2.0
+
+
+def scan_frames(buf, start=0, end=None):
+    """
+    バッファ中のMAVLinkフレームの位置を走査する（デコードはしない）
+    :param buf: bytes / mmap
+    :param start: 走査開始位置
+    :param end: 走査終了位置（省略時はバッファの末尾）
+    :return: (フレーム開始位置, フレーム長, メッセージID, システムID, コンポーネントID, シーケンス番号) のイテレータ
+    """
+    if end is None:
+        end = len(buf)
+    pos = start
+    # 次のマーカー位置を覚えておき、片方のバージョンしか無いログで再検索を繰り返さない
+    next_v1 = next_v2 = -2
+    while pos < end:
+        if -1 < next_v1 < pos or next_v1 == -2:
+            next_v1 = buf.find(b"\xfe", pos, end)
+        if -1 < next_v2 < pos or next_v2 == -2:
+            next_v2 = buf.find(b"\xfd", pos, end)
+        if next_v1 < 0 and next_v2 < 0:
+            return
+        pos = next_v2 if next_v1 < 0 or (0 <= next_v2 < next_v1) else next_v1
+        if buf[pos] == MAVLINK_V2_MARKER:
+            if pos + MAVLINK_V2_HEADER_LEN > end:
+                return
+            length = buf[pos + 1]
+            incompat_flags = buf[pos + 2]
+            total = MAVLINK_V2_HEADER_LEN + length + MAVLINK_CHECKSUM_LEN
+            if incompat_flags & MAVLINK_IFLAG_SIGNED:
+                total += MAVLINK_SIGNATURE_LEN
+            seq = buf[pos + 4]
+            sysid = buf[pos + 5]
+            compid = buf[pos + 6]
+            msgid = buf[pos + 7] | (buf[pos + 8] << 8) | (buf[pos + 9] << 16)
+        else:
+            if pos + MAVLINK_V1_HEADER_LEN > end:
+                return
+            length = buf[pos + 1]
+            total = MAVLINK_V1_HEADER_LEN + length + MAVLINK_CHECKSUM_LEN
+            seq = buf[pos + 2]
+            sysid = buf[pos + 3]
+            compid = buf[pos + 4]
+            msgid = buf[pos + 5]
+        if pos + total > end:
+            return
+        yield pos, total, msgid, sysid, compid, seq
+        pos += total
+
+
+class MessageColumns:
+    def __init__(self, msg_type):
+        """
+        1つのメッセージタイプの列データ
+        :param msg_type: メッセージタイプ名
+        """
+        self.msg_type = msg_type
+        self.timestamps = []
+        self.fields = None
+        self.columns = None
+
+    def append(self, timestamp, msg):
+        if self.fields is None:
+            # 数値のスカラーフィールドのみを列にする（文字列・配列は対象外）
+            self.fields = [name for name in msg.get_fieldnames()
+                           if isinstance(getattr(msg, name), (int, float))]
+            self.columns = {name: [] for name in self.fields}
+        self.timestamps.append(timestamp)
+        for name in self.fields:
+            self.columns[name].append(getattr(msg, name, 0))
+
+    def to_arrays(self):
+        """
+        :return: {"timestamp": ndarray, フィールド名: ndarray}
+        """
+        arrays = {"timestamp": np.asarray(self.timestamps, dtype=np.float64)}
+        for name in self.fields or []:
+            arrays[name] = np.asarray(self.columns[name])
+        return arrays
+
+
+class MavlinkLogAnalyzer:
+    def __init__(self, log_filename, msg_types=None):
+        """
+        MAVLinkログのオフライン解析
+        生のMAVLinkバイト列ログとフレーム形式ログ（--record）の両方に対応
+        :param log_filename: ログファイル名
+        :param msg_types: 解析するメッセージタイプ名のリスト（省略時は全タイプ）
+        """
+        self.log_filename = log_filename
+        self.msg_types = set(msg_types) if msg_types else None
+        self.mav = mavutil.mavlink.MAVLink(None)
+        self.messages = {}
+        self.frame_count = 0
+        self.crc_errors = 0
+        self.unknown_count = 0
+        self.seq_lost = 0
+        self.last_seq = {}
+        self.has_recv_time = False
+        self.boot_time = np.nan
+        self.wanted_ids = None
+        if self.msg_types is not None:
+            self.wanted_ids = {
+                msgid for msgid, msgtype in mavutil.mavlink.mavlink_map.items()
+                if msgtype.msgname in self.msg_types
+            }
+
+    def analyze(self):
+        """
+        ログ全体を解析して列データを作成する
+        :return: {メッセージタイプ名: {"timestamp": ndarray, フィールド名: ndarray}}
+        """
+        if os.path.getsize(self.log_filename) == 0:
+            return {}
+        with open(self.log_filename, "rb") as log_file:
+            mm = mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                if mm[:len(FRAMED_LOG_MAGIC)] == FRAMED_LOG_MAGIC:
+                    self.has_recv_time = True
+                    self._analyze_framed(mm)
+                else:
+                    self._analyze_buffer(mm, 0, len(mm), None)
+            finally:
+                mm.close()
+        return {msg_type: columns.to_arrays() for msg_type, columns in self.messages.items()}
+
+    def _analyze_framed(self, mm):
+        offset = FRAMED_LOG_FILE_HEADER.size
+        record_size = FRAMED_LOG_RECORD_HEADER.size
+        end = len(mm)
+        while offset + record_size <= end:
+            recv_time_usec, _port, length = FRAMED_LOG_RECORD_HEADER.unpack_from(mm, offset)
+            offset += record_size
+            if offset + length > end:
+                break
+            self._analyze_buffer(mm, offset, offset + length, recv_time_usec / 1e6)
+            offset += length
+
+    def _analyze_buffer(self, buf, start, end, recv_time):
+        pos = start
+        while pos < end:
+            resync = None
+            for frame_pos, total, msgid, sysid, compid, seq in scan_frames(buf, pos, end):
+                self.frame_count += 1
+                if self.wanted_ids is not None and msgid not in self.wanted_ids:
+                    # 対象外のメッセージはデコードせずに読み飛ばす（CRCも検証しない）
+                    self._check_seq(sysid, compid, seq)
+                    continue
+                try:
+                    msg = self.mav.decode(bytearray(buf[frame_pos:frame_pos + total]))
+                except mavutil.mavlink.MAVError:
+                    # ヘッダの誤検出: 1バイト先から再同期
+                    self.crc_errors += 1
+                    self.frame_count -= 1
+                    resync = frame_pos + 1
+                    break
+                if isinstance(msg, mavutil.mavlink.MAVLink_unknown):
+                    # 未知のメッセージはCRCを検証できないため、既知の送信元の場合のみシーケンスを判定する
+                    self.unknown_count += 1
+                    if (sysid, compid) in self.last_seq:
+                        self._check_seq(sysid, compid, seq)
+                    continue
+                self._check_seq(sysid, compid, seq)
+                msg_type = msg.get_type()
+                columns = self.messages.get(msg_type)
+                if columns is None:
+                    columns = self.messages[msg_type] = MessageColumns(msg_type)
+                columns.append(self._timestamp(msg, recv_time), msg)
+            if resync is None:
+                return
+            pos = resync
+
+    def _check_seq(self, sysid, compid, seq):
+        key = (sysid, compid)
+        last = self.last_seq.get(key)
+        if last is not None:
+            self.seq_lost += (seq - last - 1) & 0xFF
+        self.last_seq[key] = seq
+
+    def _timestamp(self, msg, recv_time):
+        """
+        メッセージの時刻（秒）
+        フレーム形式ログは受信時刻、生ログはメッセージ内の時刻を使う
+        時刻を持たないメッセージは直前の time_boot_ms を使う
+        """
+        if recv_time is not None:
+            return recv_time
+        time_boot_ms = getattr(msg, "time_boot_ms", None)
+        if time_boot_ms is not None:
+            self.boot_time = time_boot_ms / 1e3
+            return self.boot_time
+        time_usec = getattr(msg, "time_usec", None)
+        if time_usec is not None:
+            return time_usec / 1e6
+        return self.boot_time
+
+
+def compute_stats(timestamps):
+    """
+    タイムスタンプ列から受信レート・ジッタ・間隔の統計を求める
+    :param timestamps: 秒単位のタイムスタンプ（ndarray、NaNは無視）
+    :return: 統計値のdict
+    """
+    count = len(timestamps)
+    stats = {"count": count, "duration": 0.0, "rate": 0.0, "mean_interval": 0.0,
+             "jitter": 0.0, "max_gap": 0.0, "dropouts": 0}
+    valid = timestamps[~np.isnan(timestamps)]
+    if len(valid) < 2:
+        return stats
+    intervals = np.diff(valid)
+    intervals = intervals[intervals >= 0]  # 時刻の巻き戻り（再起動など）は除外
+    if len(intervals) == 0:
+        return stats
+    duration = float(intervals.sum())
+    median = float(np.median(intervals))
+    stats["duration"] = duration
+    stats["rate"] = len(intervals) / duration if duration > 0 else 0.0
+    stats["mean_interval"] = float(intervals.mean())
+    stats["jitter"] = float(intervals.std())
+    stats["max_gap"] = float(intervals.max())
+    if median > 0:
+        stats["dropouts"] = int(np.count_nonzero(intervals > median * DROPOUT_FACTOR))
+    return stats
+
+
+def print_stats(analyzer, arrays):
+    """
+    メッセージタイプ毎の統計を表示
+    """
+    time_source = "receive time" if analyzer.has_recv_time else "message timestamp"
+    print(f"Frames: {analyzer.frame_count}, CRC errors: {analyzer.crc_errors}, "
+          f"unknown: {analyzer.unknown_count}, lost (seq gaps): {analyzer.seq_lost}")
+    print(f"Intervals based on {time_source}")
+    print(f"{'type':<28}{'count':>9}{'rate[Hz]':>10}{'mean[ms]':>10}{'jitter[ms]':>12}"
+          f"{'max gap[ms]':>13}{'dropouts':>10}")
+    for msg_type in sorted(arrays):
+        stats = compute_stats(arrays[msg_type]["timestamp"])
+        print(f"{msg_type:<28}{stats['count']:>9}{stats['rate']:>10.2f}"
+              f"{stats['mean_interval'] * 1e3:>10.2f}{stats['jitter'] * 1e3:>12.2f}"
+              f"{stats['max_gap'] * 1e3:>13.2f}{stats['dropouts']:>10}")
+
+
+def export_arrays(arrays, filename):
+    """
+    列データをエクスポートする
+    .npz: 1ファイルに "<タイプ名>.<フィールド名>" のキーで保存
+    .parquet: <ファイル名>_<タイプ名>.parquet にタイプ毎に保存（pyarrow が必要）
+    :param arrays: analyze() の戻り値
+    :param filename: 出力ファイル名
+    """
+    if filename.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("pyarrow is required for Parquet export (pip install pyarrow)")
+            return
+        base = filename[:-len(".parquet")]
+        for msg_type, columns in arrays.items():
+            out = f"{base}_{msg_type}.parquet"
+            pq.write_table(pa.table(columns), out)
+            print(f"Exported {msg_type} to {out}")
+    else:
+        flat = {f"{msg_type}.{name}": column
+                for msg_type, columns in arrays.items() for name, column in columns.items()}
+        np.savez(filename, **flat)
+        print(f"Exported {len(arrays)} message types to {filename}")
@@ -1,8 +1,12 @@
+import os
 import socket
 import sys
 import time
 from pymavlink import mavutil
 
+# ログをまとめて読み込む単位（バイト）
+READ_CHUNK_SIZE = 64 * 1024
+
 
 class MavlinkHandler:
     def __init__(self, log_filename="mavlink-log.bin", udp_ip="0.0.0.0", udp_port=54001, replay=False):
@@ -33,9 +37,11 @@ class MavlinkHandler:
         try:
             with open(self.log_filename, "rb") as log_file:
                 prev_timestamp = None  # 前回のタイムスタンプを保存
-                while byte := log_file.read(1):  # 1バイトずつ読み取る
-                    msg = self.mavlink_connection.parse_char(byte)
-                    if msg:
+                while chunk := log_file.read(READ_CHUNK_SIZE):
+                    msgs = self.mavlink_connection.parse_buffer(chunk)
+                    if not msgs:
+                        continue
+                    for msg in msgs:
                         # タイムスタンプ処理
                         if self.replay and hasattr(msg, 'time_usec'):
                             current_timestamp = msg.time_usec / 1e6  # マイクロ秒から秒に変換
@@ -52,6 +58,25 @@ class MavlinkHandler:
         except Exception as e:
             print(f"Error parsing log file: {e}")
 
+    def analyze_log_file(self, msg_types=None, export_filename=None):
+        """ログファイルをオフライン解析し、メッセージタイプ毎の統計を表示"""
+        from mavlink_log_analyzer import MavlinkLogAnalyzer, export_arrays, print_stats
+
+        print(f"Analyzing log file: {self.log_filename}")
+        try:
+            analyzer = MavlinkLogAnalyzer(self.log_filename, msg_types=msg_types)
+            start = time.perf_counter()
+            arrays = analyzer.analyze()
+            elapsed = time.perf_counter() - start
+        except FileNotFoundError:
+            print(f"Log file {self.log_filename} not found.")
+            return
+        size_mb = os.path.getsize(self.log_filename) / (1024 * 1024)
+        print(f"Parsed {size_mb:.1f} MB in {elapsed:.2f} s")
+        print_stats(analyzer, arrays)
+        if export_filename:
+            export_arrays(arrays, export_filename)
+
     def receive_udp(self):
         """UDPパケットを受信して処理"""
         # ソケットを作成してバインド
@@ -85,12 +110,26 @@ Usage:
     python script_name.py <log_file>    Parse and display messages from an existing binary log file.
     python script_name.py <log_file> --replay
                                         Replay log file with timing based on message timestamps.
+    python script_name.py <log_file> --analyze [--types AHRS2,SERVO_OUTPUT_RAW] [--export out.npz]
+                                        Analyze the whole log offline and print rate, jitter, gap and
+                                        dropout statistics per message type.
+                                        --export writes the columnar data as .npz, or as
+                                        <name>_<TYPE>.parquet files for a .parquet name (requires pyarrow).
 Options:
     --help                              Display this help message.
 """
     print(usage)
 
 
+def get_option_value(name):
+    """オプションの値を取得（指定されていない場合は None）"""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return None
+
+
 def main():
     # 引数によるモード判定
     if len(sys.argv) > 1:
@@ -101,7 +140,13 @@ def main():
             log_filename = sys.argv[1]
             replay_mode = "--replay" in sys.argv
             handler = MavlinkHandler(log_filename=log_filename, replay=replay_mode)
-            handler.parse_log_file()
+            if "--analyze" in sys.argv:
+                msg_types = get_option_value("--types")
+                handler.analyze_log_file(
+                    msg_types=msg_types.split(",") if msg_types else None,
+                    export_filename=get_option_value("--export"))
+            else:
+                handler.parse_log_file()
     else:
         # UDPロギングモード
         handler = MavlinkHandler()